@@ -0,0 +1,146 @@
+"""Adaptive service polling of waiters."""
+
+import random
+from threading import Lock
+from time import monotonic
+from typing import Dict, NamedTuple, Optional
+
+# Max interval between service polls of a waiter
+DEFAULT_MAX_POLL_INTERVAL = 60
+
+
+class PollBackoff(NamedTuple):
+    """Exponential backoff of service polls in waiters.
+
+    initial: first interval between polls (None - ws_timeout of waiter)
+    maximum: max interval between polls
+    multiplier: interval multiplier after each poll (1 - fixed interval)
+    jitter: part of interval randomized in both directions
+
+    Interval is capped by the remaining timeout of waiter.
+    A relevant websocket event resets interval: service is
+    polled immediately and interval starts from initial.
+    """
+
+    initial: Optional[float] = None
+    maximum: float = DEFAULT_MAX_POLL_INTERVAL
+    multiplier: float = 2
+    jitter: float = 0.2
+
+
+class PollSchedule:
+    """Schedule of service polls of one wait."""
+
+    def __init__(
+        self,
+        backoff: Optional[PollBackoff],
+        ws_timeout: float,
+        timeout: float,
+    ):
+        """Init.
+
+        :param backoff: backoff (None - default backoff)
+        :param ws_timeout: initial interval if backoff has not it
+        :param timeout: wait timeout
+        """
+        self._backoff = backoff or PollBackoff()
+        initial = self._backoff.initial
+        self._initial = ws_timeout if initial is None else initial
+        self._interval = self._initial
+        now = monotonic()
+        self._deadline = now + timeout
+        self._next_poll = now
+        self.polls = 0
+        self.events = 0
+
+    def expired(self) -> bool:
+        """Check timeout of wait.
+
+        :return: timeout is expired
+        """
+        return monotonic() >= self._deadline
+
+    def delay(self) -> float:
+        """Get time to the next poll.
+
+        :return: delay (capped by the remaining timeout)
+        """
+        return max(min(self._next_poll, self._deadline) - monotonic(), 0)
+
+    def polled(self):
+        """Service is polled: schedule the next poll."""
+        self.polls += 1
+        jitter = self._backoff.jitter
+        interval = self._interval * random.uniform(  # NOQA:S311
+            1 - jitter,
+            1 + jitter,
+        )
+        self._next_poll = monotonic() + min(interval, self._backoff.maximum)
+        self._interval = min(
+            self._interval * self._backoff.multiplier,
+            self._backoff.maximum,
+        )
+
+    def reset(self):
+        """Relevant websocket event: poll now and reset interval."""
+        self.events += 1
+        self._interval = self._initial
+        self._next_poll = monotonic()
+
+
+class WaitMetrics(NamedTuple):
+    """Service polling metrics of waiters.
+
+    waits: number of finished waits
+    timeouts: number of timed out waits
+    polls: number of service polls
+    events: number of relevant websocket events
+    polls_per_wait: mean number of service polls of one wait
+        (None - no waits)
+    """
+
+    waits: int
+    timeouts: int
+    polls: int
+    events: int
+    polls_per_wait: Optional[float]
+
+
+class WaitTracker:
+    """Thread safe counters of waiters polls."""
+
+    def __init__(self):
+        """Init."""
+        self._lock = Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def finished(self, waiter: str, schedule: PollSchedule, timed_out: bool):
+        """Wait is finished.
+
+        :param waiter: waiter name
+        :param schedule: polls schedule of wait
+        :param timed_out: wait is timed out
+        """
+        with self._lock:
+            counters = self._counters.setdefault(
+                waiter,
+                {'waits': 0, 'timeouts': 0, 'polls': 0, 'events': 0},
+            )
+            counters['waits'] += 1
+            counters['timeouts'] += int(timed_out)
+            counters['polls'] += schedule.polls
+            counters['events'] += schedule.events
+
+    def metrics(self) -> Dict[str, WaitMetrics]:
+        """Get metrics.
+
+        :return: metrics by waiter name
+        """
+        with self._lock:
+            return {
+                waiter: WaitMetrics(
+                    polls_per_wait=counters['polls'] / counters['waits'],
+                    **counters,
+                )
+                for waiter, counters in self._counters.items()
+            }
@@ -0,0 +1,199 @@
+"""Chunks of file for multipart upload."""
+
+import mmap
+import os
+from contextlib import contextmanager
+from functools import partial
+from io import UnsupportedOperation
+from threading import Lock
+from typing import BinaryIO, Iterator, Optional, Union
+
+Buffer = Union[bytes, memoryview]
+
+
+def _fileno(opened_file: BinaryIO) -> Optional[int]:
+    """Get file descriptor.
+
+    :param opened_file: opened file
+    :return: file descriptor or None (not a real file)
+    """
+    try:
+        return opened_file.fileno()
+    except (AttributeError, OSError, UnsupportedOperation):
+        return None
+
+
+def is_random_access(opened_file: BinaryIO) -> bool:
+    """Check that chunks of file can be read in any order.
+
+    :param opened_file: opened file
+    :return: True for seekable files
+    """
+    seekable = getattr(opened_file, 'seekable', None)
+    return bool(seekable and seekable())
+
+
+class FileChunks:
+    """Random access chunks of seekable file.
+
+    Chunks are zero-copy memoryview slices of the memory mapped file
+    (or of the BytesIO buffer), they can be used from any thread.
+    If file can not be mapped, chunks are read by os.pread
+    or by seek and read under lock.
+
+    Chunk views should be released before closing,
+    so use the chunk context manager:
+
+    >>> with FileChunks(opened_file, chunk_size) as chunks:
+    >>>     with chunks.chunk(0) as part:
+    >>>         upload(part)
+    """
+
+    def __init__(self, opened_file: BinaryIO, chunk_size: int):
+        """Init.
+
+        :param opened_file: seekable opened file
+        :param chunk_size: size of chunk
+        """
+        self._file = opened_file
+        self.chunk_size = chunk_size
+        self._lock = Lock()
+        self._mmap: Optional[mmap.mmap] = None
+        self._buffer: Optional[memoryview] = None
+        self._fileno = _fileno(opened_file)
+        if self._fileno is not None:
+            self.size = os.fstat(self._fileno).st_size
+            self._buffer = self._map()
+        elif hasattr(opened_file, 'getbuffer'):
+            self._buffer = opened_file.getbuffer()  # type: ignore
+            self.size = len(self._buffer)
+        else:
+            with self._lock:
+                position = opened_file.tell()
+                self.size = opened_file.seek(0, os.SEEK_END)
+                opened_file.seek(position)
+
+    def __enter__(self):
+        """Enter.
+
+        :return: self
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Exit.
+
+        :param exc_type: exception type
+        :param exc_value: exception
+        :param traceback: traceback
+        """
+        self.close()
+
+    def __len__(self) -> int:
+        """Number of chunks.
+
+        :return: number of chunks
+        """
+        return -(-self.size // self.chunk_size)
+
+    def read(self, chunk_number: int) -> Buffer:
+        """Read chunk.
+
+        :param chunk_number: chunk number (starts from 0)
+        :return: chunk memoryview (zero copy) or bytes
+        """
+        offset = chunk_number * self.chunk_size
+        if self._buffer is not None:
+            return self._buffer[offset:offset + self.chunk_size]
+        if self._fileno is not None and hasattr(os, 'pread'):
+            return os.pread(self._fileno, self.chunk_size, offset)
+        with self._lock:
+            self._file.seek(offset)
+            return self._file.read(self.chunk_size)
+
+    @contextmanager
+    def chunk(self, chunk_number: int) -> Iterator[Buffer]:
+        """Get chunk and release it after usage.
+
+        :param chunk_number: chunk number (starts from 0)
+        :yields: chunk memoryview or bytes
+        """
+        part = self.read(chunk_number)
+        try:
+            yield part
+        finally:
+            if isinstance(part, memoryview):
+                part.release()
+
+    def close(self):
+        """Release file buffer."""
+        if self._buffer is not None:
+            self._buffer.release()
+            self._buffer = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def _map(self) -> Optional[memoryview]:
+        """Map file to memory.
+
+        :return: view of the mapped file or None
+        """
+        if not self.size:
+            return None
+        try:
+            self._mmap = mmap.mmap(
+                self._fileno,  # type: ignore
+                0,
+                access=mmap.ACCESS_READ,
+            )
+        except (OSError, ValueError):
+            return None
+        return memoryview(self._mmap)
+
+
+class BufferedChunks:
+    """Sequential chunks of not seekable stream.
+
+    One buffer is reused for every chunk,
+    so the previous chunk must be uploaded before the next read.
+    """
+
+    def __init__(self, opened_file: BinaryIO, chunk_size: int):
+        """Init.
+
+        :param opened_file: opened file
+        :param chunk_size: size of chunk
+        """
+        self._file = opened_file
+        self._buffer = bytearray(chunk_size)
+
+    def __iter__(self) -> Iterator[Buffer]:
+        """Iterate over chunks.
+
+        :yields: chunk view or bytes
+        """
+        if not hasattr(self._file, 'readinto'):
+            yield from iter(partial(self._file.read, len(self._buffer)), b'')
+            return
+        while True:
+            length = self._fill()
+            if not length:
+                return
+            yield memoryview(self._buffer)[:length]
+
+    def _fill(self) -> int:
+        """Fill buffer from file.
+
+        :return: length of data in buffer
+        """
+        length = 0
+        with memoryview(self._buffer) as view:
+            while length < len(self._buffer):
+                read_length = self._file.readinto(  # type: ignore
+                    view[length:],
+                )
+                if not read_length:
+                    break
+                length += read_length
+        return length
@@ -1,12 +1,38 @@
 """Dicom addon namespace."""
+import mmap
 import os
+import weakref
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import closing
 from enum import Enum, auto
-from io import BytesIO
+from io import DEFAULT_BUFFER_SIZE, BufferedReader, BytesIO
 from pathlib import Path
-from typing import Any, BinaryIO, Dict, NamedTuple, Optional, cast
+from time import sleep
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Set,
+    Union,
+    cast,
+)
 
 import pydicom
 from pydicom.dataset import FileDataset
+from requests import RequestException
+
+from ambra_sdk.addon.chunks import (
+    BufferedChunks,
+    FileChunks,
+    is_random_access,
+)
+from ambra_sdk.addon.journal import MultipartState, UploadJournal, journal_key
+from ambra_sdk.addon.spool import DOWNLOAD_CHUNK_SIZE, SpoolReader, remove_spool
+from ambra_sdk.exceptions.base import AmbraResponseException
+from ambra_sdk.storage.cache import ImageCache, is_content_version
 
 
 class UploadedImageParams(NamedTuple):
@@ -19,6 +45,144 @@ class UploadedImageParams(NamedTuple):
     attr: Any
 
 
+def is_retryable_upload_error(exception: Exception) -> bool:
+    """Check that upload can be retried after exception.
+
+    :param exception: upload exception
+    :return: True for connection and server errors
+    """
+    if isinstance(exception, AmbraResponseException):
+        return isinstance(exception.code, int) and exception.code >= 500
+    return True
+
+
+def dicom_cache_key(  # NOQA:WPS211
+    image_cache: Optional[ImageCache],
+    namespace_id: str,
+    study_uid: str,
+    image_uid: str,
+    image_version: str,
+    pretranscode: Optional[bool],
+) -> Optional[str]:
+    """Get image cache key of dicom payload.
+
+    Only images of concrete versions (content hashes) are cached.
+
+    :param image_cache: image cache
+    :param namespace_id: namespace
+    :param study_uid: study_uid
+    :param image_uid: image_uid
+    :param image_version: image_version
+    :param pretranscode: get pretranscoded
+    :return: key or None (not cached)
+    """
+    if image_cache is None or not is_content_version(image_version):
+        return None
+    return image_cache.key(
+        namespace_id,
+        study_uid,
+        image_uid,
+        image_version,
+        pretranscode=pretranscode,
+    )
+
+
+def read_dicom_payload(
+    chunks: Iterator[bytes],
+    stop_before_pixels: bool = False,
+    defer_size: Optional[Union[int, str]] = None,
+    image_cache: Optional[ImageCache] = None,
+    cache_key: Optional[str] = None,
+) -> FileDataset:
+    """Read dicom from payload chunks.
+
+    Chunks are written to the image cache (if cache key is set)
+    or spooled to a temporary file. Headers only (stop_before_pixels)
+    reading downloads chunks until pixel data.
+
+    :param chunks: payload chunks
+    :param stop_before_pixels: read only headers
+    :param defer_size: read values larger than this size
+        from the temporary file (cached image) on access
+    :param image_cache: image cache
+    :param cache_key: image cache key
+    :return: pydicom object
+    """
+    if image_cache is not None and cache_key is not None \
+       and not stop_before_pixels:
+        mapped = image_cache.write(cache_key, chunks)
+        if mapped is None:
+            return pydicom.dcmread(BytesIO(), force=True)
+        return _read_mapped_dicom(mapped, defer_size=defer_size)
+    with SpoolReader(chunks) as spool:
+        if defer_size is None or stop_before_pixels:
+            return pydicom.dcmread(
+                BufferedReader(spool, DEFAULT_BUFFER_SIZE),
+                force=True,
+                stop_before_pixels=stop_before_pixels,
+            )
+        spool_path = spool.keep()
+    # Deferred values are read by the file name
+    dataset = pydicom.dcmread(spool_path, force=True, defer_size=defer_size)
+    weakref.finalize(dataset, remove_spool, spool_path)
+    return dataset
+
+
+def read_cached_dicom(
+    image_cache: Optional[ImageCache],
+    cache_key: Optional[str],
+    stop_before_pixels: bool = False,
+    defer_size: Optional[Union[int, str]] = None,
+) -> Optional[FileDataset]:
+    """Read dicom from the image cache.
+
+    :param image_cache: image cache
+    :param cache_key: image cache key
+    :param stop_before_pixels: read only headers
+    :param defer_size: read values larger than this size
+        from the memory map of cached image on access
+    :return: pydicom object or None (not cached)
+    """
+    if image_cache is None or cache_key is None:
+        return None
+    cached = image_cache.get(cache_key)
+    if cached is None:
+        return None
+    return _read_mapped_dicom(
+        cached,
+        stop_before_pixels=stop_before_pixels,
+        defer_size=defer_size,
+    )
+
+
+def _read_mapped_dicom(
+    mapped: mmap.mmap,
+    stop_before_pixels: bool = False,
+    defer_size: Optional[Union[int, str]] = None,
+) -> FileDataset:
+    """Read dicom from the memory map of cached image.
+
+    :param mapped: memory map (closed after reading)
+    :param stop_before_pixels: read only headers
+    :param defer_size: read values larger than this size
+        from the memory map on access
+    :return: pydicom object
+    """
+    payload = cast(BinaryIO, mapped)
+    if defer_size is None or stop_before_pixels:
+        with mapped:
+            return pydicom.dcmread(
+                payload,
+                force=True,
+                stop_before_pixels=stop_before_pixels,
+            )
+    # Deferred values are read from the memory map
+    # (it is valid after eviction of cached image)
+    dataset = pydicom.dcmread(payload, force=True, defer_size=defer_size)
+    weakref.finalize(dataset, mapped.close)
+    return dataset
+
+
 class DicomUploadType(Enum):
     """Image upload methods."""
 
@@ -36,6 +200,8 @@ class Dicom:
     CHUNK_UPLOAD_THRESHOLD = 10 * CHUNK_SIZE  # file must be at least this size to use multipart
     COMPRESSION_THRESHOLD = 25 * 1024  # 25 Kb
     RETRY_LIMIT = 120
+    MULTIPART_WORKERS = 4  # number of concurrent chunk uploads
+    UPLOAD_JOURNAL: Optional[UploadJournal] = None  # journal for resumable multipart uploads
 
     def __init__(self, api):
         """Init.
@@ -44,7 +210,7 @@ class Dicom:
         """
         self._api = api
 
-    def get(
+    def get(  # NOQA:WPS211
         self,
         *,
         namespace_id: str,
@@ -53,9 +219,14 @@ class Dicom:
         image_version: str = '*',
         engine_fqdn: Optional[str] = None,
         pretranscode: Optional[bool] = None,
+        stop_before_pixels: bool = False,
+        defer_size: Optional[Union[int, str]] = None,
     ) -> FileDataset:
         """Get dicom.
 
+        Payload is streamed to a temporary file (or api.image_cache),
+        not buffered in memory.
+
         :param namespace_id: uploading to namespace
         :param study_uid: study_uid
         :param image_uid: image_uid
@@ -63,9 +234,32 @@ class Dicom:
 
         :param engine_fqdn: fqdn (if None gets namespace fqdn)
         :param pretranscode: get pretranscoded
+        :param stop_before_pixels: read only headers
+            (the rest of payload is not downloaded)
+        :param defer_size: read values larger than this size
+            (bytes or '512 KB') from the temporary file (cached image)
+            on access
 
         :return: pydicom object
         """
+        image_cache: Optional[ImageCache] = self._api.image_cache
+        cache_key = dicom_cache_key(
+            image_cache,
+            namespace_id=namespace_id,
+            study_uid=study_uid,
+            image_uid=image_uid,
+            image_version=image_version,
+            pretranscode=pretranscode,
+        )
+        cached = read_cached_dicom(
+            image_cache,
+            cache_key,
+            stop_before_pixels=stop_before_pixels,
+            defer_size=defer_size,
+        )
+        if cached is not None:
+            return cached
+
         if engine_fqdn is None:
             engine_fqdn = self._namespace_fqdn(namespace_id)
 
@@ -80,10 +274,14 @@ class Dicom:
                 image_version=image_version,
                 pretranscode=pretranscode,
             )
-        return pydicom.read_file(
-            fp=BytesIO(dicom_payload_resp.content),
-            force=True,
-        )
+        with closing(dicom_payload_resp):
+            return read_dicom_payload(
+                dicom_payload_resp.iter_content(DOWNLOAD_CHUNK_SIZE),
+                stop_before_pixels=stop_before_pixels,
+                defer_size=defer_size,
+                image_cache=image_cache,
+                cache_key=cache_key,
+            )
 
     def upload(
         self,
@@ -172,30 +370,97 @@ class Dicom:
         engine_fqdn: str,
         study_uid: str,
     ) -> UploadedImageParams:
+        """Upload file in parts.
+
+        If UPLOAD_JOURNAL is set, interrupted upload of the same file
+        is resumed: uploaded chunks are skipped.
+        If the resumed upload is rejected by the server
+        (for example, it is expired), the file is uploaded from scratch.
+
+        :param dicom_file: dicom file
+        :param namespace_id: uploading to namespace
+        :param engine_fqdn: engine fqdn
+        :param study_uid: UID of the study
+        :return: uploaded image params
+        """
+        journal = self.UPLOAD_JOURNAL
+        key = None
+        if journal is not None:
+            key = journal_key(dicom_file, engine_fqdn, namespace_id)
+        if key is not None:
+            state = journal.find(key, self.CHUNK_SIZE)  # type: ignore
+            if state is not None and state.resumed:
+                try:
+                    return self._upload_parts(
+                        dicom_file=dicom_file,
+                        namespace_id=namespace_id,
+                        engine_fqdn=engine_fqdn,
+                        study_uid=study_uid,
+                        state=state,
+                    )
+                except AmbraResponseException as exception:
+                    if is_retryable_upload_error(exception):
+                        raise
+                    journal.forget(key)  # type: ignore
         initiate_response = self._api.Storage.Image.multipart_initiate(engine_fqdn)
         upload_uuid = initiate_response['upload_uuid']
-        chunk_number = 0
-        file_size = 0
-        while True:
-            part = dicom_file.read(self.CHUNK_SIZE)
-            if not part:
-                break
-            file_size += len(part)
-            self._api.Storage.Image.multipart_chunk_upload(
+        if key is None:
+            state = MultipartState(upload_uuid)
+        else:
+            state = journal.start(  # type: ignore
+                key,
+                upload_uuid,
+                self.CHUNK_SIZE,
+            )
+        return self._upload_parts(
+            dicom_file=dicom_file,
+            namespace_id=namespace_id,
+            engine_fqdn=engine_fqdn,
+            study_uid=study_uid,
+            state=state,
+        )
+
+    def _upload_parts(
+        self,
+        *,
+        dicom_file: BinaryIO,
+        namespace_id: str,
+        engine_fqdn: str,
+        study_uid: str,
+        state: MultipartState,
+    ) -> UploadedImageParams:
+        """Upload not uploaded chunks and complete upload.
+
+        :param dicom_file: dicom file
+        :param namespace_id: uploading to namespace
+        :param engine_fqdn: engine fqdn
+        :param study_uid: UID of the study
+        :param state: multipart upload state
+        :return: uploaded image params
+        """
+        dicom_file.seek(0)
+        if self.MULTIPART_WORKERS > 1 and is_random_access(dicom_file):
+            with FileChunks(dicom_file, self.CHUNK_SIZE) as chunks:
+                file_size = self._parallel_chunks_upload(
+                    chunks=chunks,
+                    engine_fqdn=engine_fqdn,
+                    state=state,
+                )
+        else:
+            file_size = self._sequential_chunks_upload(
+                dicom_file=dicom_file,
                 engine_fqdn=engine_fqdn,
-                upload_uuid=upload_uuid,
-                bytes_part=part,
-                chunk_number=chunk_number,
+                state=state,
             )
-            chunk_number += 1
         dicom_file.seek(0)
         self._api.Storage.Image.multipart_complete(
             engine_fqdn=engine_fqdn,
             namespace=namespace_id,
-            upload_uuid=upload_uuid,
+            upload_uuid=state.upload_uuid,
             study_uid=study_uid,
             file_size=file_size,
         )
+        state.complete()
         return UploadedImageParams(
             study_uid=study_uid,
             image_uid='',
@@ -204,6 +469,146 @@ class Dicom:
             attr=None,
         )
 
+    def _sequential_chunks_upload(
+        self,
+        *,
+        dicom_file: BinaryIO,
+        engine_fqdn: str,
+        state: MultipartState,
+    ) -> int:
+        """Upload chunks one by one.
+
+        One chunk buffer is reused for all chunks.
+
+        :param dicom_file: dicom file
+        :param engine_fqdn: engine fqdn
+        :param state: multipart upload state
+        :return: file size
+        """
+        chunk_number = 0
+        file_size = 0
+        for part in BufferedChunks(dicom_file, self.CHUNK_SIZE):
+            file_size += len(part)
+            if not state.is_uploaded(chunk_number):
+                self._chunk_upload(
+                    engine_fqdn=engine_fqdn,
+                    upload_uuid=state.upload_uuid,
+                    bytes_part=part,
+                    chunk_number=chunk_number,
+                )
+                state.uploaded(chunk_number)
+            chunk_number += 1
+        return file_size
+
+    def _parallel_chunks_upload(
+        self,
+        *,
+        chunks: FileChunks,
+        engine_fqdn: str,
+        state: MultipartState,
+    ) -> int:
+        """Upload chunks concurrently.
+
+        Every chunk is read by the worker thread as a zero-copy view
+        of the mapped file (or read just before upload).
+
+        :param chunks: file chunks
+        :param engine_fqdn: engine fqdn
+        :param state: multipart upload state
+        :return: file size
+        """
+        pending: Set[Future] = set()
+        with ThreadPoolExecutor(max_workers=self.MULTIPART_WORKERS) as executor:
+            try:
+                for chunk_number in range(len(chunks)):
+                    if state.is_uploaded(chunk_number):
+                        continue
+                    if len(pending) >= self.MULTIPART_WORKERS * 2:
+                        done, pending = wait(
+                            pending,
+                            return_when=FIRST_COMPLETED,
+                        )
+                        for future in done:
+                            future.result()
+                    pending.add(
+                        executor.submit(
+                            self._read_and_upload_chunk,
+                            chunks=chunks,
+                            engine_fqdn=engine_fqdn,
+                            state=state,
+                            chunk_number=chunk_number,
+                        ),
+                    )
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:  # NOQA:WPS440
+                        future.result()
+            finally:
+                for pending_future in pending:
+                    pending_future.cancel()
+        return chunks.size
+
+    def _read_and_upload_chunk(
+        self,
+        *,
+        chunks: FileChunks,
+        engine_fqdn: str,
+        state: MultipartState,
+        chunk_number: int,
+    ):
+        """Read and upload chunk.
+
+        :param chunks: file chunks
+        :param engine_fqdn: engine fqdn
+        :param state: multipart upload state
+        :param chunk_number: chunk number
+        """
+        with chunks.chunk(chunk_number) as part:
+            self._chunk_upload(
+                engine_fqdn=engine_fqdn,
+                upload_uuid=state.upload_uuid,
+                bytes_part=part,
+                chunk_number=chunk_number,
+            )
+        state.uploaded(chunk_number)
+
+    def _chunk_upload(
+        self,
+        *,
+        engine_fqdn: str,
+        upload_uuid: str,
+        bytes_part: Union[bytes, memoryview],
+        chunk_number: int,
+    ):
+        """Upload chunk with retries.
+
+        Failed chunk is retried up to RETRY_LIMIT times
+        every UPLOAD_RETRY_DELAY milliseconds.
+
+        :param engine_fqdn: engine fqdn
+        :param upload_uuid: multipart upload uuid
+        :param bytes_part: chunk bytes
+        :param chunk_number: chunk number
+        :raises RequestException: Connection error
+        :raises AmbraResponseException: Response error
+        """
+        attempt = 0
+        while True:
+            try:
+                self._api.Storage.Image.multipart_chunk_upload(
+                    engine_fqdn=engine_fqdn,
+                    upload_uuid=upload_uuid,
+                    bytes_part=bytes_part,
+                    chunk_number=chunk_number,
+                )
+                return
+            except (RequestException, AmbraResponseException) as exception:
+                if attempt >= self.RETRY_LIMIT or \
+                   not is_retryable_upload_error(exception):
+                    raise
+            attempt += 1
+            sleep(self.UPLOAD_RETRY_DELAY / 1000)
+
     def _default_upload(
         self,
         dicom_file: BinaryIO,
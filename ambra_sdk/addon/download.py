@@ -0,0 +1,201 @@
+"""Study download to a directory.
+
+Images are saved as {study_dir}/{series_uid}/{image_uid}.dcm.
+Downloaded images are recorded to the manifest (JSON lines file
+in the study dir), so an interrupted download is resumed:
+images with the same version and size are not downloaded again.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+from pathlib import Path
+from threading import Lock
+from typing import (
+    Any,
+    AsyncIterable,
+    BinaryIO,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Tuple,
+)
+
+MANIFEST_NAME = '.download.jsonl'
+
+
+class StudyImage(NamedTuple):
+    """Image of study schema."""
+
+    series_uid: str
+    image_uid: str
+    image_version: str
+
+
+class DownloadedImage(NamedTuple):
+    """Downloaded image."""
+
+    series_uid: str
+    image_uid: str
+    image_version: str
+    path: Path
+    skipped: bool  # downloaded before (resumed download)
+
+
+def schema_images(schema: Any) -> List[StudyImage]:
+    """Get images of study schema.
+
+    :param schema: study schema (Storage.Study.schema)
+    :return: images
+    """
+    return [
+        StudyImage(
+            series_uid=series['series_uid'],
+            image_uid=image['id'],
+            image_version=image['version'],
+        )
+        for series in schema.get('series', [])
+        for image in series.get('images', [])
+    ]
+
+
+def image_path(study_dir: Path, image: StudyImage) -> Path:
+    """Get path of downloaded image.
+
+    :param study_dir: study directory
+    :param image: image
+    :return: path
+    """
+    return study_dir / image.series_uid / '{image_uid}.dcm'.format(
+        image_uid=image.image_uid,
+    )
+
+
+def open_tmp_file(path: Path) -> Tuple[BinaryIO, str]:
+    """Create temporary file near the file path.
+
+    :param path: file path
+    :return: opened temporary file and its path
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix='.tmp')
+    return os.fdopen(tmp_fd, 'wb'), tmp_path
+
+
+def write_file(path: Path, chunks: Iterable[bytes]) -> int:
+    """Write file atomically (temporary file and rename).
+
+    :param path: file path
+    :param chunks: file content chunks
+    :return: file size
+    """
+    tmp_file, tmp_path = open_tmp_file(path)
+    try:
+        with tmp_file:
+            for chunk in chunks:
+                tmp_file.write(chunk)
+            size = tmp_file.tell()
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return size
+
+
+async def async_write_file(path: Path, chunks: AsyncIterable[bytes]) -> int:
+    """Write file atomically from async chunks (temporary file and rename).
+
+    File is written in the default executor.
+
+    :param path: file path
+    :param chunks: file content chunks
+    :return: file size
+    """
+    loop = asyncio.get_event_loop()
+    tmp_file, tmp_path = await loop.run_in_executor(None, open_tmp_file, path)
+    try:
+        with tmp_file:
+            async for chunk in chunks:
+                await loop.run_in_executor(None, tmp_file.write, chunk)
+            size = tmp_file.tell()
+            # Buffered data is not written by close on the loop
+            await loop.run_in_executor(None, tmp_file.flush)
+        await loop.run_in_executor(None, os.replace, tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return size
+
+
+class DownloadManifest:
+    """Manifest of downloaded images."""
+
+    def __init__(self, study_dir: Path):
+        """Init.
+
+        :param study_dir: study directory
+        """
+        self.path = study_dir / MANIFEST_NAME
+        self._lock = Lock()
+        # relative path -> (version, size)
+        self._images: Dict[str, Tuple[str, int]] = {}
+        self._load()
+
+    def is_downloaded(self, path: Path, image_version: str) -> bool:
+        """Check that image of the version is downloaded.
+
+        :param path: image path
+        :param image_version: image version
+        :return: True if the file of recorded version and size exists
+        """
+        with self._lock:
+            recorded = self._images.get(self._name(path))
+        if recorded is None or recorded[0] != image_version:
+            return False
+        try:
+            return path.stat().st_size == recorded[1]
+        except OSError:
+            return False
+
+    def record(self, path: Path, image_version: str, size: int):
+        """Record downloaded image.
+
+        :param path: image path
+        :param image_version: image version
+        :param size: file size
+        """
+        name = self._name(path)
+        with self._lock:
+            self._images[name] = (image_version, size)
+            with open(self.path, 'a') as manifest_file:
+                manifest_file.write(json.dumps({
+                    'path': name,
+                    'version': image_version,
+                    'size': size,
+                }) + '\n')
+
+    def _name(self, path: Path) -> str:
+        """Get name of image in the manifest.
+
+        :param path: image path
+        :return: path relative to study dir
+        """
+        return path.relative_to(self.path.parent).as_posix()
+
+    def _load(self):
+        """Load downloaded images."""
+        if not self.path.exists():
+            return
+        with open(self.path) as manifest_file:
+            for line in manifest_file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Last line can be broken by interrupted write
+                    continue
+                self._images[record['path']] = (
+                    record['version'],
+                    record['size'],
+                )
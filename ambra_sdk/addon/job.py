@@ -3,22 +3,166 @@
 import uuid as uuid_lib
 from contextlib import suppress
 from time import monotonic
-from typing import Mapping, Optional, Tuple, Union, cast
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
 
 from box import Box
 
+from ambra_sdk.addon.backoff import PollBackoff, PollSchedule
 from ambra_sdk.exceptions.service import (
     NotFound,
     NotPermitted,
     PreconditionFailed,
 )
 from ambra_sdk.service.query import QueryO
-from ambra_sdk.service.ws import WSManager
+from ambra_sdk.service.ws.dispatcher import message_json
 
 ERRORS_MAPPING_KEY_TYPE = Union[Tuple[str, Optional[str]], str]
 
 ERRORS_MAPPING_TYPE = Mapping[ERRORS_MAPPING_KEY_TYPE, PreconditionFailed]
 
+JOB_STATES = frozenset(('FINISHED', 'DONE', 'ERROR', 'RUNNING', 'SCHEDULED'))
+
+# Max number of /job/get requests in one polling round of wait_many
+JOBS_POLL_BATCH_SIZE = 20
+
+
+def check_job_state(job_status: Box) -> bool:
+    """Check job state.
+
+    :param job_status: /job/get response
+    :return: job is finished (DONE or ERROR)
+
+    :raises RuntimeError: Unknown job state
+    """
+    if job_status['state'] not in JOB_STATES:
+        raise RuntimeError(
+            'Unknown job status {job_status}'.format(
+                job_status=job_status['state'],
+            ),
+        )
+    return job_status['state'] in {'DONE', 'ERROR'}
+
+
+def event_job_id(msg) -> Optional[str]:
+    """Get job id of job event.
+
+    :param msg: websocket message
+    :return: job id (None if event has not it)
+    """
+    msg_json = message_json(msg)
+    if msg_json is None:
+        return None
+    job_id = msg_json.get('id')
+    return None if job_id is None else str(job_id)
+
+
+class JobsPolling:
+    """Schedule of /job/get requests of many jobs.
+
+    A job with own event is checked immediately.
+    Jobs are rechecked (stragglers) if they were not checked
+    for poll_interval, jobs are checked after an event without
+    job id too. These checks are sent by batches of batch_size
+    jobs spread over poll_interval.
+    """
+
+    def __init__(
+        self,
+        job_ids: Iterable[str],
+        poll_interval: float,
+        batch_size: int,
+    ):
+        """Init.
+
+        :param job_ids: job ids
+        :param poll_interval: interval of not finished jobs checks
+        :param batch_size: max number of jobs in one batch
+        """
+        self._poll_interval = poll_interval
+        self._batch_size = batch_size
+        # Ordered sets of not finished jobs and jobs for checking
+        self.pending: Dict[str, None] = dict.fromkeys(job_ids)
+        self._urgent: Dict[str, None] = {}
+        self._due: Dict[str, None] = dict(self.pending)
+        # job id -> time of the last check
+        self._checked: Dict[str, float] = {}
+        self._next_batch = monotonic()
+
+    def batch(self) -> List[str]:
+        """Get jobs for checking now.
+
+        :return: job ids
+        """
+        now = monotonic()
+        for job_id, checked in self._checked.items():
+            if now - checked >= self._poll_interval:
+                self._due[job_id] = None
+        batch = list(self._urgent)[:self._batch_size]
+        paced = self._due and len(batch) < self._batch_size
+        if paced and now >= self._next_batch:
+            batch.extend(
+                job_id
+                for job_id in list(self._due)[:self._batch_size - len(batch)]
+                if job_id not in batch
+            )
+            self._next_batch = now + self._poll_interval * \
+                self._batch_size / max(len(self.pending), self._batch_size)
+        for job_id in batch:
+            self._urgent.pop(job_id, None)
+            self._due.pop(job_id, None)
+            self._checked[job_id] = now
+        if not self._due:
+            # Next sweep is not delayed
+            self._next_batch = now
+        return batch
+
+    def finished(self, job_id: str):
+        """Job is finished.
+
+        :param job_id: job id
+        """
+        self.pending.pop(job_id, None)
+        self._checked.pop(job_id, None)
+
+    def received(self, messages: Iterable):
+        """Events are received.
+
+        :param messages: websocket messages
+        """
+        for msg in messages:
+            job_id = event_job_id(msg)
+            if job_id is None:
+                self._due.update(self.pending)
+            elif job_id in self.pending:
+                self._urgent[job_id] = None
+
+    def delay(self) -> float:
+        """Get time to the next batch.
+
+        :return: delay
+        """
+        if self._urgent:
+            return 0
+        now = monotonic()
+        if self._due:
+            return max(self._next_batch - now, 0)
+        if not self._checked:
+            return self._poll_interval
+        return max(
+            min(self._checked.values()) + self._poll_interval - now,
+            0,
+        )
+
 
 class Job:  # NOQA: WPS220
     """Job addon namespace."""
@@ -36,6 +180,7 @@ class Job:  # NOQA: WPS220
         *,
         timeout: float = 200.0,
         ws_timeout: int = 5,
+        backoff: Optional[PollBackoff] = None,
         **kwargs,
     ):
         """Wait completion.
@@ -44,6 +189,7 @@ class Job:  # NOQA: WPS220
         :param method: method
         :param timeout: timeout
         :param ws_timeout: websocket interval
+        :param backoff: polling backoff (None - default backoff)
         :param kwargs: method kwargs
         :return: method result
         """
@@ -61,6 +207,7 @@ class Job:  # NOQA: WPS220
             namespace_id=namespace,
             timeout=timeout,
             ws_timeout=ws_timeout,
+            backoff=backoff,
         )
         return method_result
 
@@ -71,17 +218,142 @@ class Job:  # NOQA: WPS220
         namespace_id: str,
         timeout: float,
         ws_timeout: int,
+        backoff: Optional[PollBackoff] = None,
     ):
         """Wait job.
 
+        Job is polled with exponential backoff (interval starts
+        from ws_timeout by default), a DONE event of the job
+        (or an event without job id) triggers an immediate poll.
+
         :param job_id: job id
         :param namespace_id: job namespace_id
         :param timeout: time for waiting new study
         :param ws_timeout: time for waiting in socket
+        :param backoff: polling backoff (None - default backoff)
 
         :raises TimeoutError: if job not ready by timeout
         :raises RuntimeError: Bad answer from ws
         """
+        get_job_query = self._job_query(job_id)
+        schedule = PollSchedule(backoff, ws_timeout, timeout)
+
+        # K. Pustovalov: job channel have form job.namespace
+        channel_name = 'job.{namespace_id}'.format(namespace_id=namespace_id)
+        sid = self._api.sid
+
+        job_is_ready = False
+        try:  # NOQA:WPS501
+            with self._api.ws_hub.events(
+                sid,
+                channel_name,
+                ['DONE'],
+                lambda msg: event_job_id(msg) in {job_id, None},
+            ) as events:
+                while not schedule.expired():
+                    job_status = None
+                    with suppress(NotFound):
+                        job_status = cast(Box, get_job_query.get())
+                    schedule.polled()
+                    if job_status is not None:
+                        check_job_state(job_status)
+                        if job_status['state'] == 'DONE':
+                            job_is_ready = True
+                            break
+                        elif job_status['state'] == 'ERROR':
+                            raise RuntimeError(
+                                f'Job finished with error {job_status}',
+                            )
+                    with suppress(TimeoutError):
+                        events.get(timeout=schedule.delay())
+                        schedule.reset()
+        finally:
+            self._api.wait_tracker.finished(
+                'job',
+                schedule,
+                timed_out=not job_is_ready and schedule.expired(),
+            )
+        if job_is_ready is False:
+            raise TimeoutError
+
+    def wait_many(  # NOQA:WPS210,WPS231
+        self,
+        job_ids: Iterable[str],
+        *,
+        namespace_id: str,
+        timeout: float,
+        ws_timeout: float = 5,
+        poll_interval: float = 30,
+        poll_batch_size: int = JOBS_POLL_BATCH_SIZE,
+    ) -> Iterator[Tuple[str, Box]]:
+        """Wait many jobs of namespace.
+
+        Jobs are yielded as they finish (DONE or ERROR state,
+        check job_status.state).
+        The namespace channel is subscribed once for all jobs.
+        A job is checked by /job/get after its DONE event (all
+        jobs are checked after an event without job id) and
+        not finished jobs are checked every poll_interval.
+        Rechecks are sent by batches of poll_batch_size jobs
+        spread over poll_interval (see JobsPolling).
+
+        :Example:
+
+        >>> for job_id, job_status in api.Addon.Job.wait_many(
+        >>>     job_ids,
+        >>>     namespace_id=namespace_id,
+        >>>     timeout=600,
+        >>> ):
+        >>>     print(job_id, job_status.state)
+
+        :param job_ids: job ids
+        :param namespace_id: jobs namespace_id
+        :param timeout: time for waiting all jobs
+        :param ws_timeout: time for waiting in socket
+        :param poll_interval: interval of not finished jobs checks
+        :param poll_batch_size: max number of jobs in one polling round
+
+        :raises TimeoutError: if jobs not ready by timeout
+
+        :yields: job id and job status
+        """
+        start = monotonic()
+        polling = JobsPolling(job_ids, poll_interval, poll_batch_size)
+
+        channel_name = 'job.{namespace_id}'.format(namespace_id=namespace_id)
+        sid = self._api.sid
+        with self._api.ws_hub.events(sid, channel_name, ['DONE']) as events:
+            while polling.pending:
+                if monotonic() - start >= timeout:
+                    raise TimeoutError
+                for job_id in polling.batch():
+                    with suppress(NotFound):
+                        job_status = cast(
+                            Box,
+                            self._job_query(job_id).get(),
+                        )
+                        if check_job_state(job_status):
+                            polling.finished(job_id)
+                            yield job_id, job_status
+                if not polling.pending:
+                    break
+                wait_timeout = min(
+                    ws_timeout,
+                    polling.delay(),
+                    start + timeout - monotonic(),
+                )
+                received = []
+                with suppress(TimeoutError):
+                    received.append(events.get(timeout=max(wait_timeout, 0)))
+                received.extend(events.drain())
+                polling.received(received)
+
+    def _job_query(self, job_id: str) -> QueryO:
+        """Get /job/get query.
+
+        :param job_id: job id
+        :return: query
+        """
         errors_mapping: ERRORS_MAPPING_TYPE = {
             ('NOT_FOUND', None):
             NotFound('The job can not be found'),
@@ -91,52 +363,10 @@ class Job:  # NOQA: WPS220
         request_data = {
             'id': job_id,
         }
-        get_job_query = QueryO(
+        return QueryO(
             api=self._api,
             url='/job/get',
             request_data=request_data,
             errors_mapping=errors_mapping,
             required_sid=True,
         )
-
-        ws_url = self._api.ws_url
-        ws_manager = WSManager(ws_url)
-        start = monotonic()
-
-        # K. Pustovalov: job channel have form job.namespace
-        channel_name = 'job.{namespace_id}'.format(namespace_id=namespace_id)
-        sid = self._api.sid
-
-        job_is_ready = False
-        with ws_manager.channel(sid, channel_name) as ws:
-            while True:
-                if monotonic() - start >= timeout:
-                    break
-                with suppress(NotFound):
-                    job_status = cast(Box, get_job_query.get())
-                    if job_status['state'] not in (  # NOQA: WPS510
-                        'FINISHED',
-                        'DONE',
-                        'ERROR',
-                        'RUNNING',
-                        'SCHEDULED',
-                    ):
-                        raise RuntimeError(  # NOQA:WPS220
-                            'Unknown job status {job_status}'.format(
-                                job_status=job_status['state'],
-                            ),
-                        )
-                    if job_status['state'] == 'DONE':
-                        job_is_ready = True
-                        break
-                    elif job_status['state'] == 'ERROR':
-                        raise RuntimeError(f'Job finished with error {job_status}')
-                with suppress(TimeoutError):
-                    ws.wait_for_event(
-                        channel_name,
-                        sid,
-                        'DONE',
-                        timeout=ws_timeout,
-                    )
-        if job_is_ready is False:
-            raise TimeoutError
@@ -0,0 +1,289 @@
+"""Journal of multipart uploads.
+
+Journal is a local JSON lines file. It records upload_uuid
+and numbers of uploaded chunks of every started multipart upload,
+so an interrupted upload of the same (unchanged) file
+can be resumed from the first not uploaded chunk.
+
+Records:
+
+    {"key": ..., "upload_uuid": ..., "chunk_size": ...}  - upload started
+    {"key": ..., "upload_uuid": ..., "chunk": ...}  - chunk uploaded
+    {"key": ..., "upload_uuid": ..., "complete": true}  - upload completed
+"""
+
+import json
+import os
+from pathlib import Path
+from threading import Lock
+from typing import Any, BinaryIO, Dict, Iterable, Optional, Set, Union
+
+
+def journal_key(
+    dicom_file: BinaryIO,
+    engine_fqdn: str,
+    namespace_id: str,
+) -> Optional[str]:
+    """Get journal key of file.
+
+    Key is built from the file path, size and modification time,
+    so a changed file is uploaded from scratch.
+
+    :param dicom_file: opened file
+    :param engine_fqdn: engine fqdn
+    :param namespace_id: namespace id
+    :return: key or None (not a real file)
+    """
+    name = getattr(dicom_file, 'name', None)
+    if not isinstance(name, (str, Path)):
+        return None
+    try:
+        stat = os.fstat(dicom_file.fileno())
+    except (AttributeError, OSError, ValueError):
+        return None
+    return json.dumps([
+        os.path.realpath(name),
+        stat.st_size,
+        stat.st_mtime_ns,
+        engine_fqdn,
+        namespace_id,
+    ])
+
+
+class MultipartState:
+    """State of multipart upload.
+
+    Uploaded chunks are recorded to the journal (if any).
+    """
+
+    def __init__(
+        self,
+        upload_uuid: str,
+        chunks: Iterable[int] = (),
+        journal: Optional['UploadJournal'] = None,
+        key: Optional[str] = None,
+    ):
+        """Init.
+
+        :param upload_uuid: multipart upload uuid
+        :param chunks: numbers of uploaded chunks
+        :param journal: upload journal
+        :param key: journal key of file
+        """
+        self.upload_uuid = upload_uuid
+        self.chunks: Set[int] = set(chunks)
+        self._journal = journal
+        self._key = key
+
+    @property
+    def resumed(self) -> bool:
+        """Some chunks were uploaded before.
+
+        :return: True for resumed upload
+        """
+        return bool(self.chunks)
+
+    def is_uploaded(self, chunk_number: int) -> bool:
+        """Check that chunk is uploaded.
+
+        :param chunk_number: chunk number
+        :return: True if chunk is uploaded
+        """
+        return chunk_number in self.chunks
+
+    def uploaded(self, chunk_number: int):
+        """Mark chunk as uploaded.
+
+        :param chunk_number: chunk number
+        """
+        self.chunks.add(chunk_number)
+        if self._journal is not None and self._key is not None:
+            self._journal.record_chunk(
+                self._key,
+                self.upload_uuid,
+                chunk_number,
+            )
+
+    def complete(self):
+        """Remove completed upload from the journal."""
+        if self._journal is not None and self._key is not None:
+            self._journal.forget(self._key)
+
+
+class UploadJournal:
+    """Journal of multipart uploads.
+
+    :Example:
+
+    >>> api.Addon.Dicom.UPLOAD_JOURNAL = UploadJournal('uploads.jsonl')
+    >>> # Interrupted upload of the same file is resumed
+    >>> api.Addon.Dicom.upload_from_path(dicom_path=path, namespace_id=ns)
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """Init.
+
+        Completed uploads are removed from the journal file.
+
+        :param path: path of journal file
+        """
+        self.path = Path(path)
+        self._lock = Lock()
+        self._uploads: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def find(self, key: str, chunk_size: int) -> Optional[MultipartState]:
+        """Find not completed upload.
+
+        :param key: journal key of file
+        :param chunk_size: chunk size of upload
+        :return: upload state or None
+        """
+        with self._lock:
+            upload = self._uploads.get(key)
+            if upload is None or upload['chunk_size'] != chunk_size:
+                return None
+            return MultipartState(
+                upload_uuid=upload['upload_uuid'],
+                chunks=upload['chunks'],
+                journal=self,
+                key=key,
+            )
+
+    def start(
+        self,
+        key: str,
+        upload_uuid: str,
+        chunk_size: int,
+    ) -> MultipartState:
+        """Record started upload.
+
+        :param key: journal key of file
+        :param upload_uuid: multipart upload uuid
+        :param chunk_size: chunk size of upload
+        :return: upload state
+        """
+        with self._lock:
+            self._uploads[key] = {
+                'upload_uuid': upload_uuid,
+                'chunk_size': chunk_size,
+                'chunks': set(),
+            }
+            self._write({
+                'key': key,
+                'upload_uuid': upload_uuid,
+                'chunk_size': chunk_size,
+            })
+        return MultipartState(upload_uuid, journal=self, key=key)
+
+    def record_chunk(self, key: str, upload_uuid: str, chunk_number: int):
+        """Record uploaded chunk.
+
+        :param key: journal key of file
+        :param upload_uuid: multipart upload uuid
+        :param chunk_number: chunk number
+        """
+        with self._lock:
+            upload = self._uploads.get(key)
+            if upload is None or upload['upload_uuid'] != upload_uuid:
+                return
+            upload['chunks'].add(chunk_number)
+            self._write({
+                'key': key,
+                'upload_uuid': upload_uuid,
+                'chunk': chunk_number,
+            })
+
+    def forget(self, key: str):
+        """Remove upload (completed or expired) from the journal.
+
+        :param key: journal key of file
+        """
+        with self._lock:
+            upload = self._uploads.pop(key, None)
+            if upload is None:
+                return
+            self._write({
+                'key': key,
+                'upload_uuid': upload['upload_uuid'],
+                'complete': True,
+            })
+
+    def _write(self, record: Dict[str, Any]):
+        """Append record to journal file.
+
+        :param record: journal record
+        """
+        with open(self.path, 'a') as journal_file:
+            journal_file.write(json.dumps(record) + '\n')
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+
+    def _load(self):
+        """Load not completed uploads and compact journal file."""
+        if not self.path.exists():
+            return
+        records = 0
+        complete_size = 0
+        with open(self.path, 'rb') as journal_file:
+            for line in journal_file:
+                if not line.endswith(b'\n'):
+                    # Last line is broken by interrupted write
+                    break
+                complete_size += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                records += 1
+                self._apply(record)
+        if complete_size < self.path.stat().st_size:
+            # Next records are not appended to the broken line
+            os.truncate(self.path, complete_size)
+        chunks = sum(len(upload['chunks']) for upload in self._uploads.values())
+        if records > len(self._uploads) + chunks:
+            self._compact()
+
+    def _apply(self, record: Dict[str, Any]):
+        """Apply journal record.
+
+        :param record: journal record
+        """
+        key = record['key']
+        upload = self._uploads.get(key)
+        if 'chunk_size' in record:
+            self._uploads[key] = {
+                'upload_uuid': record['upload_uuid'],
+                'chunk_size': record['chunk_size'],
+                'chunks': set(),
+            }
+        elif upload is None or upload['upload_uuid'] != record['upload_uuid']:
+            return
+        elif record.get('complete'):
+            self._uploads.pop(key)
+        else:
+            upload['chunks'].add(record['chunk'])
+
+    def _compact(self):
+        """Rewrite journal file without completed uploads."""
+        compact_path = self.path.with_name(self.path.name + '.tmp')
+        with open(compact_path, 'w') as journal_file:
+            for key, upload in self._uploads.items():
+                records = [{
+                    'key': key,
+                    'upload_uuid': upload['upload_uuid'],
+                    'chunk_size': upload['chunk_size'],
+                }]
+                records.extend(
+                    {
+                        'key': key,
+                        'upload_uuid': upload['upload_uuid'],
+                        'chunk': chunk_number,
+                    }
+                    for chunk_number in sorted(upload['chunks'])
+                )
+                for record in records:
+                    journal_file.write(json.dumps(record) + '\n')
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        os.replace(compact_path, self.path)
@@ -0,0 +1,171 @@
+"""Spooling of downloaded streams.
+
+Download is written chunk by chunk to a temporary file,
+so a large payload is never held in memory as a whole.
+"""
+
+import asyncio
+import os
+import tempfile
+from io import SEEK_CUR, SEEK_END, SEEK_SET, RawIOBase
+from typing import Iterator, Optional
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1 Mb
+
+
+class SpoolReader(RawIOBase):
+    """Seekable reader of a download stream.
+
+    Chunks are downloaded on demand and spooled to a temporary file,
+    so a reader that stops early (headers only) does not download
+    the rest of the stream.
+    """
+
+    def __init__(self, chunks: Iterator[bytes], spool_dir: Optional[str] = None):
+        """Init.
+
+        :param chunks: download chunks
+        :param spool_dir: directory of temporary file (system default if None)
+        """
+        super().__init__()
+        self._chunks = chunks
+        spool_fd, self.name = tempfile.mkstemp(dir=spool_dir, suffix='.spool')
+        self._spool = os.fdopen(spool_fd, 'w+b')
+        self._position = 0
+        self._size = 0
+        self._complete = False
+        self._keep = False
+
+    @property
+    def downloaded(self) -> int:
+        """Number of downloaded bytes.
+
+        :return: size of spooled data
+        """
+        return self._size
+
+    def readable(self) -> bool:
+        """Readable.
+
+        :return: True
+        """
+        return True
+
+    def seekable(self) -> bool:
+        """Seekable.
+
+        :return: True
+        """
+        return True
+
+    def readinto(self, target) -> int:
+        """Read into target buffer.
+
+        :param target: target buffer
+        :return: number of read bytes
+        """
+        self._download(self._position + len(target))
+        self._spool.seek(self._position)
+        read = self._spool.readinto(target)
+        self._position += read
+        return read
+
+    def seek(self, offset: int, whence: int = SEEK_SET) -> int:
+        """Change stream position.
+
+        :param offset: offset
+        :param whence: offset origin
+        :return: new position
+        :raises ValueError: Invalid whence
+        """
+        if whence == SEEK_SET:
+            self._position = offset
+        elif whence == SEEK_CUR:
+            self._position += offset
+        elif whence == SEEK_END:
+            self.download_all()
+            self._position = self._size + offset
+        else:
+            raise ValueError('Invalid whence: {whence}'.format(whence=whence))
+        return self._position
+
+    def tell(self) -> int:
+        """Current stream position.
+
+        :return: position
+        """
+        return self._position
+
+    def download_all(self):
+        """Download the rest of the stream."""
+        self._download(None)
+
+    def keep(self) -> str:
+        """Keep the spooled file after close.
+
+        The stream is downloaded completely.
+
+        :return: path of spooled file (remove it after use)
+        """
+        self.download_all()
+        self._spool.flush()
+        self._keep = True
+        return self.name
+
+    def close(self):
+        """Close and remove the spooled file."""
+        if not self.closed:
+            self._spool.close()
+            if not self._keep:
+                os.unlink(self.name)
+        super().close()
+
+    def _download(self, size: Optional[int]):
+        """Download chunks.
+
+        :param size: required size of spooled data (None - all)
+        """
+        while not self._complete and (size is None or self._size < size):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._complete = True
+                break
+            self._spool.seek(self._size)
+            self._spool.write(chunk)
+            self._size += len(chunk)
+
+
+def remove_spool(path: str):
+    """Remove kept spooled file.
+
+    :param path: path of spooled file
+    """
+    try:
+        os.unlink(path)
+    except OSError:
+        pass  # NOQA:WPS420
+
+
+def threadsafe_chunks(
+    stream,
+    loop: asyncio.AbstractEventLoop,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """Read chunks of async stream from another thread.
+
+    Used for reading of an aiohttp response by sync consumers
+    (pydicom, file writes) in an executor.
+
+    :param stream: stream with async read(n) method (aiohttp StreamReader)
+    :param loop: event loop of the stream
+    :param chunk_size: chunk size
+    :yields: chunks
+    """
+    while True:
+        chunk = asyncio.run_coroutine_threadsafe(
+            stream.read(chunk_size),
+            loop,
+        ).result()
+        if not chunk:
+            return
+        yield chunk
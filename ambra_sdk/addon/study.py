@@ -1,25 +1,87 @@
 """Study addon namespace."""
 
-from contextlib import suppress
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import closing, suppress
 from itertools import chain
 from pathlib import Path
-from time import monotonic
-from typing import Any, Dict, Iterator, List, Optional, Tuple
+from time import monotonic, sleep
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import pydicom
 from box import Box
+from requests import RequestException
 
 from ambra_sdk import ADDON_DOCS_URL
-from ambra_sdk.addon.dicom import UploadedImageParams
+from ambra_sdk.addon.backoff import PollBackoff, PollSchedule
+from ambra_sdk.addon.dicom import (
+    UploadedImageParams,
+    is_retryable_upload_error,
+)
+from ambra_sdk.addon.download import (
+    DownloadedImage,
+    DownloadManifest,
+    StudyImage,
+    image_path,
+    schema_images,
+    write_file,
+)
+from ambra_sdk.addon.spool import DOWNLOAD_CHUNK_SIZE
+from ambra_sdk.addon.zip_stream import (
+    ZipDicom,
+    ZipEntry,
+    iter_zip,
+    read_zip_dicom,
+)
 from ambra_sdk.deprecated import deprecated
+from ambra_sdk.exceptions.base import AmbraResponseException
 from ambra_sdk.exceptions.service import NotFound
 from ambra_sdk.models import Study as StudyModel
-from ambra_sdk.service.ws import WSManager
+from ambra_sdk.service.ws.dispatcher import message_json
+
+
+class StudyEventFilter:
+    """Filter of study channel events of one study.
+
+    Events are matched by study_uid or uuid of message.
+    Events without study identifiers (and events with uuid
+    while uuid of study is unknown) are not filtered.
+    """
+
+    def __init__(self, study_uid: str, uuid: Optional[str] = None):
+        """Init.
+
+        :param study_uid: study uid
+        :param uuid: study uuid (set it when the study is found)
+        """
+        self.study_uid = study_uid
+        self.uuid = uuid
+
+    def __call__(self, msg) -> bool:
+        """Check event.
+
+        :param msg: websocket message
+        :return: event can be an event of study
+        """
+        msg_json = message_json(msg) or {}
+        study_uid = msg_json.get('study_uid')
+        if study_uid is not None:
+            return bool(study_uid == self.study_uid)
+        uuid = msg_json.get('uuid')
+        if uuid is not None and self.uuid is not None:
+            return bool(uuid == self.uuid)
+        return True
 
 
 class Study:  # NOQA:WPS214
     """Study addon namespace."""
 
+    UPLOAD_WORKERS = 4  # number of concurrent image uploads
+    UPLOAD_RETRIES = 3  # number of retries of one image upload
+    UPLOAD_RETRY_DELAY = 1  # seconds, multiplied by the attempt number
+    DOWNLOAD_WORKERS = 8  # number of concurrent image downloads
+    DOWNLOAD_RETRIES = 3  # number of retries of one image download
+    DOWNLOAD_RETRY_DELAY = 1  # seconds, multiplied by the attempt number
+
     def __init__(self, api):
         """Init.
 
@@ -32,11 +94,15 @@ class Study:  # NOQA:WPS214
         *,
         study_dir: Path,
         namespace_id: str,
+        workers: Optional[int] = None,
+        retries: Optional[int] = None,
     ) -> Tuple[str, List[UploadedImageParams]]:
         """Upload study to namespace from path.
 
         :param study_dir: path to study dir
         :param namespace_id: uploading to namespace
+        :param workers: number of concurrent uploads (UPLOAD_WORKERS)
+        :param retries: number of retries of one upload (UPLOAD_RETRIES)
 
         :raises ValueError: Study dir is not directory
         :return: list of image params
@@ -47,6 +113,8 @@ class Study:  # NOQA:WPS214
         return self.upload_paths(
             dicom_paths=study_dir.glob('**/*.dcm'),
             namespace_id=namespace_id,
+            workers=workers,
+            retries=retries,
         )
 
     def upload_paths(
@@ -54,17 +122,24 @@ class Study:  # NOQA:WPS214
         *,
         dicom_paths: Iterator[Path],
         namespace_id: str,
+        workers: Optional[int] = None,
+        retries: Optional[int] = None,
     ) -> Tuple[str, List[UploadedImageParams]]:
         """Upload study to namespace from dicoms iterator.
 
+        Images are uploaded concurrently in a thread pool.
+        Paths are taken from the iterator only when
+        there is a free place in the uploading queue.
+        Failed uploads (connection or server errors) are retried.
+
         :param dicom_paths: iterator of dicom paths
         :param namespace_id: uploading to namespace
+        :param workers: number of concurrent uploads (UPLOAD_WORKERS)
+        :param retries: number of retries of one upload (UPLOAD_RETRIES)
 
         :raises ValueError: Study dir is not directory
-        :return: list of image params
+        :return: list of image params (in order of paths)
         """
-        images_params = []
-
         first_dicom_path = next(dicom_paths, None)
         if first_dicom_path is None:
             raise ValueError('Dicoms iterator is empty')
@@ -91,15 +166,13 @@ class Study:  # NOQA:WPS214
         uuid: str = response_data.uuid
 
         # upload images
-        for dicom_path in chain((first_dicom_path, ), dicom_paths):
-            with dicom_path.open(mode='rb') as dicom:
-                images_params.append(
-                    self._api.Addon.Dicom.upload(
-                        dicom_file=dicom,
-                        namespace_id=namespace_id,
-                        engine_fqdn=engine_fqdn,
-                    ),
-                )
+        images_params = self._upload_images(
+            dicom_paths=chain((first_dicom_path, ), dicom_paths),
+            namespace_id=namespace_id,
+            engine_fqdn=engine_fqdn,
+            workers=self.UPLOAD_WORKERS if workers is None else workers,
+            retries=self.UPLOAD_RETRIES if retries is None else retries,
+        )
 
         # then sync data
         # In api.html sync method have not uuid param...
@@ -112,6 +185,325 @@ class Study:  # NOQA:WPS214
 
         return uuid, images_params
 
+    def _upload_images(
+        self,
+        *,
+        dicom_paths: Iterable[Path],
+        namespace_id: str,
+        engine_fqdn: str,
+        workers: int,
+        retries: int,
+    ) -> List[UploadedImageParams]:
+        """Upload images concurrently.
+
+        :param dicom_paths: dicom paths
+        :param namespace_id: uploading to namespace
+        :param engine_fqdn: engine fqdn
+        :param workers: number of concurrent uploads
+        :param retries: number of retries of one upload
+        :return: list of image params (in order of paths)
+        """
+        workers = max(workers, 1)
+        # Back pressure: do not read paths far ahead of uploads
+        max_pending = workers * 2
+        uploaded: Dict[int, UploadedImageParams] = {}
+        pending: Dict[Future, int] = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                for index, dicom_path in enumerate(dicom_paths):
+                    while len(pending) >= max_pending:
+                        self._collect_uploads(pending, uploaded)
+                    future = executor.submit(
+                        self._upload_image,
+                        dicom_path=dicom_path,
+                        namespace_id=namespace_id,
+                        engine_fqdn=engine_fqdn,
+                        retries=retries,
+                    )
+                    pending[future] = index
+                while pending:
+                    self._collect_uploads(pending, uploaded)
+            finally:
+                for pending_future in pending:
+                    pending_future.cancel()
+        return [uploaded[index] for index in range(len(uploaded))]
+
+    def _collect_uploads(
+        self,
+        pending: Dict[Future, int],
+        uploaded: Dict[int, UploadedImageParams],
+    ):
+        """Wait for some of pending uploads.
+
+        :param pending: pending upload futures and paths indexes
+        :param uploaded: uploaded image params by paths indexes
+        """
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            index = pending.pop(future)
+            uploaded[index] = future.result()
+
+    def _upload_image(
+        self,
+        *,
+        dicom_path: Path,
+        namespace_id: str,
+        engine_fqdn: str,
+        retries: int,
+    ) -> UploadedImageParams:
+        """Upload image with retries.
+
+        :param dicom_path: dicom path
+        :param namespace_id: uploading to namespace
+        :param engine_fqdn: engine fqdn
+        :param retries: number of retries
+        :raises RequestException: Connection error
+        :raises AmbraResponseException: Response error
+        :return: image params
+        """
+        attempt = 0
+        while True:
+            try:
+                return self._api.Addon.Dicom.upload_from_path(
+                    dicom_path=dicom_path,
+                    namespace_id=namespace_id,
+                    engine_fqdn=engine_fqdn,
+                )
+            except (RequestException, AmbraResponseException) as exception:
+                if attempt >= retries or \
+                   not is_retryable_upload_error(exception):
+                    raise
+            attempt += 1
+            sleep(self.UPLOAD_RETRY_DELAY * attempt)
+
+    def download_dir(  # NOQA:WPS211
+        self,
+        *,
+        study_dir: Path,
+        namespace_id: str,
+        study_uid: str,
+        engine_fqdn: Optional[str] = None,
+        phi_namespace: Optional[str] = None,
+        workers: Optional[int] = None,
+        retries: Optional[int] = None,
+    ) -> List[DownloadedImage]:
+        """Download study images to directory.
+
+        Images are listed by study schema and downloaded concurrently
+        in a thread pool to {study_dir}/{series_uid}/{image_uid}.dcm.
+        Failed downloads (connection or server errors) are retried.
+        Images downloaded before (same version and size) are skipped,
+        so an interrupted download can be resumed.
+
+        :param study_dir: study directory (created if not exists)
+        :param namespace_id: storage namespace
+        :param study_uid: study uid
+        :param engine_fqdn: fqdn (if None gets namespace fqdn)
+        :param phi_namespace: phi namespace
+        :param workers: number of concurrent downloads (DOWNLOAD_WORKERS)
+        :param retries: number of retries of one download (DOWNLOAD_RETRIES)
+
+        :return: downloaded images (in order of schema)
+        """
+        if engine_fqdn is None:
+            engine_fqdn = self._api \
+                .Namespace \
+                .engine_fqdn(namespace_id=namespace_id) \
+                .get() \
+                .engine_fqdn
+        schema = self._api.Storage.Study.schema(
+            engine_fqdn=engine_fqdn,
+            namespace=namespace_id,
+            study_uid=study_uid,
+            phi_namespace=phi_namespace,
+        )
+        study_dir.mkdir(parents=True, exist_ok=True)
+        manifest = DownloadManifest(study_dir)
+        images = schema_images(schema)
+        # Back pressure: number of submitted downloads is limited by workers
+        workers = max(self.DOWNLOAD_WORKERS if workers is None else workers, 1)
+        retries = self.DOWNLOAD_RETRIES if retries is None else retries
+        downloaded: Dict[int, DownloadedImage] = {}
+        pending: Dict[Future, int] = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                for index, image in enumerate(images):
+                    while len(pending) >= workers:
+                        self._collect_downloads(pending, downloaded)
+                    future = executor.submit(
+                        self._download_image,
+                        image=image,
+                        study_dir=study_dir,
+                        manifest=manifest,
+                        namespace_id=namespace_id,
+                        study_uid=study_uid,
+                        engine_fqdn=engine_fqdn,
+                        phi_namespace=phi_namespace,
+                        retries=retries,
+                    )
+                    pending[future] = index
+                while pending:
+                    self._collect_downloads(pending, downloaded)
+            finally:
+                for pending_future in pending:
+                    pending_future.cancel()
+        return [downloaded[index] for index in range(len(images))]
+
+    def _collect_downloads(
+        self,
+        pending: Dict[Future, int],
+        downloaded: Dict[int, DownloadedImage],
+    ):
+        """Wait for some of pending downloads.
+
+        :param pending: pending download futures and images indexes
+        :param downloaded: downloaded images by indexes
+        """
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            index = pending.pop(future)
+            downloaded[index] = future.result()
+
+    def _download_image(  # NOQA:WPS211
+        self,
+        *,
+        image: StudyImage,
+        study_dir: Path,
+        manifest: DownloadManifest,
+        namespace_id: str,
+        study_uid: str,
+        engine_fqdn: str,
+        phi_namespace: Optional[str],
+        retries: int,
+    ) -> DownloadedImage:
+        """Download image with retries.
+
+        :param image: study image
+        :param study_dir: study directory
+        :param manifest: manifest of downloaded images
+        :param namespace_id: storage namespace
+        :param study_uid: study uid
+        :param engine_fqdn: engine fqdn
+        :param phi_namespace: phi namespace
+        :param retries: number of retries
+        :raises RequestException: Connection error
+        :raises AmbraResponseException: Response error
+        :return: downloaded image
+        """
+        path = image_path(study_dir, image)
+        if manifest.is_downloaded(path, image.image_version):
+            return DownloadedImage(*image, path=path, skipped=True)
+        attempt = 0
+        while True:
+            try:
+                response = self._api.Storage.Image.dicom_payload(
+                    engine_fqdn=engine_fqdn,
+                    namespace=namespace_id,
+                    study_uid=study_uid,
+                    image_uid=image.image_uid,
+                    image_version=image.image_version,
+                    phi_namespace=phi_namespace,
+                )
+                with closing(response):
+                    size = write_file(
+                        path,
+                        response.iter_content(DOWNLOAD_CHUNK_SIZE),
+                    )
+            except (RequestException, AmbraResponseException) as exception:
+                if attempt >= retries or \
+                   not is_retryable_upload_error(exception):
+                    raise
+            else:
+                manifest.record(path, image.image_version, size)
+                return DownloadedImage(*image, path=path, skipped=False)
+            attempt += 1
+            sleep(self.DOWNLOAD_RETRY_DELAY * attempt)
+
+    def iter_download(  # NOQA:WPS211
+        self,
+        *,
+        namespace_id: str,
+        study_uid: str,
+        engine_fqdn: Optional[str] = None,
+        phi_namespace: Optional[str] = None,
+        series_uid: Optional[str] = None,
+        image_uid: Optional[str] = None,
+    ) -> Iterator[ZipEntry]:
+        """Download study zip and extract it on the fly.
+
+        Zip (dicom bundle of Storage.Study.download) is not saved:
+        entries are parsed from the response stream and yielded
+        as soon as they are downloaded.
+
+        :param namespace_id: storage namespace
+        :param study_uid: study uid
+        :param engine_fqdn: fqdn (if None gets namespace fqdn)
+        :param phi_namespace: phi namespace
+        :param series_uid: series uids (comma separated)
+        :param image_uid: image uids (comma separated)
+
+        :yields: zip entries (path, file)
+        """
+        if engine_fqdn is None:
+            engine_fqdn = self._api \
+                .Namespace \
+                .engine_fqdn(namespace_id=namespace_id) \
+                .get() \
+                .engine_fqdn
+        response = self._api.Storage.Study.download(
+            engine_fqdn=engine_fqdn,
+            namespace=namespace_id,
+            study_uid=study_uid,
+            bundle='dicom',
+            phi_namespace=phi_namespace,
+            series_uid=series_uid,
+            image_uid=image_uid,
+        )
+        with closing(response):
+            yield from iter_zip(response.iter_content(DOWNLOAD_CHUNK_SIZE))
+
+    def iter_download_dicom(  # NOQA:WPS211
+        self,
+        *,
+        namespace_id: str,
+        study_uid: str,
+        engine_fqdn: Optional[str] = None,
+        phi_namespace: Optional[str] = None,
+        series_uid: Optional[str] = None,
+        image_uid: Optional[str] = None,
+        stop_before_pixels: bool = False,
+    ) -> Iterator[ZipDicom]:
+        """Download study zip and read dicoms on the fly.
+
+        Not dicom files of zip are skipped.
+
+        :param namespace_id: storage namespace
+        :param study_uid: study uid
+        :param engine_fqdn: fqdn (if None gets namespace fqdn)
+        :param phi_namespace: phi namespace
+        :param series_uid: series uids (comma separated)
+        :param image_uid: image uids (comma separated)
+        :param stop_before_pixels: do not read pixel data
+
+        :yields: dicoms (path, dataset)
+        """
+        entries = self.iter_download(
+            namespace_id=namespace_id,
+            study_uid=study_uid,
+            engine_fqdn=engine_fqdn,
+            phi_namespace=phi_namespace,
+            series_uid=series_uid,
+            image_uid=image_uid,
+        )
+        with closing(entries):
+            for entry in entries:
+                dicom = read_zip_dicom(
+                    entry,
+                    stop_before_pixels=stop_before_pixels,
+                )
+                if dicom is not None:
+                    yield dicom
+
     def wait(
         self,
         *,
@@ -119,44 +511,60 @@ class Study:  # NOQA:WPS214
         namespace_id: str,
         timeout: float,
         ws_timeout: int,
+        backoff: Optional[PollBackoff] = None,
     ) -> Box:
         """Wait study in namespace.
 
+        Study is polled with exponential backoff (interval starts
+        from ws_timeout by default), a READY event of the study
+        (events of study channel are filtered by study_uid and uuid)
+        triggers an immediate poll.
+
         :param study_uid: study_uid
         :param namespace_id: namespace
         :param timeout: time for waiting new study
         :param ws_timeout: time for waiting in socket
+        :param backoff: polling backoff (None - default backoff)
         :raises TimeoutError: if study not ready by timeout
         :return: Study box object
         """
-        ws_url = self._api.ws_url
-        ws_manager = WSManager(ws_url)
         study = None
-        start = monotonic()
+        schedule = PollSchedule(backoff, ws_timeout, timeout)
+        study_events = StudyEventFilter(study_uid)
 
         channel_name = 'study.{namespace_id}'.format(namespace_id=namespace_id)
         sid = self._api.sid
 
-        with ws_manager.channel(sid, channel_name) as ws:
-            while True:
-                if monotonic() - start >= timeout:
-                    break
-                with suppress(NotFound):
-                    study = self._api.Study.get(
-                        study_uid=study_uid,
-                        storage_namespace=namespace_id,
-                    ).get()
-
-                if study and study.phantom == 0:
-                    break
-
-                with suppress(TimeoutError):
-                    ws.wait_for_event(
-                        channel_name,
-                        sid,
-                        'READY',
-                        timeout=ws_timeout,
-                    )
+        try:  # NOQA:WPS501
+            ws_hub = self._api.ws_hub
+            with ws_hub.events(
+                sid,
+                channel_name,
+                ['READY'],
+                study_events,
+            ) as events:
+                while not schedule.expired():
+                    with suppress(NotFound):
+                        study = self._api.Study.get(
+                            study_uid=study_uid,
+                            storage_namespace=namespace_id,
+                        ).get()
+                    schedule.polled()
+                    if study:
+                        study_events.uuid = study.get('uuid')
+
+                    if study and study.phantom == 0:
+                        break
+
+                    with suppress(TimeoutError):
+                        events.get(timeout=schedule.delay())
+                        schedule.reset()
+        finally:
+            self._api.wait_tracker.finished(
+                'study',
+                schedule,
+                timed_out=not study and schedule.expired(),
+            )
         if not study:
             raise TimeoutError
         return study
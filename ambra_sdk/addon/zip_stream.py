@@ -0,0 +1,505 @@
+"""Streaming extraction of zip archives.
+
+Zip is parsed on the fly by local file headers (the central directory
+at the end of archive is not used), so entries are available
+as soon as they are downloaded. Content of every entry is spooled
+to a temporary file (in memory for small entries).
+"""
+
+import struct
+import tempfile
+import zlib
+from typing import (
+    IO,
+    AsyncIterable,
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+import pydicom
+from pydicom.dataset import Dataset
+from pydicom.errors import InvalidDicomError
+
+from ambra_sdk.exceptions.base import AmbraException
+
+# Entries larger than this number of bytes are spooled to disk
+ZIP_ENTRY_SPOOL_SIZE = 16 * 1024 * 1024  # 16 Mb
+
+LOCAL_FILE_HEADER = struct.Struct('<4s5H3L2H')
+DATA_DESCRIPTOR = struct.Struct('<3L')
+ZIP64_DATA_DESCRIPTOR = struct.Struct('<L2Q')
+ZIP64_EXTRA = struct.Struct('<2Q')
+
+LOCAL_FILE_SIGNATURE = b'PK\x03\x04'
+DATA_DESCRIPTOR_SIGNATURE = b'PK\x07\x08'
+# Entries are followed by central directory (or end of it for empty zip)
+END_SIGNATURES = frozenset((
+    b'PK\x01\x02',  # central directory file header
+    b'PK\x05\x06',  # end of central directory
+    b'PK\x06\x06',  # zip64 end of central directory
+))
+
+STORED = 0
+DEFLATED = 8
+FLAG_ENCRYPTED = 0x1
+FLAG_DATA_DESCRIPTOR = 0x8
+FLAG_UTF8 = 0x800
+ZIP64_EXTRA_ID = 0x1
+ZIP64_LIMIT = 0xFFFFFFFF
+
+
+class ZipStreamError(AmbraException):
+    """Broken or not supported zip stream."""
+
+
+class ZipEntry(NamedTuple):
+    """Extracted zip entry.
+
+    path: path in archive
+    file: entry content (read from start, close it after use)
+    """
+
+    path: str
+    file: IO[bytes]  # NOQA:WPS110
+
+
+class ZipDicom(NamedTuple):
+    """Dicom extracted from zip."""
+
+    path: str
+    dataset: Dataset
+
+
+class _EntryReader:  # NOQA:WPS230
+    """Reader of entry data."""
+
+    def __init__(  # NOQA:WPS211
+        self,
+        path: str,
+        flags: int,
+        method: int,
+        crc: int,
+        compressed_size: int,
+        size: int,
+        zip64: bool,
+        spool_size: int,
+    ):
+        """Init.
+
+        :param path: path in archive
+        :param flags: general purpose flags
+        :param method: compression method
+        :param crc: crc32 of content (from local header)
+        :param compressed_size: compressed size (from local header)
+        :param size: content size (from local header)
+        :param zip64: zip64 sizes
+        :param spool_size: max size of entry spooled in memory
+        :raises ZipStreamError: Not supported entry
+        """
+        if flags & FLAG_ENCRYPTED:
+            raise ZipStreamError(
+                'Encrypted zip entry {path}'.format(path=path),
+            )
+        if method not in {STORED, DEFLATED}:
+            raise ZipStreamError(
+                'Not supported compression method {method} of {path}'.format(
+                    method=method,
+                    path=path,
+                ),
+            )
+        self.path = path
+        self.zip64 = zip64
+        self.has_descriptor = bool(flags & FLAG_DATA_DESCRIPTOR)
+        self.crc = crc
+        self.compressed_size = compressed_size
+        self.size = size
+        self.data_complete = False
+        self.file = tempfile.SpooledTemporaryFile(  # NOQA:WPS363
+            max_size=spool_size,
+        )
+        self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS) \
+            if method == DEFLATED else None
+        self._read = 0  # compressed bytes
+        self._written = 0  # content bytes
+        self._crc = 0
+
+    def feed(self, buffer: bytearray) -> int:
+        """Read entry data from buffer.
+
+        :param buffer: buffered stream
+        :return: number of consumed bytes
+        """
+        if not self.has_descriptor:
+            consumed = min(len(buffer), self.compressed_size - self._read)
+            self._write(bytes(buffer[:consumed]))
+            if self._read == self.compressed_size:
+                self._finish_data()
+            return consumed
+        if self._decompressor is not None:
+            return self._feed_deflated(buffer)
+        return self._feed_stored(buffer)
+
+    def read_descriptor(self, buffer: bytearray) -> int:
+        """Read data descriptor (crc and sizes after data).
+
+        :param buffer: buffered stream
+        :return: number of consumed bytes (0 - not enough data)
+        """
+        start = 0
+        if buffer[:4] == DATA_DESCRIPTOR_SIGNATURE:
+            start = 4
+        formats = [ZIP64_DATA_DESCRIPTOR] if self.zip64 else \
+            [DATA_DESCRIPTOR, ZIP64_DATA_DESCRIPTOR]
+        for descriptor_format in formats:
+            end = start + descriptor_format.size
+            if len(buffer) < end:
+                return 0
+            crc, compressed_size, size = descriptor_format.unpack(
+                buffer[start:end],
+            )
+            if compressed_size == self._read and size == self._written:
+                break
+        self.crc = crc
+        self.compressed_size = compressed_size
+        self.size = size
+        return end
+
+    def entry(self) -> ZipEntry:
+        """Check and get extracted entry.
+
+        :raises ZipStreamError: Broken entry
+        :return: entry
+        """
+        if self._written != self.size or self._crc != self.crc:
+            self.file.close()
+            raise ZipStreamError(
+                'Bad crc or size of zip entry {path}'.format(path=self.path),
+            )
+        self.file.seek(0)
+        return ZipEntry(path=self.path, file=self.file)
+
+    def _feed_deflated(self, buffer: bytearray) -> int:
+        """Read deflated data of unknown size.
+
+        :param buffer: buffered stream
+        :return: number of consumed bytes
+        """
+        decompressor = self._decompressor
+        data = bytes(buffer)
+        self._inflate(data)
+        consumed = len(data) - len(decompressor.unused_data)  # type: ignore
+        self._read += consumed
+        if decompressor.eof:  # type: ignore
+            self.data_complete = True
+        return consumed
+
+    def _feed_stored(self, buffer: bytearray) -> int:
+        """Read stored data of unknown size.
+
+        End of data is the descriptor signature
+        followed by the descriptor of matched crc and size.
+
+        :param buffer: buffered stream
+        :return: number of consumed bytes
+        """
+        position = buffer.find(DATA_DESCRIPTOR_SIGNATURE)
+        while position >= 0:
+            end = self._stored_end(buffer, position)
+            if end is None:
+                # Not enough data to check the descriptor
+                return self._write_stored(buffer, position)
+            if end:
+                consumed = self._write_stored(buffer, position)
+                self.data_complete = True
+                return consumed
+            position = buffer.find(DATA_DESCRIPTOR_SIGNATURE, position + 1)
+        # Signature can be split between chunks
+        return self._write_stored(
+            buffer,
+            max(len(buffer) - len(DATA_DESCRIPTOR_SIGNATURE) + 1, 0),
+        )
+
+    def _stored_end(self, buffer: bytearray, position: int) -> Optional[bool]:
+        """Check that data ends at position.
+
+        :param buffer: buffered stream
+        :param position: position of descriptor signature
+        :return: True - end of data, None - not enough data
+        """
+        size = self._read + position
+        crc = zlib.crc32(buffer[:position], self._crc)
+        start = position + len(DATA_DESCRIPTOR_SIGNATURE)
+        formats = [ZIP64_DATA_DESCRIPTOR] if self.zip64 else \
+            [DATA_DESCRIPTOR, ZIP64_DATA_DESCRIPTOR]
+        for descriptor_format in formats:
+            end = start + descriptor_format.size
+            if len(buffer) < end:
+                return None
+            descriptor = descriptor_format.unpack(buffer[start:end])
+            if descriptor == (crc, size, size):
+                return True
+        return False
+
+    def _write_stored(self, buffer: bytearray, size: int) -> int:
+        """Write start of buffer.
+
+        :param buffer: buffered stream
+        :param size: number of bytes
+        :return: number of consumed bytes
+        """
+        self._write(bytes(buffer[:size]))
+        return size
+
+    def _write(self, data: bytes):
+        """Write compressed data.
+
+        :param data: compressed data
+        """
+        self._read += len(data)
+        if self._decompressor is None:
+            self._output(data)
+        else:
+            self._inflate(data)
+
+    def _inflate(self, data: bytes):
+        """Decompress and write data.
+
+        :param data: compressed data
+        """
+        self._output(self._decompressor.decompress(data))  # type: ignore
+
+    def _output(self, content: bytes):
+        """Write entry content.
+
+        :param content: content
+        """
+        self.file.write(content)
+        self._written += len(content)
+        self._crc = zlib.crc32(content, self._crc)
+
+    def _finish_data(self):
+        """Finish data of known size.
+
+        :raises ZipStreamError: Truncated deflate stream
+        """
+        if self._decompressor is not None:
+            if not self._decompressor.eof:
+                self.file.close()
+                raise ZipStreamError(
+                    'Broken deflate stream of {path}'.format(path=self.path),
+                )
+            self._output(self._decompressor.flush())
+        self.data_complete = True
+
+
+class ZipStreamParser:
+    """Incremental parser of zip stream.
+
+    :Example:
+
+    >>> parser = ZipStreamParser()
+    >>> for chunk in chunks:
+    >>>     for path, entry_file in parser.feed(chunk):
+    >>>         ...
+    >>> parser.close()
+    """
+
+    def __init__(self, spool_size: int = ZIP_ENTRY_SPOOL_SIZE):
+        """Init.
+
+        :param spool_size: max size of entry spooled in memory
+        """
+        self._spool_size = spool_size
+        self._buffer = bytearray()
+        self._entry: Optional[_EntryReader] = None
+        self._entries: List[ZipEntry] = []
+        self._done = False
+
+    def feed(self, chunk: bytes) -> List[ZipEntry]:
+        """Parse next chunk of stream.
+
+        :param chunk: chunk
+        :return: entries completed by the chunk
+        """
+        if self._done:
+            # Central directory is not used
+            return []
+        self._buffer += chunk
+        while self._step():
+            pass  # NOQA:WPS420
+        entries, self._entries = self._entries, []
+        return entries
+
+    def close(self):
+        """Check end of stream.
+
+        :raises ZipStreamError: Truncated stream
+        """
+        if not self._done:
+            if self._entry is not None:
+                self._entry.file.close()
+            raise ZipStreamError('Unexpected end of zip stream')
+
+    def _step(self) -> bool:
+        """Parse buffered data.
+
+        :return: False if more data is required
+        """
+        if self._done:
+            self._buffer.clear()
+            return False
+        if self._entry is None:
+            return self._read_header()
+        entry = self._entry
+        if entry.data_complete:
+            consumed = entry.read_descriptor(self._buffer) \
+                if entry.has_descriptor else 0
+            if entry.has_descriptor and not consumed:
+                return False
+            del self._buffer[:consumed]  # NOQA:WPS420
+            self._entry = None
+            extracted = entry.entry()
+            if extracted.path.endswith('/'):
+                # Directory
+                extracted.file.close()
+            else:
+                self._entries.append(extracted)
+            return True
+        consumed = entry.feed(self._buffer)
+        del self._buffer[:consumed]  # NOQA:WPS420
+        return bool(consumed) or entry.data_complete
+
+    def _read_header(self) -> bool:
+        """Read local file header.
+
+        :raises ZipStreamError: Unexpected signature
+        :return: False if more data is required
+        """
+        buffer = self._buffer
+        if len(buffer) < 4:
+            return False
+        signature = bytes(buffer[:4])
+        if signature in END_SIGNATURES:
+            self._done = True
+            return True
+        if signature != LOCAL_FILE_SIGNATURE:
+            raise ZipStreamError('Bad zip local file header signature')
+        if len(buffer) < LOCAL_FILE_HEADER.size:
+            return False
+        (
+            _,
+            _,
+            flags,
+            method,
+            _,
+            _,
+            crc,
+            compressed_size,
+            size,
+            name_length,
+            extra_length,
+        ) = LOCAL_FILE_HEADER.unpack(buffer[:LOCAL_FILE_HEADER.size])
+        name_end = LOCAL_FILE_HEADER.size + name_length
+        header_end = name_end + extra_length
+        if len(buffer) < header_end:
+            return False
+        raw_path = bytes(buffer[LOCAL_FILE_HEADER.size:name_end])
+        path = raw_path.decode('utf-8' if flags & FLAG_UTF8 else 'cp437')
+        zip64_sizes = _zip64_sizes(bytes(buffer[name_end:header_end]))
+        zip64 = zip64_sizes is not None
+        if zip64_sizes is not None and ZIP64_LIMIT in {size, compressed_size}:
+            size, compressed_size = zip64_sizes
+        del buffer[:header_end]  # NOQA:WPS420
+        self._entry = _EntryReader(
+            path=path,
+            flags=flags,
+            method=method,
+            crc=crc,
+            compressed_size=compressed_size,
+            size=size,
+            zip64=zip64,
+            spool_size=self._spool_size,
+        )
+        return True
+
+
+def _zip64_sizes(extra: bytes) -> Optional[Tuple[int, int]]:
+    """Get sizes from zip64 extra field.
+
+    :param extra: extra fields of local header
+    :return: content and compressed sizes or None
+    """
+    position = 0
+    while position + 4 <= len(extra):
+        field_id, field_size = struct.unpack(
+            '<2H',
+            extra[position:position + 4],
+        )
+        field_start = position + 4
+        if field_id == ZIP64_EXTRA_ID and field_size >= ZIP64_EXTRA.size:
+            return ZIP64_EXTRA.unpack(
+                extra[field_start:field_start + ZIP64_EXTRA.size],
+            )
+        position = field_start + field_size
+    return None
+
+
+def iter_zip(
+    chunks: Iterable[bytes],
+    spool_size: int = ZIP_ENTRY_SPOOL_SIZE,
+) -> Iterator[ZipEntry]:
+    """Extract zip entries from stream.
+
+    :param chunks: zip stream chunks (response.iter_content)
+    :param spool_size: max size of entry spooled in memory
+    :yields: entries in order of archive
+    """
+    parser = ZipStreamParser(spool_size)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    parser.close()
+
+
+async def async_iter_zip(
+    chunks: AsyncIterable[bytes],
+    spool_size: int = ZIP_ENTRY_SPOOL_SIZE,
+) -> AsyncIterator[ZipEntry]:
+    """Extract zip entries from async stream.
+
+    :param chunks: zip stream chunks (response.content.iter_chunked)
+    :param spool_size: max size of entry spooled in memory
+    :yields: entries in order of archive
+    """
+    parser = ZipStreamParser(spool_size)
+    async for chunk in chunks:
+        for entry in parser.feed(chunk):
+            yield entry
+    parser.close()
+
+
+def read_zip_dicom(
+    entry: ZipEntry,
+    stop_before_pixels: bool = False,
+) -> Optional[ZipDicom]:
+    """Read dicom from zip entry.
+
+    Entry file is closed.
+
+    :param entry: zip entry
+    :param stop_before_pixels: do not read pixel data
+    :return: dicom or None (not a dicom file)
+    """
+    with entry.file:
+        try:
+            dataset = pydicom.dcmread(
+                entry.file,
+                stop_before_pixels=stop_before_pixels,
+            )
+        except InvalidDicomError:
+            return None
+    return ZipDicom(path=entry.path, dataset=dataset)
@@ -1,18 +1,19 @@
 """Ambra storage and service API."""
 
 import logging
-from threading import Lock
-from time import monotonic, sleep
-from typing import Callable, Optional, TypeVar
+from threading import Event, Lock, RLock, Thread, local
+from time import sleep
+from typing import Any, Callable, Dict, List, Optional, TypeVar
 
 import requests
-from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.util import Retry
 
 from ambra_sdk.addon.addon import Addon
 from ambra_sdk.api.base_api import BaseApi
+from ambra_sdk.api.pool import PoolAdapter, PoolStats
+from ambra_sdk.api.sid import DEFAULT_KEEP_ALIVE_INTERVAL, keep_alive_delay
 from ambra_sdk.clear_params import clear_params
-from ambra_sdk.exceptions.service import AuthorizationRequired
+from ambra_sdk.exceptions.service import AuthorizationRequired, Expired
 from ambra_sdk.exceptions.storage import AccessDenied
 from ambra_sdk.request_args import RequestArgs
 from ambra_sdk.service.entrypoints import (
@@ -64,6 +65,7 @@ from ambra_sdk.service.entrypoints import (
     Validate,
     Webhook,
 )
+from ambra_sdk.service.ws import WSHub
 from ambra_sdk.storage.storage import Storage
 
 logger = logging.getLogger(__name__)
@@ -90,7 +92,7 @@ class Api(BaseApi):
     >>> MY_RLS = RateLimits(
     ...        default=RateLimit(3, 2),
     ...        get_limit=RateLimit(4, 2),
-    ...        special={'special_url': RateLimit(5, 2)},
+    ...        special={'special_url': RateLimit(5, 2, burst=1)},
     ... )
     >>>
     >>> api = Api.with_creds(
@@ -102,6 +104,11 @@ class Api(BaseApi):
     ...     rate_limits=MY_RLS,
     ...     autocast_arguments=False,
     ... )
+
+    Api can be used from several threads.
+    Sessions are shared by threads (connection pools are thread safe),
+    or created for every thread with `PoolLimits(per_thread=True)`.
+    Concurrent authorization errors trigger only one login.
     """
 
     backend = 'REQUESTS'
@@ -116,13 +123,15 @@ class Api(BaseApi):
 
         self._service_session: Optional[requests.Session] = None
         self._storage_session: Optional[requests.Session] = None
+        self._sessions_lock = Lock()
+        self._thread_sessions = local()
+        self._all_thread_sessions: List[requests.Session] = []
+        self._sid_lock = RLock()
+        self._keep_alive_thread: Optional[Thread] = None
+        self._keep_alive_stop = Event()
+        self._ws_hub: Optional[WSHub] = None
         self._init_request_params()
 
-        # For rate limits
-        self._rate_limits_lock = Lock()
-        self._last_request_time = None
-        self._last_call_period = None
-
         # Init services api
         self._init_service_entrypoints()
 
@@ -138,15 +147,7 @@ class Api(BaseApi):
 
         :return: service session
         """
-        if self._service_session is None:
-            self._service_session = requests.Session()
-            retries = Retry(**self.service_retry_params)
-            adapter = HTTPAdapter(max_retries=retries)
-            self._service_session.mount('http://', adapter)
-            self._service_session.mount('https://', adapter)
-            self._service_session.headers.update(self._default_headers)
-            self._service_session.headers.update(self._service_default_headers)
-        return self._service_session
+        return self._session('service')
 
     @property
     def storage_session(self) -> requests.Session:
@@ -154,15 +155,7 @@ class Api(BaseApi):
 
         :return: storage session
         """
-        if self._storage_session is None:
-            self._storage_session = requests.Session()
-            retries = Retry(**self.storage_retry_params)
-            adapter = HTTPAdapter(max_retries=retries)
-            self._storage_session.mount('http://', adapter)
-            self._storage_session.mount('https://', adapter)
-            self._storage_session.headers.update(self._default_headers)
-            self._storage_session.headers.update(self._storage_default_headers)
-        return self._storage_session
+        return self._session('storage')
 
     def storage_get(
         self,
@@ -283,9 +276,10 @@ class Api(BaseApi):
 
         :return: sid
         """
-        if self._sid is None:
-            return self.get_new_sid()
-        return self._sid
+        sid = self._sid
+        if sid is None:
+            return self._refresh_sid(failed_sid=None)
+        return sid
 
     @property
     def sid(self) -> str:
@@ -295,15 +289,33 @@ class Api(BaseApi):
         """
         return self.get_sid()
 
+    @property
+    def ws_hub(self) -> WSHub:
+        """Websocket hub shared by waiters (created on first use).
+
+        :return: websocket hub
+        """
+        with self._sessions_lock:
+            if self._ws_hub is None:
+                self._ws_hub = WSHub(self.ws_url)
+            return self._ws_hub
+
     def logout(self):
         """Logout."""
+        self.stop_keep_alive()
+        if self._ws_hub is not None:
+            self._ws_hub.close()
         if self._sid:
             self.Session.logout().get()
             self._sid = None
-        if self._storage_session:
-            self._storage_session.close()
-        if self._service_session:
-            self._service_session.close()
+            self._sid_tracker.reset()
+        with self._sessions_lock:
+            sessions = [self._storage_session, self._service_session]
+            sessions.extend(self._all_thread_sessions)
+            self._all_thread_sessions = []
+        for session in sessions:
+            if session:
+                session.close()
 
     def get_new_sid(self) -> str:
         """Get new sid.
@@ -313,14 +325,43 @@ class Api(BaseApi):
         """
         if self._creds is None:
             raise RuntimeError('Missed credentials')
-        new_sid: str = self.Session.get_sid(
-            self._creds.username,
-            self._creds.password,
-            special_headers_for_login=self._special_headers_for_login,
-        )
-        self._sid = new_sid
+        with self._sid_lock:
+            new_sid: str = self.Session.get_sid(
+                self._creds.username,
+                self._creds.password,
+                special_headers_for_login=self._special_headers_for_login,
+            )
+            self._sid = new_sid
+            self._sid_tracker.obtained()
         return new_sid
 
+    def start_keep_alive(self, interval: float = DEFAULT_KEEP_ALIVE_INTERVAL):
+        """Start keep alive thread.
+
+        Thread calls cheap /session/ttl method if the sid
+        was not used for `interval` seconds, so the sid is not
+        expired by the server idle timeout. If the sid is expired anyway,
+        it is refreshed by the thread (not by the next request).
+
+        :param interval: keep alive interval in seconds
+        """
+        self.stop_keep_alive()
+        self._keep_alive_stop = Event()
+        self._keep_alive_thread = Thread(
+            target=self._keep_alive_loop,
+            args=(interval, self._keep_alive_stop),
+            daemon=True,
+        )
+        self._keep_alive_thread.start()
+
+    def stop_keep_alive(self):
+        """Stop keep alive thread."""
+        if self._keep_alive_thread is None:
+            return
+        self._keep_alive_stop.set()
+        self._keep_alive_thread.join()
+        self._keep_alive_thread = None
+
     FN_RETURN_TYPE = TypeVar('FN_RETURN_TYPE')
 
     def retry_with_new_sid(
@@ -329,33 +370,92 @@ class Api(BaseApi):
     ) -> FN_RETURN_TYPE:
         """Retry with new sid.
 
+        If several threads get authorization error at once,
+        only one of them gets new sid, others wait for it.
+
         :param fn: callable method
         :return: fn result
         """
+        sid = self._sid
         try:
             return fn()
         except (AuthorizationRequired, AccessDenied):
-            self.get_new_sid()
+            self._refresh_sid(failed_sid=self._used_sid(sid))
             return fn()
 
+    def _used_sid(self, sid: Optional[str]) -> Optional[str]:
+        """Get sid used by failed call.
+
+        Call without sid gets sid by itself,
+        so the current sid is the failed one.
+
+        :param sid: sid before the call
+        :return: sid of failed call
+        """
+        if sid is None:
+            return self._sid
+        return sid
+
+    def _refresh_sid(self, failed_sid: Optional[str]) -> str:
+        """Get new sid once for concurrent callers.
+
+        Login is performed only if the current sid
+        is still the failed one (or there is no sid).
+
+        :param failed_sid: sid of failed request (None - get sid if
+            there is no sid)
+        :return: sid
+        """
+        with self._sid_lock:
+            sid = self._sid
+            if sid is not None and sid != failed_sid:
+                return sid
+            if sid is not None:
+                self._sid_tracker.expired()
+            return self.get_new_sid()
+
+    def _keep_alive_loop(self, interval: float, stop: Event):
+        """Call keep alive method while not stopped.
+
+        :param interval: keep alive interval in seconds
+        :param stop: stop event
+        """
+        while True:
+            delay = keep_alive_delay(self._sid_tracker.idle(), interval)
+            if delay == 0:
+                self._keep_alive()
+                delay = interval
+            if stop.wait(delay):
+                return
+
+    def _keep_alive(self):
+        """Keep sid alive."""
+        try:
+            self._check_sid(self._sid)
+        except Exception:
+            logger.warning('Sid keep alive failed', exc_info=True)
+            return
+        self._sid_tracker.kept_alive()
+
+    def _check_sid(self, sid: Optional[str]):
+        """Call cheap session method, refresh expired sid.
+
+        Expired sid is not refreshed by /session/ttl retry
+        (it fails with Expired, not with authorization error).
+
+        :param sid: sid before the call
+        """
+        try:
+            self.Session.ttl().get()
+        except (AuthorizationRequired, AccessDenied, Expired):
+            self._refresh_sid(failed_sid=self._used_sid(sid))
+
     def _wait_for_service_request(self, url):
-        if self._rate_limits:
-            with self._rate_limits_lock:
-                call_period = self._rate_limits.call_period(url)
-                now = monotonic()
-                if self._last_request_time is None:
-                    # This is a first run
-                    self._last_request_time = now
-                    self._last_call_period = call_period
-                    return
-
-                wait_time = self._last_request_time + \
-                    self._last_call_period - now
-                if wait_time > 0:
-                    logger.info('Sleep %s due to rate limits', wait_time)
-                    sleep(wait_time)
-                self._last_request_time = monotonic()
-                self._last_call_period = call_period
+        if self._rate_limiter:
+            wait_time = self._rate_limiter.reserve(url)
+            if wait_time > 0:
+                logger.info('Sleep %s due to rate limits', wait_time)
+                sleep(wait_time)
 
     def _service_request_without_rate_limits(
         self,
@@ -372,6 +472,7 @@ class Api(BaseApi):
             request_data = request_args.data or {}
             request_data['sid'] = self.sid
             request_args.data = request_data  # NOQA:WPS110
+            self._sid_tracker.used()
         logger.info(
             'Service post: %s. Params: %s',
             request_args.url,
@@ -402,8 +503,81 @@ class Api(BaseApi):
             # Get or create new sid
             request_params['sid'] = self.get_sid()
             kwargs['params'] = request_params
+            self._sid_tracker.used()
         return kwargs
 
+    def _session(self, name: str) -> requests.Session:
+        """Get session (shared or of the current thread).
+
+        :param name: session name (service or storage)
+        :return: session
+        """
+        if self._pool_limits.per_thread:
+            session = getattr(self._thread_sessions, name, None)
+            if session is None:
+                session = self._new_named_session(name)
+                setattr(self._thread_sessions, name, session)
+                with self._sessions_lock:
+                    self._all_thread_sessions.append(session)
+            return session
+        attr_name = '_{name}_session'.format(name=name)
+        session = getattr(self, attr_name)
+        if session is None:
+            with self._sessions_lock:
+                session = getattr(self, attr_name)
+                if session is None:
+                    session = self._new_named_session(name)
+                    setattr(self, attr_name, session)
+        return session
+
+    def _new_named_session(self, name: str) -> requests.Session:
+        """Create service or storage session.
+
+        :param name: session name (service or storage)
+        :return: session
+        """
+        if name == 'service':
+            return self._new_session(
+                retry_params=self.service_retry_params,
+                headers=self._service_default_headers,
+                stats=self._pool_stats['service'],
+            )
+        return self._new_session(
+            retry_params=self.storage_retry_params,
+            headers=self._storage_default_headers,
+            stats=self._pool_stats['storage'],
+        )
+
+    def _new_session(
+        self,
+        retry_params: Dict[str, Any],
+        headers: Dict[str, str],
+        stats: PoolStats,
+    ) -> requests.Session:
+        """Create session with sized connection pool.
+
+        :param retry_params: urllib3 retry params
+        :param headers: session headers
+        :param stats: pool usage counters
+        :return: session
+        """
+        session = requests.Session()
+        pool_limits = self._pool_limits
+        adapter = PoolAdapter(
+            pool_connections=pool_limits.pool_connections,
+            pool_maxsize=pool_limits.pool_maxsize,
+            pool_block=pool_limits.pool_block,
+            max_retries=Retry(**retry_params),
+            stats=stats,
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update(self._default_headers)
+        session.headers.update(headers)
+        if not pool_limits.keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
     def _init_request_params(self):
         method_whitelist = [
             'HEAD',
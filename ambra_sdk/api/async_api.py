@@ -1,16 +1,18 @@
 """Ambra async api."""
 
+import asyncio
 import logging
-from asyncio import Lock, sleep
-from time import monotonic
-from typing import Awaitable, Callable, Optional, TypeVar
+from asyncio import sleep
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
 
 import aiohttp
 
 from ambra_sdk.api.base_api import BaseApi
+from ambra_sdk.api.pool import PoolStats, pool_trace_config
+from ambra_sdk.api.sid import DEFAULT_KEEP_ALIVE_INTERVAL, keep_alive_delay
 from ambra_sdk.async_addon.addon import Addon
 from ambra_sdk.clear_params import clear_params
-from ambra_sdk.exceptions.service import AuthorizationRequired
+from ambra_sdk.exceptions.service import AuthorizationRequired, Expired
 from ambra_sdk.exceptions.storage import AccessDenied
 from ambra_sdk.request_args import AioHTTPRequestArgs
 from ambra_sdk.service.entrypoints import (
@@ -62,6 +64,7 @@ from ambra_sdk.service.entrypoints import (
     AsyncValidate,
     AsyncWebhook,
 )
+from ambra_sdk.service.ws import AsyncWSHub
 from ambra_sdk.storage.storage import AsyncStorage
 
 logger = logging.getLogger(__name__)
@@ -88,7 +91,7 @@ class AsyncApi(BaseApi):
     >>> MY_RLS = RateLimits(
     ...        default=RateLimit(3, 2),
     ...        get_limit=RateLimit(4, 2),
-    ...        special={'special_url': RateLimit(5, 2)},
+    ...        special={'special_url': RateLimit(5, 2, burst=1)},
     ... )
     >>>
     >>> api = AsyncApi.with_creds(
@@ -100,6 +103,8 @@ class AsyncApi(BaseApi):
     ...     rate_limits=MY_RLS,
     ...     autocast_arguments=False,
     ... )
+
+    Concurrent authorization errors in tasks trigger only one login.
     """
 
     backend = 'AIOHTTP'
@@ -113,11 +118,9 @@ class AsyncApi(BaseApi):
         super().__init__(*args, **kwargs)
         self._service_session: Optional[aiohttp.ClientSession] = None
         self._storage_session: Optional[aiohttp.ClientSession] = None
-
-        # For rate limits
-        self._rate_limits_lock = Lock()
-        self._last_request_time = None
-        self._last_call_period = None
+        self._sid_lock: Optional[asyncio.Lock] = None
+        self._keep_alive_task: Optional[asyncio.Future] = None
+        self._ws_hub: Optional[AsyncWSHub] = None
 
         # Init services api
         self._init_service_entrypoints()
@@ -134,10 +137,11 @@ class AsyncApi(BaseApi):
 
         :return: service session
         """
-        headers = self._default_headers.copy()
-        headers.update(self._service_default_headers)
         if self._service_session is None:
-            self._service_session = aiohttp.ClientSession(headers=headers)
+            self._service_session = self._new_session(
+                headers=self._service_default_headers,
+                stats=self._pool_stats['service'],
+            )
         return self._service_session
 
     @property
@@ -146,10 +150,11 @@ class AsyncApi(BaseApi):
 
         :return: storage session
         """
-        headers = self._default_headers.copy()
-        headers.update(self._storage_default_headers)
         if self._storage_session is None:
-            self._storage_session = aiohttp.ClientSession(headers=headers)
+            self._storage_session = self._new_session(
+                headers=self._storage_default_headers,
+                stats=self._pool_stats['storage'],
+            )
         return self._storage_session
 
     async def storage_get(
@@ -272,15 +277,30 @@ class AsyncApi(BaseApi):
 
         :return: sid
         """
-        if self._sid is None:
-            return await self.get_new_sid()
-        return self._sid
+        sid = self._sid
+        if sid is None:
+            return await self._refresh_sid(failed_sid=None)
+        return sid
+
+    @property
+    def ws_hub(self) -> AsyncWSHub:
+        """Websocket hub shared by waiters (created on first use).
+
+        :return: websocket hub
+        """
+        if self._ws_hub is None:
+            self._ws_hub = AsyncWSHub(self.ws_url)
+        return self._ws_hub
 
     async def logout(self):
         """Logout."""
+        await self.stop_keep_alive()
+        if self._ws_hub is not None:
+            await self._ws_hub.close()
         if self._sid:
             await self.Session.logout().get()
             self._sid = None
+            self._sid_tracker.reset()
         if self._storage_session:
             await self._storage_session.close()
         if self._service_session:
@@ -300,8 +320,33 @@ class AsyncApi(BaseApi):
             special_headers_for_login=self._special_headers_for_login,
         )
         self._sid = new_sid
+        self._sid_tracker.obtained()
         return new_sid
 
+    def start_keep_alive(self, interval: float = DEFAULT_KEEP_ALIVE_INTERVAL):
+        """Start keep alive task.
+
+        Task calls cheap /session/ttl method if the sid
+        was not used for `interval` seconds, so the sid is not
+        expired by the server idle timeout. If the sid is expired anyway,
+        it is refreshed by the task (not by the next request).
+
+        :param interval: keep alive interval in seconds
+        """
+        if self._keep_alive_task is not None:
+            self._keep_alive_task.cancel()
+        self._keep_alive_task = asyncio.ensure_future(
+            self._keep_alive_loop(interval),
+        )
+
+    async def stop_keep_alive(self):
+        """Stop keep alive task."""
+        if self._keep_alive_task is None:
+            return
+        self._keep_alive_task.cancel()
+        await asyncio.gather(self._keep_alive_task, return_exceptions=True)
+        self._keep_alive_task = None
+
     FN_RETURN_TYPE = TypeVar('FN_RETURN_TYPE')
 
     async def retry_with_new_sid(
@@ -310,33 +355,95 @@ class AsyncApi(BaseApi):
     ) -> FN_RETURN_TYPE:
         """Retry with new sid.
 
+        If several tasks get authorization error at once,
+        only one of them gets new sid, others wait for it.
+
         :param fn: callable method
         :return: fn result
         """
+        sid = self._sid
         try:
             return await fn()
         except (AuthorizationRequired, AccessDenied):
-            await self.get_new_sid()
+            await self._refresh_sid(failed_sid=self._used_sid(sid))
             return await fn()
 
+    def _used_sid(self, sid: Optional[str]) -> Optional[str]:
+        """Get sid used by failed call.
+
+        Call without sid gets sid by itself,
+        so the current sid is the failed one.
+
+        :param sid: sid before the call
+        :return: sid of failed call
+        """
+        if sid is None:
+            return self._sid
+        return sid
+
+    async def _refresh_sid(self, failed_sid: Optional[str]) -> str:
+        """Get new sid once for concurrent callers.
+
+        Login is performed only if the current sid
+        is still the failed one (or there is no sid).
+
+        :param failed_sid: sid of failed request (None - get sid if
+            there is no sid)
+        :return: sid
+        """
+        if self._sid_lock is None:
+            # Lock is created in the running loop
+            self._sid_lock = asyncio.Lock()
+        async with self._sid_lock:
+            sid = self._sid
+            if sid is not None and sid != failed_sid:
+                return sid
+            if sid is not None:
+                self._sid_tracker.expired()
+            return await self.get_new_sid()
+
+    async def _keep_alive_loop(self, interval: float):
+        """Call keep alive method while not cancelled.
+
+        :param interval: keep alive interval in seconds
+        """
+        while True:
+            delay = keep_alive_delay(self._sid_tracker.idle(), interval)
+            if delay == 0:
+                await self._keep_alive()
+                delay = interval
+            await sleep(delay)
+
+    async def _keep_alive(self):
+        """Keep sid alive."""
+        try:
+            await self._check_sid(self._sid)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning('Sid keep alive failed', exc_info=True)
+            return
+        self._sid_tracker.kept_alive()
+
+    async def _check_sid(self, sid: Optional[str]):
+        """Call cheap session method, refresh expired sid.
+
+        Expired sid is not refreshed by /session/ttl retry
+        (it fails with Expired, not with authorization error).
+
+        :param sid: sid before the call
+        """
+        try:
+            await self.Session.ttl().get()
+        except (AuthorizationRequired, AccessDenied, Expired):
+            await self._refresh_sid(failed_sid=self._used_sid(sid))
+
     async def _wait_for_service_request(self, url):
-        if self._rate_limits:
-            async with self._rate_limits_lock:
-                call_period = self._rate_limits.call_period(url)
-                now = monotonic()
-                if self._last_request_time is None:
-                    # This is a first run
-                    self._last_request_time = now
-                    self._last_call_period = call_period
-                    return
-
-                wait_time = self._last_request_time \
-                    + self._last_call_period - now
-                if wait_time > 0:
-                    logger.info('Sleep %s due to rate limits', wait_time)
-                    await sleep(wait_time)
-                self._last_request_time = monotonic()
-                self._last_call_period = call_period
+        if self._rate_limiter:
+            wait_time = self._rate_limiter.reserve(url)
+            if wait_time > 0:
+                logger.info('Sleep %s due to rate limits', wait_time)
+                await sleep(wait_time)
 
     async def _service_request_without_rate_limits(
         self,
@@ -353,6 +460,7 @@ class AsyncApi(BaseApi):
             request_data = request_args.data or {}
             request_data['sid'] = await self.get_sid()
             request_args.data = request_data  # NOQA:WPS110
+            self._sid_tracker.used()
         if request_args.data:
             request_args.data = {  # NOQA:WPS110
                 key: value
@@ -389,8 +497,35 @@ class AsyncApi(BaseApi):
             # Get or create new sid
             request_params['sid'] = await self.get_sid()
             kwargs['params'] = request_params
+            self._sid_tracker.used()
         return kwargs
 
+    def _new_session(
+        self,
+        headers: Dict[str, str],
+        stats: PoolStats,
+    ) -> aiohttp.ClientSession:
+        """Create session with sized connection pool.
+
+        :param headers: session headers
+        :param stats: pool usage counters
+        :return: session
+        """
+        session_headers = self._default_headers.copy()
+        session_headers.update(headers)
+        pool_limits = self._pool_limits
+        connector = aiohttp.TCPConnector(
+            limit=pool_limits.limit,
+            limit_per_host=pool_limits.limit_per_host,
+            ttl_dns_cache=pool_limits.ttl_dns_cache,
+            force_close=not pool_limits.keep_alive,
+        )
+        return aiohttp.ClientSession(
+            headers=session_headers,
+            connector=connector,
+            trace_configs=[pool_trace_config(stats)],
+        )
+
     def _init_service_entrypoints(self):
         """Init service entrypoint namespaces."""
         self.Account = AsyncAccount(self)
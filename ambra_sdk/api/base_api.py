@@ -1,8 +1,14 @@
 """Base API."""
 
-from typing import Dict, NamedTuple, Optional
+from typing import Dict, NamedTuple, Optional, Tuple
 
 from ambra_sdk import __version__
+from ambra_sdk.addon.backoff import WaitMetrics, WaitTracker
+from ambra_sdk.api.pool import PoolStats, PoolUsage
+from ambra_sdk.api.rate_limiter import RateLimiter
+from ambra_sdk.api.sid import SidMetrics, SidTracker
+from ambra_sdk.service.cache import ResponseCache
+from ambra_sdk.storage.cache import ImageCache
 
 DEFAULT_SDK_CLIENT_NAME = 'Ambra SDK default client'
 
@@ -15,10 +21,17 @@ class Credentials(NamedTuple):
 
 
 class RateLimit(NamedTuple):
-    """Rate limit."""
+    """Rate limit.
+
+    calls: number of calls per seconds
+    seconds: time interval
+    burst: number of calls which can be executed without waiting
+        (by default equal to calls)
+    """
 
     calls: int
     seconds: float
+    burst: Optional[int] = None
 
 
 class RateLimits(NamedTuple):
@@ -33,18 +46,29 @@ class RateLimits(NamedTuple):
     get_limit: Optional[RateLimit]
     special: Optional[Dict[str, RateLimit]]
 
+    def bucket(self, url: str) -> Tuple[str, RateLimit]:
+        """Rate limit bucket for url.
+
+        Special urls have own buckets,
+        all get urls share the get bucket and
+        all other urls share the default bucket.
+
+        :param url: url
+        :return: bucket name and rate limit
+        """
+        if self.special and url in self.special:
+            return url, self.special[url]
+        elif self.get_limit and url.endswith('get'):
+            return 'get', self.get_limit
+        return 'default', self.default
+
     def call_period(self, url: str) -> float:
         """Call period for url.
 
         :param url: url
         :return: call period
         """
-        if self.special and url in self.special:
-            rate_limit = self.special[url]
-        elif self.get_limit and url.endswith('get'):
-            rate_limit = self.get_limit
-        else:
-            rate_limit = self.default
+        _, rate_limit = self.bucket(url)
         return float(rate_limit.seconds) / rate_limit.calls
 
 
@@ -55,6 +79,38 @@ DEFAULT_RATE_LIMITS = RateLimits(
 )
 
 
+class PoolLimits(NamedTuple):
+    """Connection pool limits.
+
+    pool_connections: number of hosts with kept alive connections
+        (requests). Storage requests go to many engine hosts.
+    pool_maxsize: max number of kept alive connections per host
+        (requests). Set it to the number of concurrent threads.
+    pool_block: wait for a free connection instead of opening
+        a connection which is discarded after request (requests)
+    limit: max number of connections to all hosts, 0 - no limit (aiohttp)
+    limit_per_host: max number of connections per host,
+        0 - no limit (aiohttp)
+    ttl_dns_cache: seconds to cache DNS lookups, None - forever (aiohttp)
+    keep_alive: reuse connections
+    per_thread: separate sessions for every thread (requests).
+        Shared session is thread safe, use this option if you change
+        session state (headers, cookies, adapters) in threads.
+    """
+
+    pool_connections: int = 10
+    pool_maxsize: int = 10
+    pool_block: bool = False
+    limit: int = 100
+    limit_per_host: int = 0
+    ttl_dns_cache: Optional[int] = 10
+    keep_alive: bool = True
+    per_thread: bool = False
+
+
+DEFAULT_POOL_LIMITS = PoolLimits()
+
+
 class BaseApi:  # NOQA:WPS214,WPS230
     """Ambra API."""
 
@@ -68,6 +124,7 @@ class BaseApi:  # NOQA:WPS214,WPS230
         special_headers_for_login: Optional[Dict[str, str]] = None,
         rate_limits: Optional[RateLimits] = DEFAULT_RATE_LIMITS,
         autocast_arguments: bool = True,
+        pool_limits: PoolLimits = DEFAULT_POOL_LIMITS,
     ):
         """Init api.
 
@@ -82,7 +139,9 @@ class BaseApi:  # NOQA:WPS214,WPS230
         :param special_headers_for_login: some special
             headers for logging requests.
         :param rate_limits: how many requests you can
-            execute per second using this Api
+            execute per second using this Api.
+            Special urls, get urls and all other urls
+            are limited by independent token buckets.
         :param autocast_arguments: If is True,
             SDK tring to cast your parameters to valid
             request arguments. For example:
@@ -95,6 +154,8 @@ class BaseApi:  # NOQA:WPS214,WPS230
             ..     ...,
             ..     fields=json.dumps(["field1", "field2"]),
             .. ).get()
+        :param pool_limits: connection pool sizes
+            of service and storage sessions
         """
         self._api_url: str = url
         self._creds: Optional[Credentials] = None
@@ -110,8 +171,23 @@ class BaseApi:  # NOQA:WPS214,WPS230
         if username is not None and password is not None:
             self._creds = Credentials(username=username, password=password)
         self._rate_limits = rate_limits
+        self._rate_limiter: Optional[RateLimiter] = None
+        if rate_limits:
+            self._rate_limiter = RateLimiter(rate_limits)
         self.ws_url = '{url}/channel/websocket'.format(url=self._api_url)
         self._autocast_arguments = autocast_arguments
+        self._pool_limits = pool_limits
+        self._sid_tracker = SidTracker(has_sid=sid is not None)
+        # Service polling counters of waiters (see wait_metrics)
+        self.wait_tracker = WaitTracker()
+        # Cache of service responses (see ResponseCache)
+        self.cache = ResponseCache()
+        # Local disk cache of storage images (see ImageCache)
+        self.image_cache: Optional[ImageCache] = None
+        self._pool_stats = {
+            'service': PoolStats(),
+            'storage': PoolStats(),
+        }
 
     @property
     def default_headers(self):
@@ -136,6 +212,7 @@ class BaseApi:  # NOQA:WPS214,WPS230
         client_name: str = DEFAULT_SDK_CLIENT_NAME,
         rate_limits: RateLimits = DEFAULT_RATE_LIMITS,
         autocast_arguments: bool = True,
+        pool_limits: PoolLimits = DEFAULT_POOL_LIMITS,
     ) -> 'BaseApi':
         """Create Api with sid.
 
@@ -159,6 +236,8 @@ class BaseApi:  # NOQA:WPS214,WPS230
             ..     ...,
             ..     fields=json.dumps(["field1", "field2"]),
             .. ).get()
+        :param pool_limits: connection pool sizes
+            of service and storage sessions
 
         :return: Api
         """
@@ -168,6 +247,7 @@ class BaseApi:  # NOQA:WPS214,WPS230
             client_name=client_name,
             rate_limits=rate_limits,
             autocast_arguments=autocast_arguments,
+            pool_limits=pool_limits,
         )
 
     @classmethod
@@ -180,6 +260,7 @@ class BaseApi:  # NOQA:WPS214,WPS230
         special_headers_for_login: Optional[Dict[str, str]] = None,
         rate_limits: RateLimits = DEFAULT_RATE_LIMITS,
         autocast_arguments: bool = True,
+        pool_limits: PoolLimits = DEFAULT_POOL_LIMITS,
     ) -> 'BaseApi':
         """Create Api with (username, password) credentials.
 
@@ -206,6 +287,8 @@ class BaseApi:  # NOQA:WPS214,WPS230
             ..     ...,
             ..     fields=json.dumps(["field1", "field2"]),
             .. ).get()
+        :param pool_limits: connection pool sizes
+            of service and storage sessions
 
         :return: Api
         """
@@ -217,8 +300,33 @@ class BaseApi:  # NOQA:WPS214,WPS230
             special_headers_for_login=special_headers_for_login,
             rate_limits=rate_limits,
             autocast_arguments=autocast_arguments,
+            pool_limits=pool_limits,
         )
 
+    def pool_usage(self) -> Dict[str, PoolUsage]:
+        """Connection pools usage.
+
+        :return: usage of service and storage session pools
+        """
+        return {
+            session: stats.usage()
+            for session, stats in self._pool_stats.items()
+        }
+
+    def sid_metrics(self) -> SidMetrics:
+        """Sid lifetime metrics.
+
+        :return: sid metrics
+        """
+        return self._sid_tracker.metrics()
+
+    def wait_metrics(self) -> Dict[str, WaitMetrics]:
+        """Service polling metrics of Addon.Job.wait and Addon.Study.wait.
+
+        :return: metrics by waiter ('job', 'study')
+        """
+        return self.wait_tracker.metrics()
+
     def service_full_url(self, url: str) -> str:
         """Full service method url.
 
@@ -0,0 +1,197 @@
+"""Connection pools usage."""
+
+from queue import Empty, Full, LifoQueue
+from threading import Lock
+from typing import Dict, NamedTuple, Optional
+
+import aiohttp
+from requests.adapters import HTTPAdapter
+from urllib3 import PoolManager
+
+POOL_COUNTERS = ('requests', 'connections', 'reused', 'queued', 'discarded', 'pools')
+
+
+class PoolUsage(NamedTuple):
+    """Connection pool usage.
+
+    requests: number of connection checkouts
+    connections: number of opened connections
+    reused: number of requests through kept alive connections
+    queued: number of requests waited for a free connection
+    discarded: number of connections closed because the pool was full
+        (increase pool_maxsize or set pool_block)
+    pools: number of created host pools. If it is much larger than
+        the number of hosts, pools are evicted (increase pool_connections)
+    """
+
+    requests: int
+    connections: int
+    reused: int
+    queued: int
+    discarded: int
+    pools: int
+
+
+class PoolStats:
+    """Thread safe counters of connection pool usage."""
+
+    def __init__(self):
+        """Init."""
+        self._lock = Lock()
+        self._counters: Dict[str, int] = dict.fromkeys(POOL_COUNTERS, 0)
+
+    def add(self, counter: str, count: int = 1):
+        """Increment counter.
+
+        :param counter: counter name
+        :param count: increment
+        """
+        with self._lock:
+            self._counters[counter] += count
+
+    def usage(self) -> PoolUsage:
+        """Get snapshot of counters.
+
+        :return: pool usage
+        """
+        with self._lock:
+            return PoolUsage(**self._counters)
+
+    def reset(self):
+        """Reset counters."""
+        with self._lock:
+            self._counters = dict.fromkeys(POOL_COUNTERS, 0)
+
+
+class CountingQueue(LifoQueue):
+    """Queue of urllib3 pool connections with usage counters.
+
+    urllib3 pool keeps `maxsize` slots in the queue.
+    An empty slot (None) means that a new connection is opened.
+    """
+
+    def __init__(self, maxsize: int, stats: PoolStats):
+        """Init.
+
+        :param maxsize: pool size
+        :param stats: pool stats
+        """
+        super().__init__(maxsize)
+        self.stats = stats
+
+    def get(self, block=True, timeout=None):
+        """Get connection slot.
+
+        :param block: wait for free slot
+        :param timeout: timeout
+        :return: connection or None
+        :raises Empty: no free slots
+        """
+        if block and self.empty():
+            self.stats.add('queued')
+        try:
+            conn = super().get(block, timeout)
+        except Empty:
+            if not block:
+                # urllib3 opens connection above the pool size
+                self.stats.add('requests')
+                self.stats.add('connections')
+            raise
+        self.stats.add('requests')
+        self.stats.add('connections' if conn is None else 'reused')
+        return conn
+
+    def put(self, item, block=True, timeout=None):  # NOQA:WPS110
+        """Put connection back.
+
+        :param item: connection
+        :param block: wait for free slot
+        :param timeout: timeout
+        :raises Full: pool is full, connection is discarded
+        """
+        try:
+            super().put(item, block, timeout)
+        except Full:
+            self.stats.add('discarded')
+            raise
+
+
+class CountingPoolManager(PoolManager):
+    """urllib3 pool manager with usage counters."""
+
+    def __init__(self, *args, stats: PoolStats, **kwargs):
+        """Init.
+
+        :param args: PoolManager args
+        :param stats: pool stats
+        :param kwargs: PoolManager kwargs
+        """
+        super().__init__(*args, **kwargs)
+        self.stats = stats
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        pool = super()._new_pool(scheme, host, port, request_context)
+        self.stats.add('pools')
+        queue = CountingQueue(pool.pool.maxsize, self.stats)
+        for _ in range(pool.pool.maxsize):
+            queue.put(None)
+        pool.pool = queue
+        return pool
+
+
+class PoolAdapter(HTTPAdapter):
+    """HTTP adapter with connection pool usage counters."""
+
+    def __init__(self, *args, stats: Optional[PoolStats] = None, **kwargs):
+        """Init.
+
+        :param args: HTTPAdapter args
+        :param stats: pool stats
+        :param kwargs: HTTPAdapter kwargs
+        """
+        self.stats = stats or PoolStats()
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        """Init pool manager.
+
+        :param connections: number of host pools
+        :param maxsize: max number of kept connections per host
+        :param block: wait for a free connection
+        :param pool_kwargs: pool manager kwargs
+        """
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        self.poolmanager = CountingPoolManager(
+            num_pools=connections,
+            maxsize=maxsize,
+            block=block,
+            stats=self.stats,
+            **pool_kwargs,
+        )
+
+
+def pool_trace_config(stats: PoolStats) -> aiohttp.TraceConfig:
+    """Get aiohttp trace config with connection pool usage counters.
+
+    :param stats: pool stats
+    :return: trace config
+    """
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_connection_create(session, context, params):  # NOQA:WPS430
+        stats.add('requests')
+        stats.add('connections')
+
+    async def on_connection_reuse(session, context, params):  # NOQA:WPS430
+        stats.add('requests')
+        stats.add('reused')
+
+    async def on_connection_queued(session, context, params):  # NOQA:WPS430
+        stats.add('queued')
+
+    trace_config.on_connection_create_end.append(on_connection_create)
+    trace_config.on_connection_reuseconn.append(on_connection_reuse)
+    trace_config.on_connection_queued_start.append(on_connection_queued)
+    return trace_config
@@ -0,0 +1,89 @@
+"""Rate limiter."""
+
+from threading import Lock
+from time import monotonic
+from typing import TYPE_CHECKING, Dict
+
+if TYPE_CHECKING:
+    from ambra_sdk.api.base_api import RateLimit, RateLimits  # NOQA:WPS433
+
+
+class TokenBucket:
+    """Token bucket.
+
+    Bucket is refilled with `calls` tokens every `seconds`
+    and can hold at most `burst` tokens.
+    Every call takes one token. If the bucket is empty,
+    the token is borrowed from the future and the caller
+    must wait until the bucket is refilled.
+    So concurrent callers are queued in the order of reservations.
+    """
+
+    __slots__ = ('_rate', '_capacity', '_tokens', '_updated')
+
+    def __init__(self, rate_limit: 'RateLimit'):
+        """Init.
+
+        :param rate_limit: rate limit
+        """
+        self._rate = rate_limit.calls / float(rate_limit.seconds)
+        burst = rate_limit.burst
+        if burst is None:
+            burst = rate_limit.calls
+        self._capacity = float(max(burst, 1))
+        self._tokens = self._capacity
+        self._updated = monotonic()
+
+    def reserve(self, now: float) -> float:
+        """Reserve one token.
+
+        :param now: current monotonic time
+        :return: time to wait before the call
+        """
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(
+                self._capacity,
+                self._tokens + elapsed * self._rate,
+            )
+            self._updated = now
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0
+        return -self._tokens / self._rate
+
+
+class RateLimiter:
+    """Rate limiter.
+
+    Keep a token bucket for every rate limits class
+    (special url, get or default) so requests from
+    different classes do not wait for each other.
+
+    Reservation is thread safe and does not block:
+    the caller gets a wait time and the caller sleeps
+    (time.sleep or asyncio.sleep).
+    """
+
+    def __init__(self, rate_limits: 'RateLimits'):
+        """Init.
+
+        :param rate_limits: rate limits
+        """
+        self._rate_limits = rate_limits
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = Lock()
+
+    def reserve(self, url: str) -> float:
+        """Reserve call of url.
+
+        :param url: url
+        :return: time to wait before the call
+        """
+        bucket_name, rate_limit = self._rate_limits.bucket(url)
+        with self._lock:
+            bucket = self._buckets.get(bucket_name)
+            if bucket is None:
+                bucket = TokenBucket(rate_limit)
+                self._buckets[bucket_name] = bucket
+            return bucket.reserve(monotonic())
@@ -0,0 +1,117 @@
+"""Sid lifetime tracking."""
+
+from threading import Lock
+from time import monotonic
+from typing import NamedTuple, Optional
+
+# Server closes idle sessions, keep alive call is performed
+# if the sid was not used for this number of seconds
+DEFAULT_KEEP_ALIVE_INTERVAL = 300
+
+
+class SidMetrics(NamedTuple):
+    """Sid lifetime metrics.
+
+    age: seconds since the sid was obtained (None - no sid)
+    idle: seconds since the last request with the sid (None - no sid)
+    logins: number of obtained sids
+    expirations: number of sids refreshed after authorization errors
+    keep_alive_calls: number of keep alive calls
+    last_lifetime: age of the last expired sid (None - no expirations).
+        Use it to choose keep alive interval.
+    """
+
+    age: Optional[float]
+    idle: Optional[float]
+    logins: int
+    expirations: int
+    keep_alive_calls: int
+    last_lifetime: Optional[float]
+
+
+class SidTracker:
+    """Thread safe tracker of sid lifetime."""
+
+    def __init__(self, has_sid: bool = False):
+        """Init.
+
+        :param has_sid: sid is known (age is counted from now)
+        """
+        self._lock = Lock()
+        now = monotonic()
+        self._obtained_at: Optional[float] = now if has_sid else None
+        self._used_at: Optional[float] = now if has_sid else None
+        self._logins = 0
+        self._expirations = 0
+        self._keep_alive_calls = 0
+        self._last_lifetime: Optional[float] = None
+
+    def obtained(self):
+        """New sid is obtained."""
+        with self._lock:
+            now = monotonic()
+            self._obtained_at = now
+            self._used_at = now
+            self._logins += 1
+
+    def used(self):
+        """Request with sid is sent."""
+        with self._lock:
+            self._used_at = monotonic()
+
+    def expired(self):
+        """Sid is expired (authorization error)."""
+        with self._lock:
+            self._expirations += 1
+            if self._obtained_at is not None:
+                self._last_lifetime = monotonic() - self._obtained_at
+
+    def kept_alive(self):
+        """Keep alive call is performed."""
+        with self._lock:
+            self._keep_alive_calls += 1
+
+    def reset(self):
+        """Sid is removed (logout)."""
+        with self._lock:
+            self._obtained_at = None
+            self._used_at = None
+
+    def idle(self) -> Optional[float]:
+        """Get seconds since the last request with sid.
+
+        :return: idle time (None - no sid)
+        """
+        with self._lock:
+            if self._used_at is None:
+                return None
+            return monotonic() - self._used_at
+
+    def metrics(self) -> SidMetrics:
+        """Get sid metrics.
+
+        :return: sid metrics
+        """
+        with self._lock:
+            now = monotonic()
+            return SidMetrics(
+                age=None if self._obtained_at is None
+                else now - self._obtained_at,
+                idle=None if self._used_at is None else now - self._used_at,
+                logins=self._logins,
+                expirations=self._expirations,
+                keep_alive_calls=self._keep_alive_calls,
+                last_lifetime=self._last_lifetime,
+            )
+
+
+def keep_alive_delay(idle: Optional[float], interval: float) -> float:
+    """Get delay before the next keep alive check.
+
+    :param idle: seconds since the last request with sid
+    :param interval: keep alive interval
+    :return: delay (0 - keep alive call is required now)
+    """
+    if idle is None:
+        return interval
+    return max(interval - idle, 0)
@@ -1,13 +1,40 @@
 """Dicom addon namespace."""
+import asyncio
 import os
 from enum import Enum, auto
-from io import BytesIO
+from functools import partial
 from pathlib import Path
-from typing import Any, BinaryIO, Dict, NamedTuple, Optional, cast
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    NamedTuple,
+    Optional,
+    Set,
+    Union,
+    cast,
+)
 
+import aiohttp
 import pydicom
 from pydicom.dataset import FileDataset
 
+from ambra_sdk.addon.chunks import (
+    BufferedChunks,
+    FileChunks,
+    is_random_access,
+)
+from ambra_sdk.addon.dicom import (
+    dicom_cache_key,
+    is_retryable_upload_error,
+    read_cached_dicom,
+    read_dicom_payload,
+)
+from ambra_sdk.addon.journal import MultipartState, UploadJournal, journal_key
+from ambra_sdk.addon.spool import threadsafe_chunks
+from ambra_sdk.exceptions.base import AmbraResponseException
+from ambra_sdk.storage.cache import ImageCache
+
 
 class UploadedImageParams(NamedTuple):
     """Image object."""
@@ -36,6 +63,8 @@ class Dicom:
     CHUNK_UPLOAD_THRESHOLD = 10 * CHUNK_SIZE  # file must be at least this size to use multipart
     COMPRESSION_THRESHOLD = 25 * 1024  # 25 Kb
     RETRY_LIMIT = 120
+    MULTIPART_WORKERS = 4  # number of concurrent chunk uploads
+    UPLOAD_JOURNAL: Optional[UploadJournal] = None  # journal for resumable multipart uploads
 
     def __init__(self, api):
         """Init.
@@ -44,7 +73,7 @@ class Dicom:
         """
         self._api = api
 
-    async def get(
+    async def get(  # NOQA:WPS211
         self,
         *,
         namespace_id: str,
@@ -53,9 +82,15 @@ class Dicom:
         image_version: str = '*',
         engine_fqdn: Optional[str] = None,
         pretranscode: Optional[bool] = None,
+        stop_before_pixels: bool = False,
+        defer_size: Optional[Union[int, str]] = None,
     ) -> FileDataset:
         """Get dicom.
 
+        Payload is streamed to a temporary file (or api.image_cache),
+        not buffered in memory. Payload (cached image) is parsed
+        in the default executor.
+
         :param namespace_id: uploading to namespace
         :param study_uid: study_uid
         :param image_uid: image_uid
@@ -63,9 +98,38 @@ class Dicom:
 
         :param engine_fqdn: fqdn (if None gets namespace fqdn)
         :param pretranscode: get pretranscoded
+        :param stop_before_pixels: read only headers
+            (the rest of payload is not downloaded)
+        :param defer_size: read values larger than this size
+            (bytes or '512 KB') from the temporary file (cached image)
+            on access
 
         :return: pydicom object
         """
+        image_cache: Optional[ImageCache] = self._api.image_cache
+        cache_key = dicom_cache_key(
+            image_cache,
+            namespace_id=namespace_id,
+            study_uid=study_uid,
+            image_uid=image_uid,
+            image_version=image_version,
+            pretranscode=pretranscode,
+        )
+        loop = asyncio.get_event_loop()
+        if cache_key is not None:
+            cached = await loop.run_in_executor(
+                None,
+                partial(
+                    read_cached_dicom,
+                    image_cache,
+                    cache_key,
+                    stop_before_pixels=stop_before_pixels,
+                    defer_size=defer_size,
+                ),
+            )
+            if cached is not None:
+                return cached
+
         if engine_fqdn is None:
             engine_fqdn = await self._namespace_fqdn(namespace_id)
 
@@ -80,10 +144,20 @@ class Dicom:
                 image_version=image_version,
                 pretranscode=pretranscode,
             )
-        return pydicom.read_file(
-            fp=BytesIO(await dicom_payload_resp.content.read()),
-            force=True,
-        )
+        try:
+            return await loop.run_in_executor(
+                None,
+                partial(
+                    read_dicom_payload,
+                    threadsafe_chunks(dicom_payload_resp.content, loop),
+                    stop_before_pixels=stop_before_pixels,
+                    defer_size=defer_size,
+                    image_cache=image_cache,
+                    cache_key=cache_key,
+                ),
+            )
+        finally:
+            dicom_payload_resp.close()
 
     async def upload(
         self,
@@ -172,30 +246,117 @@ class Dicom:
         engine_fqdn: str,
         study_uid: str,
     ) -> UploadedImageParams:
+        """Upload file in parts.
+
+        If UPLOAD_JOURNAL is set, interrupted upload of the same file
+        is resumed: uploaded chunks are skipped.
+        If the resumed upload is rejected by the server
+        (for example, it is expired), the file is uploaded from scratch.
+        Journal (and file stat for the journal key) is used
+        in the default executor.
+
+        :param dicom_file: dicom file
+        :param namespace_id: uploading to namespace
+        :param engine_fqdn: engine fqdn
+        :param study_uid: UID of the study
+        :return: uploaded image params
+        """
+        loop = asyncio.get_event_loop()
+        journal = self.UPLOAD_JOURNAL
+        key = None
+        if journal is not None:
+            key = await loop.run_in_executor(
+                None,
+                journal_key,
+                dicom_file,
+                engine_fqdn,
+                namespace_id,
+            )
+        if key is not None:
+            state = await loop.run_in_executor(
+                None,
+                journal.find,  # type: ignore
+                key,
+                self.CHUNK_SIZE,
+            )
+            if state is not None and state.resumed:
+                try:
+                    return await self._upload_parts(
+                        dicom_file=dicom_file,
+                        namespace_id=namespace_id,
+                        engine_fqdn=engine_fqdn,
+                        study_uid=study_uid,
+                        state=state,
+                    )
+                except AmbraResponseException as exception:
+                    if is_retryable_upload_error(exception):
+                        raise
+                    await loop.run_in_executor(
+                        None,
+                        journal.forget,  # type: ignore
+                        key,
+                    )
         initiate_response = await self._api.Storage.Image.multipart_initiate(engine_fqdn)
         upload_uuid = initiate_response['upload_uuid']
-        chunk_number = 0
-        file_size = 0
-        while True:
-            part = dicom_file.read(self.CHUNK_SIZE)
-            if not part:
-                break
-            file_size += len(part)
-            await self._api.Storage.Image.multipart_chunk_upload(
+        if key is None:
+            state = MultipartState(upload_uuid)
+        else:
+            state = await loop.run_in_executor(
+                None,
+                journal.start,  # type: ignore
+                key,
+                upload_uuid,
+                self.CHUNK_SIZE,
+            )
+        return await self._upload_parts(
+            dicom_file=dicom_file,
+            namespace_id=namespace_id,
+            engine_fqdn=engine_fqdn,
+            study_uid=study_uid,
+            state=state,
+        )
+
+    async def _upload_parts(
+        self,
+        *,
+        dicom_file: BinaryIO,
+        namespace_id: str,
+        engine_fqdn: str,
+        study_uid: str,
+        state: MultipartState,
+    ) -> UploadedImageParams:
+        """Upload not uploaded chunks and complete upload.
+
+        :param dicom_file: dicom file
+        :param namespace_id: uploading to namespace
+        :param engine_fqdn: engine fqdn
+        :param study_uid: UID of the study
+        :param state: multipart upload state
+        :return: uploaded image params
+        """
+        dicom_file.seek(0)
+        if self.MULTIPART_WORKERS > 1 and is_random_access(dicom_file):
+            with FileChunks(dicom_file, self.CHUNK_SIZE) as chunks:
+                file_size = await self._parallel_chunks_upload(
+                    chunks=chunks,
+                    engine_fqdn=engine_fqdn,
+                    state=state,
+                )
+        else:
+            file_size = await self._sequential_chunks_upload(
+                dicom_file=dicom_file,
                 engine_fqdn=engine_fqdn,
-                upload_uuid=upload_uuid,
-                bytes_part=part,
-                chunk_number=chunk_number,
+                state=state,
             )
-            chunk_number += 1
         dicom_file.seek(0)
         await self._api.Storage.Image.multipart_complete(
             engine_fqdn=engine_fqdn,
             namespace=namespace_id,
-            upload_uuid=upload_uuid,
+            upload_uuid=state.upload_uuid,
             study_uid=study_uid,
             file_size=file_size,
         )
+        await asyncio.get_event_loop().run_in_executor(None, state.complete)
         return UploadedImageParams(
             study_uid=study_uid,
             image_uid='',
@@ -204,6 +365,164 @@ class Dicom:
             attr=None,
         )
 
+    async def _sequential_chunks_upload(
+        self,
+        *,
+        dicom_file: BinaryIO,
+        engine_fqdn: str,
+        state: MultipartState,
+    ) -> int:
+        """Upload chunks one by one.
+
+        One chunk buffer is reused for all chunks.
+
+        :param dicom_file: dicom file
+        :param engine_fqdn: engine fqdn
+        :param state: multipart upload state
+        :return: file size
+        """
+        chunk_number = 0
+        file_size = 0
+        for part in BufferedChunks(dicom_file, self.CHUNK_SIZE):
+            file_size += len(part)
+            if not state.is_uploaded(chunk_number):
+                await self._chunk_upload(
+                    engine_fqdn=engine_fqdn,
+                    upload_uuid=state.upload_uuid,
+                    bytes_part=part,
+                    chunk_number=chunk_number,
+                )
+                await asyncio.get_event_loop().run_in_executor(
+                    None,
+                    state.uploaded,
+                    chunk_number,
+                )
+            chunk_number += 1
+        return file_size
+
+    async def _parallel_chunks_upload(
+        self,
+        *,
+        chunks: FileChunks,
+        engine_fqdn: str,
+        state: MultipartState,
+    ) -> int:
+        """Upload chunks concurrently.
+
+        Every chunk is a zero-copy view of the mapped file
+        (or is read just before upload).
+
+        :param chunks: file chunks
+        :param engine_fqdn: engine fqdn
+        :param state: multipart upload state
+        :return: file size
+        """
+        pending: Set[asyncio.Future] = set()
+        try:
+            for chunk_number in range(len(chunks)):
+                if state.is_uploaded(chunk_number):
+                    continue
+                if len(pending) >= self.MULTIPART_WORKERS:
+                    done, pending = await asyncio.wait(
+                        pending,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    for task in done:
+                        task.result()
+                pending.add(
+                    asyncio.ensure_future(
+                        self._read_and_upload_chunk(
+                            chunks=chunks,
+                            engine_fqdn=engine_fqdn,
+                            state=state,
+                            chunk_number=chunk_number,
+                        ),
+                    ),
+                )
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:  # NOQA:WPS440
+                    task.result()
+        finally:
+            for pending_task in pending:
+                pending_task.cancel()
+            # Chunks views are released by tasks
+            await asyncio.gather(*pending, return_exceptions=True)
+        return chunks.size
+
+    async def _read_and_upload_chunk(
+        self,
+        *,
+        chunks: FileChunks,
+        engine_fqdn: str,
+        state: MultipartState,
+        chunk_number: int,
+    ):
+        """Read and upload chunk.
+
+        :param chunks: file chunks
+        :param engine_fqdn: engine fqdn
+        :param state: multipart upload state
+        :param chunk_number: chunk number
+        """
+        with chunks.chunk(chunk_number) as part:
+            await self._chunk_upload(
+                engine_fqdn=engine_fqdn,
+                upload_uuid=state.upload_uuid,
+                bytes_part=part,
+                chunk_number=chunk_number,
+            )
+        # Journal record is synced to disk
+        await asyncio.get_event_loop().run_in_executor(
+            None,
+            state.uploaded,
+            chunk_number,
+        )
+
+    async def _chunk_upload(
+        self,
+        *,
+        engine_fqdn: str,
+        upload_uuid: str,
+        bytes_part: Union[bytes, memoryview],
+        chunk_number: int,
+    ):
+        """Upload chunk with retries.
+
+        Failed chunk is retried up to RETRY_LIMIT times
+        every UPLOAD_RETRY_DELAY milliseconds.
+
+        :param engine_fqdn: engine fqdn
+        :param upload_uuid: multipart upload uuid
+        :param bytes_part: chunk bytes
+        :param chunk_number: chunk number
+        :raises ClientError: Connection error
+        :raises AmbraResponseException: Response error
+        """
+        attempt = 0
+        while True:
+            try:
+                await self._api.Storage.Image.multipart_chunk_upload(
+                    engine_fqdn=engine_fqdn,
+                    upload_uuid=upload_uuid,
+                    bytes_part=bytes_part,
+                    chunk_number=chunk_number,
+                )
+                return
+            except (
+                aiohttp.ClientError,
+                asyncio.TimeoutError,
+                AmbraResponseException,
+            ) as exception:
+                if attempt >= self.RETRY_LIMIT or \
+                   not is_retryable_upload_error(exception):
+                    raise
+            attempt += 1
+            await asyncio.sleep(self.UPLOAD_RETRY_DELAY / 1000)
+
     async def _default_upload(
         self,
         dicom_file: BinaryIO,
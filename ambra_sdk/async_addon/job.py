@@ -1,19 +1,34 @@
 """Async Job addon namespace."""
 
+import asyncio
 import uuid as uuid_lib
 from contextlib import suppress
 from time import monotonic
-from typing import Mapping, Optional, Tuple, Union, cast
+from typing import (
+    AsyncIterator,
+    Iterable,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
 
 from box import Box
 
+from ambra_sdk.addon.backoff import PollBackoff, PollSchedule
+from ambra_sdk.addon.job import (
+    JOBS_POLL_BATCH_SIZE,
+    JobsPolling,
+    check_job_state,
+    event_job_id,
+)
 from ambra_sdk.exceptions.service import (
     NotFound,
     NotPermitted,
     PreconditionFailed,
 )
 from ambra_sdk.service.query import AsyncQueryO
-from ambra_sdk.service.ws import AsyncWSManager
 
 ERRORS_MAPPING_KEY_TYPE = Union[Tuple[str, Optional[str]], str]
 
@@ -36,6 +51,7 @@ class Job:
         *,
         timeout: float = 200.0,
         ws_timeout: int = 5,
+        backoff: Optional[PollBackoff] = None,
         **kwargs,
     ):
         """Wait completion.
@@ -44,6 +60,7 @@ class Job:
         :param method: method
         :param timeout: timeout
         :param ws_timeout: websocket interval
+        :param backoff: polling backoff (None - default backoff)
         :param kwargs: method kwargs
         :return: method result
         """
@@ -61,6 +78,7 @@ class Job:
             namespace_id=namespace,
             timeout=timeout,
             ws_timeout=ws_timeout,
+            backoff=backoff,
         )
         return method_result
 
@@ -71,17 +89,155 @@ class Job:
         namespace_id: str,
         timeout: float,
         ws_timeout: int,
+        backoff: Optional[PollBackoff] = None,
     ):
         """Wait job.
 
+        Job is polled with exponential backoff (interval starts
+        from ws_timeout by default), a DONE event of the job
+        (or an event without job id) triggers an immediate poll.
+
         :param job_id: job id
         :param namespace_id: job namespace_id
         :param timeout: time for waiting new study
         :param ws_timeout: time for waiting in socket
+        :param backoff: polling backoff (None - default backoff)
 
         :raises TimeoutError: if job not ready by timeout
         :raises RuntimeError: Bad answer from ws
         """
+        get_job_query = self._job_query(job_id)
+        schedule = PollSchedule(backoff, ws_timeout, timeout)
+
+        # K. Pustovalov: job channel have form job.namespace
+        channel_name = 'job.{namespace_id}'.format(namespace_id=namespace_id)
+        sid = await self._api.get_sid()
+
+        job_is_ready = False
+        try:  # NOQA:WPS501
+            ws_hub = self._api.ws_hub
+            async with ws_hub.events(
+                sid,
+                channel_name,
+                ['DONE'],
+                lambda msg: event_job_id(msg) in {job_id, None},
+            ) as events:
+                while not schedule.expired():
+                    job_status = None
+                    with suppress(NotFound):
+                        job_status = cast(Box, await get_job_query.get())
+                    schedule.polled()
+                    if job_status is not None:
+                        check_job_state(job_status)
+                        if job_status['state'] == 'DONE':
+                            job_is_ready = True
+                            break
+                        elif job_status['state'] == 'ERROR':
+                            raise RuntimeError(
+                                f'Job finished with error {job_status}',
+                            )
+                    with suppress(TimeoutError):
+                        await events.get(timeout=schedule.delay())
+                        schedule.reset()
+        finally:
+            self._api.wait_tracker.finished(
+                'job',
+                schedule,
+                timed_out=not job_is_ready and schedule.expired(),
+            )
+        if job_is_ready is False:
+            raise TimeoutError
+
+    async def wait_many(  # NOQA:WPS210,WPS231
+        self,
+        job_ids: Iterable[str],
+        *,
+        namespace_id: str,
+        timeout: float,
+        ws_timeout: float = 5,
+        poll_interval: float = 30,
+        poll_batch_size: int = JOBS_POLL_BATCH_SIZE,
+    ) -> AsyncIterator[Tuple[str, Box]]:
+        """Wait many jobs of namespace.
+
+        Jobs are yielded as they finish (DONE or ERROR state,
+        check job_status.state).
+        The namespace channel is subscribed once for all jobs.
+        A job is checked by /job/get after its DONE event (all
+        jobs are checked after an event without job id) and
+        not finished jobs are checked every poll_interval.
+        Rechecks are sent by batches of poll_batch_size concurrent
+        requests spread over poll_interval (see JobsPolling).
+
+        :Example:
+
+        >>> async for job_id, job_status in api.Addon.Job.wait_many(
+        >>>     job_ids,
+        >>>     namespace_id=namespace_id,
+        >>>     timeout=600,
+        >>> ):
+        >>>     print(job_id, job_status.state)
+
+        :param job_ids: job ids
+        :param namespace_id: jobs namespace_id
+        :param timeout: time for waiting all jobs
+        :param ws_timeout: time for waiting in socket
+        :param poll_interval: interval of not finished jobs checks
+        :param poll_batch_size: max number of jobs in one polling round
+
+        :raises TimeoutError: if jobs not ready by timeout
+
+        :yields: job id and job status
+        """
+        start = monotonic()
+        polling = JobsPolling(job_ids, poll_interval, poll_batch_size)
+
+        channel_name = 'job.{namespace_id}'.format(namespace_id=namespace_id)
+        sid = await self._api.get_sid()
+        ws_hub = self._api.ws_hub
+        async with ws_hub.events(sid, channel_name, ['DONE']) as events:
+            while polling.pending:
+                if monotonic() - start >= timeout:
+                    raise TimeoutError
+                batch = polling.batch()
+                statuses = await asyncio.gather(
+                    *(self._get_job(job_id) for job_id in batch),
+                )
+                for job_id, job_status in zip(batch, statuses):
+                    if job_status is not None and check_job_state(job_status):
+                        polling.finished(job_id)
+                        yield job_id, job_status
+                if not polling.pending:
+                    break
+                wait_timeout = min(
+                    ws_timeout,
+                    polling.delay(),
+                    start + timeout - monotonic(),
+                )
+                received = []
+                with suppress(TimeoutError):
+                    received.append(
+                        await events.get(timeout=max(wait_timeout, 0)),
+                    )
+                received.extend(events.drain())
+                polling.received(received)
+
+    async def _get_job(self, job_id: str) -> Optional[Box]:
+        """Get job status.
+
+        :param job_id: job id
+        :return: job status (None if job is not found yet)
+        """
+        with suppress(NotFound):
+            return cast(Box, await self._job_query(job_id).get())
+        return None
+
+    def _job_query(self, job_id: str) -> AsyncQueryO:
+        """Get /job/get query.
+
+        :param job_id: job id
+        :return: query
+        """
         errors_mapping: ERRORS_MAPPING_TYPE = {
             ('NOT_FOUND', None):
             NotFound('The job can not be found'),
@@ -91,52 +247,10 @@ class Job:
         request_data = {
             'id': job_id,
         }
-        get_job_query = AsyncQueryO(
+        return AsyncQueryO(
             api=self._api,
             url='/job/get',
             request_data=request_data,
             errors_mapping=errors_mapping,
             required_sid=True,
         )
-
-        ws_url = self._api.ws_url
-        ws_manager = AsyncWSManager(ws_url)
-        start = monotonic()
-
-        # K. Pustovalov: job channel have form job.namespace
-        channel_name = 'job.{namespace_id}'.format(namespace_id=namespace_id)
-        sid = await self._api.get_sid()
-
-        job_is_ready = False
-        async with ws_manager.channel(sid, channel_name) as ws:
-            while True:
-                if monotonic() - start >= timeout:
-                    break
-                with suppress(NotFound):
-                    job_status = cast(Box, await get_job_query.get())
-                    if job_status['state'] not in (  # NOQA: WPS510
-                        'FINISHED',
-                        'DONE',
-                        'ERROR',
-                        'RUNNING',
-                        'SCHEDULED',
-                    ):
-                        raise RuntimeError(  # NOQA:WPS220
-                            'Unknown job status {job_status}'.format(
-                                job_status=job_status['state'],
-                            ),
-                        )
-                    if job_status['state'] == 'DONE':
-                        job_is_ready = True
-                        break
-                    elif job_status['state'] == 'ERROR':
-                        raise RuntimeError(f'Job finished with error {job_status}')
-                with suppress(TimeoutError):
-                    await ws.wait_for_event(
-                        channel_name,
-                        sid,
-                        'DONE',
-                        timeout=ws_timeout,
-                    )
-        if job_is_ready is False:
-            raise TimeoutError
@@ -1,23 +1,62 @@
 """Study addon namespace."""
 
+import asyncio
 from contextlib import suppress
+from functools import partial
 from itertools import chain
 from pathlib import Path
 from time import monotonic
-from typing import Any, Dict, Iterator, List, Optional, Tuple
-
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+import aiohttp
 import pydicom
 from box import Box
 
-from ambra_sdk.addon.dicom import UploadedImageParams
+from ambra_sdk.addon.backoff import PollBackoff, PollSchedule
+from ambra_sdk.addon.dicom import (
+    UploadedImageParams,
+    is_retryable_upload_error,
+)
+from ambra_sdk.addon.download import (
+    DownloadedImage,
+    DownloadManifest,
+    StudyImage,
+    async_write_file,
+    image_path,
+    schema_images,
+)
+from ambra_sdk.addon.spool import DOWNLOAD_CHUNK_SIZE
+from ambra_sdk.addon.study import StudyEventFilter
+from ambra_sdk.addon.zip_stream import (
+    ZipDicom,
+    ZipEntry,
+    async_iter_zip,
+    read_zip_dicom,
+)
+from ambra_sdk.exceptions.base import AmbraResponseException
 from ambra_sdk.exceptions.service import NotFound
 from ambra_sdk.models import Study as StudyModel
-from ambra_sdk.service.ws import AsyncWSManager
 
 
 class Study:  # NOQA:WPS214
     """Study addon namespace."""
 
+    UPLOAD_WORKERS = 4  # number of concurrent image uploads
+    UPLOAD_RETRIES = 3  # number of retries of one image upload
+    UPLOAD_RETRY_DELAY = 1  # seconds, multiplied by the attempt number
+    DOWNLOAD_WORKERS = 8  # number of concurrent image downloads
+    DOWNLOAD_RETRIES = 3  # number of retries of one image download
+    DOWNLOAD_RETRY_DELAY = 1  # seconds, multiplied by the attempt number
+
     def __init__(self, api):
         """Init.
 
@@ -30,11 +69,15 @@ class Study:  # NOQA:WPS214
         *,
         study_dir: Path,
         namespace_id: str,
+        workers: Optional[int] = None,
+        retries: Optional[int] = None,
     ) -> Tuple[str, List[UploadedImageParams]]:
         """Upload study to namespace from path.
 
         :param study_dir: path to study dir
         :param namespace_id: uploading to namespace
+        :param workers: number of concurrent uploads (UPLOAD_WORKERS)
+        :param retries: number of retries of one upload (UPLOAD_RETRIES)
 
         :raises ValueError: Study dir is not directory
         :return: list of image params
@@ -45,6 +88,8 @@ class Study:  # NOQA:WPS214
         return await self.upload_paths(
             dicom_paths=study_dir.glob('**/*.dcm'),
             namespace_id=namespace_id,
+            workers=workers,
+            retries=retries,
         )
 
     async def upload_paths(
@@ -52,17 +97,24 @@ class Study:  # NOQA:WPS214
         *,
         dicom_paths: Iterator[Path],
         namespace_id: str,
+        workers: Optional[int] = None,
+        retries: Optional[int] = None,
     ) -> Tuple[str, List[UploadedImageParams]]:
         """Upload study to namespace from dicoms iterator.
 
+        Images are uploaded in concurrent tasks.
+        Paths are taken from the iterator only when
+        there is a free place in the uploading queue.
+        Failed uploads (connection or server errors) are retried.
+
         :param dicom_paths: iterator of dicom paths
         :param namespace_id: uploading to namespace
+        :param workers: number of concurrent uploads (UPLOAD_WORKERS)
+        :param retries: number of retries of one upload (UPLOAD_RETRIES)
 
         :raises ValueError: Study dir is not directory
-        :return: list of image params
+        :return: list of image params (in order of paths)
         """
-        images_params = []
-
         first_dicom_path = next(dicom_paths, None)
         if first_dicom_path is None:
             raise ValueError('Dicoms iterator is empty')
@@ -89,15 +141,13 @@ class Study:  # NOQA:WPS214
         uuid: str = response_data.uuid
 
         # upload images
-        for dicom_path in chain((first_dicom_path, ), dicom_paths):
-            with dicom_path.open(mode='rb') as dicom:
-                images_params.append(
-                    await self._api.Addon.Dicom.upload(
-                        dicom_file=dicom,
-                        namespace_id=namespace_id,
-                        engine_fqdn=engine_fqdn,
-                    ),
-                )
+        images_params = await self._upload_images(
+            dicom_paths=chain((first_dicom_path, ), dicom_paths),
+            namespace_id=namespace_id,
+            engine_fqdn=engine_fqdn,
+            workers=self.UPLOAD_WORKERS if workers is None else workers,
+            retries=self.UPLOAD_RETRIES if retries is None else retries,
+        )
 
         # then sync data
         # In api.html sync method have not uuid param...
@@ -110,6 +160,395 @@ class Study:  # NOQA:WPS214
 
         return uuid, images_params
 
+    async def _upload_images(
+        self,
+        *,
+        dicom_paths: Iterable[Path],
+        namespace_id: str,
+        engine_fqdn: str,
+        workers: int,
+        retries: int,
+    ) -> List[UploadedImageParams]:
+        """Upload images concurrently.
+
+        :param dicom_paths: dicom paths
+        :param namespace_id: uploading to namespace
+        :param engine_fqdn: engine fqdn
+        :param workers: number of concurrent uploads
+        :param retries: number of retries of one upload
+        :return: list of image params (in order of paths)
+        """
+        # Back pressure: number of tasks is limited by workers
+        workers = max(workers, 1)
+        uploaded: Dict[int, UploadedImageParams] = {}
+        pending: Dict[asyncio.Future, int] = {}
+        try:
+            for index, dicom_path in enumerate(dicom_paths):
+                while len(pending) >= workers:
+                    await self._collect_uploads(pending, uploaded)
+                task = asyncio.ensure_future(
+                    self._upload_image(
+                        dicom_path=dicom_path,
+                        namespace_id=namespace_id,
+                        engine_fqdn=engine_fqdn,
+                        retries=retries,
+                    ),
+                )
+                pending[task] = index
+            while pending:
+                await self._collect_uploads(pending, uploaded)
+        finally:
+            for pending_task in pending:
+                pending_task.cancel()
+            # Cancelled uploads are finished before the error is raised
+            await asyncio.gather(*pending, return_exceptions=True)
+        return [uploaded[index] for index in range(len(uploaded))]
+
+    async def _collect_uploads(
+        self,
+        pending: Dict[asyncio.Future, int],
+        uploaded: Dict[int, UploadedImageParams],
+    ):
+        """Wait for some of pending uploads.
+
+        :param pending: pending upload tasks and paths indexes
+        :param uploaded: uploaded image params by paths indexes
+        :raises error: the first upload error
+        """
+        done, _ = await asyncio.wait(
+            pending,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        error: Optional[BaseException] = None
+        for task in done:
+            index = pending.pop(task)
+            # Exceptions of all done tasks are retrieved
+            exception = task.exception()
+            if exception is None:
+                uploaded[index] = task.result()
+            elif error is None:
+                error = exception
+        if error is not None:
+            raise error
+
+    async def _upload_image(
+        self,
+        *,
+        dicom_path: Path,
+        namespace_id: str,
+        engine_fqdn: str,
+        retries: int,
+    ) -> UploadedImageParams:
+        """Upload image with retries.
+
+        :param dicom_path: dicom path
+        :param namespace_id: uploading to namespace
+        :param engine_fqdn: engine fqdn
+        :param retries: number of retries
+        :raises ClientError: Connection error
+        :raises AmbraResponseException: Response error
+        :return: image params
+        """
+        attempt = 0
+        while True:
+            try:
+                return await self._api.Addon.Dicom.upload_from_path(
+                    dicom_path=dicom_path,
+                    namespace_id=namespace_id,
+                    engine_fqdn=engine_fqdn,
+                )
+            except (
+                aiohttp.ClientError,
+                asyncio.TimeoutError,
+                AmbraResponseException,
+            ) as exception:
+                if attempt >= retries or \
+                   not is_retryable_upload_error(exception):
+                    raise
+            attempt += 1
+            await asyncio.sleep(self.UPLOAD_RETRY_DELAY * attempt)
+
+    async def download_dir(  # NOQA:WPS211
+        self,
+        *,
+        study_dir: Path,
+        namespace_id: str,
+        study_uid: str,
+        engine_fqdn: Optional[str] = None,
+        phi_namespace: Optional[str] = None,
+        workers: Optional[int] = None,
+        retries: Optional[int] = None,
+    ) -> List[DownloadedImage]:
+        """Download study images to directory.
+
+        Images are listed by study schema and downloaded concurrently
+        to {study_dir}/{series_uid}/{image_uid}.dcm.
+        Failed downloads (connection or server errors) are retried.
+        Images downloaded before (same version and size) are skipped,
+        so an interrupted download can be resumed.
+
+        :param study_dir: study directory (created if not exists)
+        :param namespace_id: storage namespace
+        :param study_uid: study uid
+        :param engine_fqdn: fqdn (if None gets namespace fqdn)
+        :param phi_namespace: phi namespace
+        :param workers: number of concurrent downloads (DOWNLOAD_WORKERS)
+        :param retries: number of retries of one download (DOWNLOAD_RETRIES)
+
+        :return: downloaded images (in order of schema)
+        """
+        if engine_fqdn is None:
+            namespace = await self._api \
+                .Namespace \
+                .engine_fqdn(namespace_id=namespace_id) \
+                .get()
+            engine_fqdn = namespace.engine_fqdn
+        schema = await self._api.Storage.Study.schema(
+            engine_fqdn=engine_fqdn,
+            namespace=namespace_id,
+            study_uid=study_uid,
+            phi_namespace=phi_namespace,
+        )
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(
+            None,
+            partial(study_dir.mkdir, parents=True, exist_ok=True),
+        )
+        manifest = await loop.run_in_executor(None, DownloadManifest, study_dir)
+        images = schema_images(schema)
+        # Back pressure: number of tasks is limited by workers
+        workers = max(self.DOWNLOAD_WORKERS if workers is None else workers, 1)
+        retries = self.DOWNLOAD_RETRIES if retries is None else retries
+        downloaded: Dict[int, DownloadedImage] = {}
+        pending: Dict[asyncio.Future, int] = {}
+        try:
+            for index, image in enumerate(images):
+                while len(pending) >= workers:
+                    await self._collect_downloads(pending, downloaded)
+                task = asyncio.ensure_future(
+                    self._download_image(
+                        image=image,
+                        study_dir=study_dir,
+                        manifest=manifest,
+                        namespace_id=namespace_id,
+                        study_uid=study_uid,
+                        engine_fqdn=engine_fqdn,
+                        phi_namespace=phi_namespace,
+                        retries=retries,
+                    ),
+                )
+                pending[task] = index
+            while pending:
+                await self._collect_downloads(pending, downloaded)
+        finally:
+            for pending_task in pending:
+                pending_task.cancel()
+            # Temporary files of cancelled downloads are removed
+            # before the error is raised
+            await asyncio.gather(*pending, return_exceptions=True)
+        return [downloaded[index] for index in range(len(images))]
+
+    async def _collect_downloads(
+        self,
+        pending: Dict[asyncio.Future, int],
+        downloaded: Dict[int, DownloadedImage],
+    ):
+        """Wait for some of pending downloads.
+
+        :param pending: pending download tasks and images indexes
+        :param downloaded: downloaded images by indexes
+        :raises error: the first download error
+        """
+        done, _ = await asyncio.wait(
+            pending,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        error: Optional[BaseException] = None
+        for task in done:
+            index = pending.pop(task)
+            # Exceptions of all done tasks are retrieved
+            exception = task.exception()
+            if exception is None:
+                downloaded[index] = task.result()
+            elif error is None:
+                error = exception
+        if error is not None:
+            raise error
+
+    async def _download_image(  # NOQA:WPS211
+        self,
+        *,
+        image: StudyImage,
+        study_dir: Path,
+        manifest: DownloadManifest,
+        namespace_id: str,
+        study_uid: str,
+        engine_fqdn: str,
+        phi_namespace: Optional[str],
+        retries: int,
+    ) -> DownloadedImage:
+        """Download image with retries.
+
+        :param image: study image
+        :param study_dir: study directory
+        :param manifest: manifest of downloaded images
+        :param namespace_id: storage namespace
+        :param study_uid: study uid
+        :param engine_fqdn: engine fqdn
+        :param phi_namespace: phi namespace
+        :param retries: number of retries
+        :raises ClientError: Connection error
+        :raises AmbraResponseException: Response error
+        :return: downloaded image
+        """
+        path = image_path(study_dir, image)
+        loop = asyncio.get_event_loop()
+        is_downloaded = await loop.run_in_executor(
+            None,
+            manifest.is_downloaded,
+            path,
+            image.image_version,
+        )
+        if is_downloaded:
+            return DownloadedImage(*image, path=path, skipped=True)
+        attempt = 0
+        while True:
+            try:
+                response = await self._api.Storage.Image.dicom_payload(
+                    engine_fqdn=engine_fqdn,
+                    namespace=namespace_id,
+                    study_uid=study_uid,
+                    image_uid=image.image_uid,
+                    image_version=image.image_version,
+                    phi_namespace=phi_namespace,
+                )
+                try:
+                    size = await async_write_file(
+                        path,
+                        response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE),
+                    )
+                finally:
+                    response.close()
+            except (
+                aiohttp.ClientError,
+                asyncio.TimeoutError,
+                AmbraResponseException,
+            ) as exception:
+                if attempt >= retries or \
+                   not is_retryable_upload_error(exception):
+                    raise
+            else:
+                await loop.run_in_executor(
+                    None,
+                    manifest.record,
+                    path,
+                    image.image_version,
+                    size,
+                )
+                return DownloadedImage(*image, path=path, skipped=False)
+            attempt += 1
+            await asyncio.sleep(self.DOWNLOAD_RETRY_DELAY * attempt)
+
+    async def iter_download(  # NOQA:WPS211
+        self,
+        *,
+        namespace_id: str,
+        study_uid: str,
+        engine_fqdn: Optional[str] = None,
+        phi_namespace: Optional[str] = None,
+        series_uid: Optional[str] = None,
+        image_uid: Optional[str] = None,
+    ) -> AsyncIterator[ZipEntry]:
+        """Download study zip and extract it on the fly.
+
+        Zip (dicom bundle of Storage.Study.download) is not saved:
+        entries are parsed from the response stream and yielded
+        as soon as they are downloaded.
+        Close the iterator (aclose) if it is not exhausted.
+
+        :param namespace_id: storage namespace
+        :param study_uid: study uid
+        :param engine_fqdn: fqdn (if None gets namespace fqdn)
+        :param phi_namespace: phi namespace
+        :param series_uid: series uids (comma separated)
+        :param image_uid: image uids (comma separated)
+
+        :yields: zip entries (path, file)
+        """
+        if engine_fqdn is None:
+            namespace = await self._api \
+                .Namespace \
+                .engine_fqdn(namespace_id=namespace_id) \
+                .get()
+            engine_fqdn = namespace.engine_fqdn
+        response = await self._api.Storage.Study.download(
+            engine_fqdn=engine_fqdn,
+            namespace=namespace_id,
+            study_uid=study_uid,
+            bundle='dicom',
+            phi_namespace=phi_namespace,
+            series_uid=series_uid,
+            image_uid=image_uid,
+        )
+        try:
+            entries = async_iter_zip(
+                response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE),
+            )
+            async for entry in entries:
+                yield entry
+        finally:
+            response.close()
+
+    async def iter_download_dicom(  # NOQA:WPS211
+        self,
+        *,
+        namespace_id: str,
+        study_uid: str,
+        engine_fqdn: Optional[str] = None,
+        phi_namespace: Optional[str] = None,
+        series_uid: Optional[str] = None,
+        image_uid: Optional[str] = None,
+        stop_before_pixels: bool = False,
+    ) -> AsyncIterator[ZipDicom]:
+        """Download study zip and read dicoms on the fly.
+
+        Dicoms are parsed in the default executor.
+        Not dicom files of zip are skipped.
+
+        :param namespace_id: storage namespace
+        :param study_uid: study uid
+        :param engine_fqdn: fqdn (if None gets namespace fqdn)
+        :param phi_namespace: phi namespace
+        :param series_uid: series uids (comma separated)
+        :param image_uid: image uids (comma separated)
+        :param stop_before_pixels: do not read pixel data
+
+        :yields: dicoms (path, dataset)
+        """
+        loop = asyncio.get_event_loop()
+        entries = self.iter_download(
+            namespace_id=namespace_id,
+            study_uid=study_uid,
+            engine_fqdn=engine_fqdn,
+            phi_namespace=phi_namespace,
+            series_uid=series_uid,
+            image_uid=image_uid,
+        )
+        try:
+            async for entry in entries:
+                dicom = await loop.run_in_executor(
+                    None,
+                    partial(
+                        read_zip_dicom,
+                        entry,
+                        stop_before_pixels=stop_before_pixels,
+                    ),
+                )
+                if dicom is not None:
+                    yield dicom
+        finally:
+            await entries.aclose()
+
     async def wait(
         self,
         *,
@@ -117,44 +556,60 @@ class Study:  # NOQA:WPS214
         namespace_id: str,
         timeout: float,
         ws_timeout: int,
+        backoff: Optional[PollBackoff] = None,
     ) -> Box:
         """Wait study in namespace.
 
+        Study is polled with exponential backoff (interval starts
+        from ws_timeout by default), a READY event of the study
+        (events of study channel are filtered by study_uid and uuid)
+        triggers an immediate poll.
+
         :param study_uid: study_uid
         :param namespace_id: namespace
         :param timeout: time for waiting new study
         :param ws_timeout: time for waiting in socket
+        :param backoff: polling backoff (None - default backoff)
         :raises TimeoutError: if study not ready by timeout
         :return: Study box object
         """
-        ws_url = self._api.ws_url
-        ws_manager = AsyncWSManager(ws_url)
         study = None
-        start = monotonic()
+        schedule = PollSchedule(backoff, ws_timeout, timeout)
+        study_events = StudyEventFilter(study_uid)
 
         channel_name = 'study.{namespace_id}'.format(namespace_id=namespace_id)
         sid = await self._api.get_sid()
 
-        async with ws_manager.channel(sid, channel_name) as ws:
-            while True:
-                if monotonic() - start >= timeout:
-                    break
-                with suppress(NotFound):
-                    study = await self._api.Study.get(
-                        study_uid=study_uid,
-                        storage_namespace=namespace_id,
-                    ).get()
-
-                if study and study.phantom == 0:
-                    break
-
-                with suppress(TimeoutError):
-                    await ws.wait_for_event(
-                        channel_name,
-                        sid,
-                        'READY',
-                        timeout=ws_timeout,
-                    )
+        try:  # NOQA:WPS501
+            ws_hub = self._api.ws_hub
+            async with ws_hub.events(
+                sid,
+                channel_name,
+                ['READY'],
+                study_events,
+            ) as events:
+                while not schedule.expired():
+                    with suppress(NotFound):
+                        study = await self._api.Study.get(
+                            study_uid=study_uid,
+                            storage_namespace=namespace_id,
+                        ).get()
+                    schedule.polled()
+                    if study:
+                        study_events.uuid = study.get('uuid')
+
+                    if study and study.phantom == 0:
+                        break
+
+                    with suppress(TimeoutError):
+                        await events.get(timeout=schedule.delay())
+                        schedule.reset()
+        finally:
+            self._api.wait_tracker.finished(
+                'study',
+                schedule,
+                timed_out=not study and schedule.expired(),
+            )
         if not study:
             raise TimeoutError
         return study
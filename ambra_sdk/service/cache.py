@@ -0,0 +1,377 @@
+"""Cache of service responses.
+
+Only json responses of successful requests are cached.
+Cache key is built from method url and request data (without sid),
+so responses are not shared between api urls, but are shared between
+users of one api url: do not share a cache between users
+with different permissions.
+"""
+
+import hashlib
+import json
+import sqlite3
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic, time
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+DEFAULT_CACHE_TTL = 60
+DEFAULT_MEMORY_CACHE_SIZE = 1024
+DEFAULT_SQLITE_CACHE_SIZE = 10000
+
+
+class CacheBackend(ABC):
+    """Base cache backend.
+
+    Values are json strings.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Get not expired value.
+
+        :param key: key
+        """
+
+    @abstractmethod
+    def set(self, key: str, url: str, cached_value: str, ttl: float):  # NOQA:WPS125
+        """Set value.
+
+        :param key: key
+        :param url: method url of value
+        :param cached_value: value
+        :param ttl: time to live in seconds
+        """
+
+    @abstractmethod
+    def invalidate(self, url: Optional[str] = None):
+        """Remove values.
+
+        :param url: method url of values (None - all values)
+        """
+
+
+class MemoryCache(CacheBackend):
+    """In-memory LRU cache."""
+
+    def __init__(self, max_size: int = DEFAULT_MEMORY_CACHE_SIZE):
+        """Init.
+
+        :param max_size: max number of values
+        """
+        self.max_size = max_size
+        self._lock = Lock()
+        self._values: 'OrderedDict[str, Tuple[str, str, float]]' = \
+            OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        """Get not expired value.
+
+        :param key: key
+        :return: value or None
+        """
+        with self._lock:
+            cached = self._values.get(key)
+            if cached is None:
+                return None
+            _, cached_value, expires = cached
+            if expires <= monotonic():
+                self._values.pop(key)
+                return None
+            self._values.move_to_end(key)
+            return cached_value
+
+    def set(self, key: str, url: str, cached_value: str, ttl: float):  # NOQA:WPS125
+        """Set value.
+
+        :param key: key
+        :param url: method url of value
+        :param cached_value: value
+        :param ttl: time to live in seconds
+        """
+        with self._lock:
+            self._values[key] = (url, cached_value, monotonic() + ttl)
+            self._values.move_to_end(key)
+            while len(self._values) > self.max_size:
+                self._values.popitem(last=False)
+
+    def invalidate(self, url: Optional[str] = None):
+        """Remove values.
+
+        :param url: method url of values (None - all values)
+        """
+        with self._lock:
+            if url is None:
+                self._values.clear()
+                return
+            for key in [
+                key for key, cached in self._values.items()
+                if cached[0] == url
+            ]:
+                self._values.pop(key)
+
+    def __len__(self) -> int:
+        """Number of values.
+
+        :return: number of values
+        """
+        return len(self._values)
+
+
+class SQLiteCache(CacheBackend):
+    """Local disk LRU cache (SQLite).
+
+    Values are kept between processes.
+    """
+
+    def __init__(self, path: str, max_size: int = DEFAULT_SQLITE_CACHE_SIZE):
+        """Init.
+
+        :param path: database path
+        :param max_size: max number of values
+        """
+        self.path = path
+        self.max_size = max_size
+        self._lock = Lock()
+        self._connection = sqlite3.connect(
+            path,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'key TEXT PRIMARY KEY, url TEXT, value TEXT, '
+            'expires REAL, used REAL)',
+        )
+        self._connection.execute(
+            'CREATE INDEX IF NOT EXISTS cache_used ON cache (used)',
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        """Get not expired value.
+
+        :param key: key
+        :return: value or None
+        """
+        now = time()
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT value, expires FROM cache WHERE key = ?',
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            cached_value, expires = row
+            if expires <= now:
+                self._connection.execute(
+                    'DELETE FROM cache WHERE key = ?',
+                    (key,),
+                )
+                return None
+            self._connection.execute(
+                'UPDATE cache SET used = ? WHERE key = ?',
+                (now, key),
+            )
+        return cached_value  # NOQA:WPS331
+
+    def set(self, key: str, url: str, cached_value: str, ttl: float):  # NOQA:WPS125
+        """Set value.
+
+        :param key: key
+        :param url: method url of value
+        :param cached_value: value
+        :param ttl: time to live in seconds
+        """
+        now = time()
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO cache '
+                '(key, url, value, expires, used) VALUES (?, ?, ?, ?, ?)',
+                (key, url, cached_value, now + ttl, now),
+            )
+            size = self._connection.execute(
+                'SELECT COUNT(*) FROM cache',
+            ).fetchone()[0]
+            if size > self.max_size:
+                self._connection.execute(
+                    'DELETE FROM cache WHERE key IN '
+                    '(SELECT key FROM cache ORDER BY used LIMIT ?)',
+                    (size - self.max_size,),
+                )
+
+    def invalidate(self, url: Optional[str] = None):
+        """Remove values.
+
+        :param url: method url of values (None - all values)
+        """
+        with self._lock:
+            if url is None:
+                self._connection.execute('DELETE FROM cache')
+            else:
+                self._connection.execute(
+                    'DELETE FROM cache WHERE url = ?',
+                    (url,),
+                )
+
+    def close(self):
+        """Close database."""
+        with self._lock:
+            self._connection.close()
+
+
+class CacheStats(NamedTuple):
+    """Cache usage.
+
+    hits: number of responses from cache
+    misses: number of requests of cacheable responses
+    """
+
+    hits: int
+    misses: int
+
+
+class ResponseCache:
+    """Cache of service responses.
+
+    Responses are cached if the query is marked by `.cached()`
+    or the method url has ttl in `ttls`.
+
+    :Example:
+
+    >>> api.cache = ResponseCache(
+    >>>     SQLiteCache('responses.sqlite'),
+    >>>     ttls={'/namespace/engine_fqdn': 3600},
+    >>> )
+    >>> api.Namespace.engine_fqdn(namespace_id=namespace_id).get()
+    >>> api.Account.get(uuid=account_id).cached(ttl=60).get()
+    >>> api.cache.invalidate('/account/get')
+    """
+
+    def __init__(
+        self,
+        backend: Optional[CacheBackend] = None,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = DEFAULT_CACHE_TTL,
+    ):
+        """Init.
+
+        :param backend: cache backend (MemoryCache by default)
+        :param ttls: ttl in seconds for method urls (cached without .cached())
+        :param default_ttl: ttl of .cached() queries without ttl
+        """
+        self.backend = backend or MemoryCache()
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self._stats_lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def ttl(
+        self,
+        url: str,
+        cached: bool = False,
+        ttl: Optional[float] = None,
+    ) -> Optional[float]:
+        """Get ttl of query.
+
+        :param url: method url
+        :param cached: query is marked by .cached()
+        :param ttl: ttl of .cached() query
+        :return: ttl in seconds or None (not cached)
+        """
+        if cached and ttl is not None:
+            query_ttl: Optional[float] = ttl
+        elif cached:
+            query_ttl = self.ttls.get(url, self.default_ttl)
+        else:
+            query_ttl = self.ttls.get(url)
+        if query_ttl is None or query_ttl <= 0:
+            return None
+        return query_ttl
+
+    def key(self, full_url: str, request_data: Optional[Dict[str, Any]]) -> str:
+        """Get cache key.
+
+        :param full_url: full method url
+        :param request_data: request data (sid is ignored)
+        :return: key
+        """
+        normalized_data = {
+            data_key: data_value
+            for data_key, data_value in (request_data or {}).items()
+            if data_key != 'sid' and data_value is not None
+        }
+        dumped = json.dumps(normalized_data, sort_keys=True, default=str)
+        digest = hashlib.sha256(dumped.encode('utf-8')).hexdigest()
+        return '{full_url}:{digest}'.format(full_url=full_url, digest=digest)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get cached json.
+
+        :param key: key
+        :return: decoded json or None
+        """
+        cached_value = self.backend.get(key)
+        with self._stats_lock:
+            if cached_value is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+        return json.loads(cached_value)
+
+    def set(self, key: str, url: str, response_json: Any, ttl: float):  # NOQA:WPS125
+        """Cache json.
+
+        :param key: key
+        :param url: method url
+        :param response_json: decoded json
+        :param ttl: ttl in seconds
+        """
+        self.backend.set(key, url, json.dumps(response_json), ttl)
+
+    def lookup(
+        self,
+        full_url: str,
+        request_data: Optional[Dict[str, Any]],
+    ) -> Optional[Any]:
+        """Get cached response json of request.
+
+        :param full_url: full method url
+        :param request_data: request data
+        :return: decoded json or None
+        """
+        return self.get(self.key(full_url, request_data))
+
+    def store(  # NOQA:WPS211
+        self,
+        url: str,
+        full_url: str,
+        request_data: Optional[Dict[str, Any]],
+        response_json: Any,
+        ttl: float,
+    ):
+        """Cache response json of request.
+
+        :param url: method url
+        :param full_url: full method url
+        :param request_data: request data
+        :param response_json: decoded json
+        :param ttl: ttl in seconds
+        """
+        self.set(self.key(full_url, request_data), url, response_json, ttl)
+
+    def invalidate(self, url: Optional[str] = None):
+        """Remove cached responses.
+
+        :param url: method url (None - all responses)
+        """
+        self.backend.invalidate(url)
+
+    def stats(self) -> CacheStats:
+        """Get cache usage.
+
+        :return: cache stats
+        """
+        with self._stats_lock:
+            return CacheStats(hits=self._hits, misses=self._misses)
@@ -44,6 +44,9 @@ class AsyncQuery(BaseQuery):
 
         :return: json box or response
         """
+        response_json = self._cache_lookup(self.request_args.data)
+        if response_json is not None:
+            return self.return_constructor(response_json)
         return await self._api.retry_with_new_sid(self.get_once)
 
     async def get_once(self) -> RETURN_TYPE:
@@ -61,6 +64,7 @@ class AsyncQuery(BaseQuery):
             response_json = await response.json()
             if 'status' in response_json:
                 response_json.pop('status')
+            self._cache_store(self.request_args.data, response_json)
             return self.return_constructor(response_json)
         return response
 
@@ -97,6 +101,7 @@ class AsyncQueryP(BaseQueryP):
             pagination_field=self._paginated_field,
             rows_in_page=self._rows_in_page,
             return_constructor=self.return_constructor,
+            cache_ttl=self._cache_query_ttl(),
         )
 
     async def first(self) -> Optional[JSON_RETURN_TYPE]:
@@ -118,6 +123,9 @@ class AsyncQueryP(BaseQueryP):
 
         :return: json box or response
         """
+        response_json = self._cache_lookup(self.request_args.data)
+        if response_json is not None:
+            return self.return_constructor(response_json)
         return await self._api.retry_with_new_sid(self.get_once)
 
     async def get_once(self) -> RETURN_TYPE:
@@ -139,6 +147,7 @@ class AsyncQueryP(BaseQueryP):
             response_json = await response.json()
             if 'status' in response_json:
                 response_json.pop('status')
+            self._cache_store(self.request_args.data, response_json)
             return self.return_constructor(response_json)
         return response
 
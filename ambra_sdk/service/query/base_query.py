@@ -1,9 +1,16 @@
 """Base query objects."""
-from typing import Any, Callable, Dict, Generic
+from typing import Any, Callable, Dict, Generic, Iterable, Optional, Type
 
 from box import Box
 
+from ambra_sdk.models.base import BaseModel
 from ambra_sdk.service.response import ERROR_MAPPING, JSON_RETURN_TYPE
+from ambra_sdk.service.rows import (
+    RowField,
+    TupleConstructor,
+    as_dict,
+    record_class,
+)
 
 DEFAULT_ROWS_IN_PAGINATION_PAGE = 100
 
@@ -35,6 +42,8 @@ class BaseQuery(Generic[JSON_RETURN_TYPE]):
         self._required_sid = required_sid
         self._errors_mapping = errors_mapping
         self.return_constructor = return_constructor
+        self._cache_enabled = False
+        self._cache_ttl: Optional[float] = None
 
     @property
     def full_url(self) -> str:
@@ -45,6 +54,63 @@ class BaseQuery(Generic[JSON_RETURN_TYPE]):
         full_url: str = self._api.service_full_url(self.url)
         return full_url  # NOQA:331
 
+    def cached(self, ttl: Optional[float] = None):
+        """Cache json response in api.cache.
+
+        :Example:
+
+        >>> api.Account.get(uuid=account_id).cached(ttl=60).get()
+
+        :param ttl: time to live in seconds
+            (None - ttl of method url or default ttl, 0 - do not cache)
+        :return: self object
+        """
+        self._cache_enabled = True
+        self._cache_ttl = ttl
+        return self
+
+    def _cache_query_ttl(self) -> Optional[float]:
+        """Get cache ttl of query.
+
+        :return: ttl in seconds or None (not cached)
+        """
+        query_ttl: Optional[float] = self._api.cache.ttl(
+            self.url,
+            self._cache_enabled,
+            self._cache_ttl,
+        )
+        return query_ttl  # NOQA:WPS331
+
+    def _cache_lookup(self, request_data: Optional[Dict[str, Any]]) -> Any:
+        """Get cached response json.
+
+        :param request_data: request data
+        :return: decoded json or None
+        """
+        if self._cache_query_ttl() is None:
+            return None
+        return self._api.cache.lookup(self.full_url, request_data)
+
+    def _cache_store(
+        self,
+        request_data: Optional[Dict[str, Any]],
+        response_json: Any,
+    ):
+        """Cache response json.
+
+        :param request_data: request data
+        :param response_json: decoded json
+        """
+        query_ttl = self._cache_query_ttl()
+        if query_ttl is not None:
+            self._api.cache.store(
+                self.url,
+                self.full_url,
+                request_data,
+                response_json,
+                query_ttl,
+            )
+
 
 class BaseQueryP(BaseQuery):
     """Base query with pagination."""
@@ -99,6 +165,45 @@ class BaseQueryP(BaseQuery):
         self._rows_in_page = rows_in_page
         return self
 
+    def as_dicts(self):
+        """Return rows as decoded json dicts (without Box conversion).
+
+        :return: self object
+        """
+        self.return_constructor = as_dict
+        return self
+
+    def as_tuples(self, fields: Iterable[RowField]):
+        """Return rows as tuples of fields values.
+
+        :Example:
+
+        >>> api.Study.list().as_tuples(['uuid', Study.study_uid]).all()
+
+        :param fields: field names or model fields
+        :return: self object
+        """
+        self.return_constructor = TupleConstructor(fields)
+        return self
+
+    def as_records(
+        self,
+        model: Type[BaseModel],
+        fields: Optional[Iterable[RowField]] = None,
+    ):
+        """Return rows as records with __slots__ of model fields.
+
+        :Example:
+
+        >>> api.Study.list().as_records(Study).all()
+
+        :param model: model
+        :param fields: record fields (all model fields by default)
+        :return: self object
+        """
+        self.return_constructor = record_class(model, fields)
+        return self
+
 
 def get_query_cls_name(
     with_pagination: bool,
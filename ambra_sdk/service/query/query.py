@@ -44,6 +44,9 @@ class Query(BaseQuery):
 
         :return: json box or response
         """
+        response_json = self._cache_lookup(self.request_args.data)
+        if response_json is not None:
+            return self.return_constructor(response_json)
         get_result = self._api.retry_with_new_sid(self.get_once)
         return get_result  # NOQA:331
 
@@ -62,6 +65,7 @@ class Query(BaseQuery):
             response_json = response.json()
             if 'status' in response_json:
                 response_json.pop('status')
+            self._cache_store(self.request_args.data, response_json)
             return self.return_constructor(response_json)
         return response
 
@@ -98,6 +102,7 @@ class QueryP(BaseQueryP):
             pagination_field=self._paginated_field,
             rows_in_page=self._rows_in_page,
             return_constructor=self.return_constructor,
+            cache_ttl=self._cache_query_ttl(),
         )
 
     def first(self) -> Optional[JSON_RETURN_TYPE]:
@@ -119,6 +124,9 @@ class QueryP(BaseQueryP):
 
         :return: json box or response
         """
+        response_json = self._cache_lookup(self.request_args.data)
+        if response_json is not None:
+            return self.return_constructor(response_json)
         get_result = self._api.retry_with_new_sid(self.get_once)
         return get_result  # NOQA:331
 
@@ -141,6 +149,7 @@ class QueryP(BaseQueryP):
             response_json = response.json()
             if 'status' in response_json:
                 response_json.pop('status')
+            self._cache_store(self.request_args.data, response_json)
             return self.return_constructor(response_json)
         return response
 
@@ -1,6 +1,9 @@
 """Async response objects."""
 
-from typing import Optional, Union
+import asyncio
+from collections import deque
+from copy import copy
+from typing import Any, Deque, Dict, Iterable, Optional, Union
 
 import aiohttp
 
@@ -13,6 +16,12 @@ from ambra_sdk.service.response.base_response import (
     check_401_405,
     check_412,
 )
+from ambra_sdk.service.response.columns import (
+    DEFAULT_BATCH_ROWS,
+    AsyncColumnsExport,
+)
+from ambra_sdk.service.response.stream import PageDecoder
+from ambra_sdk.service.rows import RowField, as_dict
 
 ASYNC_RETURN_TYPE = Union[JSON_RETURN_TYPE, aiohttp.ClientResponse]
 
@@ -39,8 +48,31 @@ class AsyncIterableResponse(BaseIterableResponse):
 
         :return: async data generator
         """
+        if self._prefetch_pages:
+            return self._prefetch_data_generator()
+        if self._stream_chunk_size and self._cache_ttl is None:
+            return self._stream_data_generator()
         return self._data_generator()
 
+    def to_columns(
+        self,
+        fields: Iterable[RowField],
+        batch_rows: int = DEFAULT_BATCH_ROWS,
+    ) -> AsyncColumnsExport:
+        """Export rows to columns.
+
+        Rows are not converted to return type,
+        they are accumulated into column buffers by batches.
+        Return type of the response is not changed.
+
+        :param fields: field names or model fields
+        :param batch_rows: number of rows in one batch
+        :return: columns export
+        """
+        rows = copy(self)
+        rows._return_constructor = as_dict  # NOQA:WPS437
+        return AsyncColumnsExport(rows, fields, batch_rows)
+
     async def first(self) -> Optional[JSON_RETURN_TYPE]:
         """First element.
 
@@ -67,8 +99,13 @@ class AsyncIterableResponse(BaseIterableResponse):
             self._request_args.data = self._prepare_data(  # NOQA:WPS110
                 self._request_args.data,
             )
-            response = await self._api.retry_with_new_sid(self._get_response)
-            json = await response.json()
+            json = self._cache_lookup(self._request_args.data)
+            if json is None:
+                response = await self._api.retry_with_new_sid(
+                    self._get_response,
+                )
+                json = await response.json()
+                self._cache_store(self._request_args.data, json)
             more = json['page']['more']
             # maximum rows in page
             max_rows_in_page = json['page']['rows']
@@ -89,6 +126,183 @@ class AsyncIterableResponse(BaseIterableResponse):
             if more == 0:
                 break
 
+    async def _prefetch_data_generator(self):  # NOQA: WPS231
+        """Return iterator by rows with concurrently requested pages.
+
+        The first page is requested alone. If it has more rows,
+        next pages are requested concurrently (page numbers are
+        known in advance), but not more than `pages` at once.
+
+        :yields: response object
+
+        :raises RuntimeError: Max rows in page diffs from request
+        """
+        first_page, last_page = self._pages_range()
+        if self._max_row is not None and self._max_row <= self._min_row:
+            return
+        self._current_row = first_page * self._rows_in_page
+        semaphore = asyncio.Semaphore(self._prefetch_pages)
+        pages: Deque[asyncio.Future] = deque()
+        next_page = self._schedule_pages(
+            pages,
+            first_page,
+            last_page,
+            window=1,
+            semaphore=semaphore,
+        )
+        try:
+            while pages:
+                json = await pages.popleft()
+                more = json['page']['more']
+                # maximum rows in page
+                max_rows_in_page = json['page']['rows']
+                if max_rows_in_page != self._rows_in_page:
+                    raise RuntimeError(
+                        'The max_rows_in_page parameter was ignored by the server',
+                    )
+                if more != 0:
+                    next_page = self._schedule_pages(
+                        pages,
+                        next_page,
+                        last_page,
+                        window=self._prefetch_pages,
+                        semaphore=semaphore,
+                    )
+                for row in json[self._pagination_field]:
+                    if self._current_row < self._min_row:
+                        self._current_row += 1
+                        continue
+                    if self._max_row is not None and \
+                       self._current_row >= self._max_row:
+                        return
+                    self._current_row += 1
+                    yield self._return_constructor(row)
+                if more == 0:
+                    break
+        finally:
+            for page in pages:
+                page.cancel()
+            # Cancelled requests are finished (connections are released)
+            await asyncio.gather(*pages, return_exceptions=True)
+
+    async def _stream_data_generator(self):  # NOQA: WPS231
+        """Return iterator by rows decoded from response stream.
+
+        :yields: response object
+
+        :raises RuntimeError: Max rows in page diffs from request
+        """
+        first_page, _ = self._pages_range()
+        if self._max_row is not None and self._max_row <= self._min_row:
+            return
+        self._current_row = first_page * self._rows_in_page
+        page_number = first_page
+        while True:
+            response = await self._get_page_response(page_number)
+            decoder = PageDecoder(self._pagination_field)
+            chunks = response.content.iter_chunked(self._stream_chunk_size)
+            try:
+                async for chunk in chunks:
+                    for row in decoder.feed(chunk):
+                        if self._current_row < self._min_row:
+                            self._current_row += 1
+                            continue
+                        if self._max_row is not None and \
+                           self._current_row >= self._max_row:
+                            return
+                        self._current_row += 1
+                        yield self._return_constructor(row)
+                decoder.close()
+            finally:
+                response.release()
+            more = decoder.fields['page']['more']
+            # maximum rows in page
+            max_rows_in_page = decoder.fields['page']['rows']
+            if max_rows_in_page != self._rows_in_page:
+                raise RuntimeError(
+                    'The max_rows_in_page parameter was ignored by the server',
+                )
+            if more == 0:
+                break
+            page_number += 1
+
+    def _schedule_pages(  # NOQA: WPS211
+        self,
+        pages: Deque[asyncio.Future],
+        next_page: int,
+        last_page: Optional[int],
+        window: int,
+        semaphore: asyncio.Semaphore,
+    ) -> int:
+        """Schedule page requests.
+
+        :param pages: queue of scheduled pages
+        :param next_page: next page number
+        :param last_page: last page number (None if unknown)
+        :param window: max number of scheduled pages
+        :param semaphore: semaphore for concurrent requests
+        :return: next not scheduled page number
+        """
+        while len(pages) < window and (
+            last_page is None or next_page <= last_page
+        ):
+            pages.append(
+                asyncio.ensure_future(
+                    self._get_page_json(next_page, semaphore),
+                ),
+            )
+            next_page += 1
+        return next_page
+
+    async def _get_page_json(
+        self,
+        page_number: int,
+        semaphore: asyncio.Semaphore,
+    ) -> Dict[str, Any]:
+        """Get json of page.
+
+        :param page_number: page number (starts from 0)
+        :param semaphore: semaphore for concurrent requests
+        :return: page json
+        """
+        request_data = self._page_request_data(
+            self._request_args.data,
+            page_number,
+        )
+        page_json: Optional[Dict[str, Any]] = self._cache_lookup(request_data)
+        if page_json is None:
+            async with semaphore:
+                response = await self._get_page_response(page_number)
+                page_json = await response.json()
+            self._cache_store(request_data, page_json)
+        return page_json  # NOQA:WPS331
+
+    async def _get_page_response(
+        self,
+        page_number: int,
+    ) -> aiohttp.ClientResponse:
+        """Get response of page.
+
+        :param page_number: page number (starts from 0)
+        :return: page response
+        """
+        request_args = AioHTTPRequestArgs(**self._request_args.to_dict())
+        request_args.data = self._page_request_data(  # NOQA:WPS110
+            self._request_args.data,
+            page_number,
+        )
+
+        async def _get_response():  # NOQA:WPS430
+            response = await self._api.service_request(
+                required_sid=self._required_sid,
+                request_args=request_args,
+            )
+            return await async_check_response(response, self._errors_mapping)
+
+        page_response: aiohttp.ClientResponse = \
+            await self._api.retry_with_new_sid(_get_response)
+        return page_response  # NOQA:WPS331
+
     async def _get_response(self):
         response = await self._api.service_request(
             required_sid=self._required_sid,
@@ -19,6 +19,7 @@ from ambra_sdk.exceptions.service import (
     MethodNotAllowed,
     PreconditionFailed,
 )
+from ambra_sdk.service.response.stream import DEFAULT_STREAM_CHUNK_SIZE
 
 JSON_RETURN_TYPE = TypeVar('JSON_RETURN_TYPE')
 ERROR_MAPPING = Mapping[
@@ -40,6 +41,7 @@ class BaseIterableResponse(Generic[JSON_RETURN_TYPE]):
         pagination_field: str,
         rows_in_page: int,
         return_constructor: Callable[..., JSON_RETURN_TYPE] = Box,
+        cache_ttl: Optional[float] = None,
     ):
         """Respone initialization.
 
@@ -50,6 +52,7 @@ class BaseIterableResponse(Generic[JSON_RETURN_TYPE]):
         :param pagination_field: field for pagination
         :param rows_in_page: number of rows in page
         :param return_constructor: constructor for return type
+        :param cache_ttl: ttl of cached pages (None - not cached)
         """
         self._api = api
         self._url = url
@@ -58,10 +61,13 @@ class BaseIterableResponse(Generic[JSON_RETURN_TYPE]):
         self._pagination_field = pagination_field
         self._rows_in_page = rows_in_page
         self._return_constructor = return_constructor
+        self._cache_ttl = cache_ttl
 
         self._min_row: int = 0
         self._max_row: Optional[int] = None
         self._current_row: Optional[int] = None
+        self._prefetch_pages: int = 0
+        self._stream_chunk_size: Optional[int] = None
 
     def __getitem__(self, key: slice):
         """Set range.
@@ -102,6 +108,101 @@ class BaseIterableResponse(Generic[JSON_RETURN_TYPE]):
         self._max_row = max_row
         return self
 
+    def prefetch(self, pages: int):
+        """Prefetch next pages concurrently.
+
+        While rows of the current page are consumed, next `pages`
+        pages are requested concurrently. Rows order is preserved.
+
+        :param pages: number of pages requested in advance
+            (0 - disable prefetching)
+        :return: self object
+        :raises ValueError: Negative number of pages
+        """
+        if pages < 0:
+            raise ValueError('Negative number of prefetched pages')
+        self._prefetch_pages = pages
+        return self
+
+    def stream(self, chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE):
+        """Decode pages incrementally from the response stream.
+
+        Rows are decoded one by one while the page is downloaded,
+        so the whole page is never kept in memory.
+        Prefetched pages are decoded entirely, so streaming
+        is not used together with prefetch.
+
+        :param chunk_size: size of read chunks in bytes
+        :return: self object
+        :raises ValueError: Not positive chunk size
+        """
+        if chunk_size <= 0:
+            raise ValueError('Chunk size should be positive')
+        self._stream_chunk_size = chunk_size
+        return self
+
+    def _cache_lookup(self, request_data: Optional[Dict[str, Any]]) -> Any:
+        """Get cached page json.
+
+        :param request_data: page request data
+        :return: decoded json or None
+        """
+        if self._cache_ttl is None:
+            return None
+        return self._api.cache.lookup(
+            self._api.service_full_url(self._url),
+            request_data,
+        )
+
+    def _cache_store(
+        self,
+        request_data: Optional[Dict[str, Any]],
+        page_json: Dict[str, Any],
+    ):
+        """Cache page json.
+
+        :param request_data: page request data
+        :param page_json: decoded json
+        """
+        if self._cache_ttl is not None:
+            self._api.cache.store(
+                self._url,
+                self._api.service_full_url(self._url),
+                request_data,
+                page_json,
+                self._cache_ttl,
+            )
+
+    def _pages_range(self) -> Tuple[int, Optional[int]]:
+        """Range of pages for requested rows.
+
+        Page numbers starts from 0.
+
+        :return: first page number and last page number (None if unknown)
+        """
+        first_page = self._min_row // self._rows_in_page
+        if self._max_row is None:
+            return first_page, None
+        last_page = max(self._max_row - 1, 0) // self._rows_in_page
+        return first_page, last_page
+
+    def _page_request_data(
+        self,
+        request_data: Optional[Dict[str, Any]],
+        page_number: int,
+    ) -> Dict[str, Any]:
+        """Copy of request data for page.
+
+        :param request_data: request data
+        :param page_number: page number (starts from 0)
+        :return: page request data
+        """
+        page_request_data = dict(request_data or {})
+        page_request_data['page.rows'] = self._rows_in_page
+        # But for request page number starts from 1
+        page_request_data['page.number'] = page_number + 1
+        return page_request_data
+
     def _prepare_data(
         self,
         request_data: Optional[Dict[str, Any]] = None,
@@ -0,0 +1,536 @@
+"""Columnar export of paginated responses.
+
+Rows are accumulated into typed column buffers
+(arrays for numbers and booleans) and written by batches,
+so the memory usage does not depend on the number of rows.
+
+CSV export uses only the standard library.
+Arrow and Parquet export requires pyarrow.
+"""
+
+import csv
+import json
+import re
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Union,
+)
+
+from ambra_sdk.models.base import BaseField, FieldDescriptor
+from ambra_sdk.models.fields import Boolean, Date, DateTime, Float, Integer
+from ambra_sdk.service.rows import RowField, field_name
+
+try:
+    import pyarrow  # NOQA:WPS433
+    import pyarrow.compute  # NOQA:WPS433,WPS301
+    import pyarrow.parquet  # NOQA:WPS433,WPS301
+except ImportError:
+    pyarrow = None  # NOQA:WPS440
+
+if TYPE_CHECKING:
+    from ambra_sdk.service.response.async_response import (  # NOQA:WPS433
+        AsyncIterableResponse,
+    )
+    from ambra_sdk.service.response.response import (  # NOQA:WPS433
+        IterableResponse,
+    )
+
+DEFAULT_BATCH_ROWS = 10000
+
+ARRAY_TYPECODES = {
+    Integer: 'q',
+    Float: 'd',
+    Boolean: 'B',
+}
+
+TRUE_STRINGS = frozenset(('1', 'true', 't', 'yes'))
+
+DATETIME_RE = re.compile(
+    r'^(?P<date>\d{4}-\d{2}-\d{2})'
+    r'(?:[T ](?P<hour>\d{2}):(?P<minute>\d{2})'
+    r'(?::(?P<second>\d{2})(?:\.(?P<fraction>\d+))?)?)?'
+    r'\s*(?P<zone>Z|[+-]\d{2}(?::?\d{2})?)?$',
+)
+
+
+def _to_utc(value: Any) -> Optional[datetime]:  # NOQA:WPS110
+    """Convert date time value to naive UTC date time.
+
+    Naive values are treated as UTC.
+
+    :param value: date time or string
+    :return: naive UTC date time (None for None)
+
+    :raises ValueError: Wrong date time
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        moment = value
+    else:
+        match = DATETIME_RE.match(str(value).strip())
+        if match is None:
+            raise ValueError('Wrong date time {value}'.format(value=value))
+        parts = match.groupdict()
+        fraction = (parts['fraction'] or '0')[:6].ljust(6, '0')
+        moment = datetime.strptime(parts['date'], '%Y-%m-%d').replace(
+            hour=int(parts['hour'] or 0),
+            minute=int(parts['minute'] or 0),
+            second=int(parts['second'] or 0),
+            microsecond=int(fraction),
+        )
+        zone = parts['zone']
+        if zone and zone != 'Z':
+            sign = -1 if zone[0] == '-' else 1
+            digits = zone[1:].replace(':', '')
+            offset = timedelta(
+                hours=int(digits[:2]),
+                minutes=int(digits[2:] or 0),
+            )
+            moment = moment.replace(tzinfo=timezone(sign * offset))
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def _to_bool(value: Any) -> bool:  # NOQA:WPS110
+    """Convert value to bool.
+
+    :param value: value
+    :return: bool value
+    """
+    if isinstance(value, str):
+        return value.lower() in TRUE_STRINGS
+    return bool(value)
+
+
+class ColumnBuffer:
+    """Buffer of one column values.
+
+    Integer, Float and Boolean fields are stored in arrays
+    with a separate validity mask, other fields are stored in lists.
+    Nested values (dicts, lists) are stored as json strings.
+    DateTime values are also kept normalized to naive UTC.
+    """
+
+    def __init__(self, field: RowField):
+        """Init.
+
+        :param field: field name or model field
+        """
+        self.name = field_name(field)
+        self.field: Optional[BaseField] = None
+        if isinstance(field, FieldDescriptor):
+            self.field = field._field
+        self.typecode = ARRAY_TYPECODES.get(type(self.field))
+        self._data: Union[array, List[Any]] = []
+        self._mask = bytearray()
+        self._timestamps: List[Optional[datetime]] = []
+        self.clear()
+
+    def clear(self):
+        """Clear buffer."""
+        self._timestamps = []
+        if self.typecode is None:
+            self._data = []
+        else:
+            self._data = array(self.typecode)
+            self._mask = bytearray()
+
+    def append(self, value: Any):  # NOQA:WPS110
+        """Append value.
+
+        :param value: value
+        """
+        if self.typecode is None:
+            if isinstance(value, (dict, list)):
+                value = json.dumps(value)  # NOQA:WPS110
+            if isinstance(self.field, DateTime):
+                self._timestamps.append(_to_utc(value))
+            self._data.append(value)
+            return
+        if value is None:
+            self._data.append(0)
+            self._mask.append(0)
+            return
+        if self.typecode == 'B':
+            value = _to_bool(value)  # NOQA:WPS110
+        elif self.field is not None:
+            value = self.field.validate(value)  # NOQA:WPS110
+        self._data.append(value)
+        self._mask.append(1)
+
+    def pop(self):
+        """Remove the last value."""
+        if isinstance(self.field, DateTime):
+            self._timestamps.pop()
+        self._data.pop()
+        if self.typecode is not None:
+            self._mask.pop()
+
+    def values(self) -> List[Any]:  # NOQA:WPS110
+        """Get python values.
+
+        :return: list of values (None for nulls)
+        """
+        if self.typecode is None:
+            return list(self._data)
+        convert = bool if self.typecode == 'B' else None
+        return [
+            (convert(column_value) if convert else column_value)
+            if valid else None
+            for column_value, valid in zip(self._data, self._mask)
+        ]
+
+    def arrow_type(self):
+        """Get arrow type of column.
+
+        :return: arrow type
+        """
+        if isinstance(self.field, Integer):
+            return pyarrow.int64()
+        if isinstance(self.field, Float):
+            return pyarrow.float64()
+        if isinstance(self.field, Boolean):
+            return pyarrow.bool_()
+        if isinstance(self.field, DateTime):
+            return pyarrow.timestamp('us')
+        if isinstance(self.field, Date):
+            return pyarrow.date32()
+        return pyarrow.string()
+
+    def arrow_array(self):
+        """Get arrow array of column.
+
+        Arrays of numbers are built from buffers without python objects.
+        Timestamps are built from values normalized to UTC,
+        dates are parsed from strings.
+
+        :return: arrow array
+        """
+        arrow_type = self.arrow_type()
+        if isinstance(self.field, DateTime):
+            return pyarrow.array(self._timestamps, type=arrow_type)
+        if self.typecode is None:
+            strings = pyarrow.array(self._data, type=pyarrow.string())
+            if arrow_type == pyarrow.string():
+                return strings
+            return strings.cast(arrow_type)
+        storage_type = pyarrow.uint8() if self.typecode == 'B' else arrow_type
+        length = len(self._data)
+        column = pyarrow.Array.from_buffers(
+            storage_type,
+            length,
+            [None, pyarrow.py_buffer(self._data)],
+        )
+        if self.typecode == 'B':
+            column = column.cast(pyarrow.bool_())
+        if all(self._mask):
+            return column
+        mask = pyarrow.Array.from_buffers(
+            pyarrow.uint8(),
+            length,
+            [None, pyarrow.py_buffer(self._mask)],
+        ).cast(pyarrow.bool_())
+        return pyarrow.compute.if_else(
+            mask,
+            column,
+            pyarrow.scalar(None, type=arrow_type),
+        )
+
+
+class ColumnBuffers:
+    """Column buffers of rows batch."""
+
+    def __init__(self, fields: Iterable[RowField]):
+        """Init.
+
+        :param fields: fields of columns
+        """
+        self.columns = [ColumnBuffer(field) for field in fields]
+        self.rows = 0
+
+    @property
+    def names(self) -> List[str]:
+        """Column names.
+
+        :return: column names
+        """
+        return [column.name for column in self.columns]
+
+    def append(self, row: Dict[str, Any]):
+        """Append row.
+
+        Row with a wrong value is not appended to any column.
+
+        :param row: row
+        """
+        appended = 0
+        try:
+            for column in self.columns:
+                column.append(row.get(column.name))
+                appended += 1
+        except Exception:
+            # Columns are kept aligned
+            for appended_column in self.columns[:appended]:
+                appended_column.pop()
+            raise
+        self.rows += 1
+
+    def clear(self):
+        """Clear buffers."""
+        for column in self.columns:
+            column.clear()
+        self.rows = 0
+
+    def to_dict(self) -> Dict[str, List[Any]]:
+        """Get columns values.
+
+        :return: column name: list of values
+        """
+        return {column.name: column.values() for column in self.columns}
+
+    def to_rows(self) -> Iterator[List[Any]]:
+        """Get rows values.
+
+        :return: iterator by rows
+        """
+        return zip(*(column.values() for column in self.columns))
+
+    def arrow_schema(self):
+        """Get arrow schema.
+
+        :return: arrow schema
+        """
+        return pyarrow.schema([
+            (column.name, column.arrow_type()) for column in self.columns
+        ])
+
+    def to_arrow(self):
+        """Get arrow record batch.
+
+        :return: arrow record batch
+        """
+        return pyarrow.RecordBatch.from_arrays(
+            [column.arrow_array() for column in self.columns],
+            schema=self.arrow_schema(),
+        )
+
+
+def check_pyarrow():
+    """Check pyarrow is installed.
+
+    :raises ImportError: pyarrow is not installed
+    """
+    if pyarrow is None:
+        raise ImportError('pyarrow is required for arrow and parquet export')
+
+
+class ColumnsExport:
+    """Columnar export of iterable response.
+
+    :Example:
+
+    >>> export = api.Study.list().all().to_columns(
+    >>>     fields=[Study.uuid, Study.study_uid, Study.created],
+    >>> )
+    >>> with open('studies.csv', 'w', newline='') as csv_file:
+    >>>     export.to_csv(csv_file)
+    >>> export.to_parquet('studies.parquet')
+    """
+
+    def __init__(
+        self,
+        response: 'IterableResponse',
+        fields: Iterable[RowField],
+        batch_rows: int = DEFAULT_BATCH_ROWS,
+    ):
+        """Init.
+
+        :param response: iterable response (rows are dicts)
+        :param fields: fields of columns
+        :param batch_rows: number of rows in one batch
+        """
+        self._response = response
+        self._fields = list(fields)
+        self._batch_rows = batch_rows
+
+    def batches(self) -> Iterator[ColumnBuffers]:
+        """Get batches of rows.
+
+        Batch buffers are reused, so use batch before the next one.
+
+        :yields: column buffers of batch
+        """
+        buffers = ColumnBuffers(self._fields)
+        for row in self._response:
+            buffers.append(row)
+            if buffers.rows >= self._batch_rows:
+                yield buffers
+                buffers.clear()
+        if buffers.rows:
+            yield buffers
+
+    def arrow_batches(self) -> Iterator[Any]:
+        """Get arrow record batches.
+
+        :yields: arrow record batch
+        """
+        check_pyarrow()
+        for batch in self.batches():
+            yield batch.to_arrow()
+
+    def to_csv(self, csv_file: IO[str], header: bool = True) -> int:
+        """Write csv.
+
+        :param csv_file: text file
+        :param header: write header
+        :return: number of written rows
+        """
+        writer = csv.writer(csv_file)
+        if header:
+            writer.writerow(ColumnBuffers(self._fields).names)
+        rows = 0
+        for batch in self.batches():
+            writer.writerows(batch.to_rows())
+            rows += batch.rows
+        return rows
+
+    def to_arrow(self):
+        """Get arrow table.
+
+        Whole table is kept in memory, use
+        arrow_batches or to_parquet for large exports.
+
+        :return: arrow table
+        """
+        check_pyarrow()
+        return pyarrow.Table.from_batches(
+            list(self.arrow_batches()),
+            schema=ColumnBuffers(self._fields).arrow_schema(),
+        )
+
+    def to_parquet(self, path: str, **kwargs) -> int:
+        """Write parquet file by batches.
+
+        :param path: file path
+        :param kwargs: pyarrow.parquet.ParquetWriter kwargs
+        :return: number of written rows
+        """
+        check_pyarrow()
+        schema = ColumnBuffers(self._fields).arrow_schema()
+        rows = 0
+        with pyarrow.parquet.ParquetWriter(path, schema, **kwargs) as writer:
+            for batch in self.arrow_batches():
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        return rows
+
+
+class AsyncColumnsExport:
+    """Columnar export of async iterable response.
+
+    :Example:
+
+    >>> export = api.Study.list().all().to_columns(
+    >>>     fields=[Study.uuid, Study.study_uid, Study.created],
+    >>> )
+    >>> await export.to_parquet('studies.parquet')
+    """
+
+    def __init__(
+        self,
+        response: 'AsyncIterableResponse',
+        fields: Iterable[RowField],
+        batch_rows: int = DEFAULT_BATCH_ROWS,
+    ):
+        """Init.
+
+        :param response: async iterable response (rows are dicts)
+        :param fields: fields of columns
+        :param batch_rows: number of rows in one batch
+        """
+        self._response = response
+        self._fields = list(fields)
+        self._batch_rows = batch_rows
+
+    async def batches(self) -> AsyncIterator[ColumnBuffers]:
+        """Get batches of rows.
+
+        Batch buffers are reused, so use batch before the next one.
+
+        :yields: column buffers of batch
+        """
+        buffers = ColumnBuffers(self._fields)
+        async for row in self._response:
+            buffers.append(row)
+            if buffers.rows >= self._batch_rows:
+                yield buffers
+                buffers.clear()
+        if buffers.rows:
+            yield buffers
+
+    async def arrow_batches(self) -> AsyncIterator[Any]:
+        """Get arrow record batches.
+
+        :yields: arrow record batch
+        """
+        check_pyarrow()
+        async for batch in self.batches():
+            yield batch.to_arrow()
+
+    async def to_csv(self, csv_file: IO[str], header: bool = True) -> int:
+        """Write csv.
+
+        :param csv_file: text file
+        :param header: write header
+        :return: number of written rows
+        """
+        writer = csv.writer(csv_file)
+        if header:
+            writer.writerow(ColumnBuffers(self._fields).names)
+        rows = 0
+        async for batch in self.batches():
+            writer.writerows(batch.to_rows())
+            rows += batch.rows
+        return rows
+
+    async def to_arrow(self):
+        """Get arrow table.
+
+        Whole table is kept in memory, use
+        arrow_batches or to_parquet for large exports.
+
+        :return: arrow table
+        """
+        check_pyarrow()
+        return pyarrow.Table.from_batches(
+            [batch async for batch in self.arrow_batches()],
+            schema=ColumnBuffers(self._fields).arrow_schema(),
+        )
+
+    async def to_parquet(self, path: str, **kwargs) -> int:
+        """Write parquet file by batches.
+
+        :param path: file path
+        :param kwargs: pyarrow.parquet.ParquetWriter kwargs
+        :return: number of written rows
+        """
+        check_pyarrow()
+        schema = ColumnBuffers(self._fields).arrow_schema()
+        rows = 0
+        with pyarrow.parquet.ParquetWriter(path, schema, **kwargs) as writer:
+            async for batch in self.arrow_batches():
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        return rows
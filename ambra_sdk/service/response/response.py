@@ -1,6 +1,9 @@
 """Response objects."""
 
-from typing import Optional, Union
+from collections import deque
+from copy import copy
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterable, Optional, Union
 
 from requests import Response
 
@@ -13,6 +16,12 @@ from ambra_sdk.service.response.base_response import (
     check_401_405,
     check_412,
 )
+from ambra_sdk.service.response.columns import (
+    DEFAULT_BATCH_ROWS,
+    ColumnsExport,
+)
+from ambra_sdk.service.response.stream import PageDecoder
+from ambra_sdk.service.rows import RowField, as_dict
 
 RETURN_TYPE = Union[JSON_RETURN_TYPE, Response]
 
@@ -34,7 +43,18 @@ class IterableResponse(BaseIterableResponse):
         super().__init__(**kwargs)
         self._request_args = request_args
 
-    def __iter__(self):  # NOQA: WPS231
+    def __iter__(self):
+        """Return iterator by rows.
+
+        :return: data generator
+        """
+        if self._prefetch_pages:
+            return self._prefetch_data_generator()
+        if self._stream_chunk_size and self._cache_ttl is None:
+            return self._stream_data_generator()
+        return self._data_generator()
+
+    def _data_generator(self):  # NOQA: WPS231
         """Return iterator by rows.
 
         :yields: response object
@@ -47,8 +67,11 @@ class IterableResponse(BaseIterableResponse):
             self._request_args.data = self._prepare_data(  # NOQA:WPS110
                 self._request_args.data,
             )
-            response = self._api.retry_with_new_sid(self._get_response)
-            json = response.json()
+            json = self._cache_lookup(self._request_args.data)
+            if json is None:
+                response = self._api.retry_with_new_sid(self._get_response)
+                json = response.json()
+                self._cache_store(self._request_args.data, json)
             more = json['page']['more']
             # maximum rows in page
             max_rows_in_page = json['page']['rows']
@@ -69,6 +92,164 @@ class IterableResponse(BaseIterableResponse):
             if more == 0:
                 break
 
+    def _prefetch_data_generator(self):  # NOQA: WPS231
+        """Return iterator by rows with prefetched pages.
+
+        Server does not return total count of rows, so at the end of
+        the sequence up to `pages` extra (empty) pages can be requested.
+
+        :yields: response object
+
+        :raises RuntimeError: Max rows in page diffs from request
+        """
+        first_page, last_page = self._pages_range()
+        if self._max_row is not None and self._max_row <= self._min_row:
+            return
+        self._current_row = first_page * self._rows_in_page
+        next_page = first_page
+        pages: Deque[Future] = deque()
+        executor = ThreadPoolExecutor(max_workers=self._prefetch_pages)
+        try:
+            while True:
+                while len(pages) <= self._prefetch_pages and (
+                    last_page is None or next_page <= last_page
+                ):
+                    pages.append(
+                        executor.submit(self._get_page_json, next_page),
+                    )
+                    next_page += 1
+                if not pages:
+                    break
+                json = pages.popleft().result()
+                more = json['page']['more']
+                # maximum rows in page
+                max_rows_in_page = json['page']['rows']
+                if max_rows_in_page != self._rows_in_page:
+                    raise RuntimeError(
+                        'The max_rows_in_page parameter was ignored by the server',
+                    )
+                for row in json[self._pagination_field]:
+                    if self._current_row < self._min_row:
+                        self._current_row += 1
+                        continue
+                    if self._max_row is not None and \
+                       self._current_row >= self._max_row:
+                        return
+                    self._current_row += 1
+                    yield self._return_constructor(row)
+                if more == 0:
+                    break
+        finally:
+            for page in pages:
+                page.cancel()
+            # Wait for requests in flight, so they do not outlive iterator
+            executor.shutdown(wait=True)
+
+    def _stream_data_generator(self):  # NOQA: WPS231
+        """Return iterator by rows decoded from response stream.
+
+        :yields: response object
+
+        :raises RuntimeError: Max rows in page diffs from request
+        """
+        first_page, _ = self._pages_range()
+        if self._max_row is not None and self._max_row <= self._min_row:
+            return
+        self._current_row = first_page * self._rows_in_page
+        page_number = first_page
+        while True:
+            response = self._get_page_response(page_number, stream=True)
+            decoder = PageDecoder(self._pagination_field)
+            try:
+                for chunk in response.iter_content(self._stream_chunk_size):
+                    for row in decoder.feed(chunk):
+                        if self._current_row < self._min_row:
+                            self._current_row += 1
+                            continue
+                        if self._max_row is not None and \
+                           self._current_row >= self._max_row:
+                            return
+                        self._current_row += 1
+                        yield self._return_constructor(row)
+                decoder.close()
+            finally:
+                response.close()
+            more = decoder.fields['page']['more']
+            # maximum rows in page
+            max_rows_in_page = decoder.fields['page']['rows']
+            if max_rows_in_page != self._rows_in_page:
+                raise RuntimeError(
+                    'The max_rows_in_page parameter was ignored by the server',
+                )
+            if more == 0:
+                break
+            page_number += 1
+
+    def _get_page_json(self, page_number: int) -> Dict[str, Any]:
+        """Get json of page.
+
+        :param page_number: page number (starts from 0)
+        :return: page json
+        """
+        request_data = self._page_request_data(
+            self._request_args.data,
+            page_number,
+        )
+        page_json: Optional[Dict[str, Any]] = self._cache_lookup(request_data)
+        if page_json is None:
+            response = self._get_page_response(page_number)
+            page_json = response.json()
+            self._cache_store(request_data, page_json)
+        return page_json  # NOQA:WPS331
+
+    def _get_page_response(
+        self,
+        page_number: int,
+        stream: bool = False,
+    ) -> Response:
+        """Get response of page.
+
+        :param page_number: page number (starts from 0)
+        :param stream: do not read response content immediately
+        :return: page response
+        """
+        request_args = RequestArgs(**self._request_args.to_dict())
+        request_args.data = self._page_request_data(  # NOQA:WPS110
+            self._request_args.data,
+            page_number,
+        )
+        if stream:
+            request_args.stream = True
+
+        def _get_response():  # NOQA:WPS430
+            response = self._api.service_request(
+                required_sid=self._required_sid,
+                request_args=request_args,
+            )
+            return check_response(response, self._errors_mapping)
+
+        page_response: Response = self._api.retry_with_new_sid(_get_response)
+        return page_response  # NOQA:WPS331
+
+    def to_columns(
+        self,
+        fields: Iterable[RowField],
+        batch_rows: int = DEFAULT_BATCH_ROWS,
+    ) -> ColumnsExport:
+        """Export rows to columns.
+
+        Rows are not converted to return type,
+        they are accumulated into column buffers by batches.
+        Return type of the response is not changed.
+
+        :param fields: field names or model fields
+        :param batch_rows: number of rows in one batch
+        :return: columns export
+        """
+        rows = copy(self)
+        rows._return_constructor = as_dict  # NOQA:WPS437
+        return ColumnsExport(rows, fields, batch_rows)
+
     def first(self) -> Optional[JSON_RETURN_TYPE]:
         """First element.
 
@@ -0,0 +1,228 @@
+"""Streaming decoder of paginated responses."""
+
+import codecs
+from enum import Enum, auto
+from json import JSONDecodeError, JSONDecoder
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_STREAM_CHUNK_SIZE = 64 * 1024
+
+WHITESPACES = frozenset(' \t\n\r')
+NUMBER_CHARS = frozenset('0123456789+-.eE')
+LITERALS = ('true', 'false', 'null', 'NaN', 'Infinity', '-Infinity')
+UNICODE_ESCAPE_LENGTH = 6
+
+
+class DecoderState(Enum):
+    """Page decoder states."""
+
+    start = auto()
+    key = auto()
+    colon = auto()
+    value = auto()  # NOQA:WPS110
+    rows = auto()
+    done = auto()
+
+
+class PageDecoder:  # NOQA:WPS214
+    """Incremental decoder of paginated response page.
+
+    Page is a json object like this:
+    {"page": {"more": 1, "rows": 100}, "studies": [{...}, {...}]}
+
+    Rows of the pagination field are decoded one by one
+    as soon as they are received, so only one row is kept in memory.
+    Other top level fields are decoded entirely and stored in `fields`.
+
+    :Example:
+
+    >>> decoder = PageDecoder('studies')
+    >>> for chunk in response.iter_content(DEFAULT_STREAM_CHUNK_SIZE):
+    >>>     for row in decoder.feed(chunk):
+    >>>         do_something_with(row)
+    >>> decoder.close()
+    >>> more = decoder.fields['page']['more']
+    """
+
+    def __init__(self, pagination_field: str):
+        """Init.
+
+        :param pagination_field: field for pagination
+        """
+        self._pagination_field = pagination_field
+        self._json_decoder = JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._position = 0
+        self._offset = 0
+        self._state = DecoderState.start
+        self._key: Optional[str] = None
+        self.fields: Dict[str, Any] = {}
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """Feed next chunk of response.
+
+        :param chunk: chunk of response body
+        :return: rows decoded from this chunk
+        """
+        return self._feed_text(self._text_decoder.decode(chunk))
+
+    def close(self):
+        """Check that response is decoded entirely.
+
+        :raises ValueError: Unexpected end of json
+        """
+        self._feed_text(self._text_decoder.decode(b'', final=True))
+        if self._state != DecoderState.done:
+            raise ValueError('Unexpected end of json')
+
+    def _feed_text(self, text: str) -> List[Any]:
+        """Feed next part of decoded text.
+
+        :param text: text
+        :return: decoded rows
+        """
+        self._offset += self._position
+        self._buffer = '{rest}{text}'.format(
+            rest=self._buffer[self._position:],
+            text=text,
+        )
+        self._position = 0
+        return self._parse()
+
+    def _parse(self) -> List[Any]:  # NOQA:WPS231
+        """Parse buffer.
+
+        :return: decoded rows
+        :raises ValueError: Invalid json
+        """
+        rows = []
+        while True:
+            self._skip_whitespaces()
+            if self._position >= len(self._buffer):
+                return rows
+            char = self._buffer[self._position]
+            if self._state == DecoderState.start:
+                self._expect(char, '{', DecoderState.key)
+            elif self._state == DecoderState.key:
+                if not self._parse_key(char):
+                    return rows
+            elif self._state == DecoderState.colon:
+                self._expect(char, ':', DecoderState.value)
+            elif self._state == DecoderState.value:
+                if not self._parse_value(char):
+                    return rows
+            elif self._state == DecoderState.rows:
+                if char in {',', ']'}:
+                    self._position += 1
+                    if char == ']':
+                        self._state = DecoderState.key
+                    continue
+                decoded, row = self._decode()
+                if not decoded:
+                    return rows
+                rows.append(row)
+            else:
+                raise ValueError('Extra data after json object')
+
+    def _parse_key(self, char: str) -> bool:
+        """Parse top level key.
+
+        :param char: current char
+        :return: False if more data is required
+        """
+        if char in {',', '}'}:
+            self._position += 1
+            if char == '}':
+                self._state = DecoderState.done
+            return True
+        decoded, key = self._decode()
+        if not decoded:
+            return False
+        self._key = key
+        self._state = DecoderState.colon
+        return True
+
+    def _parse_value(self, char: str) -> bool:
+        """Parse top level value.
+
+        :param char: current char
+        :return: False if more data is required
+        """
+        if self._key == self._pagination_field and char == '[':
+            self._position += 1
+            self._state = DecoderState.rows
+            return True
+        decoded, field_value = self._decode()
+        if not decoded:
+            return False
+        self.fields[str(self._key)] = field_value
+        self._state = DecoderState.key
+        return True
+
+    def _decode(self) -> Tuple[bool, Any]:
+        """Decode json value from the current position.
+
+        Every value in object or list is followed by a delimiter.
+        So a value at the end of buffer can be truncated
+        (for example number) and we need more data.
+
+        :return: is value decoded and value
+        :raises ValueError: Invalid json
+        """
+        try:
+            decoded_value, end = self._json_decoder.raw_decode(
+                self._buffer,
+                self._position,
+            )
+        except JSONDecodeError as error:
+            if self._truncated(error):
+                return False, None
+            raise ValueError(
+                'Wrong json at offset {offset}: {msg}'.format(
+                    offset=self._offset + error.pos,
+                    msg=error.msg,
+                ),
+            )
+        if NUMBER_CHARS.issuperset(self._buffer[end:]):
+            # Number can be continued in the next chunk: 1 -> 1.5
+            return False, None
+        self._position = end
+        return True, decoded_value
+
+    def _truncated(self, error: JSONDecodeError) -> bool:
+        """Check that decode error is caused by the end of buffer.
+
+        :param error: decode error
+        :return: True if more data can fix the error
+        """
+        rest = self._buffer[error.pos:]
+        if not rest or error.msg.startswith('Unterminated string'):
+            return True
+        if error.msg.startswith('Invalid \\uXXXX escape'):
+            return len(rest) < UNICODE_ESCAPE_LENGTH
+        return any(literal.startswith(rest) for literal in LITERALS)
+
+    def _expect(self, char: str, expected: str, next_state: DecoderState):
+        """Expect char.
+
+        :param char: current char
+        :param expected: expected char
+        :param next_state: next decoder state
+        :raises ValueError: Unexpected char
+        """
+        if char != expected:
+            raise ValueError(
+                'Expected {expected!r}, got {char!r}'.format(
+                    expected=expected,
+                    char=char,
+                ),
+            )
+        self._position += 1
+        self._state = next_state
+
+    def _skip_whitespaces(self):
+        """Skip whitespaces."""
+        while self._position < len(self._buffer) and \
+                self._buffer[self._position] in WHITESPACES:
+            self._position += 1
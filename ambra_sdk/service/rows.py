@@ -0,0 +1,169 @@
+"""Lightweight row constructors.
+
+Box recursively converts every row of response.
+For bulk listings this conversion takes most of the time,
+so these constructors can be used instead of Box.
+"""
+
+import keyword
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type, Union
+
+from ambra_sdk.models.base import BaseModel, FieldDescriptor, ModelDescriptor
+
+RowField = Union[str, FieldDescriptor]
+
+KEYWORD_SUFFIX = '_field'
+
+
+def as_dict(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Return row as is (decoded json dict).
+
+    :param row: row
+    :return: row
+    """
+    return row
+
+
+def field_name(field: RowField) -> str:
+    """Get field name in response.
+
+    :param field: field name or model field
+    :return: field name
+    """
+    if isinstance(field, FieldDescriptor):
+        return row_key(str(field._name))
+    return field
+
+
+class TupleConstructor:
+    """Row to tuple constructor.
+
+    Missing fields are None.
+    """
+
+    __slots__ = ('fields',)
+
+    def __init__(self, fields: Iterable[RowField]):
+        """Init.
+
+        :param fields: fields of tuple
+        """
+        self.fields: Tuple[str, ...] = tuple(
+            field_name(field) for field in fields
+        )
+
+    def __call__(self, row: Dict[str, Any]) -> Tuple[Any, ...]:
+        """Construct tuple.
+
+        :param row: row
+        :return: tuple of fields values
+        """
+        return tuple(map(row.get, self.fields))
+
+
+class BaseRecord:
+    """Base record.
+
+    Record is a plain object with __slots__ for every field.
+    Missing fields are None.
+    """
+
+    __slots__: Tuple[str, ...] = ()
+    _keys: Tuple[str, ...] = ()
+
+    def __init__(self, row: Dict[str, Any]):
+        """Init.
+
+        :param row: row
+        """
+        for slot, key in zip(self.__slots__, self._keys):
+            setattr(self, slot, row.get(key))
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get record as dict.
+
+        :return: dict of fields values
+        """
+        return {
+            key: getattr(self, slot)
+            for slot, key in zip(self.__slots__, self._keys)
+        }
+
+    def __eq__(self, other):  # NOQA:D105
+        if not isinstance(other, BaseRecord):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def __repr__(self):  # NOQA:D105
+        fields = ', '.join(
+            '{slot}={value!r}'.format(slot=slot, value=getattr(self, slot))
+            for slot in self.__slots__
+        )
+        return '{name}({fields})'.format(
+            name=self.__class__.__name__,
+            fields=fields,
+        )
+
+
+def model_fields(model: Type[BaseModel]) -> List[str]:
+    """Get model field names.
+
+    :param model: model
+    :return: list of field names (attributes of model)
+    """
+    fields: List[str] = []
+    for klass in reversed(model.__mro__):  # NOQA:WPS609
+        for attr_name, attr in vars(klass).items():
+            if isinstance(attr, (FieldDescriptor, ModelDescriptor)) and \
+               attr_name not in fields:
+                fields.append(attr_name)
+    return fields
+
+
+def row_key(attr_name: str) -> str:
+    """Get response key for model attribute.
+
+    Python keywords are renamed in models: global -> global_field
+
+    :param attr_name: model attribute name
+    :return: response key
+    """
+    if attr_name.endswith(KEYWORD_SUFFIX):
+        key = attr_name[:-len(KEYWORD_SUFFIX)]
+        if keyword.iskeyword(key):
+            return key
+    return attr_name
+
+
+def record_class(
+    model: Type[BaseModel],
+    fields: Optional[Iterable[RowField]] = None,
+) -> Type[BaseRecord]:
+    """Create record class for model.
+
+    :param model: model
+    :param fields: record fields (all model fields by default)
+    :return: record class
+    """
+    if fields is None:
+        names = tuple(model_fields(model))
+    else:
+        names = tuple(
+            str(field._name) if isinstance(field, FieldDescriptor) else field
+            for field in fields
+        )
+    return _record_class(model.__name__, names)  # NOQA:WPS609
+
+
+@lru_cache(maxsize=None)
+def _record_class(model_name: str, names: Tuple[str, ...]) -> Type[BaseRecord]:
+    record: Type[BaseRecord] = type(
+        '{model_name}Record'.format(model_name=model_name),
+        (BaseRecord,),
+        {
+            '__slots__': names,
+            '_keys': tuple(row_key(name) for name in names),
+        },
+    )
+    return record  # NOQA:WPS331
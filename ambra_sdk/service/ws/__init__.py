@@ -1,2 +1,5 @@
+from ambra_sdk.service.ws.async_hub import AsyncWSHub
 from ambra_sdk.service.ws.async_ws import AsyncWSManager
+from ambra_sdk.service.ws.dispatcher import OverflowPolicy
+from ambra_sdk.service.ws.hub import WSHub
 from ambra_sdk.service.ws.ws import WSManager
@@ -0,0 +1,413 @@
+"""Shared websocket hub for async api."""
+
+import asyncio
+import json
+import logging
+import sys
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+import aiohttp
+
+from ambra_sdk.service.ws.async_ws import INACTIVITY_TIMEOUT
+from ambra_sdk.service.ws.dispatcher import (
+    SUBSCRIBER_MAX_SIZE,
+    AsyncWSSubscriber,
+    MessageFilter,
+    OverflowPolicy,
+    WSDispatcher,
+    event_keys,
+    status_key,
+)
+
+if sys.version_info >= (3, 7):
+    from contextlib import asynccontextmanager
+else:
+    # For python3.6
+    from ambra_sdk.async_context_manager import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncWSHub:  # NOQA:WPS214
+    """Long-lived websocket connection shared by async waiters.
+
+    One websocket (and one reader task) serves all waiters of api.
+    Channel subscriptions are reference counted: a channel is
+    subscribed by the first waiter and unsubscribed by the last one.
+    Every event is delivered to all subscribers of it.
+    A waiter with a new sid (refreshed session) subscribes the channel
+    again, subscribers of channel get events marked by any of its sids.
+    Closed connection is restored and channels are resubscribed.
+    Waiters of other channels are not blocked by (un)subscription
+    of channel.
+
+    :Example:
+
+    >>> channel = 'job.{namespace_id}'.format(namespace_id=namespace_id)
+    >>> sid = await api.get_sid()
+    >>> async with api.ws_hub.events(sid, channel, ['DONE']) as events:
+    >>>     msg = await events.get(timeout=10)
+    """
+
+    def __init__(self, url: str):
+        """Init.
+
+        :param url: websocket channel url
+        """
+        self._url = url
+        self._dispatcher = WSDispatcher()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._reader: Optional[asyncio.Future] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._ping_interval = INACTIVITY_TIMEOUT
+        self._subscribe_wait_timeout = 10
+        self._unsubscribe_wait_timeout = self._subscribe_wait_timeout
+        # channel -> number of subscribers
+        self._channels: Dict[str, int] = {}
+        # channel -> sids of subscriptions (the last one is actual)
+        self._sids: Dict[str, List[str]] = {}
+        # subscriber -> channel and event names
+        self._subscribers: Dict[
+            AsyncWSSubscriber,
+            Tuple[str, FrozenSet[str]],
+        ] = {}
+        # channel -> (un)subscription in progress
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def channels(self) -> Dict[str, int]:
+        """Subscribed channels.
+
+        :return: number of subscribers by channel
+        """
+        return dict(self._channels)
+
+    def dropped(self) -> int:
+        """Number of messages dropped by overflow of buffers.
+
+        Look at dropped attribute of subscriber for its drops.
+
+        :return: number of messages
+        """
+        return self._dispatcher.dropped
+
+    async def subscribe(
+        self,
+        sid: str,
+        channel: str,
+        events: Iterable[str],
+        match: Optional[MessageFilter] = None,
+        max_size: int = SUBSCRIBER_MAX_SIZE,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+    ) -> AsyncWSSubscriber:
+        """Subscribe to events of channel.
+
+        :param sid: sid
+        :param channel: channel
+        :param events: event names
+        :param match: filter of events (None - all events)
+        :param max_size: max number of buffered events of subscriber
+        :param overflow: policy of full buffer
+        :return: subscriber (unsubscribe it after use)
+        """
+        events = frozenset(events)
+        async with self._channel_lock(channel):
+            await self._connect()
+            sids = self._sids.get(channel, [])
+            subscriber = AsyncWSSubscriber(
+                event_keys(channel, events, [*sids, sid]),
+                match,
+                max_size,
+                overflow,
+            )
+            # Subscribers are updated before the channel subscription:
+            # events can not be missed
+            self._dispatcher.add_subscriber(subscriber)
+            if sid not in sids:
+                self._add_sid_keys(channel, sid)
+            self._channels[channel] = self._channels.get(channel, 0) + 1
+            self._subscribers[subscriber] = (channel, events)
+            if sid in sids:
+                return subscriber
+            request = asyncio.get_event_loop().create_future()
+            self._pending[channel] = request
+        # Answer is waited without lock
+        try:
+            await self._request(
+                {'action': 'subscribe', 'channel': channel, 'sid': sid},
+                channel,
+                self._subscribe_wait_timeout,
+            )
+        except BaseException:
+            self._remove_subscriber(subscriber)
+            raise
+        else:
+            if subscriber in self._subscribers:
+                self._sids[channel] = [*sids, sid]
+        finally:
+            self._finish_request(channel, request)
+        return subscriber
+
+    async def unsubscribe(self, subscriber: AsyncWSSubscriber):
+        """Remove subscriber.
+
+        Channel is unsubscribed if it has no subscribers.
+
+        :param subscriber: subscriber
+        """
+        async with self._get_lock():
+            channel = self._remove_subscriber(subscriber)
+            if channel is None or self._ws is None or self._ws.closed:
+                return
+            request = asyncio.get_event_loop().create_future()
+            self._pending[channel] = request
+        try:
+            await self._request(
+                {
+                    'action': 'unsubscribe',
+                    'channel': channel,
+                    # But required! ;-)
+                    'sid': 'NOT NEEDED!',
+                },
+                channel,
+                self._unsubscribe_wait_timeout,
+            )
+        except TimeoutError:
+            logger.debug('Unsubscribe timeout %s', channel)
+        finally:
+            self._finish_request(channel, request)
+
+    @asynccontextmanager
+    async def events(
+        self,
+        sid: str,
+        channel: str,
+        events: Iterable[str],
+        match: Optional[MessageFilter] = None,
+        max_size: int = SUBSCRIBER_MAX_SIZE,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+    ) -> AsyncIterator[AsyncWSSubscriber]:
+        """Subscribe to events of channel.
+
+        :param sid: sid
+        :param channel: channel
+        :param events: event names
+        :param match: filter of events (None - all events)
+        :param max_size: max number of buffered events of subscriber
+        :param overflow: policy of full buffer
+        :yields: subscriber
+        """
+        subscriber = await self.subscribe(
+            sid,
+            channel,
+            events,
+            match,
+            max_size,
+            overflow,
+        )
+        try:  # NOQA:WPS501
+            yield subscriber
+        finally:
+            await self.unsubscribe(subscriber)
+
+    async def close(self):
+        """Close websocket."""
+        self._channels = {}
+        self._sids = {}
+        self._subscribers = {}
+        reader, self._reader = self._reader, None
+        if reader is not None:
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+        if self._ws is not None:
+            await self._ws.close()
+            self._ws = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        """Get lock of subscriptions (created in running loop).
+
+        :return: lock
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    @asynccontextmanager
+    async def _channel_lock(self, channel: str) -> AsyncIterator[None]:
+        """Lock hub when channel has no (un)subscription in progress.
+
+        :param channel: channel
+        :yields: nothing
+        """
+        lock = self._get_lock()
+        while True:
+            await lock.acquire()
+            pending = self._pending.get(channel)
+            if pending is None:
+                break
+            lock.release()
+            await asyncio.wait([pending])
+        try:  # NOQA:WPS501
+            yield
+        finally:
+            lock.release()
+
+    def _finish_request(self, channel: str, request: asyncio.Future):
+        """Finish (un)subscription of channel.
+
+        :param channel: channel
+        :param request: (un)subscription
+        """
+        self._pending.pop(channel, None)
+        request.set_result(None)
+
+    def _remove_subscriber(
+        self,
+        subscriber: AsyncWSSubscriber,
+    ) -> Optional[str]:
+        """Remove subscriber.
+
+        :param subscriber: subscriber
+        :return: channel without subscribers (unsubscribe it) or None
+        """
+        subscription = self._subscribers.pop(subscriber, None)
+        if subscription is None:
+            # Hub is closed
+            return None
+        channel, _ = subscription
+        self._dispatcher.remove_subscriber(subscriber)
+        subscribers = self._channels.pop(channel) - 1
+        if subscribers > 0:
+            self._channels[channel] = subscribers
+            return None
+        self._sids.pop(channel, None)
+        self._dispatcher.forget_channel(channel)
+        return channel
+
+    async def _connect(self):
+        """Connect websocket and run reader."""
+        if self._reader is not None and not self._reader.done():
+            return
+        if self._session is None or self._session.closed:
+            logger.debug('Create new session')
+            self._session = aiohttp.ClientSession()
+        if self._ws is not None:
+            # Reader is failed
+            await self._ws.close()
+        logger.debug('Run ws connection')
+        self._ws = await self._session.ws_connect(self._url)
+        self._reader = asyncio.ensure_future(self._read())
+        await self._resubscribe()
+
+    async def _resubscribe(self):
+        """Resubscribe channels (answers are not waited)."""
+        loop = asyncio.get_event_loop()
+        for channel, sids in self._sids.items():
+            # Answer is consumed: it is not an answer
+            # for the next request of channel
+            self._dispatcher.add_waiter(
+                status_key(channel),
+                loop.create_future(),
+            )
+            await self._send(
+                {
+                    'action': 'subscribe',
+                    'channel': channel,
+                    'sid': sids[-1],
+                },
+            )
+
+    def _add_sid_keys(self, channel: str, sid: str):
+        """Add events of new sid to subscribers of channel.
+
+        :param channel: channel
+        :param sid: new sid of channel
+        """
+        for subscriber, (sub_channel, events) in self._subscribers.items():
+            if sub_channel == channel:
+                self._dispatcher.add_keys(
+                    subscriber,
+                    event_keys(channel, events, [sid]),
+                )
+
+    async def _reconnect(self):
+        """Restore closed connection and resubscribe channels."""
+        logger.debug('Restart ws connection')
+        self._ws = await self._session.ws_connect(  # type: ignore
+            self._url,
+        )
+        await self._resubscribe()
+
+    async def _read(self):
+        """Read messages and dispatch them."""
+        try:
+            while True:
+                ws = self._ws
+                try:
+                    msg = await asyncio.wait_for(
+                        ws.receive(),  # type: ignore
+                        timeout=self._ping_interval,
+                    )
+                except asyncio.TimeoutError:
+                    logger.debug('Ping')
+                    await self._send({'action': 'ping'})
+                    continue
+                logger.debug('Recieved: %s', str(msg))
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    self._dispatcher.dispatch(msg)
+                elif msg.type in {
+                    aiohttp.WSMsgType.CLOSE,
+                    aiohttp.WSMsgType.CLOSING,
+                    aiohttp.WSMsgType.CLOSED,
+                    aiohttp.WSMsgType.ERROR,
+                }:
+                    logger.debug('Connection closed')
+                    await self._reconnect()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exception:  # NOQA:B902
+            logger.exception('Websocket error')
+            self._dispatcher.close(exception)
+
+    async def _request(
+        self,
+        request: Dict[str, Any],
+        channel: str,
+        timeout: float,
+    ):
+        """Send subscription request and wait for answer.
+
+        :param request: request json
+        :param channel: channel
+        :param timeout: timeout of answer
+
+        :raises TimeoutError: No answer
+        """
+        waiter = asyncio.get_event_loop().create_future()
+        # Waiter is added before request: answer can not be missed
+        self._dispatcher.add_waiter(status_key(channel), waiter)
+        await self._send(request)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            self._dispatcher.remove_waiter(waiter)
+            raise TimeoutError
+
+    async def _send(self, request: Dict[str, Any]):
+        """Send request.
+
+        :param request: request json
+        """
+        await self._ws.send_str(json.dumps(request))  # type: ignore
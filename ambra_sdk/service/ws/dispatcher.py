@@ -0,0 +1,524 @@
+"""Dispatch of websocket messages to waiters.
+
+Messages are routed by key:
+events by (channel, event, sid_md5) and
+subscription answers by (channel, status).
+A message without waiters is kept (bounded by key)
+until somebody waits for it, so waiters of different
+keys never consume messages of each other.
+
+Subscribers (WSSubscriber, AsyncWSSubscriber) get every message
+of their keys (accepted by their match function):
+one message is fanned out to all subscribers.
+Buffers of subscribers are bounded and never block the socket
+reader: overflow is resolved by OverflowPolicy and counted.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from collections import defaultdict, deque
+from enum import Enum
+from threading import Condition, Lock
+from typing import (
+    Any,
+    Callable,
+    DefaultDict,
+    Deque,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+import aiohttp
+
+# Max number of kept messages of one key
+UNCLAIMED_MAX_SIZE = 100
+
+# Max number of buffered messages of one subscriber
+SUBSCRIBER_MAX_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+MessageKey = Optional[Tuple[str, ...]]
+
+MessageFilter = Callable[[aiohttp.WSMessage], bool]
+
+
+def sid_md5(sid: str) -> str:
+    """Get md5 of sid (events are marked by it).
+
+    :param sid: sid
+    :return: md5 hex digest
+    """
+    return hashlib.md5(sid.encode()).hexdigest()  # NOQA:S303
+
+
+def event_key(channel: str, event: str, md5: str) -> Tuple[str, ...]:
+    """Get key of event message.
+
+    :param channel: channel name
+    :param event: event name
+    :param md5: md5 of sid
+    :return: key
+    """
+    return ('event', channel, event, md5)
+
+
+def event_keys(
+    channel: str,
+    events: Iterable[str],
+    sids: Iterable[str],
+) -> Set[Tuple[str, ...]]:
+    """Get keys of events of channel subscribed by sids.
+
+    :param channel: channel name
+    :param events: event names
+    :param sids: sids of channel subscriptions
+    :return: keys
+    """
+    md5s = {sid_md5(sid) for sid in sids}
+    return {event_key(channel, event, md5) for event in events for md5 in md5s}
+
+
+def status_key(channel: str, status: str = 'OK') -> Tuple[str, ...]:
+    """Get key of subscribe (unsubscribe) answer.
+
+    :param channel: channel name
+    :param status: answer status
+    :return: key
+    """
+    return ('status', channel, status)
+
+
+def message_json(msg: aiohttp.WSMessage) -> Optional[Dict[str, Any]]:
+    """Get json of text message.
+
+    :param msg: message
+    :return: json dict or None
+    """
+    if msg.type != aiohttp.WSMsgType.TEXT:
+        return None
+    try:
+        msg_json = json.loads(msg.data)
+    except ValueError:
+        return None
+    return msg_json if isinstance(msg_json, dict) else None
+
+
+def message_key(msg_json: Optional[Dict[str, Any]]) -> MessageKey:
+    """Get key of message.
+
+    :param msg_json: message json
+    :return: key or None (not routed message)
+    """
+    if msg_json is None:
+        return None
+    channel = msg_json.get('channel')
+    if channel is None:
+        return None
+    event = msg_json.get('event')
+    md5 = msg_json.get('sid_md5')
+    if event is not None and md5 is not None:
+        return event_key(channel, event, md5)
+    status = msg_json.get('status')
+    if status is not None:
+        return status_key(channel, status)
+    return None
+
+
+class OverflowPolicy(Enum):
+    """Policy of full subscriber buffer.
+
+    DROP_OLDEST: the oldest buffered message is dropped
+    DROP_NEWEST: the new message is dropped
+    """
+
+    DROP_OLDEST = 'drop_oldest'
+    DROP_NEWEST = 'drop_newest'
+
+
+def put_bounded(
+    messages: Deque[aiohttp.WSMessage],
+    msg: aiohttp.WSMessage,
+    max_size: int,
+    overflow: OverflowPolicy,
+) -> int:
+    """Put message to bounded buffer.
+
+    :param messages: buffer
+    :param msg: message
+    :param max_size: max size of buffer
+    :param overflow: policy of full buffer
+    :return: number of dropped messages
+    """
+    if len(messages) < max_size:
+        messages.append(msg)
+        return 0
+    if overflow == OverflowPolicy.DROP_OLDEST:
+        messages.popleft()
+        messages.append(msg)
+    return 1
+
+
+class WSSubscriber:
+    """Messages of subscribed keys for sync consumers.
+
+    Messages are put by the websocket thread.
+    """
+
+    def __init__(
+        self,
+        keys: Iterable[MessageKey],
+        match: Optional[MessageFilter] = None,
+        max_size: int = SUBSCRIBER_MAX_SIZE,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+    ):
+        """Init.
+
+        :param keys: message keys
+        :param match: filter of messages (None - all messages of keys)
+        :param max_size: max number of buffered messages
+        :param overflow: policy of full buffer
+        """
+        self.keys = frozenset(keys)
+        self.match = match
+        self.max_size = max_size
+        self.overflow = overflow
+        # Number of messages dropped by overflow
+        self.dropped = 0
+        self._messages: Deque[aiohttp.WSMessage] = deque()
+        self._condition = Condition()
+
+    def put(self, msg: aiohttp.WSMessage) -> int:
+        """Put message (never blocks).
+
+        :param msg: message
+        :return: number of dropped messages
+        """
+        with self._condition:
+            dropped = put_bounded(
+                self._messages,
+                msg,
+                self.max_size,
+                self.overflow,
+            )
+            self.dropped += dropped
+            self._condition.notify()
+        return dropped
+
+    def get(self, timeout: Optional[float] = None) -> aiohttp.WSMessage:
+        """Get next message.
+
+        :param timeout: timeout
+
+        :raises TimeoutError: No messages by timeout
+
+        :return: message
+        """
+        with self._condition:
+            if not self._condition.wait_for(
+                lambda: self._messages,
+                timeout=timeout,
+            ):
+                raise TimeoutError
+            return self._messages.popleft()
+
+    def drain(self) -> List[aiohttp.WSMessage]:
+        """Get all received messages (without waiting).
+
+        :return: messages
+        """
+        with self._condition:
+            messages = list(self._messages)
+            self._messages.clear()
+            return messages
+
+
+class AsyncWSSubscriber:
+    """Messages of subscribed keys for async consumers.
+
+    Messages are put in the loop of consumer.
+    """
+
+    def __init__(
+        self,
+        keys: Iterable[MessageKey],
+        match: Optional[MessageFilter] = None,
+        max_size: int = SUBSCRIBER_MAX_SIZE,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+    ):
+        """Init.
+
+        :param keys: message keys
+        :param match: filter of messages (None - all messages of keys)
+        :param max_size: max number of buffered messages
+        :param overflow: policy of full buffer
+        """
+        self.keys = frozenset(keys)
+        self.match = match
+        self.max_size = max_size
+        self.overflow = overflow
+        # Number of messages dropped by overflow
+        self.dropped = 0
+        self._messages: Deque[aiohttp.WSMessage] = deque()
+        self._received: Optional[asyncio.Event] = None
+
+    def put(self, msg: aiohttp.WSMessage) -> int:
+        """Put message (never blocks).
+
+        :param msg: message
+        :return: number of dropped messages
+        """
+        dropped = put_bounded(
+            self._messages,
+            msg,
+            self.max_size,
+            self.overflow,
+        )
+        self.dropped += dropped
+        if self._received is not None:
+            self._received.set()
+        return dropped
+
+    async def get(self, timeout: Optional[float] = None) -> aiohttp.WSMessage:
+        """Get next message.
+
+        :param timeout: timeout
+
+        :raises TimeoutError: No messages by timeout
+
+        :return: message
+        """
+        loop = asyncio.get_event_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while not self._messages:
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError
+            if self._received is None:
+                self._received = asyncio.Event()
+            self._received.clear()
+            try:
+                await asyncio.wait_for(self._received.wait(), remaining)
+            except asyncio.TimeoutError:
+                raise TimeoutError
+        return self._messages.popleft()
+
+    def drain(self) -> List[aiohttp.WSMessage]:
+        """Get all received messages (without waiting).
+
+        :return: messages
+        """
+        messages = list(self._messages)
+        self._messages.clear()
+        return messages
+
+
+Subscriber = Union[WSSubscriber, AsyncWSSubscriber]
+
+
+class WSDispatcher:
+    """Thread safe dispatcher of websocket messages.
+
+    Waiters are futures (concurrent or asyncio) with
+    set_result, set_exception and done methods.
+    They are resolved in the thread of dispatch call
+    (asyncio futures must be dispatched in their loop).
+    """
+
+    def __init__(self, unclaimed_max_size: int = UNCLAIMED_MAX_SIZE):
+        """Init.
+
+        :param unclaimed_max_size: max number of kept messages of one key
+        """
+        self._lock = Lock()
+        self._unclaimed_max_size = unclaimed_max_size
+        self._waiters: DefaultDict[MessageKey, Deque[Any]] = \
+            defaultdict(deque)
+        self._predicate_waiters: List[
+            Tuple[Callable[[aiohttp.WSMessage], bool], Any]
+        ] = []
+        self._unclaimed: Dict[MessageKey, Deque[aiohttp.WSMessage]] = {}
+        self._subscribers: DefaultDict[MessageKey, Set[Subscriber]] = \
+            defaultdict(set)
+        self._dropped = 0
+
+    def dispatch(self, msg: aiohttp.WSMessage):
+        """Route message to subscribers and a waiter.
+
+        :param msg: message
+        """
+        key = message_key(message_json(msg))
+        with self._lock:
+            subscribers = list(self._subscribers.get(key, ()))
+            for subscriber in subscribers:
+                if subscriber.match is None or subscriber.match(msg):
+                    if subscriber.put(msg):
+                        self._dropped += 1
+                        logger.debug('Subscriber buffer overflow %s', key)
+            waiters = self._waiters.get(key)
+            while waiters:
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(msg)
+                    return
+            for index, (fn, predicate_waiter) in enumerate(
+                self._predicate_waiters,
+            ):
+                if not predicate_waiter.done() and fn(msg):
+                    del self._predicate_waiters[index]  # NOQA:WPS420
+                    predicate_waiter.set_result(msg)
+                    return
+            if subscribers:
+                return
+            unclaimed = self._unclaimed.get(key)
+            if unclaimed is None:
+                unclaimed = deque()
+                self._unclaimed[key] = unclaimed
+            self._dropped += put_bounded(
+                unclaimed,
+                msg,
+                self._unclaimed_max_size,
+                OverflowPolicy.DROP_OLDEST,
+            )
+
+    @property
+    def dropped(self) -> int:
+        """Number of messages dropped by overflow of buffers.
+
+        :return: number of messages
+        """
+        with self._lock:
+            return self._dropped
+
+    def add_subscriber(self, subscriber: Subscriber):
+        """Add subscriber.
+
+        :param subscriber: subscriber
+        """
+        with self._lock:
+            for key in subscriber.keys:
+                self._subscribers[key].add(subscriber)
+
+    def add_keys(self, subscriber: Subscriber, keys: Iterable[MessageKey]):
+        """Add keys to subscriber.
+
+        :param subscriber: added subscriber
+        :param keys: message keys
+        """
+        with self._lock:
+            new_keys = frozenset(keys) - subscriber.keys
+            subscriber.keys = subscriber.keys | new_keys
+            for key in new_keys:
+                self._subscribers[key].add(subscriber)
+
+    def remove_subscriber(self, subscriber: Subscriber):
+        """Remove subscriber.
+
+        :param subscriber: subscriber
+        """
+        with self._lock:
+            for key in subscriber.keys:
+                key_subscribers = self._subscribers.get(key)
+                if key_subscribers is None:
+                    continue
+                key_subscribers.discard(subscriber)
+                if not key_subscribers:
+                    self._subscribers.pop(key)
+
+    def add_waiter(self, key: MessageKey, waiter):
+        """Wait for message of key.
+
+        Waiter is resolved immediately by a kept message.
+
+        :param key: message key
+        :param waiter: future
+        """
+        with self._lock:
+            unclaimed = self._unclaimed.get(key)
+            if unclaimed:
+                waiter.set_result(unclaimed.popleft())
+                return
+            self._waiters[key].append(waiter)
+
+    def add_predicate_waiter(
+        self,
+        fn: Callable[[aiohttp.WSMessage], bool],
+        waiter,
+    ):
+        """Wait for message matched by fn.
+
+        :param fn: message predicate
+        :param waiter: future
+        """
+        with self._lock:
+            for unclaimed in self._unclaimed.values():
+                for msg in unclaimed:
+                    if fn(msg):
+                        unclaimed.remove(msg)
+                        waiter.set_result(msg)
+                        return
+            self._predicate_waiters.append((fn, waiter))
+
+    def remove_waiter(self, waiter):
+        """Remove not resolved waiter (timeout).
+
+        :param waiter: future
+        """
+        with self._lock:
+            for waiters in self._waiters.values():
+                if waiter in waiters:
+                    waiters.remove(waiter)
+            self._predicate_waiters = [
+                (fn, predicate_waiter)
+                for fn, predicate_waiter in self._predicate_waiters
+                if predicate_waiter is not waiter
+            ]
+            self._cleanup()
+
+    def forget_channel(self, channel: str):
+        """Remove kept messages of channel (unsubscribed).
+
+        :param channel: channel name
+        """
+        with self._lock:
+            for key in list(self._unclaimed):
+                if key is not None and key[1] == channel and \
+                   key[0] == 'event':
+                    self._unclaimed.pop(key)
+
+    def close(self, exception: BaseException):
+        """Fail all waiters.
+
+        :param exception: exception for waiters
+        """
+        with self._lock:
+            waiters = [
+                waiter
+                for key_waiters in self._waiters.values()
+                for waiter in key_waiters
+            ]
+            waiters.extend(
+                predicate_waiter
+                for _, predicate_waiter in self._predicate_waiters
+            )
+            self._waiters.clear()
+            self._predicate_waiters = []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_exception(exception)
+
+    def _cleanup(self):
+        """Remove empty waiters queues."""
+        empty_keys: List[Hashable] = [
+            key for key, waiters in self._waiters.items() if not waiters
+        ]
+        for key in empty_keys:
+            self._waiters.pop(key)
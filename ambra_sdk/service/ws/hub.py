@@ -0,0 +1,284 @@
+"""Shared websocket hub."""
+
+import logging
+from concurrent.futures import Future, wait
+from contextlib import contextmanager
+from threading import Lock
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from ambra_sdk.service.ws.dispatcher import (
+    SUBSCRIBER_MAX_SIZE,
+    MessageFilter,
+    OverflowPolicy,
+    WSDispatcher,
+    WSSubscriber,
+    event_keys,
+)
+from ambra_sdk.service.ws.ws import WSManager
+
+logger = logging.getLogger(__name__)
+
+
+class WSHub:
+    """Long-lived websocket connection shared by waiters.
+
+    One websocket (and one thread) serves all waiters of api.
+    Channel subscriptions are reference counted: a channel is
+    subscribed by the first waiter and unsubscribed by the last one.
+    Every event is delivered to all subscribers of it.
+    A waiter with a new sid (refreshed session) subscribes the channel
+    again, subscribers of channel get events marked by any of its sids.
+    Closed connection is restored and channels are resubscribed.
+    Waiters of other channels are not blocked by (un)subscription
+    of channel.
+
+    :Example:
+
+    >>> channel = 'job.{namespace_id}'.format(namespace_id=namespace_id)
+    >>> with api.ws_hub.events(api.sid, channel, ['DONE']) as events:
+    >>>     msg = events.get(timeout=10)
+    """
+
+    def __init__(self, url: str):
+        """Init.
+
+        :param url: websocket channel url
+        """
+        self._url = url
+        self._lock = Lock()
+        self._manager: Optional[WSManager] = None
+        # channel -> number of subscribers
+        self._channels: Dict[str, int] = {}
+        # channel -> sids of subscriptions (the last one is actual)
+        self._sids: Dict[str, List[str]] = {}
+        # subscriber -> channel and event names
+        self._subscribers: Dict[WSSubscriber, Tuple[str, FrozenSet[str]]] = {}
+        # channel -> (un)subscription in progress
+        self._pending: Dict[str, Future] = {}
+        # Dropped messages of stopped websockets
+        self._dropped = 0
+
+    def channels(self) -> Dict[str, int]:
+        """Subscribed channels.
+
+        :return: number of subscribers by channel
+        """
+        with self._lock:
+            return dict(self._channels)
+
+    def dropped(self) -> int:
+        """Number of messages dropped by overflow of buffers.
+
+        Look at dropped attribute of subscriber for its drops.
+
+        :return: number of messages
+        """
+        with self._lock:
+            if self._manager is None:
+                return self._dropped
+            return self._dropped + self._manager.dispatcher.dropped
+
+    def subscribe(
+        self,
+        sid: str,
+        channel: str,
+        events: Iterable[str],
+        match: Optional[MessageFilter] = None,
+        max_size: int = SUBSCRIBER_MAX_SIZE,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+    ) -> WSSubscriber:
+        """Subscribe to events of channel.
+
+        :param sid: sid
+        :param channel: channel
+        :param events: event names
+        :param match: filter of events (None - all events)
+        :param max_size: max number of buffered events of subscriber
+        :param overflow: policy of full buffer
+        :return: subscriber (unsubscribe it after use)
+        """
+        events = frozenset(events)
+        with self._channel_lock(channel):
+            manager = self._get_manager()
+            sids = self._sids.get(channel, [])
+            subscriber = WSSubscriber(
+                event_keys(channel, events, [*sids, sid]),
+                match,
+                max_size,
+                overflow,
+            )
+            # Subscribers are updated before the channel subscription:
+            # events can not be missed
+            manager.dispatcher.add_subscriber(subscriber)
+            if sid not in sids:
+                self._add_sid_keys(manager.dispatcher, channel, sid)
+            self._channels[channel] = self._channels.get(channel, 0) + 1
+            self._subscribers[subscriber] = (channel, events)
+            if sid in sids:
+                return subscriber
+            request: Future = Future()
+            self._pending[channel] = request
+        # Network round-trip is done without lock
+        try:
+            manager.subscribe(sid, channel)
+        except BaseException:
+            with self._lock:
+                self._remove_subscriber(subscriber)
+            raise
+        else:
+            with self._lock:
+                if subscriber in self._subscribers:
+                    self._sids[channel] = [*sids, sid]
+        finally:
+            self._finish_request(channel, request)
+        return subscriber
+
+    def unsubscribe(self, subscriber: WSSubscriber):
+        """Remove subscriber.
+
+        Channel is unsubscribed if it has no subscribers.
+
+        :param subscriber: subscriber
+        """
+        with self._lock:
+            manager = self._manager
+            channel = self._remove_subscriber(subscriber)
+            if channel is None or manager is None or \
+               not manager.is_running():
+                return
+            request: Future = Future()
+            self._pending[channel] = request
+        try:
+            manager.unsubscribe(channel)
+        except TimeoutError:
+            logger.debug('Unsubscribe timeout %s', channel)
+        finally:
+            self._finish_request(channel, request)
+
+    @contextmanager
+    def events(
+        self,
+        sid: str,
+        channel: str,
+        events: Iterable[str],
+        match: Optional[MessageFilter] = None,
+        max_size: int = SUBSCRIBER_MAX_SIZE,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+    ) -> Iterator[WSSubscriber]:
+        """Subscribe to events of channel.
+
+        :param sid: sid
+        :param channel: channel
+        :param events: event names
+        :param match: filter of events (None - all events)
+        :param max_size: max number of buffered events of subscriber
+        :param overflow: policy of full buffer
+        :yields: subscriber
+        """
+        subscriber = self.subscribe(
+            sid,
+            channel,
+            events,
+            match,
+            max_size,
+            overflow,
+        )
+        try:  # NOQA:WPS501
+            yield subscriber
+        finally:
+            self.unsubscribe(subscriber)
+
+    def close(self):
+        """Close websocket."""
+        with self._lock:
+            manager, self._manager = self._manager, None
+            if manager is not None:
+                self._dropped += manager.dispatcher.dropped
+            self._channels = {}
+            self._sids = {}
+            self._subscribers = {}
+        if manager is not None and manager.is_running():
+            manager.stop()
+
+    @contextmanager
+    def _channel_lock(self, channel: str) -> Iterator[None]:
+        """Lock hub when channel has no (un)subscription in progress.
+
+        :param channel: channel
+        :yields: nothing
+        """
+        while True:
+            self._lock.acquire()
+            pending = self._pending.get(channel)
+            if pending is None:
+                break
+            self._lock.release()
+            wait([pending])
+        try:  # NOQA:WPS501
+            yield
+        finally:
+            self._lock.release()
+
+    def _finish_request(self, channel: str, request: Future):
+        """Finish (un)subscription of channel.
+
+        :param channel: channel
+        :param request: (un)subscription
+        """
+        with self._lock:
+            self._pending.pop(channel, None)
+        request.set_result(None)
+
+    def _remove_subscriber(self, subscriber: WSSubscriber) -> Optional[str]:
+        """Remove subscriber (call under lock).
+
+        :param subscriber: subscriber
+        :return: channel without subscribers (unsubscribe it) or None
+        """
+        subscription = self._subscribers.pop(subscriber, None)
+        if subscription is None or self._manager is None:
+            # Hub is closed
+            return None
+        channel, _ = subscription
+        self._manager.dispatcher.remove_subscriber(subscriber)
+        subscribers = self._channels.pop(channel) - 1
+        if subscribers > 0:
+            self._channels[channel] = subscribers
+            return None
+        self._sids.pop(channel, None)
+        return channel
+
+    def _get_manager(self) -> WSManager:
+        """Get running manager (call under lock).
+
+        :return: manager
+        """
+        manager = self._manager
+        if manager is not None and manager.is_running():
+            return manager
+        if manager is not None:
+            logger.debug('Restart stopped websocket')
+            self._dropped += manager.dispatcher.dropped
+        manager = WSManager(self._url)
+        manager.run()
+        self._manager = manager
+        # Move subscribers of the stopped websocket
+        for subscriber in self._subscribers:
+            manager.dispatcher.add_subscriber(subscriber)
+        for channel, sids in self._sids.items():
+            manager.subscribe(sids[-1], channel)
+        return manager
+
+    def _add_sid_keys(self, dispatcher: WSDispatcher, channel: str, sid: str):
+        """Add events of new sid to subscribers of channel.
+
+        :param dispatcher: dispatcher of subscribers
+        :param channel: channel
+        :param sid: new sid of channel
+        """
+        for subscriber, (sub_channel, events) in self._subscribers.items():
+            if sub_channel == channel:
+                dispatcher.add_keys(
+                    subscriber,
+                    event_keys(channel, events, [sid]),
+                )
@@ -1,19 +1,26 @@
 """WS channels."""
 
 import asyncio
-import hashlib
 import json
 import logging
 import sys
 from asyncio import events
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from contextlib import contextmanager
-from queue import Empty, Queue
-from threading import Thread
+from threading import Event, Thread
 from time import monotonic
-from typing import Callable, Dict, List
+from typing import Any, Callable, Dict, List, Optional
 
 import aiohttp
 
+from ambra_sdk.service.ws.dispatcher import (
+    WSDispatcher,
+    event_key,
+    sid_md5,
+    status_key,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -48,6 +55,11 @@ else:
 class WSManager:  # NOQA:WPS214
     """WS manager.
 
+    Websocket is served by an event loop in a separate thread.
+    Requests (subscribe, unsubscribe) are delivered to the loop
+    immediately, received messages are routed to waiters by
+    channel, event and sid (see WSDispatcher).
+
     :Example:
 
     >>> url = 'https://ambra.com/channel/websocket'
@@ -57,7 +69,6 @@ class WSManager:  # NOQA:WPS214
 
     >>> ws = WSManager(url)
     >>> ws.run()
-    >>> time.sleep(10)
     >>> ws.subscribe(sid, channel)
 
     >>> def wait_for_func(msg):
@@ -72,7 +83,6 @@ class WSManager:  # NOQA:WPS214
     >>>     pass
 
     >>> ws.unsubscribe(channel)
-    >>> time.sleep(10)
     >>> ws.stop()
     """
 
@@ -82,11 +92,29 @@ class WSManager:  # NOQA:WPS214
         :param url: websocket channel url
         """
         self._url = url
-        self._requests: Queue = Queue()
-        self._responses: Queue = Queue(maxsize=100)
+        self._dispatcher = WSDispatcher()
+        self._ws: Optional[WS] = None
+        self._manager_thread: Optional[Thread] = None
+        self._runned = False
         self._subscribe_wait_timeout = 10
         self._unsubscribe_wait_timeout = self._subscribe_wait_timeout
 
+    @property
+    def dispatcher(self) -> WSDispatcher:
+        """Dispatcher of received messages.
+
+        :return: dispatcher
+        """
+        return self._dispatcher
+
+    def is_running(self) -> bool:
+        """Check that websocket thread is alive.
+
+        :return: True if runned and not stopped
+        """
+        thread = self._manager_thread
+        return self._runned and thread is not None and thread.is_alive()
+
     def wait_for(
         self,
         fn: Callable[[aiohttp.WSMessage], bool],
@@ -96,26 +124,16 @@ class WSManager:  # NOQA:WPS214
 
         On TimeoutError this func dont stop ws.
         So you need to run this func in try-except block.
+        Prefer wait_for_event: it is routed by key.
 
         :param fn: Function for find message
         :param timeout: timeout
 
-        :raises TimeoutError: timeout error
-
         :returns: message
         """
-        start = monotonic()
-        while True:
-            try:
-                msg: aiohttp.WSMessage = self._responses.get(timeout=timeout)
-            except Empty:
-                logger.debug('No messages in queue')
-                raise TimeoutError
-
-            if fn(msg):
-                return msg
-            if timeout and (monotonic() - start) >= timeout:
-                raise TimeoutError
+        waiter: Future = Future()
+        self._dispatcher.add_predicate_waiter(fn, waiter)
+        return self._wait(waiter, timeout)
 
     def wait_for_event(
         self,
@@ -133,26 +151,12 @@ class WSManager:  # NOQA:WPS214
 
         :return: msg
         """
-        sid_md5 = hashlib.md5(sid.encode()).hexdigest()  # NOQA:S303
-
-        def _is_ready(msg):  # NOQA:WPS430
-            if msg.type != aiohttp.WSMsgType.TEXT:
-                return False
-            msg_json = msg.json()
-            msg_event = msg_json.get('event')
-            msg_channel = msg_json.get('channel')
-            msg_sid_md5 = msg_json.get('sid_md5')
-            if msg_event is None \
-               or msg_channel is None \
-               or msg_sid_md5 is None:
-                return False
-
-            if channel == msg_channel \
-               and msg_sid_md5 == sid_md5 \
-               and msg_event == event:
-                return True
-            return False
-        return self.wait_for(_is_ready, timeout)
+        waiter: Future = Future()
+        self._dispatcher.add_waiter(
+            event_key(channel, event, sid_md5(sid)),
+            waiter,
+        )
+        return self._wait(waiter, timeout)
 
     def wait_for_subscribe(
         self,
@@ -166,20 +170,9 @@ class WSManager:  # NOQA:WPS214
 
         :return: msg
         """
-        def _is_subscribed(msg):  # NOQA:WPS430
-            if msg.type != aiohttp.WSMsgType.TEXT:
-                return False
-            msg_json = msg.json()
-            status = msg_json.get('status')
-            msg_channel = msg_json.get('channel')
-            if status is not None \
-               and msg_channel is not None \
-               and channel == msg_channel \
-               and status == 'OK':
-                return True
-            return False
-
-        return self.wait_for(_is_subscribed, timeout)
+        waiter: Future = Future()
+        self._dispatcher.add_waiter(status_key(channel), waiter)
+        return self._wait(waiter, timeout)
 
     def wait_for_unsubscribe(
         self,
@@ -198,23 +191,29 @@ class WSManager:  # NOQA:WPS214
         return self.wait_for_subscribe(channel, timeout)
 
     def run(self):
-        """Run manager."""
-        ws = WS(
+        """Run manager.
+
+        Returns when the event loop of websocket is started.
+        """
+        started = Event()
+        self._ws = WS(
             url=self._url,
-            responses=self._responses,
-            requests=self._requests,
+            dispatcher=self._dispatcher,
+            started=started,
         )
         self._manager_thread = Thread(
-            target=asyncio_run,
-            args=(ws.run(), ),
+            target=self._serve,
+            args=(self._ws, ),
+            daemon=True,
         )
         self._manager_thread.start()
+        started.wait()
         self._runned = True
 
     def stop(self):
         """Stop manager."""
-        self._requests.put(('STOP', {}))
-        self._manager_thread.join()
+        self._request('STOP', {})
+        self._manager_thread.join()  # type: ignore
         self._runned = False
 
     def subscribe(self, sid: str, channel: str):
@@ -223,24 +222,22 @@ class WSManager:  # NOQA:WPS214
         :param sid: sid
         :param channel: channel
         """
-        self._requests.put(
-            ('SUBSCRIBE', {'sid': sid, 'channel': channel}),
-        )
-        self.wait_for_subscribe(
-            channel,
-            self._subscribe_wait_timeout,
-        )
+        waiter: Future = Future()
+        # Waiter is added before request: answer can not be missed
+        self._dispatcher.add_waiter(status_key(channel), waiter)
+        self._request('SUBSCRIBE', {'sid': sid, 'channel': channel})
+        self._wait(waiter, self._subscribe_wait_timeout)
 
     def unsubscribe(self, channel: str):
         """Subscribe from channel.
 
         :param channel: channel
         """
-        self._requests.put(('UNSUBSCRIBE', {'channel': channel}))
-        self.wait_for_unsubscribe(
-            channel,
-            self._unsubscribe_wait_timeout,
-        )
+        waiter: Future = Future()
+        self._dispatcher.add_waiter(status_key(channel), waiter)
+        self._request('UNSUBSCRIBE', {'channel': channel})
+        self._wait(waiter, self._unsubscribe_wait_timeout)
+        self._dispatcher.forget_channel(channel)
 
     @contextmanager
     def channels(
@@ -279,6 +276,55 @@ class WSManager:  # NOQA:WPS214
         with self.channels(sid, channel_names=[channel_name]) as ws:
             yield ws
 
+    def _request(self, request_type: str, kwargs: Dict[str, Any]):
+        """Send request to websocket loop.
+
+        :param request_type: request type
+        :param kwargs: request kwargs
+        :raises RuntimeError: Manager is not runned
+        """
+        ws = self._ws
+        if ws is None or ws.loop is None or ws.loop.is_closed():
+            raise RuntimeError('Not runned')
+        ws.loop.call_soon_threadsafe(ws.request, request_type, kwargs)
+
+    def _wait(
+        self,
+        waiter: Future,
+        timeout: Optional[float],
+    ) -> aiohttp.WSMessage:
+        """Wait for waiter result.
+
+        :param waiter: waiter
+        :param timeout: timeout
+
+        :raises TimeoutError: timeout error
+
+        :return: message
+        """
+        try:
+            return waiter.result(timeout=timeout)
+        except FutureTimeoutError:
+            self._dispatcher.remove_waiter(waiter)
+            # Message can be dispatched before removing
+            if waiter.done():
+                return waiter.result()
+            logger.debug('No messages')
+            raise TimeoutError
+
+    def _serve(self, ws: 'WS'):
+        """Serve websocket (manager thread).
+
+        :param ws: websocket
+        """
+        try:
+            asyncio_run(ws.run())
+        except Exception as exception:  # NOQA:B902
+            logger.exception('Websocket error')
+            self._dispatcher.close(exception)
+        else:
+            self._dispatcher.close(RuntimeError('Websocket is stopped'))
+
 
 class WS:  # NOQA: WPS214
     """WS.
@@ -289,21 +335,22 @@ class WS:  # NOQA: WPS214
     In this case WS recreate connection and
     resubscribe channels
 
-    Communication with WS through
-    responses and requests queues.
+    Requests are put to the loop by WS.request
+    (loop.call_soon_threadsafe from other threads),
+    received messages are passed to dispatcher.
     """
 
     def __init__(
         self,
         url: str,
-        responses: Queue,
-        requests: Queue,
+        dispatcher: WSDispatcher,
+        started: Event,
     ):
         """Init.
 
         :param url: websocket url
-        :param responses: responses queue
-        :param requests: requests queue
+        :param dispatcher: dispatcher of received messages
+        :param started: set when the loop is ready for requests
         """
         self._url = url
         self._channels: Dict[str, str] = {}
@@ -311,17 +358,28 @@ class WS:  # NOQA: WPS214
         self._ws = None
         self._last_ping = None
         self._ping_interval = INACTIVITY_TIMEOUT
-        self._check_request_interval = 2
-        self._manager_thread = None
         self._runned = False
-        self._requests = requests
-        self._responses = responses
+        self._dispatcher = dispatcher
+        self._started = started
+        self._requests: Optional[asyncio.Queue] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def request(self, request_type: str, kwargs: Dict[str, Any]):
+        """Put request (call in loop).
+
+        :param request_type: SUBSCRIBE, UNSUBSCRIBE or STOP
+        :param kwargs: request kwargs
+        """
+        self._requests.put_nowait((request_type, kwargs))  # type: ignore
 
     async def run(self):
         """Run websocket handlers."""
         self._runned = True
         self._ws_lock = asyncio.Lock()
         self._session_lock = asyncio.Lock()
+        self._requests = asyncio.Queue()
+        self.loop = asyncio_get_running_loop()
+        self._started.set()
         try:  # NOQA:WPS501
             await asyncio.gather(
                 self._request_handler(),
@@ -351,22 +409,18 @@ class WS:  # NOQA: WPS214
             elif self._ws.closed:
                 logger.debug('Restart ws connection')
                 self._ws = await self._session.ws_connect(self._url)
-                await self._resubscribe()
+                await self._resubscribe(self._ws)
             return self._ws
 
-    def _get_from_requests(self):
-        return self._requests.get(timeout=self._check_request_interval)
-
     async def _request_handler(self):
         logger.debug('Start request handler')
-        loop = asyncio_get_running_loop()
         while True:
             try:
-                # This is blocking. So run in executor
-                request_type, kwargs = await loop.run_in_executor(
-                    None, self._get_from_requests,
+                request_type, kwargs = await asyncio.wait_for(
+                    self._requests.get(),  # type: ignore
+                    timeout=self._ping_interval,
                 )
-            except Empty:
+            except asyncio.TimeoutError:
                 await self._ping()
                 continue
 
@@ -388,10 +442,14 @@ class WS:  # NOQA: WPS214
             msg = await ws.receive()
             logger.debug('Recieved: %s', str(msg))
             if msg.type == aiohttp.WSMsgType.TEXT:
-                self._responses.put(msg)
+                self._dispatcher.dispatch(msg)
             elif msg.type == aiohttp.WSMsgType.CLOSING:
                 continue
-            elif msg.type == aiohttp.WSMsgType.CLOSED:
+            elif msg.type in {
+                aiohttp.WSMsgType.CLOSE,
+                aiohttp.WSMsgType.CLOSED,
+                aiohttp.WSMsgType.ERROR,
+            }:
                 logger.debug('Connection closed')
                 # refresh socket
                 ws = await self._get_ws()
@@ -406,20 +464,26 @@ class WS:  # NOQA: WPS214
     async def _subscribe(self, sid, channel):
         logger.debug('Subscribe %s', channel)
         self._channels[channel] = sid
-        sub_request = json.dumps(
+        ws = await self._get_ws()
+        await ws.send_str(self._subscribe_request(sid, channel))
+
+    async def _resubscribe(self, ws):
+        # Connection is locked, so send to it directly
+        logger.debug('Resubscribe')
+        for channel, sid in self._channels.items():
+            # Answer is consumed (not waited): it is not an answer
+            # for the next request of channel
+            self._dispatcher.add_waiter(status_key(channel), Future())
+            await ws.send_str(self._subscribe_request(sid, channel))
+
+    def _subscribe_request(self, sid, channel):
+        return json.dumps(
             {
                 'action': 'subscribe',
                 'channel': channel,
                 'sid': sid,
             },
         )
-        ws = await self._get_ws()
-        await ws.send_str(sub_request)
-
-    async def _resubscribe(self):
-        logger.debug('Resubscribe')
-        for channel, sid in self._channels.items():
-            await self._subscribe(sid, channel)
 
     async def _unsubscribe(self, channel):
         logger.debug('Unsubscribe %s', channel)
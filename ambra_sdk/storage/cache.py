@@ -0,0 +1,300 @@
+"""Local disk cache of storage images.
+
+Image version is a hash of image content, so a downloaded image
+(or a frame rendered from it) of a concrete version never changes.
+Cached files are named by a hash of
+(namespace, study_uid, image_uid, image_version, params)
+and can be shared between processes of one host.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+from pathlib import Path
+from threading import Lock
+from time import time
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple, Union
+
+DEFAULT_IMAGE_CACHE_SIZE = 1024 ** 3  # 1 Gb
+# After eviction the cache size is not more than this part of max size
+EVICTION_RATIO = 0.9
+# Not finished writes older than this number of seconds are removed
+STALE_TMP_AGE = 3600
+TMP_SUFFIX = '.tmp'
+
+
+def is_content_version(image_version: Optional[str]) -> bool:
+    """Check that image version is a content hash.
+
+    :param image_version: image version
+    :return: False for the latest version ('*')
+    """
+    return bool(image_version) and image_version != '*'
+
+
+class ImageCacheStats(NamedTuple):
+    """Image cache usage.
+
+    hits: number of images read from cache
+    misses: number of images not found in cache
+    evicted: number of removed images (least recently used)
+    size: size of cached images in bytes
+    files: number of cached images
+    """
+
+    hits: int
+    misses: int
+    evicted: int
+    size: int
+    files: int
+
+
+class ImageCache:
+    """Size bounded local disk LRU cache of storage images.
+
+    Files are written atomically (temporary file and rename)
+    and read by memory mapping.
+
+    :Example:
+
+    >>> api.image_cache = ImageCache('/var/cache/ambra', max_size=10 * 1024 ** 3)
+    >>> # Downloaded once, next calls read the local file
+    >>> api.Addon.Dicom.get(
+    >>>     namespace_id=namespace,
+    >>>     study_uid=study_uid,
+    >>>     image_uid=image_uid,
+    >>>     image_version=image_version,
+    >>> )
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        max_size: int = DEFAULT_IMAGE_CACHE_SIZE,
+    ):
+        """Init.
+
+        :param path: cache directory
+        :param max_size: max size of cached images in bytes
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self._lock = Lock()
+        # path -> (size, last usage time)
+        self._files: Dict[Path, Tuple[int, float]] = {}
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evicted = 0
+        self._scan()
+
+    @staticmethod
+    def key(  # NOQA:WPS211
+        namespace: str,
+        study_uid: str,
+        image_uid: str,
+        image_version: str,
+        **params: Any,
+    ) -> str:
+        """Get cache key.
+
+        :param namespace: storage namespace
+        :param study_uid: study uid
+        :param image_uid: image uid
+        :param image_version: image version (content hash)
+        :param params: request params (frame number, depth, size...).
+            None values are ignored.
+        :return: key
+        """
+        request_params = {
+            param_name: param_value
+            for param_name, param_value in params.items()
+            if param_value is not None
+        }
+        dumped = json.dumps(
+            [namespace, study_uid, image_uid, image_version, request_params],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(dumped.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[mmap.mmap]:
+        """Get memory mapped cached image.
+
+        :param key: key
+        :return: read only memory map (close it after use) or None
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as cached_file:
+                mapped = mmap.mmap(
+                    cached_file.fileno(),
+                    0,
+                    access=mmap.ACCESS_READ,
+                )
+        except (OSError, ValueError):
+            # Not cached, evicted by another process or empty
+            with self._lock:
+                self._misses += 1
+                self._forget(path)
+            return None
+        now = time()
+        try:
+            # Modification time is the usage time for other processes
+            os.utime(path, (now, now))
+        except OSError:
+            pass  # NOQA:WPS420
+        with self._lock:
+            self._hits += 1
+            self._remember(path, len(mapped), now)
+        return mapped
+
+    def set(self, key: str, content: bytes):  # NOQA:WPS125
+        """Cache image.
+
+        :param key: key
+        :param content: image content
+        """
+        mapped = self.write(key, [content])
+        if mapped is not None:
+            mapped.close()
+
+    def write(self, key: str, chunks: Iterable[bytes]) -> Optional[mmap.mmap]:
+        """Cache image from chunks.
+
+        The image is visible in cache only after all chunks are written.
+
+        :param key: key
+        :param chunks: image content chunks
+        :return: read only memory map of the image (close it after use)
+            or None for empty image
+        """
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        tmp_fd, tmp_path = tempfile.mkstemp(
+            dir=str(self.path),
+            suffix=TMP_SUFFIX,
+        )
+        try:
+            with os.fdopen(tmp_fd, 'w+b') as tmp_file:
+                for chunk in chunks:
+                    tmp_file.write(chunk)
+                tmp_file.flush()
+                size = tmp_file.tell()
+                # Map before rename: the image can be evicted
+                # by another process right after it becomes visible
+                mapped = mmap.mmap(
+                    tmp_file.fileno(),
+                    0,
+                    access=mmap.ACCESS_READ,
+                ) if size else None
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        with self._lock:
+            self._remember(path, size, time())
+            if self._size > self.max_size:
+                self._evict()
+        return mapped
+
+    def invalidate(self, key: Optional[str] = None):
+        """Remove cached images.
+
+        :param key: key (None - all images)
+        """
+        with self._lock:
+            if key is None:
+                self._scan()
+            paths = list(self._files) if key is None else [self._path(key)]
+            for path in paths:
+                self._remove(path)
+
+    def stats(self) -> ImageCacheStats:
+        """Get cache usage.
+
+        :return: cache stats
+        """
+        with self._lock:
+            return ImageCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evicted=self._evicted,
+                size=self._size,
+                files=len(self._files),
+            )
+
+    def _path(self, key: str) -> Path:
+        """Get path of cached image.
+
+        :param key: key
+        :return: path
+        """
+        return self.path / key[:2] / key
+
+    def _remember(self, path: Path, size: int, used: float):
+        """Add image to index.
+
+        :param path: path of cached image
+        :param size: image size
+        :param used: last usage time
+        """
+        self._forget(path)
+        self._files[path] = (size, used)
+        self._size += size
+
+    def _forget(self, path: Path):
+        """Remove image from index.
+
+        :param path: path of cached image
+        """
+        cached = self._files.pop(path, None)
+        if cached is not None:
+            self._size -= cached[0]
+
+    def _remove(self, path: Path):
+        """Remove cached image.
+
+        :param path: path of cached image
+        """
+        self._forget(path)
+        try:
+            path.unlink()
+        except OSError:
+            pass  # NOQA:WPS420
+
+    def _scan(self):
+        """Build index from cache directory.
+
+        Other processes can add and remove files,
+        so the index is rebuilt before eviction.
+        """
+        self._files = {}
+        self._size = 0
+        now = time()
+        for path in self.path.glob('*/*'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            self._remember(path, stat.st_size, stat.st_mtime)
+        for tmp_path in self.path.glob('*' + TMP_SUFFIX):
+            try:
+                if now - tmp_path.stat().st_mtime > STALE_TMP_AGE:
+                    tmp_path.unlink()
+            except OSError:
+                continue
+
+    def _evict(self):
+        """Remove least recently used images."""
+        self._scan()
+        target_size = self.max_size * EVICTION_RATIO
+        by_usage = sorted(self._files.items(), key=lambda cached: cached[1][1])
+        for path, _ in by_usage:
+            if self._size <= target_size:
+                break
+            self._remove(path)
+            self._evicted += 1
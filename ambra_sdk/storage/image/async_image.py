@@ -210,7 +210,7 @@ class AsyncImage(BaseImage):
         self,
         engine_fqdn: str,
         upload_uuid: str,
-        bytes_part: bytes,
+        bytes_part: Union[bytes, memoryview],
         chunk_number: int,
         only_prepare: bool = False,
     ) -> Union[ClientResponse, PreparedRequest]:
@@ -220,7 +220,7 @@ class AsyncImage(BaseImage):
 
         :param engine_fqdn: Engine FQDN (Required).
         :param upload_uuid: UUID of the initiated multipart upload (Required).
-        :param bytes_part: part of image (Required).
+        :param bytes_part: part of image, bytes or memoryview (Required).
         :param chunk_number: sequence number, first part has number 0 (Required).
         :param only_prepare: Get prepared request.
 
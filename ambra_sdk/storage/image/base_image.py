@@ -2,7 +2,7 @@
 
 import os
 import zlib
-from typing import Optional, Set
+from typing import Optional, Set, Union
 
 from aiohttp import FormData
 
@@ -303,7 +303,7 @@ class BaseImage:
         self,
         engine_fqdn: str,
         upload_uuid: str,
-        bytes_part: bytes,
+        bytes_part: Union[bytes, memoryview],
         chunk_number: int,
     ) -> PreparedRequest:
         """Upload a part of image.
@@ -312,7 +312,7 @@ class BaseImage:
 
         :param engine_fqdn: Engine FQDN (Required).
         :param upload_uuid: UUID of the initiated multipart upload (Required).
-        :param bytes_part: part of image (Required).
+        :param bytes_part: part of image, bytes or memoryview (Required).
         :param chunk_number: sequence number, first part has number 0 (Required).
 
         :returns: status code
@@ -1,4 +1,5 @@
 from enum import Enum
+from io import SEEK_CUR, SEEK_END, SEEK_SET, RawIOBase
 from typing import TYPE_CHECKING, Any, Dict, Optional, Union
 
 from aiohttp import ClientResponse, FormData
@@ -24,6 +25,81 @@ class StorageMethod(Enum):
 REQUEST_FILES_TYPE = Optional[Union[Dict[str, RequestsFileType], FormData]]
 
 
+class BufferReader(RawIOBase):
+    """File-like reader of memoryview.
+
+    Requests treats memoryview as iterable of ints,
+    so memoryview data is sent with this reader without copying
+    the whole buffer (http client reads it by small blocks).
+    """
+
+    def __init__(self, buffer: memoryview):
+        """Init.
+
+        :param buffer: buffer
+        """
+        super().__init__()
+        self._buffer = buffer.cast('B')
+        self._position = 0
+
+    def __len__(self) -> int:
+        """Length of buffer.
+
+        :return: length
+        """
+        return len(self._buffer)
+
+    def readable(self) -> bool:
+        """Is readable.
+
+        :return: True
+        """
+        return True
+
+    def seekable(self) -> bool:
+        """Is seekable.
+
+        :return: True
+        """
+        return True
+
+    def readinto(self, target) -> int:
+        """Read into target buffer.
+
+        :param target: target buffer
+        :return: number of read bytes
+        """
+        length = min(len(target), len(self._buffer) - self._position)
+        if length <= 0:
+            return 0
+        end = self._position + length
+        target[:length] = self._buffer[self._position:end]
+        self._position = end
+        return length
+
+    def seek(self, offset: int, whence: int = SEEK_SET) -> int:
+        """Change position.
+
+        :param offset: offset
+        :param whence: SEEK_SET, SEEK_CUR or SEEK_END
+        :return: new position
+        """
+        base = {
+            SEEK_SET: 0,
+            SEEK_CUR: self._position,
+            SEEK_END: len(self._buffer),
+        }[whence]
+        self._position = max(base + offset, 0)
+        return self._position
+
+    def tell(self) -> int:
+        """Get position.
+
+        :return: position
+        """
+        return self._position
+
+
 class PreparedRequest:  # NOQA:WPS230
     """Prepared request."""
 
@@ -87,7 +163,9 @@ class PreparedRequest:  # NOQA:WPS230
         if self.params is not None:
             request_kwargs['params'] = self.params
 
-        if self.data is not None:
+        if isinstance(self.data, memoryview):
+            request_kwargs['data'] = BufferReader(self.data)
+        elif self.data is not None:
             request_kwargs['data'] = self.data
 
         if self.headers is not None:
@@ -0,0 +1,155 @@
+"""Benchmark of Addon.Dicom.get memory usage.
+
+Measure peak python memory of getting a large dicom
+from a local http server: buffered payload (previous implementation)
+and streamed payload (full, deferred pixel data, headers only).
+
+Usage:
+
+    python -m benchmarks.dicom_get --size 256
+"""
+
+import argparse
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import BytesIO
+from socketserver import ThreadingMixIn
+from threading import Thread
+from time import perf_counter
+from typing import Any, Callable, Tuple
+
+import pydicom
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+
+from ambra_sdk.api import Api
+
+MB = 1024 * 1024
+
+
+def make_dicom(size: int) -> bytes:
+    """Make dicom with pixel data of given size.
+
+    :param size: pixel data size in bytes
+    :return: dicom file content
+    """
+    file_meta = FileMetaDataset()
+    file_meta.MediaStorageSOPClassUID = '1.2.840.10008.5.1.4.1.1.7'
+    file_meta.MediaStorageSOPInstanceUID = generate_uid()
+    file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    dataset = Dataset()
+    dataset.file_meta = file_meta
+    dataset.preamble = b'\0' * 128
+    dataset.SOPClassUID = file_meta.MediaStorageSOPClassUID
+    dataset.SOPInstanceUID = file_meta.MediaStorageSOPInstanceUID
+    dataset.PatientName = 'Benchmark'
+    # Frames of 1024x1024 8 bit pixels (1 Mb)
+    dataset.Rows = 1024
+    dataset.Columns = 1024
+    dataset.BitsAllocated = 8
+    dataset.NumberOfFrames = max(size // MB, 1)
+    dataset.PixelData = b'\1' * size
+    dicom_file = BytesIO()
+    pydicom.dcmwrite(dicom_file, dataset)
+    return dicom_file.getvalue()
+
+
+def serve(content: bytes) -> Tuple[HTTPServer, str]:
+    """Serve content on a local http server.
+
+    :param content: response content
+    :return: server and engine fqdn
+    """
+
+    class Handler(BaseHTTPRequestHandler):  # NOQA:WPS431
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):  # NOQA:N802
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            try:
+                self.wfile.write(content)
+            except ConnectionError:
+                # Headers only reading closes the connection
+                return
+
+        def log_message(self, *args):  # NOQA:WPS110
+            """Disable logging."""
+
+    class Server(ThreadingMixIn, HTTPServer):  # NOQA:WPS431
+        daemon_threads = True
+
+    server = Server(('127.0.0.1', 0), Handler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server, '127.0.0.1:{port}'.format(port=server.server_address[1])
+
+
+def measure(get: Callable[[], Any]) -> Tuple[float, float]:
+    """Measure peak memory and time.
+
+    :param get: get dicom function
+    :return: peak memory in Mb and seconds
+    """
+    tracemalloc.start()
+    start = perf_counter()
+    dataset = get()
+    duration = perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del dataset  # NOQA:WPS420
+    return peak / MB, duration
+
+
+def main():
+    """Run benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=256, help='Mb of pixels')
+    args = parser.parse_args()
+    server, engine_fqdn = serve(make_dicom(args.size * MB))
+    api = Api.with_sid(url='http://127.0.0.1', sid='sid', rate_limits=None)
+    api.Storage.STORAGE_BASE_URL = 'http://{engine_fqdn}/api/v3/storage'
+    image_args = {
+        'namespace_id': 'namespace',
+        'study_uid': 'study_uid',
+        'image_uid': 'image_uid',
+        'engine_fqdn': engine_fqdn,
+    }
+
+    def buffered():  # NOQA:WPS430
+        response = api.Storage.Image.dicom_payload(
+            engine_fqdn=engine_fqdn,
+            namespace='namespace',
+            study_uid='study_uid',
+            image_uid='image_uid',
+            image_version='*',
+        )
+        return pydicom.dcmread(BytesIO(response.content), force=True)
+
+    variants = {
+        'buffered (before)': buffered,
+        'streamed': lambda: api.Addon.Dicom.get(**image_args),
+        'defer_size=1 MB': lambda: api.Addon.Dicom.get(
+            defer_size='1 MB',
+            **image_args,
+        ),
+        'stop_before_pixels': lambda: api.Addon.Dicom.get(
+            stop_before_pixels=True,
+            **image_args,
+        ),
+    }
+    print('pixel data: {size} Mb'.format(size=args.size))  # NOQA:WPS421
+    for name, get in variants.items():
+        peak, duration = measure(get)
+        print(  # NOQA:WPS421
+            '{name:<20} peak {peak:>8.1f} Mb {duration:>8.2f} s'.format(
+                name=name,
+                peak=peak,
+                duration=duration,
+            ),
+        )
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
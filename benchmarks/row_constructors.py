@@ -0,0 +1,90 @@
+"""Benchmark of row constructors.
+
+Measure rows per second for every row representation
+of paginated responses.
+
+Usage:
+
+    python -m benchmarks.row_constructors --rows 100000
+"""
+
+import argparse
+import json
+from time import perf_counter
+from typing import Any, Callable, Dict, List
+
+from box import Box
+
+from ambra_sdk.models import Study
+from ambra_sdk.service.entrypoints.study import StudyBox
+from ambra_sdk.service.rows import TupleConstructor, as_dict, record_class
+
+
+def make_rows(rows_count: int) -> List[Dict[str, Any]]:
+    """Make study like rows.
+
+    :param rows_count: number of rows
+    :return: rows
+    """
+    row = {
+        'uuid': '1.2.3.4',
+        'study_uid': '1.2.840.1.2.3',
+        'patient_name': 'Doe^John',
+        'patientid': 'PID',
+        'modality': 'CT',
+        'study_date': '20200101',
+        'created': '2020-01-01 00:00:00',
+        'phi_namespace': 'namespace',
+        'storage_namespace': 'namespace',
+        'customfields': [
+            {'uuid': 'cf{n}'.format(n=n), 'name': 'name', 'value': n}
+            for n in range(5)
+        ],
+        'attachment_count': 0,
+    }
+    page = json.dumps(row)
+    # Each row is a separate object as in decoded response
+    return [json.loads(page) for _ in range(rows_count)]
+
+
+def rows_per_second(
+    constructor: Callable[[Dict[str, Any]], Any],
+    rows: List[Dict[str, Any]],
+) -> float:
+    """Measure rows per second.
+
+    :param constructor: row constructor
+    :param rows: rows
+    :return: rows per second
+    """
+    start = perf_counter()
+    for row in rows:
+        constructor(row)
+    return len(rows) / (perf_counter() - start)
+
+
+def main():
+    """Run benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+    fields = ['uuid', 'study_uid', 'patient_name', 'modality']
+    constructors = {
+        'Box': Box,
+        'StudyBox': StudyBox,
+        'as_dicts': as_dict,
+        'as_tuples': TupleConstructor(fields),
+        'as_records (fields)': record_class(Study, fields),
+        'as_records (all)': record_class(Study),
+    }
+    for name, constructor in constructors.items():
+        rows = make_rows(args.rows)
+        rate = rows_per_second(constructor, rows)
+        print('{name:<20} {rate:>12,.0f} rows/sec'.format(  # NOQA:WPS421
+            name=name,
+            rate=rate,
+        ))
+
+
+if __name__ == '__main__':
+    main()
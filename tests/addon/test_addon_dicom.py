@@ -1,7 +1,21 @@
+import gc
+import tempfile
+from io import BytesIO, RawIOBase
 from pathlib import Path
+from threading import Lock
+from time import sleep
 
+import pytest
+import requests
 from pydicom.dataset import FileDataset
 
+from ambra_sdk.addon.chunks import BufferedChunks, FileChunks
+from ambra_sdk.addon.journal import UploadJournal
+from ambra_sdk.api import Api
+from ambra_sdk.exceptions.base import AmbraResponseException
+from ambra_sdk.storage.cache import ImageCache
+from ambra_sdk.storage.request import BufferReader
+
 
 class TestAddonDicom:
     """Test addon dicom namespace."""
@@ -86,3 +100,479 @@ class TestAddonDicom:
         assert image_params.image_version
         assert image_params.namespace == namespace_id
         assert image_params.attr
+
+
+class TestAddonDicomMultipartUpload:
+    """Test multipart upload."""
+
+    @pytest.fixture
+    def multipart_api(self, monkeypatch):
+        """Api with mocked multipart upload methods.
+
+        :param monkeypatch: monkeypatch
+        :return: api and uploaded chunks
+        """
+        api = Api.with_sid(url='http://127.0.0.1', sid='sid', rate_limits=None)
+        uploaded = {'chunks': {}, 'failed': set(), 'active': 0, 'max_active': 0}
+        lock = Lock()
+        image = api.Storage.Image
+
+        def multipart_chunk_upload(
+            engine_fqdn,
+            upload_uuid,
+            bytes_part,
+            chunk_number,
+        ):
+            with lock:
+                uploaded['active'] += 1
+                uploaded['max_active'] = max(
+                    uploaded['max_active'],
+                    uploaded['active'],
+                )
+            sleep(0.01)
+            with lock:
+                uploaded['active'] -= 1
+                if chunk_number not in uploaded['failed']:
+                    uploaded['failed'].add(chunk_number)
+                    raise AmbraResponseException(503, 'Unavailable')
+                uploaded['chunks'][chunk_number] = bytes(bytes_part)
+
+        def multipart_complete(**kwargs):
+            uploaded['complete'] = kwargs
+
+        monkeypatch.setattr(
+            image,
+            'multipart_initiate',
+            lambda engine_fqdn: {'upload_uuid': 'upload_uuid'},
+        )
+        monkeypatch.setattr(
+            image,
+            'multipart_chunk_upload',
+            multipart_chunk_upload,
+        )
+        monkeypatch.setattr(image, 'multipart_complete', multipart_complete)
+        monkeypatch.setattr(api.Addon.Dicom, 'UPLOAD_RETRY_DELAY', 0)
+        monkeypatch.setattr(api.Addon.Dicom, 'CHUNK_SIZE', 10000)
+        return api, uploaded
+
+    @pytest.mark.parametrize('workers', [1, 4])
+    def test_multipart_upload(self, multipart_api, workers, monkeypatch):
+        """Test chunks are uploaded with retries before complete."""
+        api, uploaded = multipart_api
+        monkeypatch.setattr(api.Addon.Dicom, 'MULTIPART_WORKERS', workers)
+        dicom_path = Path(__file__) \
+            .parents[1] \
+            .joinpath('dicoms', 'read_only', 'series_1', 'IMG00001.dcm')
+        content = dicom_path.read_bytes()
+        with open(dicom_path, 'rb') as dicom_file:
+            api.Addon.Dicom._multipart_upload(
+                dicom_file=dicom_file,
+                namespace_id='namespace',
+                engine_fqdn='fqdn',
+                study_uid='study_uid',
+            )
+        chunks = uploaded['chunks']
+        assert b''.join(chunks[n] for n in sorted(chunks)) == content
+        assert len(chunks) == len(uploaded['failed'])
+        assert uploaded['complete']['file_size'] == len(content)
+        if workers > 1:
+            assert 1 < uploaded['max_active'] <= workers
+
+    def test_multipart_upload_retry_limit(self, multipart_api, monkeypatch):
+        """Test chunk upload error after retry limit."""
+        api, _ = multipart_api
+        monkeypatch.setattr(api.Addon.Dicom, 'RETRY_LIMIT', 0)
+        with pytest.raises(AmbraResponseException):
+            api.Addon.Dicom._multipart_upload(
+                dicom_file=BytesIO(b'0' * 5000),
+                namespace_id='namespace',
+                engine_fqdn='fqdn',
+                study_uid='study_uid',
+            )
+
+
+class TestAddonDicomUploadJournal:
+    """Test resumable multipart upload."""
+
+    @pytest.fixture
+    def journal_api(self, monkeypatch, tmp_path):
+        """Api with mocked multipart upload methods and upload journal.
+
+        :param monkeypatch: monkeypatch
+        :param tmp_path: temporary directory
+        :return: api and upload calls
+        """
+        api = Api.with_sid(url='http://127.0.0.1', sid='sid', rate_limits=None)
+        calls = {'initiated': [], 'chunks': [], 'fail': None}
+        image = api.Storage.Image
+
+        def multipart_initiate(engine_fqdn):
+            upload_uuid = 'upload_{n}'.format(n=len(calls['initiated']))
+            calls['initiated'].append(upload_uuid)
+            return {'upload_uuid': upload_uuid}
+
+        def multipart_chunk_upload(
+            engine_fqdn,
+            upload_uuid,
+            bytes_part,
+            chunk_number,
+        ):
+            if calls['fail'] is not None and calls['fail'](
+                upload_uuid,
+                chunk_number,
+            ):
+                raise AmbraResponseException(400, 'Bad request')
+            calls['chunks'].append((upload_uuid, chunk_number))
+
+        def multipart_complete(**kwargs):
+            calls['complete'] = kwargs
+
+        monkeypatch.setattr(image, 'multipart_initiate', multipart_initiate)
+        monkeypatch.setattr(
+            image,
+            'multipart_chunk_upload',
+            multipart_chunk_upload,
+        )
+        monkeypatch.setattr(image, 'multipart_complete', multipart_complete)
+        monkeypatch.setattr(api.Addon.Dicom, 'MULTIPART_WORKERS', 1)
+        monkeypatch.setattr(api.Addon.Dicom, 'CHUNK_SIZE', 10000)
+        monkeypatch.setattr(
+            api.Addon.Dicom,
+            'UPLOAD_JOURNAL',
+            UploadJournal(tmp_path / 'journal.jsonl'),
+        )
+        return api, calls
+
+    @pytest.fixture
+    def dicom_path(self, tmp_path):
+        """Copy of dicom file.
+
+        :param tmp_path: temporary directory
+        :return: dicom path
+        """
+        dicom_path = tmp_path / 'image.dcm'
+        dicom_path.write_bytes(
+            Path(__file__)
+            .parents[1]
+            .joinpath('dicoms', 'read_only', 'series_1', 'IMG00001.dcm')
+            .read_bytes(),
+        )
+        return dicom_path
+
+    def _upload(self, api, dicom_path):
+        with open(dicom_path, 'rb') as dicom_file:
+            api.Addon.Dicom._multipart_upload(
+                dicom_file=dicom_file,
+                namespace_id='namespace',
+                engine_fqdn='fqdn',
+                study_uid='study_uid',
+            )
+
+    def test_resume(self, journal_api, dicom_path, tmp_path):
+        """Test interrupted upload is resumed from the journal."""
+        api, calls = journal_api
+        calls['fail'] = lambda upload_uuid, chunk_number: chunk_number == 3
+        with pytest.raises(AmbraResponseException):
+            self._upload(api, dicom_path)
+        assert calls['chunks'] == [('upload_0', n) for n in range(3)]
+
+        # New process reads the journal
+        journal_path = tmp_path / 'journal.jsonl'
+        api.Addon.Dicom.UPLOAD_JOURNAL = UploadJournal(journal_path)
+        calls['fail'] = None
+        calls['chunks'] = []
+        self._upload(api, dicom_path)
+        chunks_count = -(-dicom_path.stat().st_size // 10000)
+        assert calls['initiated'] == ['upload_0']
+        assert calls['chunks'] == [
+            ('upload_0', n) for n in range(3, chunks_count)
+        ]
+        assert calls['complete']['upload_uuid'] == 'upload_0'
+
+        # Completed upload is removed from the journal
+        UploadJournal(journal_path)
+        assert not journal_path.read_text()
+
+    def test_broken_record(self, tmp_path):
+        """Test records are not appended to the broken last line."""
+        journal_path = tmp_path / 'journal.jsonl'
+        journal = UploadJournal(journal_path)
+        journal.start('key', 'upload_0', 10)
+        journal.record_chunk('key', 'upload_0', 0)
+        with open(journal_path, 'a') as journal_file:
+            journal_file.write('{"key": "key", "upload_uuid": "upl')
+        journal = UploadJournal(journal_path)
+        journal.record_chunk('key', 'upload_0', 1)
+        state = UploadJournal(journal_path).find('key', 10)
+        assert state.chunks == {0, 1}
+        assert len(journal_path.read_text().splitlines()) == 3
+
+    def test_expired_upload(self, journal_api, dicom_path):
+        """Test rejected resumed upload is started from scratch."""
+        api, calls = journal_api
+        calls['fail'] = lambda upload_uuid, chunk_number: chunk_number == 3
+        with pytest.raises(AmbraResponseException):
+            self._upload(api, dicom_path)
+        calls['fail'] = lambda upload_uuid, chunk_number: \
+            upload_uuid == 'upload_0'
+        calls['chunks'] = []
+        self._upload(api, dicom_path)
+        chunks_count = -(-dicom_path.stat().st_size // 10000)
+        assert calls['initiated'] == ['upload_0', 'upload_1']
+        assert calls['chunks'] == [
+            ('upload_1', n) for n in range(chunks_count)
+        ]
+        assert calls['complete']['upload_uuid'] == 'upload_1'
+
+    def test_changed_file(self, journal_api, dicom_path):
+        """Test changed file is not resumed."""
+        api, calls = journal_api
+        calls['fail'] = lambda upload_uuid, chunk_number: chunk_number == 3
+        with pytest.raises(AmbraResponseException):
+            self._upload(api, dicom_path)
+        with open(dicom_path, 'ab') as dicom_file:
+            dicom_file.write(b'\0')
+        calls['fail'] = None
+        self._upload(api, dicom_path)
+        assert calls['initiated'] == ['upload_0', 'upload_1']
+        assert calls['complete']['upload_uuid'] == 'upload_1'
+
+
+DICOM_PATH = Path(__file__) \
+    .parents[1] \
+    .joinpath('dicoms', 'read_only', 'series_1', 'IMG00001.dcm')
+
+
+class PayloadResponse:
+    """Streamed dicom payload response."""
+
+    def __init__(self, content, chunk_size=4096):
+        self.content = content
+        self.chunk_size = chunk_size
+        self.sent = 0
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        while self.sent < len(self.content):
+            chunk = self.content[self.sent:self.sent + self.chunk_size]
+            self.sent += len(chunk)
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def payload_api(monkeypatch, tmp_path):
+    """Api with mocked streamed dicom payload.
+
+    :param monkeypatch: monkeypatch
+    :param tmp_path: temporary directory (for spooled files)
+    :return: api and payload responses
+    """
+    api = Api.with_sid(url='http://127.0.0.1', sid='sid', rate_limits=None)
+    responses = []
+
+    def dicom_payload(image_version, **kwargs):  # NOQA:WPS430
+        response = PayloadResponse(DICOM_PATH.read_bytes())
+        responses.append((image_version, response))
+        return response
+
+    monkeypatch.setattr(api.Storage.Image, 'dicom_payload', dicom_payload)
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path))
+    return api, responses
+
+
+def get_dicom(api, image_version='*', **kwargs):
+    """Get dicom from mocked storage.
+
+    :param api: api
+    :param image_version: image version
+    :param kwargs: get kwargs
+    :return: dataset
+    """
+    return api.Addon.Dicom.get(
+        namespace_id='namespace',
+        study_uid='study_uid',
+        image_uid='image_uid',
+        image_version=image_version,
+        engine_fqdn='fqdn',
+        **kwargs,
+    )
+
+
+class TestAddonDicomStreamingGet:
+    """Test dicom get without buffering payload in memory."""
+
+    def test_get(self, payload_api, tmp_path):
+        """Test payload is spooled and removed."""
+        api, responses = payload_api
+        dicom = get_dicom(api)
+        assert len(dicom.PixelData) == 179080
+        assert responses[0][1].closed
+        assert not list(tmp_path.iterdir())
+
+    def test_stop_before_pixels(self, payload_api):
+        """Test only headers are downloaded."""
+        api, responses = payload_api
+        dicom = get_dicom(api, stop_before_pixels=True)
+        assert 'PixelData' not in dicom
+        assert dicom.SOPInstanceUID
+        response = responses[0][1]
+        assert response.sent < len(response.content) // 10
+        assert response.closed
+
+    def test_defer_size(self, payload_api, tmp_path):
+        """Test deferred pixel data is read from spooled file."""
+        api, _ = payload_api
+        dicom = get_dicom(api, defer_size='1 KB')
+        assert len(list(tmp_path.iterdir())) == 1
+        assert len(dicom.PixelData) == 179080
+        del dicom  # NOQA:WPS420
+        gc.collect()
+        assert not list(tmp_path.iterdir())
+
+
+class TestAddonDicomImageCache:
+    """Test dicom payload from image cache."""
+
+    @pytest.fixture
+    def cached_api(self, payload_api, tmp_path):
+        """Api with image cache.
+
+        :param payload_api: api with mocked dicom payload
+        :param tmp_path: temporary directory
+        :return: api and payload responses
+        """
+        api, responses = payload_api
+        api.image_cache = ImageCache(tmp_path / 'cache')
+        return api, responses
+
+    def test_cached_version(self, cached_api):
+        """Test image of concrete version is downloaded once."""
+        api, responses = cached_api
+        first = get_dicom(api, 'v1')
+        second = get_dicom(api, 'v1')
+        headers = get_dicom(api, 'v1', stop_before_pixels=True)
+        assert first.SOPInstanceUID == second.SOPInstanceUID
+        assert first.PixelData == second.PixelData
+        assert 'PixelData' not in headers
+        assert [version for version, _ in responses] == ['v1']
+        assert api.image_cache.stats().hits == 2
+
+    def test_cached_defer_size(self, cached_api):
+        """Test deferred values of cached image survive eviction."""
+        api, responses = cached_api
+        get_dicom(api, 'v1')
+        dicom = get_dicom(api, 'v1', defer_size='1 KB')
+        api.image_cache.invalidate()
+        assert len(dicom.PixelData) == 179080
+        assert [version for version, _ in responses] == ['v1']
+
+    def test_written_defer_size(self, cached_api):
+        """Test deferred values of just cached image."""
+        api, responses = cached_api
+        mapped = []
+        write = api.image_cache.write
+
+        def cache_write(key, chunks):  # NOQA:WPS430
+            mapped.append(write(key, chunks))
+            return mapped[-1]
+
+        api.image_cache.write = cache_write
+        dicom = get_dicom(api, 'v1', defer_size='1 KB')
+        api.image_cache.invalidate()
+        assert not mapped[0].closed
+        assert len(dicom.PixelData) == 179080
+        assert [version for version, _ in responses] == ['v1']
+        del dicom  # NOQA:WPS420
+        gc.collect()
+        assert mapped[0].closed
+
+    def test_latest_version(self, cached_api):
+        """Test latest version is not cached."""
+        api, responses = cached_api
+        get_dicom(api)
+        get_dicom(api)
+        assert [version for version, _ in responses] == ['*', '*']
+
+
+class SeekableReader(RawIOBase):
+    """Seekable file without descriptor and buffer."""
+
+    def __init__(self, content):
+        self._content = BytesIO(content)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, target):
+        return self._content.readinto(target)
+
+    def seek(self, offset, whence=0):
+        return self._content.seek(offset, whence)
+
+    def tell(self):
+        return self._content.tell()
+
+
+class TestFileChunks:
+    """Test file chunks."""
+
+    content = bytes(range(256)) * 10
+
+    def test_read(self, tmp_path):
+        """Test read chunks of real and in-memory files."""
+        path = tmp_path / 'file'
+        path.write_bytes(self.content)
+        with open(path, 'rb') as opened_file:
+            sources = (
+                (opened_file, memoryview),
+                (BytesIO(self.content), memoryview),
+                (SeekableReader(self.content), bytes),
+            )
+            for source, chunk_type in sources:
+                with FileChunks(source, 1000) as chunks:
+                    assert chunks.size == len(self.content)
+                    assert len(chunks) == 3
+                    with chunks.chunk(2) as part:
+                        assert isinstance(part, chunk_type)
+                        assert part == self.content[2000:]
+                    assert b''.join(
+                        chunks.read(n) for n in range(len(chunks))
+                    ) == self.content
+
+    def test_empty_file(self, tmp_path):
+        """Test empty file is not mapped."""
+        path = tmp_path / 'file'
+        path.write_bytes(b'')
+        with open(path, 'rb') as opened_file:
+            with FileChunks(opened_file, 1000) as chunks:
+                assert len(chunks) == 0
+
+    def test_buffered_chunks(self):
+        """Test sequential chunks of not seekable stream."""
+        stream = SeekableReader(self.content)
+        chunks = [bytes(part) for part in BufferedChunks(stream, 1000)]
+        assert [len(part) for part in chunks] == [1000, 1000, 560]
+        assert b''.join(chunks) == self.content
+
+
+class TestBufferReader:
+    """Test memoryview reader for requests."""
+
+    def test_post(self, requests_mock):
+        """Test memoryview is posted without iteration by ints."""
+        requests_mock.post('http://127.0.0.1/part')
+        view = memoryview(b'part of file')
+        with BufferReader(view) as reader:
+            assert len(reader) == len(view)
+            assert reader.read(4) == b'part'
+            reader.seek(0)
+            requests.post('http://127.0.0.1/part', data=reader)
+            request = requests_mock.request_history[0]
+            assert request.headers['Content-Length'] == str(len(view))
+            assert request.body.read() == bytes(view)
@@ -0,0 +1,264 @@
+from threading import Timer
+from time import monotonic
+from urllib.parse import parse_qs
+
+import pytest
+from box import Box
+
+from ambra_sdk.addon.backoff import PollBackoff
+from ambra_sdk.api import Api, AsyncApi
+from ambra_sdk.service.ws.dispatcher import sid_md5
+
+
+def job_event(job_id=None):
+    """Job DONE event.
+
+    :param job_id: job id
+    :return: event
+    """
+    event = {
+        'channel': 'job.namespace',
+        'event': 'DONE',
+        'sid_md5': sid_md5('sid'),
+    }
+    if job_id is not None:
+        event['id'] = job_id
+    return event
+
+
+class RequestLog(list):
+    """Requested job ids with times of requests."""
+
+    def __init__(self):
+        super().__init__()
+        self.times = []
+
+    def add(self, job_id):
+        self.append(job_id)
+        self.times.append(monotonic())
+
+
+@pytest.fixture
+def jobs_api(ws_server, requests_mock):
+    """Api with mocked /job/get.
+
+    :param ws_server: websocket server
+    :param requests_mock: requests mock
+    :yields: api, job states and requested job ids
+    """
+    api = Api.with_sid(url='http://127.0.0.1', sid='sid', rate_limits=None)
+    api.ws_url = ws_server.url
+    states = {}
+    requested = RequestLog()
+
+    def get_job(request, context):  # NOQA:WPS430
+        job_id = parse_qs(request.text)['id'][0]
+        requested.add(job_id)
+        return {'state': states.get(job_id, 'RUNNING')}
+
+    requests_mock.post(
+        api.service_full_url('/job/get'),
+        json=get_job,
+        headers={'content-type': 'application/json'},
+    )
+    yield api, states, requested
+    api.ws_hub.close()
+
+
+class TestAddonJobWait:
+    """Test waiting of job."""
+
+    def test_backoff(self, jobs_api):
+        """Test polls are spread by backoff."""
+        api, _, requested = jobs_api
+        with pytest.raises(TimeoutError):
+            api.Addon.Job.wait(
+                job_id='1',
+                namespace_id='namespace',
+                timeout=0.5,
+                ws_timeout=1,
+                backoff=PollBackoff(initial=0.05, jitter=0),
+            )
+        # Polls at 0, 0.05, 0.15 and 0.35 seconds
+        assert requested == ['1'] * 4
+        metrics = api.wait_metrics()['job']
+        assert metrics.waits == 1
+        assert metrics.timeouts == 1
+        assert metrics.polls == 4
+
+    def test_event_resets_backoff(self, jobs_api, ws_server):
+        """Test event triggers immediate poll."""
+        api, states, requested = jobs_api
+
+        def finish():  # NOQA:WPS430
+            states['1'] = 'DONE'
+            ws_server.send(job_event('1'))
+
+        timer = Timer(0.2, finish)
+        timer.start()
+        start = monotonic()
+        api.Addon.Job.wait(
+            job_id='1',
+            namespace_id='namespace',
+            timeout=10,
+            ws_timeout=5,
+        )
+        timer.join()
+        assert monotonic() - start < 1
+        assert requested == ['1', '1']
+        assert api.wait_metrics()['job'] == (1, 0, 2, 1, 2)
+
+    def test_other_job_event(self, jobs_api, ws_server):
+        """Test event of other job does not reset backoff."""
+        api, _, requested = jobs_api
+        timer = Timer(0.1, ws_server.send, (job_event('2'),))
+        timer.start()
+        with pytest.raises(TimeoutError):
+            api.Addon.Job.wait(
+                job_id='1',
+                namespace_id='namespace',
+                timeout=0.5,
+                ws_timeout=1,
+                backoff=PollBackoff(initial=0.3, jitter=0),
+            )
+        timer.join()
+        # Polls at 0 and 0.3 seconds
+        assert requested == ['1', '1']
+        assert api.wait_metrics()['job'].events == 0
+
+
+class TestAddonJobWaitMany:
+    """Test waiting of many jobs."""
+
+    def test_wait_many(self, jobs_api, ws_server):
+        """Test jobs are yielded as they finish."""
+        api, states, requested = jobs_api
+        states['1'] = 'DONE'
+        jobs = api.Addon.Job.wait_many(
+            ['1', '2', '3'],
+            namespace_id='namespace',
+            timeout=10,
+            ws_timeout=5,
+            poll_interval=60,
+        )
+        start = monotonic()
+        assert next(jobs) == ('1', {'state': 'DONE'})
+        assert requested == ['1']
+        assert api.ws_hub.channels() == {'job.namespace': 1}
+
+        states['2'] = 'ERROR'
+        ws_server.send(job_event('2'))
+        assert next(jobs) == ('2', {'state': 'ERROR'})
+        assert requested == ['1', '2']
+
+        def finish():  # NOQA:WPS430
+            states['3'] = 'DONE'
+            ws_server.send(job_event())
+
+        timer = Timer(0.2, finish)
+        timer.start()
+        assert next(jobs) == ('3', {'state': 'DONE'})
+        timer.join()
+        # Events of finished jobs do not produce requests
+        assert requested == ['1', '2', '3', '3']
+        with pytest.raises(StopIteration):
+            next(jobs)
+        assert monotonic() - start < 5
+        assert api.ws_hub.channels() == {}
+        assert [request['action'] for request in ws_server.requests] == [
+            'subscribe',
+            'unsubscribe',
+        ]
+
+    def test_stragglers_polling(self, jobs_api, ws_server):
+        """Test paced batches of jobs without events."""
+        api, states, requested = jobs_api
+
+        def finish():  # NOQA:WPS430
+            states['6'] = 'DONE'
+            ws_server.send(job_event('6'))
+
+        timer = Timer(0.1, finish)
+        timer.start()
+        finished = []
+        start = monotonic()
+        with pytest.raises(TimeoutError):
+            for job_id, _ in api.Addon.Job.wait_many(
+                ['1', '2', '3', '4', '5', '6'],
+                namespace_id='namespace',
+                timeout=1,
+                ws_timeout=5,
+                poll_interval=0.6,
+                poll_batch_size=2,
+            ):
+                finished.append(job_id)
+        timer.join()
+        assert finished == ['6']
+        times = {}
+        for job_id, request_time in zip(requested, requested.times):
+            times.setdefault(job_id, []).append(request_time - start)
+        # Job of event is checked immediately and once
+        assert len(times['6']) == 1
+        assert times['6'][0] < times['3'][0]
+        # First checks are spread over poll interval by batches
+        first_checks = [times[job_id][0] for job_id in '12345']
+        assert first_checks[1] - first_checks[0] < 0.05
+        assert 0.15 < first_checks[2] - first_checks[0] < 0.3
+        assert first_checks[4] - first_checks[0] > 0.3
+        # Jobs are rechecked once a poll interval
+        for job_id in '12345':
+            assert len(times[job_id]) <= 2
+            for previous, following in zip(times[job_id], times[job_id][1:]):
+                assert following - previous >= 0.55
+        assert len(requested) <= 10
+
+    def test_timeout(self, jobs_api):
+        """Test timeout of not finished jobs."""
+        api, _, requested = jobs_api
+        with pytest.raises(TimeoutError):
+            list(
+                api.Addon.Job.wait_many(
+                    ['1', '2'],
+                    namespace_id='namespace',
+                    timeout=0.5,
+                    ws_timeout=5,
+                    poll_interval=0.2,
+                ),
+            )
+        assert 4 <= len(requested) <= 8
+        assert api.ws_hub.channels() == {}
+
+
+@pytest.mark.asyncio
+async def test_async_wait_many(ws_server, monkeypatch):
+    """Test async jobs are yielded as they finish."""
+    api = AsyncApi.with_sid(
+        url='http://127.0.0.1',
+        sid='sid',
+        rate_limits=None,
+    )
+    api.ws_url = ws_server.url
+    states = {'2': 'DONE'}
+    requested = []
+
+    async def get_job(job_id):  # NOQA:WPS430
+        requested.append(job_id)
+        return Box(state=states.get(job_id, 'RUNNING'))
+
+    monkeypatch.setattr(api.Addon.Job, '_get_job', get_job)
+    jobs = api.Addon.Job.wait_many(
+        ['1', '2'],
+        namespace_id='namespace',
+        timeout=10,
+        ws_timeout=5,
+        poll_interval=60,
+    )
+    assert await jobs.__anext__() == ('2', {'state': 'DONE'})
+    states['1'] = 'DONE'
+    ws_server.send(job_event('1'))
+    assert await jobs.__anext__() == ('1', {'state': 'DONE'})
+    with pytest.raises(StopAsyncIteration):
+        await jobs.__anext__()
+    assert requested == ['1', '2', '1']
+    assert api.ws_hub.channels() == {}
+    await api.ws_hub.close()
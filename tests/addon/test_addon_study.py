@@ -1,11 +1,20 @@
 import inspect
 import tempfile
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from threading import Lock, Thread
+from time import monotonic, sleep
 
+import pydicom
 import pytest
 from dynaconf import settings
 
+from ambra_sdk.addon.dicom import UploadedImageParams
+from ambra_sdk.api import Api
+from ambra_sdk.exceptions.base import AmbraResponseException
+from ambra_sdk.service.ws.dispatcher import sid_md5
+
 
 class TestAddonStudy:
     """Test addon study namespace."""
@@ -392,3 +401,363 @@ class TestAddonStudyDeprecated:
         )
         assert new_study
         auto_remove(new_study)
+
+
+class TestAddonStudyUploadPool:
+    """Test concurrent upload of study images."""
+
+    @pytest.fixture
+    def upload_api(self, requests_mock, monkeypatch):
+        """Api with mocked study add, sync and image uploads.
+
+        :param requests_mock: requests mock
+        :param monkeypatch: monkeypatch
+        :return: api and uploads counters
+        """
+        api = Api.with_sid(url='http://127.0.0.1', sid='sid', rate_limits=None)
+        json_headers = {'content-type': 'application/json'}
+        requests_mock.post(
+            api.service_full_url('/study/add'),
+            json={'status': 'OK', 'uuid': 'uuid', 'engine_fqdn': 'fqdn'},
+            headers=json_headers,
+        )
+        requests_mock.post(
+            api.service_full_url('/study/sync'),
+            json={'status': 'OK'},
+            headers=json_headers,
+        )
+        counters = {'active': 0, 'max_active': 0, 'failed': []}
+        lock = Lock()
+
+        def upload_from_path(*, dicom_path, namespace_id, engine_fqdn):
+            with lock:
+                counters['active'] += 1
+                counters['max_active'] = max(
+                    counters['max_active'],
+                    counters['active'],
+                )
+            sleep(0.02)
+            with lock:
+                counters['active'] -= 1
+                if dicom_path.name not in counters['failed']:
+                    counters['failed'].append(dicom_path.name)
+                    raise AmbraResponseException(500, 'Server error')
+            return UploadedImageParams(
+                study_uid='study_uid',
+                image_uid=dicom_path.name,
+                image_version='1',
+                namespace=namespace_id,
+                attr=engine_fqdn,
+            )
+
+        monkeypatch.setattr(
+            api.Addon.Dicom,
+            'upload_from_path',
+            upload_from_path,
+        )
+        monkeypatch.setattr(api.Addon.Study, 'UPLOAD_RETRY_DELAY', 0)
+        return api, counters
+
+    def test_upload_paths(self, upload_api, requests_mock):
+        """Test ordered results, retries and one sync."""
+        api, counters = upload_api
+        dicom_dir = Path(__file__).parents[1] / 'dicoms' / 'read_only'
+        first_dicom = next(dicom_dir.glob('**/*.dcm'))
+        dicom_paths = [first_dicom] + [
+            first_dicom.with_name('IMG{n:05}.dcm'.format(n=n))
+            for n in range(100, 120)
+        ]
+        uuid, images_params = api.Addon.Study.upload_paths(
+            dicom_paths=iter(dicom_paths),
+            namespace_id='namespace',
+            workers=4,
+        )
+        assert uuid == 'uuid'
+        assert [params.image_uid for params in images_params] == \
+            [dicom_path.name for dicom_path in dicom_paths]
+        assert 1 < counters['max_active'] <= 4
+        sync_calls = [
+            request for request in requests_mock.request_history
+            if request.path.endswith('/study/sync')
+        ]
+        assert len(sync_calls) == 1
+
+    def test_upload_paths_retries_exceeded(self, upload_api):
+        """Test upload error after retries."""
+        api, _ = upload_api
+        dicom_dir = Path(__file__).parents[1] / 'dicoms' / 'read_only'
+        with pytest.raises(AmbraResponseException):
+            api.Addon.Study.upload_paths(
+                dicom_paths=dicom_dir.glob('**/*.dcm'),
+                namespace_id='namespace',
+                retries=0,
+            )
+
+
+class PayloadResponse:
+    """Streamed dicom payload response."""
+
+    def __init__(self, content):
+        self.content = content
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.content), 3):
+            yield self.content[start:start + 3]
+
+    def close(self):
+        self.closed = True
+
+
+class TestAddonStudyDownloadDir:
+    """Test concurrent download of study images."""
+
+    @pytest.fixture
+    def download_api(self, monkeypatch):
+        """Api with mocked study schema and dicom payloads.
+
+        :param monkeypatch: monkeypatch
+        :return: api, study schema and download counters
+        """
+        api = Api.with_sid(url='http://127.0.0.1', sid='sid', rate_limits=None)
+        schema = {
+            'series': [
+                {
+                    'series_uid': 'series_{n}'.format(n=series),
+                    'images': [
+                        {'id': 'image_{n}'.format(n=image), 'version': 'v1'}
+                        for image in range(series * 10, series * 10 + 10)
+                    ],
+                }
+                for series in range(2)
+            ],
+        }
+        counters = {
+            'active': 0,
+            'max_active': 0,
+            'failed': set(),
+            'downloaded': [],
+        }
+        lock = Lock()
+
+        def dicom_payload(*, image_uid, image_version, **kwargs):
+            with lock:
+                counters['active'] += 1
+                counters['max_active'] = max(
+                    counters['max_active'],
+                    counters['active'],
+                )
+            sleep(0.01)
+            with lock:
+                counters['active'] -= 1
+                if image_uid not in counters['failed']:
+                    counters['failed'].add(image_uid)
+                    raise AmbraResponseException(503, 'Unavailable')
+                counters['downloaded'].append(image_uid)
+            return PayloadResponse(
+                '{image_uid}:{image_version}'.format(
+                    image_uid=image_uid,
+                    image_version=image_version,
+                ).encode(),
+            )
+
+        monkeypatch.setattr(
+            api.Storage.Study,
+            'schema',
+            lambda **kwargs: schema,
+        )
+        monkeypatch.setattr(api.Storage.Image, 'dicom_payload', dicom_payload)
+        monkeypatch.setattr(api.Addon.Study, 'DOWNLOAD_RETRY_DELAY', 0)
+        return api, schema, counters
+
+    def _download(self, api, study_dir, **kwargs):
+        return api.Addon.Study.download_dir(
+            study_dir=study_dir,
+            namespace_id='namespace',
+            study_uid='study_uid',
+            engine_fqdn='fqdn',
+            **kwargs,
+        )
+
+    def test_download_dir(self, download_api, tmp_path):
+        """Test images are downloaded concurrently with retries."""
+        api, _, counters = download_api
+        images = self._download(api, tmp_path, workers=4)
+        assert [image.image_uid for image in images] == [
+            'image_{n}'.format(n=n) for n in range(20)
+        ]
+        assert images[12].path == tmp_path / 'series_1' / 'image_12.dcm'
+        assert images[12].path.read_bytes() == b'image_12:v1'
+        assert not any(image.skipped for image in images)
+        assert 1 < counters['max_active'] <= 4
+        assert not list(tmp_path.glob('**/*.tmp'))
+
+    def test_submission_window(self, download_api, tmp_path, monkeypatch):
+        """Test not finished downloads are limited by workers."""
+        api, _, _ = download_api
+        lock = Lock()
+        submitted = {'active': 0, 'max_active': 0}
+
+        def counted(function, **kwargs):  # NOQA:WPS430
+            try:
+                return function(**kwargs)
+            finally:
+                with lock:
+                    submitted['active'] -= 1
+
+        class CountingExecutor(ThreadPoolExecutor):  # NOQA:WPS431
+            def submit(self, function, **kwargs):
+                with lock:
+                    submitted['active'] += 1
+                    submitted['max_active'] = max(
+                        submitted['max_active'],
+                        submitted['active'],
+                    )
+                return super().submit(counted, function, **kwargs)
+
+        monkeypatch.setattr(
+            'ambra_sdk.addon.study.ThreadPoolExecutor',
+            CountingExecutor,
+        )
+        assert len(self._download(api, tmp_path, workers=3)) == 20
+        assert submitted['max_active'] <= 3
+
+    def test_resume(self, download_api, tmp_path):
+        """Test downloaded images of the same version are skipped."""
+        api, schema, counters = download_api
+        self._download(api, tmp_path)
+        schema['series'][0]['images'][0]['version'] = 'v2'
+        (tmp_path / 'series_1' / 'image_15.dcm').write_bytes(b'broken')
+        (tmp_path / 'series_1' / 'image_16.dcm').unlink()
+        counters['downloaded'] = []
+        images = self._download(api, tmp_path)
+        assert sorted(counters['downloaded']) == [
+            'image_0',
+            'image_15',
+            'image_16',
+        ]
+        assert images[0].path.read_bytes() == b'image_0:v2'
+        assert sum(image.skipped for image in images) == 17
+
+    def test_retries_exceeded(self, download_api, tmp_path):
+        """Test download error after retries."""
+        api, _, _ = download_api
+        with pytest.raises(AmbraResponseException):
+            self._download(api, tmp_path, retries=0)
+
+
+class TestAddonStudyIterDownload:
+    """Test streaming extraction of study zip."""
+
+    @pytest.fixture
+    def zip_api(self, monkeypatch):
+        """Api with mocked study zip download.
+
+        :param monkeypatch: monkeypatch
+        :return: api, dicom paths and download kwargs
+        """
+        api = Api.with_sid(url='http://127.0.0.1', sid='sid', rate_limits=None)
+        dicom_dir = Path(__file__).parents[1] / 'dicoms' / 'read_only'
+        dicom_paths = sorted(dicom_dir.glob('**/*.dcm'))
+        zip_content = tempfile.SpooledTemporaryFile()
+        with zipfile.ZipFile(zip_content, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.writestr('README.txt', 'Study')
+            for dicom_path in dicom_paths:
+                zip_file.write(
+                    dicom_path,
+                    dicom_path.relative_to(dicom_dir).as_posix(),
+                )
+        zip_content.seek(0)
+        response = PayloadResponse(zip_content.read())
+        download_kwargs = {}
+
+        def download(**kwargs):  # NOQA:WPS430
+            download_kwargs.update(kwargs)
+            return response
+
+        monkeypatch.setattr(api.Storage.Study, 'download', download)
+        return api, dicom_paths, download_kwargs, response
+
+    def test_iter_download(self, zip_api):
+        """Test zip entries are extracted."""
+        api, dicom_paths, download_kwargs, response = zip_api
+        entries = list(
+            api.Addon.Study.iter_download(
+                namespace_id='namespace',
+                study_uid='study_uid',
+                engine_fqdn='fqdn',
+                series_uid='series_uid',
+            ),
+        )
+        assert [path for path, _ in entries] == ['README.txt'] + [
+            'series_1/{name}'.format(name=dicom_path.name)
+            for dicom_path in dicom_paths
+        ]
+        assert entries[1].file.read() == dicom_paths[0].read_bytes()
+        assert download_kwargs['bundle'] == 'dicom'
+        assert download_kwargs['series_uid'] == 'series_uid'
+        assert response.closed
+
+    def test_iter_download_dicom(self, zip_api):
+        """Test dicoms are read from zip."""
+        api, dicom_paths, _, response = zip_api
+        dicoms = api.Addon.Study.iter_download_dicom(
+            namespace_id='namespace',
+            study_uid='study_uid',
+            engine_fqdn='fqdn',
+            stop_before_pixels=True,
+        )
+        path, dataset = next(dicoms)
+        assert path == 'series_1/{name}'.format(name=dicom_paths[0].name)
+        assert 'PixelData' not in dataset
+        assert dataset.SOPInstanceUID == \
+            pydicom.dcmread(str(dicom_paths[0])).SOPInstanceUID
+        dicoms.close()
+        assert response.closed
+
+
+class TestAddonStudyWait:
+    """Test waiting of study."""
+
+    def test_wait_filters_events(self, ws_server, requests_mock):
+        """Test events of other studies do not produce polls."""
+        api = Api.with_sid(url='http://127.0.0.1', sid='sid', rate_limits=None)
+        api.ws_url = ws_server.url
+        study = {'uuid': 'uuid', 'phantom': 1}
+        requests_mock.post(
+            api.service_full_url('/study/get'),
+            json=lambda request, context: dict(study),
+            headers={'content-type': 'application/json'},
+        )
+
+        def ready(**kwargs):  # NOQA:WPS430
+            ws_server.send({
+                'channel': 'study.namespace',
+                'event': 'READY',
+                'sid_md5': sid_md5('sid'),
+                **kwargs,
+            })
+
+        def send_events():  # NOQA:WPS430
+            ready(study_uid='other')
+            ready(uuid='other')
+            sleep(0.2)
+            study['phantom'] = 0
+            ready(uuid='uuid')
+
+        sender = Thread(target=send_events)
+        sender.start()
+        start = monotonic()
+        ready_study = api.Addon.Study.wait(
+            study_uid='study_uid',
+            namespace_id='namespace',
+            timeout=10,
+            ws_timeout=5,
+        )
+        sender.join()
+        assert monotonic() - start < 2
+        assert ready_study.phantom == 0
+        assert len(requests_mock.request_history) == 2
+        metrics = api.wait_metrics()['study']
+        assert (metrics.polls, metrics.events) == (2, 1)
+        api.ws_hub.close()
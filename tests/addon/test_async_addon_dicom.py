@@ -1,8 +1,17 @@
+import asyncio
+import tempfile
+import threading
 from pathlib import Path
 
+import aiohttp
 import pytest
 from pydicom.dataset import FileDataset
 
+from ambra_sdk.addon.journal import UploadJournal, journal_key
+from ambra_sdk.api import AsyncApi
+from ambra_sdk.async_addon import dicom as async_dicom
+from ambra_sdk.storage.cache import ImageCache
+
 
 @pytest.mark.asyncio
 class TestAsyncAddonDicom:
@@ -90,3 +99,252 @@ class TestAsyncAddonDicom:
         assert image_params.image_version
         assert image_params.namespace == namespace_id
         assert image_params.attr
+
+
+class TestAsyncAddonDicomMultipartUpload:
+    """Test multipart upload."""
+
+    @pytest.fixture
+    def multipart_api(self, monkeypatch):
+        """Async api with mocked multipart upload methods.
+
+        :param monkeypatch: monkeypatch
+        :return: api and uploaded chunks
+        """
+        api = AsyncApi.with_sid(
+            url='http://127.0.0.1',
+            sid='sid',
+            rate_limits=None,
+        )
+        uploaded = {'chunks': {}, 'failed': set(), 'active': 0, 'max_active': 0}
+        image = api.Storage.Image
+
+        async def multipart_initiate(engine_fqdn):
+            return {'upload_uuid': 'upload_uuid'}
+
+        async def multipart_chunk_upload(
+            engine_fqdn,
+            upload_uuid,
+            bytes_part,
+            chunk_number,
+        ):
+            uploaded['active'] += 1
+            uploaded['max_active'] = max(
+                uploaded['max_active'],
+                uploaded['active'],
+            )
+            await asyncio.sleep(0.01)
+            uploaded['active'] -= 1
+            if chunk_number not in uploaded['failed']:
+                uploaded['failed'].add(chunk_number)
+                raise aiohttp.ClientConnectionError()
+            uploaded['chunks'][chunk_number] = bytes(bytes_part)
+
+        async def multipart_complete(**kwargs):
+            uploaded['complete'] = kwargs
+
+        monkeypatch.setattr(image, 'multipart_initiate', multipart_initiate)
+        monkeypatch.setattr(
+            image,
+            'multipart_chunk_upload',
+            multipart_chunk_upload,
+        )
+        monkeypatch.setattr(image, 'multipart_complete', multipart_complete)
+        monkeypatch.setattr(api.Addon.Dicom, 'UPLOAD_RETRY_DELAY', 0)
+        monkeypatch.setattr(api.Addon.Dicom, 'CHUNK_SIZE', 10000)
+        return api, uploaded
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('workers', [1, 4])
+    async def test_multipart_upload(self, multipart_api, workers, monkeypatch):
+        """Test chunks are uploaded with retries before complete."""
+        api, uploaded = multipart_api
+        monkeypatch.setattr(api.Addon.Dicom, 'MULTIPART_WORKERS', workers)
+        dicom_path = Path(__file__) \
+            .parents[1] \
+            .joinpath('dicoms', 'read_only', 'series_1', 'IMG00001.dcm')
+        content = dicom_path.read_bytes()
+        with open(dicom_path, 'rb') as dicom_file:
+            await api.Addon.Dicom._multipart_upload(
+                dicom_file=dicom_file,
+                namespace_id='namespace',
+                engine_fqdn='fqdn',
+                study_uid='study_uid',
+            )
+        chunks = uploaded['chunks']
+        assert b''.join(chunks[n] for n in sorted(chunks)) == content
+        assert uploaded['complete']['file_size'] == len(content)
+        if workers > 1:
+            assert 1 < uploaded['max_active'] <= workers
+
+    @pytest.mark.asyncio
+    async def test_resume(self, multipart_api, monkeypatch, tmp_path):
+        """Test interrupted upload is resumed from the journal."""
+        api, uploaded = multipart_api
+        journal_path = tmp_path / 'journal.jsonl'
+        monkeypatch.setattr(
+            api.Addon.Dicom,
+            'UPLOAD_JOURNAL',
+            UploadJournal(journal_path),
+        )
+        dicom_path = tmp_path / 'image.dcm'
+        dicom_path.write_bytes(
+            Path(__file__)
+            .parents[1]
+            .joinpath('dicoms', 'read_only', 'series_1', 'IMG00001.dcm')
+            .read_bytes(),
+        )
+        journal = api.Addon.Dicom.UPLOAD_JOURNAL
+        with open(dicom_path, 'rb') as dicom_file:
+            key = journal_key(dicom_file, 'fqdn', 'namespace')
+        journal.start(key, 'upload_uuid', 10000)
+        journal.record_chunk(key, 'upload_uuid', 0)
+        journal.record_chunk(key, 'upload_uuid', 1)
+
+        api.Addon.Dicom.UPLOAD_JOURNAL = UploadJournal(journal_path)
+        write = api.Addon.Dicom.UPLOAD_JOURNAL._write
+        journal_threads = set()
+
+        def threaded_write(record):  # NOQA:WPS430
+            journal_threads.add(threading.current_thread())
+            write(record)
+
+        find = api.Addon.Dicom.UPLOAD_JOURNAL.find
+
+        def threaded_find(*args):  # NOQA:WPS430
+            journal_threads.add(threading.current_thread())
+            return find(*args)
+
+        monkeypatch.setattr(
+            api.Addon.Dicom.UPLOAD_JOURNAL,
+            '_write',
+            threaded_write,
+        )
+        monkeypatch.setattr(
+            api.Addon.Dicom.UPLOAD_JOURNAL,
+            'find',
+            threaded_find,
+        )
+        with open(dicom_path, 'rb') as dicom_file:
+            await api.Addon.Dicom._multipart_upload(
+                dicom_file=dicom_file,
+                namespace_id='namespace',
+                engine_fqdn='fqdn',
+                study_uid='study_uid',
+            )
+        # Journal is read and synced to disk out of the event loop
+        assert journal_threads
+        assert threading.current_thread() not in journal_threads
+        chunks_count = -(-dicom_path.stat().st_size // 10000)
+        assert sorted(uploaded['chunks']) == list(range(2, chunks_count))
+        assert uploaded['complete']['upload_uuid'] == 'upload_uuid'
+        assert find(key, 10000) is None
+
+
+DICOM_PATH = Path(__file__) \
+    .parents[1] \
+    .joinpath('dicoms', 'read_only', 'series_1', 'IMG00001.dcm')
+
+
+class PayloadStream:
+    """Content stream of mocked dicom payload response."""
+
+    def __init__(self, content):
+        self._content = content
+        self.sent = 0
+
+    async def read(self, size):
+        chunk = self._content[self.sent:self.sent + min(size, 4096)]
+        self.sent += len(chunk)
+        return chunk
+
+
+class PayloadResponse:
+    """Streamed dicom payload response."""
+
+    def __init__(self, content):
+        self.content = PayloadStream(content)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+class TestAsyncAddonDicomStreamingGet:
+    """Test dicom get without buffering payload in memory."""
+
+    @pytest.fixture
+    def payload_api(self, monkeypatch, tmp_path):
+        """Async api with mocked streamed dicom payload.
+
+        :param monkeypatch: monkeypatch
+        :param tmp_path: temporary directory
+        :return: api and payload responses
+        """
+        api = AsyncApi.with_sid(
+            url='http://127.0.0.1',
+            sid='sid',
+            rate_limits=None,
+        )
+        responses = []
+
+        async def dicom_payload(image_version, **kwargs):  # NOQA:WPS430
+            response = PayloadResponse(DICOM_PATH.read_bytes())
+            responses.append((image_version, response))
+            return response
+
+        monkeypatch.setattr(api.Storage.Image, 'dicom_payload', dicom_payload)
+        monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path))
+        return api, responses
+
+    async def _get(self, api, image_version='*', **kwargs):
+        return await api.Addon.Dicom.get(
+            namespace_id='namespace',
+            study_uid='study_uid',
+            image_uid='image_uid',
+            image_version=image_version,
+            engine_fqdn='fqdn',
+            **kwargs,
+        )
+
+    async def test_get(self, payload_api, tmp_path):
+        """Test payload is spooled and removed."""
+        api, responses = payload_api
+        dicom = await self._get(api)
+        assert len(dicom.PixelData) == 179080
+        assert responses[0][1].closed
+        assert not list(tmp_path.iterdir())
+
+    async def test_no_image_cache(self, payload_api, monkeypatch):
+        """Test image cache is not read without cache."""
+        api, _ = payload_api
+
+        def read_cached_dicom(*args, **kwargs):  # NOQA:WPS430
+            raise AssertionError('Image cache is not set')
+
+        monkeypatch.setattr(
+            async_dicom,
+            'read_cached_dicom',
+            read_cached_dicom,
+        )
+        dicom = await self._get(api, 'v1')
+        assert len(dicom.PixelData) == 179080
+
+    async def test_stop_before_pixels(self, payload_api):
+        """Test only headers are downloaded."""
+        api, responses = payload_api
+        dicom = await self._get(api, stop_before_pixels=True)
+        assert 'PixelData' not in dicom
+        assert responses[0][1].content.sent < 179080 // 10
+
+    async def test_image_cache(self, payload_api, tmp_path):
+        """Test image of concrete version is downloaded once."""
+        api, responses = payload_api
+        api.image_cache = ImageCache(tmp_path / 'cache')
+        for image_version in ('v1', 'v1', '*'):
+            dicom = await self._get(api, image_version)
+            assert len(dicom.PixelData) == 179080
+        dicom = await self._get(api, 'v1', defer_size='1 KB')
+        assert len(dicom.PixelData) == 179080
+        assert [version for version, _ in responses] == ['v1', '*']
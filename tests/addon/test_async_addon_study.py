@@ -1,11 +1,19 @@
+import asyncio
+import gc
 import inspect
 import tempfile
 import zipfile
 from pathlib import Path
 
+import aiohttp
+import pydicom
 import pytest
+from aioresponses import aioresponses
 from dynaconf import settings
 
+from ambra_sdk.addon.dicom import UploadedImageParams
+from ambra_sdk.api import AsyncApi
+
 
 @pytest.mark.asyncio
 class TestAsyncAddonStudy:
@@ -284,3 +292,314 @@ class TestAsyncAddonStudy:
             )
             assert new_study
             async_auto_remove(new_study)
+
+
+class TestAsyncAddonStudyUploadPool:
+    """Test concurrent upload of study images."""
+
+    @pytest.fixture
+    def upload_api(self, monkeypatch):
+        """Async api with mocked image uploads.
+
+        :param monkeypatch: monkeypatch
+        :return: api and uploads counters
+        """
+        api = AsyncApi.with_sid(
+            url='http://127.0.0.1',
+            sid='sid',
+            rate_limits=None,
+        )
+        counters = {'active': 0, 'max_active': 0, 'failed': []}
+
+        async def upload_from_path(*, dicom_path, namespace_id, engine_fqdn):
+            counters['active'] += 1
+            counters['max_active'] = max(
+                counters['max_active'],
+                counters['active'],
+            )
+            await asyncio.sleep(0.01)
+            counters['active'] -= 1
+            if dicom_path.name not in counters['failed']:
+                counters['failed'].append(dicom_path.name)
+                raise aiohttp.ClientConnectionError()
+            return UploadedImageParams(
+                study_uid='study_uid',
+                image_uid=dicom_path.name,
+                image_version='1',
+                namespace=namespace_id,
+                attr=engine_fqdn,
+            )
+
+        monkeypatch.setattr(
+            api.Addon.Dicom,
+            'upload_from_path',
+            upload_from_path,
+        )
+        monkeypatch.setattr(api.Addon.Study, 'UPLOAD_RETRY_DELAY', 0)
+        return api, counters
+
+    @pytest.mark.asyncio
+    async def test_upload_paths(self, upload_api):
+        """Test ordered results, retries and one sync."""
+        api, counters = upload_api
+        dicom_dir = Path(__file__).parents[1] / 'dicoms' / 'read_only'
+        first_dicom = next(dicom_dir.glob('**/*.dcm'))
+        dicom_paths = [first_dicom] + [
+            first_dicom.with_name('IMG{n:05}.dcm'.format(n=n))
+            for n in range(100, 120)
+        ]
+        with aioresponses() as mocked:
+            mocked.post(
+                api.service_full_url('/study/add'),
+                payload={'status': 'OK', 'uuid': 'uuid', 'engine_fqdn': 'fqdn'},
+            )
+            mocked.post(
+                api.service_full_url('/study/sync'),
+                payload={'status': 'OK'},
+            )
+            uuid, images_params = await api.Addon.Study.upload_paths(
+                dicom_paths=iter(dicom_paths),
+                namespace_id='namespace',
+                workers=4,
+            )
+        assert uuid == 'uuid'
+        assert [params.image_uid for params in images_params] == \
+            [dicom_path.name for dicom_path in dicom_paths]
+        assert 1 < counters['max_active'] <= 4
+
+    @pytest.mark.asyncio
+    async def test_upload_error(self, upload_api, monkeypatch):
+        """Test uploads are finished and errors are retrieved on error."""
+        api, _ = upload_api
+
+        async def upload_from_path(*, dicom_path, **kwargs):  # NOQA:WPS430
+            if dicom_path.name not in {'IMG00000.dcm', 'IMG00001.dcm'}:
+                await asyncio.sleep(10)
+            raise aiohttp.ClientConnectionError()
+
+        async def upload():  # NOQA:WPS430
+            with pytest.raises(aiohttp.ClientConnectionError):
+                await api.Addon.Study._upload_images(
+                    dicom_paths=[
+                        Path('IMG{n:05}.dcm'.format(n=n)) for n in range(8)
+                    ],
+                    namespace_id='namespace',
+                    engine_fqdn='fqdn',
+                    workers=4,
+                    retries=0,
+                )
+
+        monkeypatch.setattr(
+            api.Addon.Dicom,
+            'upload_from_path',
+            upload_from_path,
+        )
+        loop = asyncio.get_event_loop()
+        loop_errors = []
+        loop.set_exception_handler(
+            lambda _, context: loop_errors.append(context),
+        )
+        try:
+            await upload()
+            current_task = asyncio.current_task()
+            assert [
+                task for task in asyncio.all_tasks()
+                if task is not current_task
+            ] == []
+            gc.collect()
+        finally:
+            loop.set_exception_handler(None)
+        assert loop_errors == []
+
+    @pytest.mark.asyncio
+    async def test_collect_errors(self, upload_api):
+        """Test all done uploads are collected on error."""
+        api, _ = upload_api
+
+        async def fail():  # NOQA:WPS430
+            raise aiohttp.ClientConnectionError()
+
+        pending = {asyncio.ensure_future(fail()): index for index in range(2)}
+        await asyncio.sleep(0)
+        with pytest.raises(aiohttp.ClientConnectionError):
+            await api.Addon.Study._collect_uploads(pending, {})
+        assert pending == {}
+
+
+class PayloadStream:
+    """Content stream of mocked dicom payload response."""
+
+    def __init__(self, content):
+        self._content = content
+
+    async def iter_chunked(self, size):
+        for start in range(0, len(self._content), 3):
+            yield self._content[start:start + 3]
+
+
+class PayloadResponse:
+    """Streamed dicom payload response."""
+
+    def __init__(self, content):
+        self.content = PayloadStream(content)
+
+    def close(self):
+        """Close response."""
+
+
+@pytest.mark.asyncio
+async def test_download_dir(monkeypatch, tmp_path):
+    """Test concurrent download with retries and resume."""
+    api = AsyncApi.with_sid(
+        url='http://127.0.0.1',
+        sid='sid',
+        rate_limits=None,
+    )
+    schema = {
+        'series': [{
+            'series_uid': 'series',
+            'images': [
+                {'id': 'image_{n}'.format(n=n), 'version': 'v1'}
+                for n in range(10)
+            ],
+        }],
+    }
+    counters = {'active': 0, 'max_active': 0, 'failed': set(), 'downloaded': []}
+
+    async def study_schema(**kwargs):  # NOQA:WPS430
+        return schema
+
+    async def dicom_payload(*, image_uid, **kwargs):  # NOQA:WPS430
+        counters['active'] += 1
+        counters['max_active'] = max(counters['max_active'], counters['active'])
+        await asyncio.sleep(0.01)
+        counters['active'] -= 1
+        if image_uid not in counters['failed']:
+            counters['failed'].add(image_uid)
+            raise aiohttp.ClientConnectionError()
+        counters['downloaded'].append(image_uid)
+        return PayloadResponse(image_uid.encode())
+
+    monkeypatch.setattr(api.Storage.Study, 'schema', study_schema)
+    monkeypatch.setattr(api.Storage.Image, 'dicom_payload', dicom_payload)
+    monkeypatch.setattr(api.Addon.Study, 'DOWNLOAD_RETRY_DELAY', 0)
+    download_args = {
+        'study_dir': tmp_path,
+        'namespace_id': 'namespace',
+        'study_uid': 'study_uid',
+        'engine_fqdn': 'fqdn',
+        'workers': 4,
+    }
+    images = await api.Addon.Study.download_dir(**download_args)
+    assert [image.path.read_bytes() for image in images] == [
+        'image_{n}'.format(n=n).encode() for n in range(10)
+    ]
+    assert 1 < counters['max_active'] <= 4
+
+    schema['series'][0]['images'][3]['version'] = 'v2'
+    counters['downloaded'] = []
+    images = await api.Addon.Study.download_dir(**download_args)
+    assert counters['downloaded'] == ['image_3']
+    assert sum(image.skipped for image in images) == 9
+
+
+class SlowStream:
+    """Content stream of never finished response."""
+
+    async def iter_chunked(self, size):
+        yield b'data'
+        await asyncio.sleep(10)
+
+
+@pytest.mark.asyncio
+async def test_download_dir_error(monkeypatch, tmp_path):
+    """Test cancelled downloads are finished on error."""
+    api = AsyncApi.with_sid(
+        url='http://127.0.0.1',
+        sid='sid',
+        rate_limits=None,
+    )
+
+    async def study_schema(**kwargs):  # NOQA:WPS430
+        return {
+            'series': [{
+                'series_uid': 'series',
+                'images': [
+                    {'id': 'image_{n}'.format(n=n), 'version': 'v1'}
+                    for n in range(4)
+                ],
+            }],
+        }
+
+    async def dicom_payload(*, image_uid, **kwargs):  # NOQA:WPS430
+        if image_uid != 'image_0':
+            response = PayloadResponse(b'')
+            response.content = SlowStream()
+            return response
+        await asyncio.sleep(0.05)
+        raise aiohttp.ClientConnectionError()
+
+    monkeypatch.setattr(api.Storage.Study, 'schema', study_schema)
+    monkeypatch.setattr(api.Storage.Image, 'dicom_payload', dicom_payload)
+    with pytest.raises(aiohttp.ClientConnectionError):
+        await api.Addon.Study.download_dir(
+            study_dir=tmp_path,
+            namespace_id='namespace',
+            study_uid='study_uid',
+            engine_fqdn='fqdn',
+            workers=4,
+            retries=0,
+        )
+    assert not list(tmp_path.glob('**/*.tmp'))
+    current_task = asyncio.current_task()
+    assert [
+        task for task in asyncio.all_tasks() if task is not current_task
+    ] == []
+
+
+@pytest.mark.asyncio
+async def test_iter_download(monkeypatch):
+    """Test streaming extraction of study zip."""
+    api = AsyncApi.with_sid(
+        url='http://127.0.0.1',
+        sid='sid',
+        rate_limits=None,
+    )
+    dicom_dir = Path(__file__).parents[1] / 'dicoms' / 'read_only'
+    dicom_paths = sorted(dicom_dir.glob('**/*.dcm'))
+    zip_content = tempfile.SpooledTemporaryFile()
+    with zipfile.ZipFile(zip_content, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr('README.txt', 'Study')
+        for dicom_path in dicom_paths:
+            zip_file.write(dicom_path, dicom_path.name)
+    zip_content.seek(0)
+    zip_bytes = zip_content.read()
+
+    async def download(**kwargs):  # NOQA:WPS430
+        return PayloadResponse(zip_bytes)
+
+    monkeypatch.setattr(api.Storage.Study, 'download', download)
+    download_args = {
+        'namespace_id': 'namespace',
+        'study_uid': 'study_uid',
+        'engine_fqdn': 'fqdn',
+    }
+    entries = [
+        entry async for entry in api.Addon.Study.iter_download(**download_args)
+    ]
+    assert [entry.path for entry in entries] == ['README.txt'] + [
+        dicom_path.name for dicom_path in dicom_paths
+    ]
+    assert entries[1].file.read() == dicom_paths[0].read_bytes()
+
+    dicoms = [
+        dicom async for dicom in api.Addon.Study.iter_download_dicom(
+            **download_args,
+        )
+    ]
+    assert [dicom.path for dicom in dicoms] == [
+        dicom_path.name for dicom_path in dicom_paths
+    ]
+    assert dicoms[0].dataset.SOPInstanceUID == \
+        pydicom.dcmread(str(dicom_paths[0])).SOPInstanceUID
+    await api.service_session.close()
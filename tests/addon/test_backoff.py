@@ -0,0 +1,78 @@
+from time import sleep
+
+import pytest
+
+from ambra_sdk.addon.backoff import PollBackoff, PollSchedule, WaitTracker
+
+
+class TestPollSchedule:
+    """Test schedule of waiter polls."""
+
+    def test_intervals(self):
+        """Test intervals grow up to maximum."""
+        schedule = PollSchedule(
+            PollBackoff(maximum=4, jitter=0),
+            ws_timeout=1,
+            timeout=100,
+        )
+        assert schedule.delay() == 0
+        delays = []
+        for _ in range(5):
+            schedule.polled()
+            delays.append(round(schedule.delay()))
+        assert delays == [1, 2, 4, 4, 4]
+        assert schedule.polls == 5
+
+    def test_jitter(self):
+        """Test intervals are randomized."""
+        schedule = PollSchedule(
+            PollBackoff(initial=10, multiplier=1, jitter=0.5),
+            ws_timeout=1,
+            timeout=100,
+        )
+        delays = set()
+        for _ in range(20):
+            schedule.polled()
+            delay = schedule.delay()
+            assert 4.9 < delay <= 15
+            delays.add(delay)
+        assert len(delays) > 1
+
+    def test_capped_by_timeout(self):
+        """Test delay is capped by remaining timeout."""
+        schedule = PollSchedule(PollBackoff(), ws_timeout=10, timeout=0.1)
+        schedule.polled()
+        assert schedule.delay() <= 0.1
+        sleep(0.1)
+        assert schedule.expired()
+
+    def test_reset(self):
+        """Test event resets interval."""
+        schedule = PollSchedule(
+            PollBackoff(jitter=0),
+            ws_timeout=1,
+            timeout=100,
+        )
+        schedule.polled()
+        schedule.polled()
+        schedule.reset()
+        assert schedule.delay() == 0
+        schedule.polled()
+        assert round(schedule.delay()) == 1
+        assert schedule.events == 1
+
+
+def test_wait_tracker():
+    """Test polls per wait."""
+    tracker = WaitTracker()
+    assert tracker.metrics() == {}
+    schedule = PollSchedule(None, ws_timeout=1, timeout=100)
+    for _ in range(3):
+        schedule.polled()
+    tracker.finished('job', schedule, timed_out=False)
+    tracker.finished('job', PollSchedule(None, 1, 100), timed_out=True)
+    metrics = tracker.metrics()['job']
+    assert metrics.waits == 2
+    assert metrics.timeouts == 1
+    assert metrics.polls == 3
+    assert metrics.polls_per_wait == pytest.approx(1.5)
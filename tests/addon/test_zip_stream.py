@@ -0,0 +1,107 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from ambra_sdk.addon.zip_stream import (
+    ZipStreamError,
+    ZipStreamParser,
+    iter_zip,
+)
+
+ZIP_FILES = {
+    'DICOMDIR': b'dicomdir',
+    'SER00001/IMG00001': os.urandom(5000),
+    # Content with data descriptor signatures
+    'SER00001/IMG00002': b'PK\x07\x08' * 1000,
+    'SER00002/IMG00001': b'',
+    'SER00002/IMG00002': b'ab' * 50000,
+}
+
+
+class NotSeekable(io.RawIOBase):
+    """Not seekable output (zip entries with data descriptors)."""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def writable(self):
+        return True
+
+    def write(self, content):
+        return self.buffer.write(content)
+
+
+def make_zip(compression, seekable, zip64=False):
+    """Make zip of ZIP_FILES.
+
+    :param compression: compression method
+    :param seekable: write to seekable output
+    :param zip64: force zip64 entries
+    :return: zip content
+    """
+    output = io.BytesIO() if seekable else NotSeekable()
+    with zipfile.ZipFile(output, 'w', compression) as zip_file:
+        if seekable:
+            zip_file.writestr('SER00001/', b'')
+        for path, content in ZIP_FILES.items():
+            with zip_file.open(path, 'w', force_zip64=zip64) as entry_file:
+                entry_file.write(content)
+    return (output if seekable else output.buffer).getvalue()
+
+
+def split(content, chunk_size):
+    return [
+        content[start:start + chunk_size]
+        for start in range(0, len(content), chunk_size)
+    ]
+
+
+class TestZipStream:
+    """Test streaming zip extraction."""
+
+    @pytest.mark.parametrize('compression', [
+        zipfile.ZIP_STORED,
+        zipfile.ZIP_DEFLATED,
+    ])
+    @pytest.mark.parametrize('seekable', [True, False])
+    @pytest.mark.parametrize('zip64', [True, False])
+    @pytest.mark.parametrize('chunk_size', [5, 4096])
+    def test_iter_zip(self, compression, seekable, zip64, chunk_size):
+        """Test entries are extracted."""
+        content = make_zip(compression, seekable, zip64)
+        entries = iter_zip(split(content, chunk_size), spool_size=1024)
+        extracted = {path: entry_file.read() for path, entry_file in entries}
+        assert extracted == ZIP_FILES
+
+    def test_entries_are_yielded_on_arrival(self):
+        """Test entry is available before the end of stream."""
+        content = make_zip(zipfile.ZIP_DEFLATED, seekable=False)
+        parser = ZipStreamParser()
+        paths = []
+        for chunk in split(content, 100):
+            paths.extend(entry.path for entry in parser.feed(chunk))
+            if paths:
+                break
+        assert paths == ['DICOMDIR']
+
+    @pytest.mark.parametrize('seekable', [True, False])
+    def test_truncated(self, seekable):
+        """Test error for truncated stream."""
+        content = make_zip(zipfile.ZIP_DEFLATED, seekable)
+        with pytest.raises(ZipStreamError):
+            list(iter_zip(split(content[:len(content) // 2], 4096)))
+
+    def test_bad_crc(self):
+        """Test error for corrupted entry."""
+        content = bytearray(make_zip(zipfile.ZIP_STORED, seekable=True))
+        position = content.index(ZIP_FILES['SER00001/IMG00001'])
+        content[position] ^= 0xFF
+        with pytest.raises(ZipStreamError):
+            list(iter_zip([bytes(content)]))
+
+    def test_not_zip(self):
+        """Test error for not zip stream."""
+        with pytest.raises(ZipStreamError):
+            list(iter_zip([b'<html></html>']))
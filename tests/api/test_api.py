@@ -1,13 +1,16 @@
-from threading import Thread
-from time import monotonic
+from threading import Barrier, Thread
+from time import monotonic, sleep
 
 import pytest
 import requests
 from dynaconf import settings
 
 from ambra_sdk.api import Api
-from ambra_sdk.api.base_api import RateLimit, RateLimits
-from ambra_sdk.exceptions.service import InvalidCredentials
+from ambra_sdk.api.base_api import PoolLimits, RateLimit, RateLimits
+from ambra_sdk.exceptions.service import (
+    AuthorizationRequired,
+    InvalidCredentials,
+)
 
 
 class TestApi:
@@ -214,18 +217,20 @@ class TestApi:
             username='username',
             url='http://127.0.0.1',
             password='pass',
+            rate_limits=RateLimits(
+                default=RateLimit(1, 2),
+                get_limit=None,
+                special=None,
+            ),
         )
         assert api._rate_limits
-        assert api._rate_limits_lock
-        api._wait_for_service_request('')
-        assert api._last_request_time
-        assert api._last_call_period
+        assert api._rate_limiter
 
         now = monotonic()
-        api._last_request_time = now
-        api._last_call_period = 2.0  # 2 seconds
         api._wait_for_service_request('')
-        assert monotonic() - now > 2.0
+        assert monotonic() - now < 0.5
+        api._wait_for_service_request('')
+        assert monotonic() - now > 1.9
 
     def test__wait_for_service_request_in_threads(self):
         """Test wait for service request in threads."""
@@ -252,9 +257,10 @@ class TestApi:
         for thread in threads:  # NOQA:WPS440
             thread.join()
         spent_time = monotonic() - now
-        assert spent_time > (threads_n - 1) * 1  # NOQA:WPS345
+        assert spent_time > (threads_n - 1) * 1 - 0.1  # NOQA:WPS345
         assert spent_time < (threads_n + 1) * 1    # NOQA:WPS345
 
+        # Get bucket is independent and permits burst of 2 calls
         threads = []
         now = monotonic()
         threads_n = 3
@@ -269,5 +275,206 @@ class TestApi:
             thread.join()
 
         spent_time = monotonic() - now
-        assert spent_time > (threads_n - 1) * 0.5
-        assert spent_time < (threads_n + 1) * 1  # NOQA:WPS345
+        assert spent_time > 0.4
+        assert spent_time < 1
+
+    def test_pool_limits(self):
+        """Test pool limits of sessions."""
+        pool_limits = PoolLimits(pool_connections=3, pool_maxsize=7)
+        api = Api.with_sid('url', 'sid', pool_limits=pool_limits)
+        for session in (api.service_session, api.storage_session):
+            adapter = session.get_adapter('https://host')
+            assert adapter.poolmanager.connection_pool_kw['maxsize'] == 7
+            assert adapter._pool_connections == 3
+            assert session.headers['Connection'] == 'keep-alive'
+        api = Api.with_sid(
+            'url',
+            'sid',
+            pool_limits=PoolLimits(keep_alive=False),
+        )
+        assert api.storage_session.headers['Connection'] == 'close'
+
+    def test_pool_usage(self, local_server):
+        """Test pool usage counters."""
+        api = Api.with_sid(
+            local_server,
+            'sid',
+            pool_limits=PoolLimits(pool_maxsize=2),
+        )
+        for _ in range(3):
+            api.storage_get(local_server, required_sid=False)
+        usage = api.pool_usage()['storage']
+        assert usage.requests == 3
+        assert usage.connections == 1
+        assert usage.reused == 2
+        assert usage.discarded == 0
+        assert usage.pools == 1
+
+        threads = [
+            Thread(
+                target=api.storage_get,
+                args=(local_server,),
+                kwargs={'required_sid': False},
+            )
+            for _ in range(6)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        usage = api.pool_usage()['storage']
+        assert usage.requests == 9
+        assert usage.connections > 2
+        assert usage.discarded == usage.connections - 2
+        assert api.pool_usage()['service'].requests == 0
+
+    def test_single_flight_sid_refresh(self, monkeypatch):
+        """Test concurrent authorization errors trigger one login."""
+        api = Api.with_creds('url', 'username', 'password', rate_limits=None)
+        api._sid = 'expired'
+        logins = []
+
+        def get_sid(*args, **kwargs):  # NOQA:WPS430
+            logins.append(1)
+            sleep(0.05)
+            return 'sid_{n}'.format(n=len(logins))
+
+        monkeypatch.setattr(api.Session, 'get_sid', get_sid)
+        barrier = Barrier(8)
+        sids = []
+
+        def call():  # NOQA:WPS430
+            barrier.wait()
+            if api._sid == 'expired':
+                raise AuthorizationRequired()
+            return api._sid
+
+        def request():  # NOQA:WPS430
+            sids.append(api.retry_with_new_sid(call))
+
+        threads = [Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(logins) == 1
+        assert sids == ['sid_1'] * 8
+
+        # Failed request with the current sid gets new sid
+        api._sid = 'expired'
+        barrier = Barrier(1)
+        assert api.retry_with_new_sid(call) == 'sid_2'
+
+    def test_retry_without_sid(self, monkeypatch):
+        """Test rejected sid obtained by the call itself is refreshed."""
+        api = Api.with_creds('url', 'username', 'password', rate_limits=None)
+        logins = []
+
+        def get_sid(*args, **kwargs):  # NOQA:WPS430
+            logins.append(1)
+            return 'sid_{n}'.format(n=len(logins))
+
+        monkeypatch.setattr(api.Session, 'get_sid', get_sid)
+
+        def call():  # NOQA:WPS430
+            sid = api.get_sid()
+            if sid == 'sid_1':
+                raise AuthorizationRequired()
+            return sid
+
+        assert api._sid is None
+        assert api.retry_with_new_sid(call) == 'sid_2'
+        assert len(logins) == 2
+
+    @pytest.mark.parametrize('per_thread', [False, True])
+    def test_thread_sessions(self, per_thread):
+        """Test sessions in threads."""
+        api = Api.with_sid(
+            'url',
+            'sid',
+            pool_limits=PoolLimits(per_thread=per_thread),
+        )
+        barrier = Barrier(4)
+        sessions = []
+
+        def get_session():  # NOQA:WPS430
+            barrier.wait()
+            session = api.storage_session
+            assert api.storage_session is session
+            sessions.append(session)
+
+        threads = [Thread(target=get_session) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        unique_sessions = {id(session) for session in sessions}
+        assert len(unique_sessions) == (4 if per_thread else 1)
+        api._sid = None
+        api.logout()
+
+    def test_keep_alive(self, requests_mock):
+        """Test keep alive refreshes expired sid in background."""
+        api = Api(
+            'http://127.0.0.1',
+            username='username',
+            password='password',
+            sid='expired',
+            rate_limits=None,
+        )
+
+        def ttl(request, context):  # NOQA:WPS430
+            context.headers['content-type'] = 'application/json'
+            if 'sid=expired' in request.text:
+                context.status_code = 401
+                return {}
+            return {'ttl': 100}
+
+        requests_mock.post('http://127.0.0.1/session/ttl', json=ttl)
+        requests_mock.post(
+            'http://127.0.0.1/session/login',
+            json={'sid': 'new_sid'},
+            headers={'content-type': 'application/json'},
+        )
+        api.start_keep_alive(interval=0.05)
+        sleep(0.2)
+        api.stop_keep_alive()
+        assert api._keep_alive_thread is None
+        assert api._sid == 'new_sid'
+        metrics = api.sid_metrics()
+        assert metrics.logins == 1
+        assert metrics.expirations == 1
+        assert metrics.keep_alive_calls >= 1
+        assert metrics.last_lifetime is not None
+        assert metrics.idle < 0.1
+
+    def test_keep_alive_expired(self, requests_mock):
+        """Test keep alive gets new sid if ttl fails with EXPIRED."""
+        api = Api(
+            'http://127.0.0.1',
+            username='username',
+            password='password',
+            sid='expired',
+            rate_limits=None,
+        )
+
+        def ttl(request, context):  # NOQA:WPS430
+            context.headers['content-type'] = 'application/json'
+            if 'sid=expired' in request.text:
+                context.status_code = 412
+                return {'status': 'ERROR', 'error_type': 'EXPIRED'}
+            return {'ttl': 100}
+
+        requests_mock.post('http://127.0.0.1/session/ttl', json=ttl)
+        requests_mock.post(
+            'http://127.0.0.1/session/login',
+            json={'sid': 'new_sid'},
+            headers={'content-type': 'application/json'},
+        )
+        api.start_keep_alive(interval=0.05)
+        sleep(0.2)
+        api.stop_keep_alive()
+        assert api._sid == 'new_sid'
+        metrics = api.sid_metrics()
+        assert metrics.logins == 1
+        assert metrics.expirations == 1
@@ -7,8 +7,11 @@ from aioresponses import CallbackResult, aioresponses
 from dynaconf import settings
 
 from ambra_sdk.api import AsyncApi
-from ambra_sdk.api.base_api import RateLimit, RateLimits
-from ambra_sdk.exceptions.service import InvalidCredentials
+from ambra_sdk.api.base_api import PoolLimits, RateLimit, RateLimits
+from ambra_sdk.exceptions.service import (
+    AuthorizationRequired,
+    InvalidCredentials,
+)
 
 
 class FixedAioresponses(aioresponses):
@@ -201,18 +204,20 @@ class TestAsyncApi:
             username='username',
             url='http://127.0.0.1',
             password='pass',
+            rate_limits=RateLimits(
+                default=RateLimit(1, 2),
+                get_limit=None,
+                special=None,
+            ),
         )
         assert api._rate_limits
-        assert api._rate_limits_lock
-        await api._wait_for_service_request('')
-        assert api._last_request_time
-        assert api._last_call_period
+        assert api._rate_limiter
 
         now = monotonic()
-        api._last_request_time = now
-        api._last_call_period = 2.0  # 2 seconds
         await api._wait_for_service_request('')
-        assert monotonic() - now > 2.0
+        assert monotonic() - now < 0.5
+        await api._wait_for_service_request('')
+        assert monotonic() - now > 1.9
 
     @pytest.mark.asyncio
     async def test__wait_for_service_request_in_multiple_tasks(self):
@@ -237,9 +242,10 @@ class TestAsyncApi:
             ],
         )
         spent_time = monotonic() - now
-        assert spent_time > (concurrent_tasks - 1) * 1  # NOQA:WPS345
+        assert spent_time > (concurrent_tasks - 1) * 1 - 0.1  # NOQA:WPS345
         assert spent_time < (concurrent_tasks + 1) * 1  # NOQA:WPS345
 
+        # Get bucket is independent and permits burst of 2 calls
         now = monotonic()
         concurrent_tasks = 3
 
@@ -250,5 +256,144 @@ class TestAsyncApi:
             ],
         )
         spent_time = monotonic() - now
-        assert spent_time > (concurrent_tasks - 1) * 0.5
-        assert spent_time < (concurrent_tasks + 1) * 1  # NOQA:WPS345
+        assert spent_time > 0.4
+        assert spent_time < 1
+
+    @pytest.mark.asyncio
+    async def test_pool_usage(self, local_server):
+        """Test pool limits and usage counters."""
+        api = AsyncApi.with_sid(
+            local_server,
+            'sid',
+            pool_limits=PoolLimits(limit=2),
+        )
+        connector = api.storage_session.connector
+        assert connector.limit == 2
+
+        async def get():  # NOQA:WPS430
+            response = await api.storage_get(local_server, required_sid=False)
+            await response.read()
+
+        await asyncio.gather(*(get() for _ in range(6)))
+        await api.storage_session.close()
+        usage = api.pool_usage()['storage']
+        assert usage.requests == 6
+        assert usage.connections == 2
+        assert usage.reused == 4
+        assert usage.queued > 0
+
+    @pytest.mark.asyncio
+    async def test_single_flight_sid_refresh(self, monkeypatch):
+        """Test concurrent authorization errors trigger one login."""
+        api = AsyncApi.with_creds(
+            'url',
+            'username',
+            'password',
+            rate_limits=None,
+        )
+        api._sid = 'expired'
+        logins = []
+
+        async def get_sid(*args, **kwargs):  # NOQA:WPS430
+            logins.append(1)
+            await asyncio.sleep(0.01)
+            return 'sid_{n}'.format(n=len(logins))
+
+        monkeypatch.setattr(api.Session, 'get_sid', get_sid)
+
+        async def call():  # NOQA:WPS430
+            sid = api._sid
+            await asyncio.sleep(0)
+            if sid == 'expired':
+                raise AuthorizationRequired()
+            return sid
+
+        sids = await asyncio.gather(*(
+            api.retry_with_new_sid(call) for _ in range(50)
+        ))
+        assert len(logins) == 1
+        assert sids == ['sid_1'] * 50
+
+        # Failed request with the current sid gets new sid
+        api._sid = 'expired'
+        assert await api.retry_with_new_sid(call) == 'sid_2'
+
+    @pytest.mark.asyncio
+    async def test_retry_without_sid(self, monkeypatch):
+        """Test rejected sid obtained by the call itself is refreshed."""
+        api = AsyncApi.with_creds(
+            'url',
+            'username',
+            'password',
+            rate_limits=None,
+        )
+        logins = []
+
+        async def get_sid(*args, **kwargs):  # NOQA:WPS430
+            logins.append(1)
+            return 'sid_{n}'.format(n=len(logins))
+
+        monkeypatch.setattr(api.Session, 'get_sid', get_sid)
+
+        async def call():  # NOQA:WPS430
+            sid = await api.get_sid()
+            if sid == 'sid_1':
+                raise AuthorizationRequired()
+            return sid
+
+        assert api._sid is None
+        assert await api.retry_with_new_sid(call) == 'sid_2'
+        assert len(logins) == 2
+
+    @pytest.mark.asyncio
+    async def test_keep_alive(self):
+        """Test keep alive calls session ttl if sid is idle."""
+        api = AsyncApi.with_sid('http://127.0.0.1', 'sid', rate_limits=None)
+        with aioresponses() as mocked:
+            mocked.post(
+                'http://127.0.0.1/session/ttl',
+                payload={'ttl': 100},
+                repeat=True,
+            )
+            api.start_keep_alive(interval=0.05)
+            await asyncio.sleep(0.2)
+            await api.stop_keep_alive()
+        metrics = api.sid_metrics()
+        assert metrics.keep_alive_calls >= 2
+        assert metrics.logins == 0
+        assert metrics.age >= 0.2
+        assert metrics.idle < 0.1
+
+    @pytest.mark.asyncio
+    async def test_keep_alive_expired(self, monkeypatch):
+        """Test keep alive gets new sid if ttl fails with EXPIRED."""
+        api = AsyncApi(
+            'http://127.0.0.1',
+            username='username',
+            password='password',
+            sid='expired',
+            rate_limits=None,
+        )
+
+        async def get_sid(*args, **kwargs):  # NOQA:WPS430
+            return 'new_sid'
+
+        monkeypatch.setattr(api.Session, 'get_sid', get_sid)
+        with aioresponses() as mocked:
+            mocked.post(
+                'http://127.0.0.1/session/ttl',
+                status=412,
+                payload={'status': 'ERROR', 'error_type': 'EXPIRED'},
+            )
+            mocked.post(
+                'http://127.0.0.1/session/ttl',
+                payload={'ttl': 100},
+                repeat=True,
+            )
+            api.start_keep_alive(interval=0.05)
+            await asyncio.sleep(0.2)
+            await api.stop_keep_alive()
+        assert api._sid == 'new_sid'
+        metrics = api.sid_metrics()
+        assert metrics.logins == 1
+        assert metrics.expirations == 1
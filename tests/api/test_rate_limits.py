@@ -1,6 +1,7 @@
 """Test rate limits."""
 
 from ambra_sdk.api.base_api import RateLimit, RateLimits
+from ambra_sdk.api.rate_limiter import RateLimiter, TokenBucket
 
 
 class TestRateLimits:
@@ -35,3 +36,67 @@ class TestRateLimits:
         assert rls.call_period('abc') == 2 / 3
         assert rls.call_period('abc/get') == 2 / 4
         assert rls.call_period('special') == 2 / 5
+
+    def test_bucket(self):
+        """Test rate limits bucket."""
+        rls = RateLimits(
+            default=RateLimit(3, 2),
+            get_limit=RateLimit(4, 2),
+            special={'special/get': RateLimit(5, 2)},
+        )
+        assert rls.bucket('abc') == ('default', RateLimit(3, 2))
+        assert rls.bucket('abc/get') == ('get', RateLimit(4, 2))
+        assert rls.bucket('special/get') == (
+            'special/get',
+            RateLimit(5, 2),
+        )
+
+
+class TestTokenBucket:
+    """Test token bucket."""
+
+    def test_burst(self):
+        """Test burst equal to calls by default."""
+        bucket = TokenBucket(RateLimit(2, 1))
+        now = bucket._updated
+        assert bucket.reserve(now) == 0
+        assert bucket.reserve(now) == 0
+        assert bucket.reserve(now) == 0.5
+        assert bucket.reserve(now) == 1
+
+    def test_special_burst(self):
+        """Test special burst."""
+        bucket = TokenBucket(RateLimit(2, 1, burst=1))
+        now = bucket._updated
+        assert bucket.reserve(now) == 0
+        assert bucket.reserve(now) == 0.5
+
+    def test_refill(self):
+        """Test bucket refill."""
+        bucket = TokenBucket(RateLimit(1, 2))
+        now = bucket._updated
+        assert bucket.reserve(now) == 0
+        assert bucket.reserve(now + 1) == 1
+        # Bucket can not hold more than burst tokens
+        assert bucket.reserve(now + 100) == 0
+        assert bucket.reserve(now + 100) == 2
+
+
+class TestRateLimiter:
+    """Test rate limiter."""
+
+    def test_independent_buckets(self):
+        """Test independent buckets."""
+        limiter = RateLimiter(
+            RateLimits(
+                default=RateLimit(1, 10),
+                get_limit=RateLimit(1, 10),
+                special={'special': RateLimit(1, 10)},
+            ),
+        )
+        assert limiter.reserve('abc') == 0
+        assert limiter.reserve('abc/get') == 0
+        assert limiter.reserve('special') == 0
+        assert limiter.reserve('abc') > 9
+        assert limiter.reserve('other/get') > 9
+        assert limiter.reserve('special') > 9
@@ -67,6 +67,8 @@ pytest_plugins = [
     'tests.fixtures.async_study',
     'tests.fixtures.ws',
     'tests.fixtures.customfield',
+    'tests.fixtures.pagination',
+    'tests.fixtures.local_server',
 ]
 
 
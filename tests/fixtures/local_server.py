@@ -0,0 +1,51 @@
+"""Local http server fixtures."""
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from threading import Thread
+from time import sleep
+
+import pytest
+
+RESPONSE_DELAY = 0.05
+
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    """Threading http server."""
+
+    daemon_threads = True
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    """Keep alive handler with response delay."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):  # NOQA:N802
+        """Respond to get request."""
+        sleep(RESPONSE_DELAY)
+        body = b'ok'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # NOQA:WPS110
+        """Disable logging.
+
+        :param args: args
+        """
+
+
+@pytest.fixture
+def local_server():
+    """Local http server.
+
+    :yields: server url
+    """
+    server = ThreadingServer(('127.0.0.1', 0), SlowHandler)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{port}'.format(port=server.server_address[1])
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,42 @@
+"""Paginated response fixtures."""
+
+from urllib.parse import parse_qs
+
+import pytest
+
+from ambra_sdk.api import Api
+
+ROWS_COUNT = 23
+ROWS_IN_PAGE = 5
+
+
+@pytest.fixture
+def paginated_api(requests_mock):
+    """Api with mocked paginated /study/list.
+
+    :param requests_mock: requests mock
+    :return: api
+    """
+    api = Api.with_sid(
+        url='http://127.0.0.1',
+        sid='sid',
+        rate_limits=None,
+    )
+
+    def page_response(request, context):  # NOQA:WPS430
+        request_data = parse_qs(request.text)
+        rows = int(request_data['page.rows'][0])
+        page_number = int(request_data['page.number'][0])
+        start = (page_number - 1) * rows
+        end = min(start + rows, ROWS_COUNT)
+        context.headers['content-type'] = 'application/json'
+        return {
+            'page': {'more': int(end < ROWS_COUNT), 'rows': rows},
+            'studies': [{'id': row} for row in range(start, end)],
+        }
+
+    requests_mock.post(
+        api.service_full_url('/study/list'),
+        json=page_response,
+    )
+    return api
@@ -1,6 +1,11 @@
 """Websocket fixtures."""
 
+import asyncio
+import json
+from threading import Event, Thread
+
 import pytest
+from aiohttp import web
 from dynaconf import settings
 
 from ambra_sdk.service.ws import WSManager
@@ -64,3 +69,107 @@ def account_ws(api, account, ws):
     ws.subscribe(api.sid, channel_name)
     yield ws
     ws.unsubscribe(channel_name)
+
+
+class WSServer:
+    """Local websocket server of channel events."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.sockets = []
+        self.requests = []
+        # Answers of (un)subscription of held channels are delayed
+        self.held = set()
+        self._held_answers = []
+        self.url = None
+        self._started = Event()
+        self._thread = Thread(target=self._serve, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self._started.wait()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(
+            self._runner.cleanup(),
+            self.loop,
+        ).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+    def send(self, message):
+        """Send message to all connected sockets.
+
+        :param message: message json
+        """
+        async def _send():  # NOQA:WPS430
+            for socket in self.sockets:
+                await socket.send_str(json.dumps(message))
+
+        asyncio.run_coroutine_threadsafe(_send(), self.loop).result()
+
+    def disconnect(self):
+        """Close all connected sockets."""
+        async def _close():  # NOQA:WPS430
+            sockets, self.sockets = self.sockets, []
+            for socket in sockets:
+                await socket.close()
+
+        asyncio.run_coroutine_threadsafe(_close(), self.loop).result()
+
+    def release(self):
+        """Send delayed answers of held channels."""
+        async def _release():  # NOQA:WPS430
+            answers, self._held_answers = self._held_answers, []
+            self.held = set()
+            for socket, answer in answers:
+                await socket.send_str(answer)
+
+        asyncio.run_coroutine_threadsafe(_release(), self.loop).result()
+
+    async def _handler(self, request):
+        socket = web.WebSocketResponse()
+        await socket.prepare(request)
+        self.sockets.append(socket)
+        async for msg in socket:
+            ws_request = json.loads(msg.data)
+            self.requests.append(ws_request)
+            if ws_request['action'] in {'subscribe', 'unsubscribe'}:
+                answer = json.dumps({
+                    'status': 'OK',
+                    'channel': ws_request['channel'],
+                })
+                if ws_request['channel'] in self.held:
+                    self._held_answers.append((socket, answer))
+                else:
+                    await socket.send_str(answer)
+        if socket in self.sockets:
+            self.sockets.remove(socket)
+        return socket
+
+    def _serve(self):
+        asyncio.set_event_loop(self.loop)
+        app = web.Application()
+        app.router.add_get('/channel/websocket', self._handler)
+        self._runner = web.AppRunner(app)
+        self.loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        self.loop.run_until_complete(site.start())
+        port = self._runner.addresses[0][1]
+        self.url = 'http://127.0.0.1:{port}/channel/websocket'.format(
+            port=port,
+        )
+        self._started.set()
+        self.loop.run_forever()
+
+
+@pytest.fixture
+def ws_server():
+    """Websocket server.
+
+    :yields: server
+    """
+    server = WSServer()
+    server.start()
+    yield server
+    server.stop()
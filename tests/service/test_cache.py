@@ -0,0 +1,203 @@
+from urllib.parse import parse_qs
+
+import pytest
+from aioresponses import aioresponses
+
+from ambra_sdk.api import Api, AsyncApi
+from ambra_sdk.service.cache import (
+    CacheBackend,
+    MemoryCache,
+    ResponseCache,
+    SQLiteCache,
+)
+from tests.fixtures.pagination import ROWS_COUNT, ROWS_IN_PAGE
+
+ACCOUNT_JSON = {'uuid': 'account', 'name': 'name', 'status': 'OK'}
+
+
+@pytest.fixture
+def api(requests_mock):
+    """Api with mocked /account/get.
+
+    :param requests_mock: requests mock
+    :return: api
+    """
+    api = Api.with_sid(
+        url='http://127.0.0.1',
+        sid='sid',
+        rate_limits=None,
+    )
+    requests_mock.post(
+        api.service_full_url('/account/get'),
+        json=ACCOUNT_JSON,
+        headers={'content-type': 'application/json'},
+    )
+    return api
+
+
+class TestCacheBackends:
+    """Test cache backends."""
+
+    @pytest.fixture(params=['memory', 'sqlite'])
+    def backend(self, request, tmp_path):
+        """Cache backend.
+
+        :param request: pytest request
+        :param tmp_path: temporary directory
+        :yields: backend with max size 2
+        """
+        if request.param == 'memory':
+            yield MemoryCache(max_size=2)
+            return
+        backend = SQLiteCache(str(tmp_path / 'cache.sqlite'), max_size=2)
+        yield backend
+        backend.close()
+
+    def test_incomplete_backend(self):
+        """Test backend without all methods is not created."""
+
+        class GetOnlyCache(CacheBackend):  # NOQA:WPS431
+            def get(self, key):
+                return None
+
+        with pytest.raises(TypeError):
+            GetOnlyCache()
+
+    def test_ttl(self, backend, monkeypatch):
+        """Test expired values."""
+        backend.set('key', '/url', '"value"', 60)
+        assert backend.get('key') == '"value"'
+        backend.set('key', '/url', '"value"', -1)
+        assert backend.get('key') is None
+
+    def test_lru(self, backend):
+        """Test eviction of least recently used values."""
+        backend.set('first', '/url', '1', 60)
+        backend.set('second', '/url', '2', 60)
+        assert backend.get('first') == '1'
+        backend.set('third', '/url', '3', 60)
+        assert backend.get('second') is None
+        assert backend.get('first') == '1'
+        assert backend.get('third') == '3'
+
+    def test_invalidate(self, backend):
+        """Test invalidation by url."""
+        backend.set('first', '/first', '1', 60)
+        backend.set('second', '/second', '2', 60)
+        backend.invalidate('/first')
+        assert backend.get('first') is None
+        assert backend.get('second') == '2'
+        backend.invalidate()
+        assert backend.get('second') is None
+
+    def test_sqlite_persistence(self, tmp_path):
+        """Test values are kept between instances."""
+        path = str(tmp_path / 'cache.sqlite')
+        backend = SQLiteCache(path)
+        backend.set('key', '/url', '1', 60)
+        backend.close()
+        backend = SQLiteCache(path)
+        assert backend.get('key') == '1'
+        backend.close()
+
+
+class TestResponseCache:
+    """Test response cache."""
+
+    def test_key_without_sid(self):
+        """Test sid and data order are not in the key."""
+        cache = ResponseCache()
+        assert cache.key('/url', {'sid': 'a', 'x': 1, 'y': 2}) == \
+            cache.key('/url', {'y': 2, 'x': 1, 'sid': 'b'})
+        assert cache.key('/url', {'x': 1}) != cache.key('/url', {'x': 2})
+        assert cache.key('/url', {'x': 1}) != cache.key('/other', {'x': 1})
+
+    def test_ttl(self):
+        """Test query ttl."""
+        cache = ResponseCache(ttls={'/url': 10}, default_ttl=5)
+        assert cache.ttl('/url') == 10
+        assert cache.ttl('/other') is None
+        assert cache.ttl('/other', cached=True) == 5
+        assert cache.ttl('/url', cached=True, ttl=1) == 1
+        assert cache.ttl('/url', cached=True, ttl=0) is None
+
+    def test_cached(self, api, requests_mock):
+        """Test cached query."""
+        first = api.Account.get(uuid='account').cached(ttl=60).get()
+        second = api.Account.get(uuid='account').cached(ttl=60).get()
+        assert first == second
+        assert second.uuid == 'account'
+        assert requests_mock.call_count == 1
+        assert api.cache.stats().hits == 1
+
+        api.Account.get(uuid='other').cached(ttl=60).get()
+        api.Account.get(uuid='account').get()
+        assert requests_mock.call_count == 3
+
+    def test_invalidate(self, api, requests_mock):
+        """Test invalidation."""
+        api.Account.get(uuid='account').cached().get()
+        api.cache.invalidate('/account/get')
+        api.Account.get(uuid='account').cached().get()
+        assert requests_mock.call_count == 2
+
+    def test_endpoint_ttls(self, api, requests_mock):
+        """Test ttl configured for method url."""
+        api.cache = ResponseCache(ttls={'/account/get': 60})
+        api.Account.get(uuid='account').get()
+        api.Account.get(uuid='account').get()
+        assert requests_mock.call_count == 1
+
+    def test_sid_change(self, api, requests_mock):
+        """Test cached response is used with a new sid."""
+        api.Account.get(uuid='account').cached().get()
+        api._sid = 'new_sid'  # NOQA:WPS437
+        api.Account.get(uuid='account').cached().get()
+        assert requests_mock.call_count == 1
+
+    def test_pages(self, paginated_api, requests_mock):
+        """Test cached pages."""
+        for _ in range(2):
+            rows = paginated_api.Study.list() \
+                .set_rows_in_page(ROWS_IN_PAGE) \
+                .cached() \
+                .all()
+            assert [row.id for row in rows] == list(range(ROWS_COUNT))
+        assert requests_mock.call_count == ROWS_COUNT // ROWS_IN_PAGE + 1
+
+    def test_prefetch_pages(self, paginated_api, requests_mock):
+        """Test cached prefetched pages."""
+        pages_count = ROWS_COUNT // ROWS_IN_PAGE + 1
+        calls = []
+        for _ in range(2):
+            rows = paginated_api.Study.list() \
+                .set_rows_in_page(ROWS_IN_PAGE) \
+                .cached() \
+                .all() \
+                .prefetch(pages=3)
+            assert [row.id for row in rows] == list(range(ROWS_COUNT))
+            calls.append(requests_mock.call_count)
+        # Only extra (empty) pages can be requested again
+        first_run_calls = calls[0]
+        for request in requests_mock.request_history[first_run_calls:]:
+            assert int(parse_qs(request.text)['page.number'][0]) > pages_count
+
+    @pytest.mark.asyncio
+    async def test_async_cached(self):
+        """Test cached async query."""
+        api = AsyncApi.with_sid(
+            url='http://127.0.0.1',
+            sid='sid',
+            rate_limits=None,
+        )
+        with aioresponses() as mocked:
+            mocked.post(
+                api.service_full_url('/account/get'),
+                payload=ACCOUNT_JSON,
+                repeat=True,
+            )
+            await api.Account.get(uuid='account').cached().get()
+            account = await api.Account.get(uuid='account').cached().get()
+            assert account.uuid == 'account'
+            assert len(list(mocked.requests.values())[0]) == 1
+        await api.service_session.close()
@@ -0,0 +1,194 @@
+import io
+from datetime import date, datetime
+
+import pytest
+
+from ambra_sdk.models import Accelerator, RadreportAnalytics, Study
+from ambra_sdk.service.response.columns import (
+    AsyncColumnsExport,
+    ColumnBuffers,
+    ColumnsExport,
+)
+from tests.fixtures.pagination import ROWS_COUNT, ROWS_IN_PAGE
+
+ROWS = (
+    {
+        'id': 1,
+        'uuid': 'u1',
+        'global': 1,
+        'created': '2020-08-20 10:09:23.5',
+        'study_date': '2020-08-20',
+        'customfields': [{'uuid': 'cf'}],
+    },
+    {
+        'id': '2',
+        'uuid': None,
+        'global': False,
+        'created': '2020-08-20 10:09:23-04',
+    },
+    {'id': None, 'global': '0', 'created': None},
+)
+
+FIELDS = (
+    Study.id,
+    Study.uuid,
+    Accelerator.global_field,
+    Study.created,
+    'study_date',
+    'customfields',
+)
+
+
+class AsyncRows:
+    """Async iterable rows."""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._rows)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class TestColumnBuffers:
+    """Test column buffers."""
+
+    def test_to_dict(self):
+        """Test typed values of columns."""
+        buffers = ColumnBuffers(FIELDS)
+        for row in ROWS:
+            buffers.append(row)
+        assert buffers.rows == 3
+        assert buffers.names == [
+            'id', 'uuid', 'global', 'created', 'study_date', 'customfields',
+        ]
+        columns = buffers.to_dict()
+        assert columns['id'] == [1, 2, None]
+        assert columns['uuid'] == ['u1', None, None]
+        assert columns['global'] == [True, False, False]
+        assert columns['customfields'] == ['[{"uuid": "cf"}]', None, None]
+        buffers.clear()
+        assert buffers.rows == 0
+        assert buffers.to_dict()['id'] == []
+
+    def test_wrong_value(self):
+        """Test row with wrong value is not appended."""
+        buffers = ColumnBuffers(FIELDS)
+        buffers.append(ROWS[0])
+        with pytest.raises(ValueError):
+            buffers.append({'id': 2, 'uuid': 'u2', 'created': 'wrong'})
+        buffers.append(ROWS[2])
+        assert buffers.rows == 2
+        columns = buffers.to_dict()
+        assert columns['id'] == [1, None]
+        assert columns['uuid'] == ['u1', None]
+        assert columns['created'] == ['2020-08-20 10:09:23.5', None]
+
+    def test_to_arrow(self):
+        """Test arrow batch."""
+        pyarrow = pytest.importorskip('pyarrow')
+        buffers = ColumnBuffers([Study.id, Study.created, RadreportAnalytics.day])
+        buffers.append({'id': 1, 'created': '2020-08-20 10:09:23'})
+        buffers.append({'id': None, 'day': '2020-08-21'})
+        batch = buffers.to_arrow()
+        assert batch.schema.field('id').type == pyarrow.int64()
+        assert batch.schema.field('created').type == pyarrow.timestamp('us')
+        assert batch.to_pydict() == {
+            'id': [1, None],
+            'created': [datetime(2020, 8, 20, 10, 9, 23), None],  # NOQA:WPS432
+            'day': [None, date(2020, 8, 21)],
+        }
+
+    def test_mixed_zones(self):
+        """Test timestamps with and without zone offset in one column."""
+        pytest.importorskip('pyarrow')
+        buffers = ColumnBuffers([Study.created])
+        for created in (
+            '2020-08-20 10:09:23',
+            '2020-08-20T10:09:23.123456789+02:30',
+            '2020-08-20 10:09:23Z',
+            datetime(2020, 8, 20, 10, 9, 23),  # NOQA:WPS432
+        ):
+            buffers.append({'created': created})
+        assert buffers.to_arrow().to_pydict()['created'] == [
+            datetime(2020, 8, 20, 10, 9, 23),  # NOQA:WPS432
+            datetime(2020, 8, 20, 7, 39, 23, 123456),  # NOQA:WPS432
+            datetime(2020, 8, 20, 10, 9, 23),  # NOQA:WPS432
+            datetime(2020, 8, 20, 10, 9, 23),  # NOQA:WPS432
+        ]
+        with pytest.raises(ValueError, match='Wrong date time'):
+            buffers.append({'created': 'yesterday'})
+
+
+class TestColumnsExport:
+    """Test columns export."""
+
+    def test_to_csv(self):
+        """Test csv export by batches."""
+        csv_file = io.StringIO()
+        rows = ColumnsExport(ROWS, FIELDS, batch_rows=2).to_csv(csv_file)
+        assert rows == 3
+        assert csv_file.getvalue().splitlines() == [
+            'id,uuid,global,created,study_date,customfields',
+            '1,u1,True,2020-08-20 10:09:23.5,2020-08-20,"[{""uuid"": ""cf""}]"',
+            '2,,False,2020-08-20 10:09:23-04,,',
+            ',,False,,,',
+        ]
+
+    def test_to_parquet(self, tmp_path):
+        """Test parquet export by batches."""
+        pyarrow = pytest.importorskip('pyarrow')
+        path = str(tmp_path / 'rows.parquet')
+        rows = ColumnsExport(ROWS, FIELDS, batch_rows=2).to_parquet(path)
+        assert rows == 3
+        table = pyarrow.parquet.read_table(path)
+        assert table.column('id').to_pylist() == [1, 2, None]
+        assert table.column('created').to_pylist()[1] == \
+            datetime(2020, 8, 20, 14, 9, 23)  # NOQA:WPS432
+
+    def test_to_arrow(self):
+        """Test arrow export."""
+        pytest.importorskip('pyarrow')
+        table = ColumnsExport(ROWS, FIELDS, batch_rows=1).to_arrow()
+        assert table.num_rows == 3
+        assert table.column('global').to_pylist() == [True, False, False]
+
+    def test_response_to_columns(self, paginated_api):
+        """Test iterable response to columns."""
+        rows = paginated_api.Study.list() \
+            .set_rows_in_page(ROWS_IN_PAGE) \
+            .all()
+        export = rows.to_columns([Study.id], batch_rows=10)
+        batches = [batch.to_dict()['id'] for batch in export.batches()]
+        assert batches == [
+            list(range(0, 10)),
+            list(range(10, 20)),
+            list(range(20, ROWS_COUNT)),
+        ]
+        # Return type of response is not changed
+        assert rows.first().id == 0
+
+
+class TestAsyncColumnsExport:
+    """Test async columns export."""
+
+    @pytest.mark.asyncio
+    async def test_to_csv(self):
+        """Test csv export by batches."""
+        csv_file = io.StringIO()
+        export = AsyncColumnsExport(AsyncRows(ROWS), FIELDS, batch_rows=2)
+        assert await export.to_csv(csv_file, header=False) == 3
+        assert len(csv_file.getvalue().splitlines()) == 3
+
+    @pytest.mark.asyncio
+    async def test_to_arrow(self):
+        """Test arrow export."""
+        pytest.importorskip('pyarrow')
+        export = AsyncColumnsExport(AsyncRows(ROWS), FIELDS, batch_rows=2)
+        table = await export.to_arrow()
+        assert table.column('id').to_pylist() == [1, 2, None]
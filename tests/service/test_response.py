@@ -0,0 +1,322 @@
+import asyncio
+import json
+import re
+
+import pytest
+from aioresponses import CallbackResult, aioresponses
+
+from ambra_sdk.api import AsyncApi
+from ambra_sdk.api.base_api import RateLimit, RateLimits
+from ambra_sdk.exceptions.service import AuthorizationRequired
+from ambra_sdk.service.response.stream import PageDecoder
+from tests.fixtures.pagination import ROWS_COUNT, ROWS_IN_PAGE
+
+PAGE_JSON = (
+    '{"studies": [{"id": 1, "name": "\\u0441\u0442"}, {"id": 22}],'
+    ' "page": {"more": 0, "rows": 5}}'
+).encode()
+
+
+class TestPageDecoder:
+    """Test page decoder."""
+
+    @pytest.mark.parametrize('chunk_size', [1, 2, 7, 1024])
+    def test_feed(self, chunk_size):
+        """Test decode page by chunks."""
+        decoder = PageDecoder('studies')
+        rows = []
+        for start in range(0, len(PAGE_JSON), chunk_size):
+            rows.extend(decoder.feed(PAGE_JSON[start:start + chunk_size]))
+        decoder.close()
+        assert rows == [{'id': 1, 'name': 'ст'}, {'id': 22}]
+        assert decoder.fields == {'page': {'more': 0, 'rows': 5}}
+
+    def test_unexpected_end(self):
+        """Test truncated page."""
+        decoder = PageDecoder('studies')
+        decoder.feed(PAGE_JSON[:-10])
+        with pytest.raises(ValueError):
+            decoder.close()
+
+    def test_invalid_json(self):
+        """Test invalid page."""
+        decoder = PageDecoder('studies')
+        with pytest.raises(ValueError):
+            decoder.feed(b'["studies"]')
+
+    def test_invalid_row(self):
+        """Test invalid row is reported before the end of page."""
+        decoder = PageDecoder('studies')
+        assert decoder.feed(b'{"studies": [{"id": 1},') == [{'id': 1}]
+        with pytest.raises(ValueError, match='offset 33'):
+            decoder.feed(b' {"id": 2 "name": "a"}, {"id": 3}')
+
+    @pytest.mark.parametrize('row', [
+        b'1.5',
+        b'-2e10',
+        b'true',
+        b'null',
+        b'"\\u0441\\u0442"',
+    ])
+    def test_truncated_value(self, row):
+        """Test value split between chunks."""
+        page = b'{"studies": [' + row + b']}'
+        decoder = PageDecoder('studies')
+        rows = []
+        for position in range(len(page)):
+            rows.extend(decoder.feed(page[position:position + 1]))
+        decoder.close()
+        assert rows == [json.loads(row)]
+
+
+class TestIterableResponse:
+    """Test iterable response."""
+
+    def test_iterate(self, paginated_api):
+        """Test iterate over all rows."""
+        rows = paginated_api.Study.list() \
+            .set_rows_in_page(ROWS_IN_PAGE) \
+            .all()
+        assert [row.id for row in rows] == list(range(ROWS_COUNT))
+
+    @pytest.mark.parametrize('pages', [1, 3, 10])
+    def test_prefetch(self, paginated_api, requests_mock, pages):
+        """Test iterate over all rows with prefetch."""
+        rows = paginated_api.Study.list() \
+            .set_rows_in_page(ROWS_IN_PAGE) \
+            .all() \
+            .prefetch(pages=pages)
+        assert [row.id for row in rows] == list(range(ROWS_COUNT))
+        pages_count = ROWS_COUNT // ROWS_IN_PAGE + 1
+        assert pages_count <= requests_mock.call_count
+        assert requests_mock.call_count <= pages_count + pages
+
+    def test_prefetch_range(self, paginated_api, requests_mock):
+        """Test prefetch with range."""
+        rows = paginated_api.Study.list() \
+            .set_rows_in_page(ROWS_IN_PAGE) \
+            .all() \
+            .prefetch(pages=3)[7:13]
+        assert [row.id for row in rows] == list(range(7, 13))
+        # Only pages 2 and 3 are requested
+        assert requests_mock.call_count == 2
+
+    def test_prefetch_empty_range(self, paginated_api, requests_mock):
+        """Test prefetch with empty range."""
+        rows = paginated_api.Study.list() \
+            .all() \
+            .prefetch(pages=3)[5:5]
+        assert list(rows) == []
+        assert requests_mock.call_count == 0
+
+    def test_prefetch_negative(self, paginated_api):
+        """Test prefetch negative pages."""
+        with pytest.raises(ValueError):
+            paginated_api.Study.list().all().prefetch(pages=-1)
+
+    def test_prefetch_retry_with_new_sid(self, paginated_api, monkeypatch):
+        """Test prefetch retry with new sid."""
+        new_sids = []
+
+        def get_new_sid():  # NOQA:WPS430
+            new_sids.append('new_sid')
+            paginated_api._sid = 'new_sid'
+            return 'new_sid'
+
+        monkeypatch.setattr(paginated_api, 'get_new_sid', get_new_sid)
+        original_request = paginated_api.service_request
+        failed = []
+
+        def service_request(request_args, required_sid):  # NOQA:WPS430
+            page_number = request_args.data['page.number']
+            if page_number == 2 and not failed:
+                failed.append(page_number)
+                raise AuthorizationRequired()
+            return original_request(
+                request_args=request_args,
+                required_sid=required_sid,
+            )
+
+        monkeypatch.setattr(paginated_api, 'service_request', service_request)
+        rows = paginated_api.Study.list() \
+            .set_rows_in_page(ROWS_IN_PAGE) \
+            .all() \
+            .prefetch(pages=2)
+        assert [row.id for row in rows] == list(range(ROWS_COUNT))
+        assert new_sids == ['new_sid']
+
+
+    @pytest.mark.parametrize('chunk_size', [1, 16, 1024])
+    def test_stream(self, paginated_api, chunk_size):
+        """Test iterate over rows decoded from stream."""
+        rows = paginated_api.Study.list() \
+            .set_rows_in_page(ROWS_IN_PAGE) \
+            .all() \
+            .stream(chunk_size=chunk_size)
+        assert [row.id for row in rows] == list(range(ROWS_COUNT))
+
+    def test_stream_range(self, paginated_api, requests_mock):
+        """Test stream with range."""
+        rows = paginated_api.Study.list() \
+            .set_rows_in_page(ROWS_IN_PAGE) \
+            .all() \
+            .stream()[7:13]
+        assert [row.id for row in rows] == list(range(7, 13))
+        assert requests_mock.call_count == 2
+
+    def test_stream_not_positive_chunk(self, paginated_api):
+        """Test stream with not positive chunk size."""
+        with pytest.raises(ValueError):
+            paginated_api.Study.list().all().stream(chunk_size=0)
+
+
+class TestAsyncIterableResponse:
+    """Test async iterable response."""
+
+    @pytest.fixture
+    def mocked(self):
+        """Mocked /study/list with concurrent requests counter.
+
+        :yields: aioresponses and counters
+        """
+        counters = {'calls': 0, 'active': 0, 'max_active': 0}
+
+        async def page_response(url, **kwargs):  # NOQA:WPS430
+            counters['calls'] += 1
+            counters['active'] += 1
+            counters['max_active'] = max(
+                counters['max_active'],
+                counters['active'],
+            )
+            await asyncio.sleep(0.01)
+            counters['active'] -= 1
+            request_data = kwargs['data']
+            rows = int(request_data['page.rows'])
+            page_number = int(request_data['page.number'])
+            start = (page_number - 1) * rows
+            end = min(start + rows, ROWS_COUNT)
+            return CallbackResult(
+                payload={
+                    'page': {'more': int(end < ROWS_COUNT), 'rows': rows},
+                    'studies': [{'id': row} for row in range(start, end)],
+                },
+            )
+
+        with aioresponses() as mocked:
+            mocked.post(
+                re.compile(r'.*/study/list'),
+                callback=page_response,
+                repeat=True,
+            )
+            yield counters
+
+    @pytest.fixture
+    def async_paginated_api(self):
+        """Async api.
+
+        :return: api
+        """
+        return AsyncApi.with_sid(
+            url='http://127.0.0.1',
+            sid='sid',
+            rate_limits=None,
+        )
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('pages', [0, 1, 3, 10])
+    async def test_prefetch(self, async_paginated_api, mocked, pages):
+        """Test iterate over all rows with prefetch."""
+        rows = async_paginated_api.Study.list() \
+            .set_rows_in_page(ROWS_IN_PAGE) \
+            .all() \
+            .prefetch(pages=pages)
+        ids = [row.id async for row in rows]
+        assert ids == list(range(ROWS_COUNT))
+        pages_count = ROWS_COUNT // ROWS_IN_PAGE + 1
+        assert pages_count <= mocked['calls'] <= pages_count + pages
+        assert mocked['max_active'] <= max(pages, 1)
+        if pages > 1:
+            assert mocked['max_active'] > 1
+
+    @pytest.mark.asyncio
+    async def test_prefetch_one_page(self, async_paginated_api, mocked):
+        """Test only first page is requested for one page result."""
+        rows = async_paginated_api.Study.list() \
+            .set_rows_in_page(100) \
+            .all() \
+            .prefetch(pages=3)
+        ids = [row.id async for row in rows]
+        assert ids == list(range(ROWS_COUNT))
+        assert mocked['calls'] == 1
+
+    @pytest.mark.asyncio
+    async def test_prefetch_range(self, async_paginated_api, mocked):
+        """Test prefetch with range."""
+        rows = async_paginated_api.Study.list() \
+            .set_rows_in_page(ROWS_IN_PAGE) \
+            .all() \
+            .prefetch(pages=3)[7:13]
+        ids = [row.id async for row in rows]
+        assert ids == list(range(7, 13))
+        assert mocked['calls'] == 2
+
+    @pytest.mark.asyncio
+    async def test_prefetch_close(self, async_paginated_api, mocked):
+        """Test prefetched pages are finished on close of iterator."""
+        rows = async_paginated_api.Study.list() \
+            .set_rows_in_page(ROWS_IN_PAGE) \
+            .all() \
+            .prefetch(pages=3)
+        rows_iterator = rows.__aiter__()  # NOQA:WPS609
+        assert (await rows_iterator.__anext__()).id == 0  # NOQA:WPS609
+        await rows_iterator.aclose()
+        current_task = asyncio.current_task()
+        assert [
+            task for task in asyncio.all_tasks() if task is not current_task
+        ] == []
+
+    @pytest.mark.asyncio
+    async def test_prefetch_rate_limits(self, mocked):
+        """Test prefetch honours rate limits."""
+        api = AsyncApi.with_sid(
+            url='http://127.0.0.1',
+            sid='sid',
+            rate_limits=RateLimits(
+                default=RateLimit(10, 1, burst=1),
+                get_limit=None,
+                special=None,
+            ),
+        )
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        rows = api.Study.list() \
+            .set_rows_in_page(ROWS_IN_PAGE) \
+            .all() \
+            .prefetch(pages=10)
+        ids = [row.id async for row in rows]
+        assert ids == list(range(ROWS_COUNT))
+        # 10 calls per second without bursts
+        assert loop.time() - start >= (mocked['calls'] - 1) * 0.1 - 0.05
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('chunk_size', [1, 16, 1024])
+    async def test_stream(self, async_paginated_api, mocked, chunk_size):
+        """Test iterate over rows decoded from stream."""
+        rows = async_paginated_api.Study.list() \
+            .set_rows_in_page(ROWS_IN_PAGE) \
+            .all() \
+            .stream(chunk_size=chunk_size)
+        ids = [row.id async for row in rows]
+        assert ids == list(range(ROWS_COUNT))
+        assert mocked['calls'] == ROWS_COUNT // ROWS_IN_PAGE + 1
+
+    @pytest.mark.asyncio
+    async def test_stream_range(self, async_paginated_api, mocked):
+        """Test stream with range."""
+        rows = async_paginated_api.Study.list() \
+            .set_rows_in_page(ROWS_IN_PAGE) \
+            .all() \
+            .stream()[7:13]
+        ids = [row.id async for row in rows]
+        assert ids == list(range(7, 13))
+        assert mocked['calls'] == 2
@@ -0,0 +1,89 @@
+import pytest
+
+from ambra_sdk.models import Accelerator, Study
+from ambra_sdk.service.rows import (
+    BaseRecord,
+    TupleConstructor,
+    as_dict,
+    model_fields,
+    record_class,
+)
+from tests.fixtures.pagination import ROWS_COUNT, ROWS_IN_PAGE
+
+
+class TestRowConstructors:
+    """Test row constructors."""
+
+    def test_as_dict(self):
+        """Test as dict."""
+        row = {'a': {'b': 1}}
+        assert as_dict(row) is row
+
+    def test_tuple_constructor(self):
+        """Test tuple constructor."""
+        constructor = TupleConstructor(['uuid', Study.study_uid, 'missing'])
+        row = {'uuid': 'u', 'study_uid': 's', 'other': 1}
+        assert constructor(row) == ('u', 's', None)
+
+    def test_renamed_keyword_field(self):
+        """Test descriptor of renamed keyword field gets response key."""
+        row = {'uuid': 'u', 'global': True}
+        constructor = TupleConstructor([Accelerator.global_field, 'uuid'])
+        assert constructor(row) == (True, 'u')
+        record = record_class(Accelerator, [Accelerator.global_field])(row)
+        assert record.global_field is True
+        assert record.as_dict() == {'global': True}
+
+    def test_record_class(self):
+        """Test record class from model."""
+        record_cls = record_class(Accelerator)
+        assert issubclass(record_cls, BaseRecord)
+        assert record_cls.__slots__ == tuple(model_fields(Accelerator))
+        assert record_class(Accelerator) is record_cls
+        record = record_cls({'uuid': 'u', 'global': True, 'unknown': 1})
+        assert record.uuid == 'u'
+        assert record.global_field is True
+        assert record.name is None
+        with pytest.raises(AttributeError):
+            record.unknown  # NOQA:WPS428
+        with pytest.raises(AttributeError):
+            record.unknown = 1
+
+    def test_record_class_fields(self):
+        """Test record class with fields."""
+        record_cls = record_class(Study, ['uuid', Study.study_uid])
+        record = record_cls({'uuid': 'u', 'study_uid': 's', 'id': 1})
+        assert record.as_dict() == {'uuid': 'u', 'study_uid': 's'}
+        assert record == record_cls({'uuid': 'u', 'study_uid': 's'})
+        assert repr(record) == "StudyRecord(uuid='u', study_uid='s')"
+
+
+class TestQueryRows:
+    """Test query rows representation."""
+
+    def test_as_dicts(self, paginated_api):
+        """Test rows as dicts."""
+        rows = list(
+            paginated_api.Study.list()
+            .set_rows_in_page(ROWS_IN_PAGE)
+            .as_dicts()
+            .all(),
+        )
+        assert rows == [{'id': row} for row in range(ROWS_COUNT)]
+        assert all(type(row) is dict for row in rows)  # NOQA:E721
+
+    def test_as_tuples(self, paginated_api):
+        """Test rows as tuples."""
+        rows = paginated_api.Study.list() \
+            .set_rows_in_page(ROWS_IN_PAGE) \
+            .as_tuples([Study.id, 'uuid']) \
+            .all()
+        assert list(rows) == [(row, None) for row in range(ROWS_COUNT)]
+
+    def test_as_records(self, paginated_api):
+        """Test rows as records."""
+        rows = paginated_api.Study.list() \
+            .set_rows_in_page(ROWS_IN_PAGE) \
+            .as_records(Study) \
+            .all()
+        assert [row.id for row in rows] == list(range(ROWS_COUNT))
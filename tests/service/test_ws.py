@@ -0,0 +1,410 @@
+import asyncio
+from threading import Thread
+from urllib.parse import parse_qs
+from time import monotonic, sleep
+
+import pytest
+
+from ambra_sdk.api import Api
+from ambra_sdk.service.ws import (
+    AsyncWSHub,
+    OverflowPolicy,
+    WSHub,
+    WSManager,
+)
+from ambra_sdk.service.ws.dispatcher import (
+    AsyncWSSubscriber,
+    WSSubscriber,
+    sid_md5,
+)
+
+
+def event(channel, name, sid='sid', **kwargs):
+    return dict(
+        channel=channel,
+        event=name,
+        sid_md5=sid_md5(sid),
+        **kwargs,
+    )
+
+
+class TestWSManager:
+    """Test event driven websocket manager."""
+
+    def test_subscribe_is_immediate(self, ws_server):
+        """Test subscribe does not wait for polling interval."""
+        ws_manager = WSManager(ws_server.url)
+        ws_manager.run()
+        start = monotonic()
+        ws_manager.subscribe('sid', 'study.namespace')
+        assert monotonic() - start < 1
+        ws_manager.unsubscribe('study.namespace')
+        ws_manager.stop()
+        assert [request['action'] for request in ws_server.requests] == [
+            'subscribe',
+            'unsubscribe',
+        ]
+
+    def test_events_are_routed(self, ws_server):
+        """Test waiters get events of own key only."""
+        ws_manager = WSManager(ws_server.url)
+        with ws_manager.channel('sid', 'study.namespace') as ws:
+            ws_server.send(event('study.namespace', 'EDIT'))
+            ws_server.send(event('study.namespace', 'READY', uuid='1'))
+            ws_server.send(event('study.namespace', 'READY', 'other'))
+            ws_server.send(event('study.namespace', 'READY', uuid='2'))
+            ready = ws.wait_for_event(
+                'study.namespace',
+                'sid',
+                'READY',
+                timeout=5,
+            )
+            assert ready.json()['uuid'] == '1'
+            edit = ws.wait_for_event(
+                'study.namespace',
+                'sid',
+                'EDIT',
+                timeout=5,
+            )
+            assert edit.json()['event'] == 'EDIT'
+            ready = ws.wait_for(
+                lambda msg: msg.json().get('uuid') == '2',
+                timeout=5,
+            )
+            assert ready.json()['uuid'] == '2'
+            with pytest.raises(TimeoutError):
+                ws.wait_for_event(
+                    'study.namespace',
+                    'sid',
+                    'READY',
+                    timeout=0.1,
+                )
+
+    def test_concurrent_waiters(self, ws_server):
+        """Test waiters in threads are resolved by arrived events."""
+        ws_manager = WSManager(ws_server.url)
+        results = {}
+
+        def wait_event(name):  # NOQA:WPS430
+            results[name] = ws_manager.wait_for_event(
+                'job.namespace',
+                'sid',
+                name,
+                timeout=5,
+            ).json()['event']
+
+        with ws_manager.channel('sid', 'job.namespace'):
+            threads = [
+                Thread(target=wait_event, args=(name,))
+                for name in ('DONE', 'ERROR')
+            ]
+            for thread in threads:
+                thread.start()
+            ws_server.send(event('job.namespace', 'ERROR'))
+            ws_server.send(event('job.namespace', 'DONE'))
+            for thread in threads:
+                thread.join()
+        assert results == {'DONE': 'DONE', 'ERROR': 'ERROR'}
+
+
+@pytest.mark.parametrize('overflow, kept', [
+    (OverflowPolicy.DROP_OLDEST, ['2', '3']),
+    (OverflowPolicy.DROP_NEWEST, ['0', '1']),
+])
+def test_subscriber_overflow(overflow, kept):
+    """Test bounded buffer of subscriber."""
+    subscriber = WSSubscriber([], max_size=2, overflow=overflow)
+    dropped = [subscriber.put(str(index)) for index in range(4)]
+    assert dropped == [0, 0, 1, 1]
+    assert subscriber.dropped == 2
+    assert [subscriber.get(timeout=0), subscriber.get(timeout=0)] == kept
+    with pytest.raises(TimeoutError):
+        subscriber.get(timeout=0)
+
+
+@pytest.mark.asyncio
+async def test_async_subscriber():
+    """Test bounded buffer of async subscriber."""
+    subscriber = AsyncWSSubscriber([], max_size=2)
+    getters = [
+        asyncio.ensure_future(subscriber.get(timeout=5)) for _ in range(2)
+    ]
+    await asyncio.sleep(0)
+    subscriber.put('0')
+    subscriber.put('1')
+    assert sorted(await asyncio.gather(*getters)) == ['0', '1']
+    for index in range(2, 5):
+        subscriber.put(str(index))
+    assert subscriber.dropped == 1
+    assert await subscriber.get(timeout=0) == '3'
+    assert subscriber.drain() == ['4']
+    with pytest.raises(TimeoutError):
+        await subscriber.get(timeout=0.01)
+
+
+def wait_connections(ws_server, count):
+    """Wait for connected sockets.
+
+    :param ws_server: websocket server
+    :param count: number of sockets
+    """
+    start = monotonic()
+    while len(ws_server.sockets) != count:
+        assert monotonic() - start < 5
+        sleep(0.01)
+
+
+class TestWSHub:
+    """Test shared websocket hub."""
+
+    def test_shared_subscriptions(self, ws_server):
+        """Test channel is subscribed once and events are fanned out."""
+        hub = WSHub(ws_server.url)
+        first = hub.subscribe('sid', 'job.namespace', ['DONE'])
+        second = hub.subscribe('sid', 'job.namespace', ['DONE', 'ERROR'])
+        assert hub.channels() == {'job.namespace': 2}
+        ws_server.send(event('job.namespace', 'DONE', job='1'))
+        ws_server.send(event('job.namespace', 'ERROR', job='2'))
+        assert first.get(timeout=5).json()['job'] == '1'
+        assert second.get(timeout=5).json()['job'] == '1'
+        assert second.get(timeout=5).json()['job'] == '2'
+        with pytest.raises(TimeoutError):
+            first.get(timeout=0.1)
+        hub.unsubscribe(first)
+        assert hub.channels() == {'job.namespace': 1}
+        hub.unsubscribe(second)
+        assert hub.channels() == {}
+        hub.close()
+        assert len(ws_server.sockets) <= 1
+        assert [request['action'] for request in ws_server.requests] == [
+            'subscribe',
+            'unsubscribe',
+        ]
+
+    def test_match(self, ws_server):
+        """Test subscriber gets matched events only."""
+        hub = WSHub(ws_server.url)
+        with hub.events(
+            'sid',
+            'study.namespace',
+            ['READY'],
+            lambda msg: msg.json().get('uuid') == '2',
+        ) as events:
+            ws_server.send(event('study.namespace', 'READY', uuid='1'))
+            ws_server.send(event('study.namespace', 'READY', uuid='2'))
+            assert events.get(timeout=5).json()['uuid'] == '2'
+            assert events.drain() == []
+        hub.close()
+
+    def test_slow_subscriber(self, ws_server):
+        """Test overflow of slow subscriber does not affect others."""
+        hub = WSHub(ws_server.url)
+        slow = hub.subscribe('sid', 'job.namespace', ['DONE'], max_size=2)
+        with hub.events('sid', 'job.namespace', ['DONE']) as events:
+            for job_id in range(5):
+                ws_server.send(event('job.namespace', 'DONE', id=job_id))
+            assert [
+                events.get(timeout=5).json()['id'] for _ in range(5)
+            ] == [0, 1, 2, 3, 4]
+        assert [msg.json()['id'] for msg in slow.drain()] == [3, 4]
+        assert slow.dropped == 3
+        assert hub.dropped() == 3
+        hub.unsubscribe(slow)
+        hub.close()
+        assert hub.dropped() == 3
+
+    def test_resubscribe(self, ws_server):
+        """Test channels are resubscribed after reconnect."""
+        hub = WSHub(ws_server.url)
+        with hub.events('sid', 'study.namespace', ['READY']) as events:
+            ws_server.disconnect()
+            wait_connections(ws_server, 1)
+            ws_server.send(event('study.namespace', 'READY'))
+            assert events.get(timeout=5).json()['event'] == 'READY'
+        hub.close()
+        assert [request['action'] for request in ws_server.requests] == [
+            'subscribe',
+            'subscribe',
+            'unsubscribe',
+        ]
+
+    def test_new_sid(self, ws_server):
+        """Test channel is subscribed again by waiter with new sid."""
+        hub = WSHub(ws_server.url)
+        first = hub.subscribe('sid', 'job.namespace', ['DONE'])
+        with hub.events('sid2', 'job.namespace', ['DONE']) as second:
+            assert hub.channels() == {'job.namespace': 2}
+            ws_server.send(event('job.namespace', 'DONE', 'sid2', job='1'))
+            ws_server.send(event('job.namespace', 'DONE', job='2'))
+            for subscriber in (first, second):
+                assert [
+                    subscriber.get(timeout=5).json()['job'] for _ in range(2)
+                ] == ['1', '2']
+        hub.unsubscribe(first)
+        hub.close()
+        assert [
+            (request['action'], request['sid'])
+            for request in ws_server.requests
+        ] == [
+            ('subscribe', 'sid'),
+            ('subscribe', 'sid2'),
+            ('unsubscribe', 'NOT NEEDED!'),
+        ]
+
+    def test_slow_subscription(self, ws_server):
+        """Test slow subscription does not block other channels."""
+        hub = WSHub(ws_server.url)
+        ws_server.held.add('job.slow')
+        slow = []
+
+        def subscribe_slow():  # NOQA:WPS430
+            slow.append(hub.subscribe('sid', 'job.slow', ['DONE']))
+
+        threads = [Thread(target=subscribe_slow) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        start = monotonic()
+        while not ws_server.requests:
+            assert monotonic() - start < 5
+            sleep(0.01)
+        start = monotonic()
+        with hub.events('sid', 'job.fast', ['DONE']) as events:
+            ws_server.send(event('job.fast', 'DONE'))
+            assert events.get(timeout=5).json()['event'] == 'DONE'
+        assert monotonic() - start < 5
+        assert not slow
+        ws_server.release()
+        for thread in threads:
+            thread.join(timeout=5)
+        assert len(slow) == 2
+        assert hub.channels() == {'job.slow': 2}
+        hub.close()
+        assert [
+            (request['action'], request['channel'])
+            for request in ws_server.requests
+        ] == [
+            ('subscribe', 'job.slow'),
+            ('subscribe', 'job.fast'),
+            ('unsubscribe', 'job.fast'),
+        ]
+
+    def test_job_wait(self, ws_server, requests_mock):
+        """Test concurrent job waiters share one websocket."""
+        api = Api.with_sid(url='http://127.0.0.1', sid='sid', rate_limits=None)
+        api.ws_url = ws_server.url
+        done = set()
+        requests_mock.post(
+            api.service_full_url('/job/get'),
+            json=lambda request, context: {
+                'state': 'DONE' if parse_qs(request.text)['id'][0] in done
+                else 'RUNNING',
+            },
+            headers={'content-type': 'application/json'},
+        )
+        waiters = [
+            Thread(
+                target=api.Addon.Job.wait,
+                kwargs={
+                    'job_id': job_id,
+                    'namespace_id': 'namespace',
+                    'timeout': 30,
+                    'ws_timeout': 30,
+                },
+            )
+            for job_id in ('1', '2', '3')
+        ]
+        for waiter in waiters:
+            waiter.start()
+        start = monotonic()
+        while api.ws_hub.channels() != {'job.namespace': 3}:
+            assert monotonic() - start < 5
+            sleep(0.01)
+        done.update({'1', '2', '3'})
+        ws_server.send(event('job.namespace', 'DONE'))
+        for waiter in waiters:
+            waiter.join()
+        assert monotonic() - start < 5
+        assert len(ws_server.sockets) == 1
+        assert api.ws_hub.channels() == {}
+        api.ws_hub.close()
+
+
+@pytest.mark.asyncio
+async def test_async_hub(ws_server):
+    """Test async hub subscriptions and fan out."""
+    hub = AsyncWSHub(ws_server.url)
+    first = await hub.subscribe('sid', 'job.namespace', ['DONE'])
+    async with hub.events('sid', 'job.namespace', ['DONE']) as second:
+        assert hub.channels() == {'job.namespace': 2}
+        ws_server.send(event('job.namespace', 'DONE'))
+        assert (await first.get(timeout=5)).json()['event'] == 'DONE'
+        assert (await second.get(timeout=5)).json()['event'] == 'DONE'
+        # Client loop answers the close handshake
+        await asyncio.get_event_loop().run_in_executor(
+            None,
+            ws_server.disconnect,
+        )
+        while len(ws_server.sockets) != 1:
+            await asyncio.sleep(0.01)
+        ws_server.send(event('job.namespace', 'DONE', job='2'))
+        assert (await second.get(timeout=5)).json()['job'] == '2'
+    await hub.unsubscribe(first)
+    assert hub.channels() == {}
+    await hub.close()
+    assert [request['action'] for request in ws_server.requests] == [
+        'subscribe',
+        'subscribe',
+        'unsubscribe',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_async_hub_new_sid(ws_server):
+    """Test async hub subscribes channel again by new sid."""
+    hub = AsyncWSHub(ws_server.url)
+    async with hub.events('sid', 'job.namespace', ['DONE']) as first:
+        async with hub.events('sid2', 'job.namespace', ['DONE']) as second:
+            ws_server.send(event('job.namespace', 'DONE', 'sid2', job='1'))
+            ws_server.send(event('job.namespace', 'DONE', job='2'))
+            for subscriber in (first, second):
+                assert [
+                    (await subscriber.get(timeout=5)).json()['job']
+                    for _ in range(2)
+                ] == ['1', '2']
+    await hub.close()
+    assert [request['sid'] for request in ws_server.requests] == [
+        'sid',
+        'sid2',
+        'NOT NEEDED!',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_async_hub_slow_subscription(ws_server):
+    """Test slow subscription does not block other channels."""
+    hub = AsyncWSHub(ws_server.url)
+    ws_server.held.add('job.slow')
+    slow = [
+        asyncio.ensure_future(hub.subscribe('sid', 'job.slow', ['DONE']))
+        for _ in range(2)
+    ]
+    while not ws_server.requests:
+        await asyncio.sleep(0.01)
+    start = monotonic()
+    async with hub.events('sid', 'job.fast', ['DONE']) as events:
+        ws_server.send(event('job.fast', 'DONE'))
+        assert (await events.get(timeout=5)).json()['event'] == 'DONE'
+    assert monotonic() - start < 5
+    assert not any(task.done() for task in slow)
+    ws_server.release()
+    await asyncio.wait_for(asyncio.gather(*slow), timeout=5)
+    assert hub.channels() == {'job.slow': 2}
+    await hub.close()
+    assert [
+        (request['action'], request['channel'])
+        for request in ws_server.requests
+    ] == [
+        ('subscribe', 'job.slow'),
+        ('subscribe', 'job.fast'),
+        ('unsubscribe', 'job.fast'),
+    ]
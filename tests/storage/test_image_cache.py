@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+from ambra_sdk.storage.cache import ImageCache, is_content_version
+
+
+class TestImageCache:
+    """Test local disk image cache."""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        """Image cache with max size 100 bytes.
+
+        :param tmp_path: temporary directory
+        :return: image cache
+        """
+        return ImageCache(tmp_path / 'images', max_size=100)
+
+    def test_key(self):
+        """Test key is built from image and params."""
+        key = ImageCache.key('ns', 'study', 'image', 'v1', frame_number=1)
+        assert key == ImageCache.key(
+            'ns', 'study', 'image', 'v1', frame_number=1, depth=None,
+        )
+        assert key != ImageCache.key('ns', 'study', 'image', 'v2', frame_number=1)
+        assert key != ImageCache.key('ns', 'study', 'image', 'v1', frame_number=2)
+
+    def test_content_version(self):
+        """Test latest version is not cached."""
+        assert is_content_version('v1')
+        assert not is_content_version('*')
+        assert not is_content_version(None)
+
+    def test_get_set(self, cache):
+        """Test cached image is memory mapped."""
+        assert cache.get('ab12') is None
+        cache.set('ab12', b'content')
+        with cache.get('ab12') as mapped:
+            assert mapped[:] == b'content'
+            assert mapped.read(3) == b'con'
+        assert cache.stats()[:2] == (1, 1)
+
+    def test_write_chunks(self, cache):
+        """Test image from chunks."""
+        cache.write('ab12', [b'con', b'tent'])
+        with cache.get('ab12') as mapped:
+            assert mapped[:] == b'content'
+        assert cache.stats().size == 7
+
+    def test_failed_write(self, cache):
+        """Test not finished image is not visible."""
+        def chunks():  # NOQA:WPS430
+            yield b'con'
+            raise ValueError('Connection lost')
+
+        with pytest.raises(ValueError):
+            cache.write('ab12', chunks())
+        assert cache.get('ab12') is None
+        assert not list(cache.path.glob('*.tmp'))
+
+    def test_lru_eviction(self, cache):
+        """Test least recently used images are evicted."""
+        for key in ('aa01', 'aa02', 'aa03'):
+            cache.set(key, b'0' * 30)
+            # Usage times differ on file systems with coarse time
+            os.utime(cache._path(key), (0, int(key[-1])))  # NOQA:WPS437
+        with cache.get('aa01'):
+            pass  # NOQA:WPS420
+        cache.set('aa04', b'0' * 30)
+        assert cache.get('aa02') is None
+        for key in ('aa01', 'aa03', 'aa04'):
+            with cache.get(key) as mapped:
+                assert len(mapped) == 30
+        stats = cache.stats()
+        assert stats.evicted == 1
+        assert stats.size == 90
+
+    def test_shared_directory(self, cache):
+        """Test images are shared between instances."""
+        cache.set('ab12', b'content')
+        other = ImageCache(cache.path, max_size=100)
+        assert other.stats().size == 7
+        with other.get('ab12') as mapped:
+            assert mapped[:] == b'content'
+
+    def test_invalidate(self, cache):
+        """Test invalidation."""
+        cache.set('ab12', b'content')
+        cache.set('cd34', b'content')
+        cache.invalidate('ab12')
+        assert cache.get('ab12') is None
+        cache.invalidate()
+        assert cache.get('cd34') is None
+        assert cache.stats().size == 0